@@ -1,5 +1,23 @@
 """
 ERPNext Custom Modules for Discount and Tax Implementation
+
+Core modules import without frappe (pure calculations, safe for tests and
+tooling); every other module needs a Frappe site. Hook entry points in
+hooks.py import what they need lazily.
 """
 
 __version__ = "1.0.0"
+
+# Pure calculation engines, importable without frappe
+CORE_MODULES = [
+    "erpnext_custom.discount_calculator",
+    "erpnext_custom.tax_calculator",
+    "erpnext_custom.gl_entry_sales",
+    "erpnext_custom.gl_entry_purchase",
+    "erpnext_custom.invoice_cancellation",
+    "erpnext_custom.commission_calculator",
+    "erpnext_custom.latency_histogram",
+    "erpnext_custom.query_counter",
+    "erpnext_custom.sampling_profiler",
+    "erpnext_custom.document_mapping"
+]
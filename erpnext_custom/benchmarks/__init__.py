@@ -0,0 +1,6 @@
+"""
+Benchmarks for ERPNext Custom Modules
+
+Standalone scripts that run against local stand-ins (SQLite, in-memory data)
+instead of a Frappe site, so they can run anywhere with plain Python.
+"""
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Calculators, GL Posting and Reversal
+
+Measures the throughput (lines per second) of the frappe-free engines at
+1, 100 and 10,000 lines:
+    calculate_discount:              one discount per invoice line
+    calculate_taxes:                 tax template with N rows
+    post_sales_invoice_gl_entry:     invoice with N tax rows
+    post_purchase_invoice_gl_entry:  invoice with N tax rows
+    create_reversal_gl_entry:        N original GL lines
+    verify_cancellation_net_effect:  N original + N reversal GL lines
+
+Results can be saved as a JSON baseline. A later run compares against it and
+exits with status 1 when any case lost more than --threshold of its
+throughput. Baselines are machine specific: record one on the machine that
+runs the comparison.
+
+Usage:
+    python -m erpnext_custom.benchmarks.bench_calculators --save
+    python -m erpnext_custom.benchmarks.bench_calculators --threshold 0.2
+    python -m erpnext_custom.benchmarks.bench_calculators --sizes 1 100 --baseline /tmp/calculators.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from erpnext_custom.discount_calculator import calculate_discount
+from erpnext_custom.tax_calculator import calculate_taxes
+from erpnext_custom.gl_entry_sales import post_sales_invoice_gl_entry
+from erpnext_custom.gl_entry_purchase import post_purchase_invoice_gl_entry
+from erpnext_custom.invoice_cancellation import create_reversal_gl_entry, verify_cancellation_net_effect
+
+
+DEFAULT_SIZES = [1, 100, 10000]
+
+# Allowed throughput loss before a case counts as a regression (0.2 = 20%)
+DEFAULT_THRESHOLD = 0.2
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "calculators.json")
+
+POSTING_DATE = "2024-01-15"
+
+
+def make_tax_rows(lines: int) -> List[Dict[str, Any]]:
+    """N calculated tax rows of 1,000 each"""
+    return [
+        {"account_head": "2210 - Hutang PPN", "description": f"Tax {i}", "rate": 1, "tax_amount": 1000.0}
+        for i in range(lines)
+    ]
+
+
+def make_gl_entries(lines: int) -> List[Dict[str, Any]]:
+    """N balanced GL lines: alternating debit and credit"""
+    entries = []
+    for i in range(lines):
+        debit = 1000.0 if i % 2 == 0 else 0
+        credit = 1000.0 if i % 2 == 1 else 0
+        # With an odd count the last line balances itself
+        if i == lines - 1 and lines % 2:
+            credit = 1000.0
+        entries.append({
+            "account": f"{4100 + i % 50} - Akun",
+            "debit": debit,
+            "credit": credit,
+            "posting_date": POSTING_DATE,
+            "voucher_type": "Sales Invoice",
+            "voucher_no": "SI-2024-00001",
+            "remarks": "Sales Invoice SI-2024-00001"
+        })
+    return entries
+
+
+def setup_calculate_discount(lines: int) -> Callable[[], Any]:
+    subtotals = [100000.0 + i for i in range(lines)]
+
+    def run():
+        for subtotal in subtotals:
+            calculate_discount(subtotal, discount_percentage=10)
+    return run
+
+
+def setup_calculate_taxes(lines: int) -> Callable[[], Any]:
+    template = {"taxes": [
+        {
+            "charge_type": "On Previous Row Total" if i % 2 else "On Net Total",
+            "account_head": "2210 - Hutang PPN",
+            "description": f"Tax {i}",
+            "rate": 0.01
+        }
+        for i in range(lines)
+    ]}
+    return lambda: calculate_taxes(900000, template)
+
+
+def setup_post_sales_invoice_gl_entry(lines: int) -> Callable[[], Any]:
+    taxes = make_tax_rows(lines)
+    invoice = {
+        "name": "SI-2024-00001",
+        "customer": "CUST-001",
+        "total": 1000000,
+        "discount_amount": 100000,
+        "net_total": 900000,
+        "taxes": taxes,
+        "grand_total": 900000 + sum(tax["tax_amount"] for tax in taxes)
+    }
+    return lambda: post_sales_invoice_gl_entry(invoice, POSTING_DATE)
+
+
+def setup_post_purchase_invoice_gl_entry(lines: int) -> Callable[[], Any]:
+    taxes = make_tax_rows(lines)
+    invoice = {
+        "name": "PI-2024-00001",
+        "supplier": "SUPP-001",
+        "total": 600000,
+        "discount_amount": 50000,
+        "net_total": 550000,
+        "taxes": taxes,
+        "grand_total": 550000 + sum(tax["tax_amount"] for tax in taxes)
+    }
+    return lambda: post_purchase_invoice_gl_entry(invoice, POSTING_DATE)
+
+
+def setup_create_reversal_gl_entry(lines: int) -> Callable[[], Any]:
+    entries = make_gl_entries(lines)
+    return lambda: create_reversal_gl_entry(entries, POSTING_DATE)
+
+
+def setup_verify_cancellation_net_effect(lines: int) -> Callable[[], Any]:
+    entries = make_gl_entries(lines)
+    reversal = create_reversal_gl_entry(entries, POSTING_DATE)["gl_entries"]
+    return lambda: verify_cancellation_net_effect(entries, reversal)
+
+
+CASES = {
+    "calculate_discount": setup_calculate_discount,
+    "calculate_taxes": setup_calculate_taxes,
+    "post_sales_invoice_gl_entry": setup_post_sales_invoice_gl_entry,
+    "post_purchase_invoice_gl_entry": setup_post_purchase_invoice_gl_entry,
+    "create_reversal_gl_entry": setup_create_reversal_gl_entry,
+    "verify_cancellation_net_effect": setup_verify_cancellation_net_effect
+}
+
+
+def case_key(name: str, lines: int) -> str:
+    """Baseline key of a case, e.g. "calculate_taxes[100]" """
+    return f"{name}[{lines}]"
+
+
+def measure(func: Callable[[], Any], lines: int, min_time: float = 0.2, rounds: int = 3) -> float:
+    """
+    Throughput of func in lines per second, best of several rounds.
+
+    Each round calls func until min_time has passed.
+    """
+    best = 0.0
+
+    for _ in range(rounds):
+        calls = 0
+        started = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - started
+        best = max(best, calls * lines / elapsed)
+
+    return best
+
+
+def run_suite(
+    sizes: List[int] = DEFAULT_SIZES,
+    cases: List[str] = None,
+    min_time: float = 0.2
+) -> Dict[str, float]:
+    """
+    Run every case at every size.
+
+    Returns:
+        Dict of case key -> lines per second
+    """
+    results = {}
+
+    for name in cases or CASES:
+        for lines in sizes:
+            results[case_key(name, lines)] = round(measure(CASES[name](lines), lines, min_time), 1)
+
+    return results
+
+
+def compare_to_baseline(
+    results: Dict[str, float],
+    baseline: Dict[str, float],
+    threshold: float = DEFAULT_THRESHOLD
+) -> List[Dict[str, Any]]:
+    """
+    Cases whose throughput dropped more than threshold below the baseline.
+
+    Cases missing from either side are ignored.
+
+    Returns:
+        List of dicts with case, baseline, current and change (fraction, negative = slower)
+    """
+    regressions = []
+
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+
+        change = (current - previous) / previous
+        if change < -threshold:
+            regressions.append({
+                "case": key,
+                "baseline": previous,
+                "current": current,
+                "change": round(change, 3)
+            })
+
+    return regressions
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    """Results of a saved baseline, or {} when there is none"""
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r") as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path: str, results: Dict[str, float]) -> None:
+    """Save results with the interpreter they were measured on"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "recorded": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "results": results
+        }, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark calculators, GL posting and reversal")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Line counts")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="Only run this case")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per measurement round")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed throughput loss, e.g. 0.2 for 20%%")
+    parser.add_argument("--save", action="store_true", help="Save the results as the new baseline")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"CALCULATOR BENCHMARK: sizes {args.sizes}, threshold {args.threshold:.0%}")
+    print("=" * 80)
+
+    results = run_suite(args.sizes, args.case, args.min_time)
+    baseline = load_baseline(args.baseline)
+
+    for key, current in results.items():
+        line = f"{key:>42}: {current:>14,.0f} lines/s"
+        if baseline.get(key):
+            line += f"  ({(current - baseline[key]) / baseline[key]:+.1%} vs baseline)"
+        print(line)
+
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save to record one")
+
+    print("=" * 80)
+
+    if regressions and not args.save:
+        for regression in regressions:
+            print(f"❌ {regression['case']}: {regression['current']:,.0f} lines/s, "
+                  f"{regression['change']:.1%} vs baseline {regression['baseline']:,.0f}")
+        sys.exit(1)
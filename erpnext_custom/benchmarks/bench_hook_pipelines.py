@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Hook Pipelines
+
+Runs the submit and cancel pipeline of every document the erpnext_custom
+hooks handle against the in-memory frappe stand-in (see frappe_standin),
+optionally with simulated database latency:
+    1. Sales Invoice: GL posting and commission / GL reversal
+    2. Purchase Invoice: GL posting with PPh 23 / GL reversal
+    3. Credit Note: commission adjustment / its reversal
+    4. Sales Return: returned quantity index and Stock Entry / their reversal
+
+Every document is submitted, and later cancelled, in a request of its own
+(commit, fresh frappe.local). Cancel latency includes loading the document.
+
+A workload file from workload.py can be replayed instead, record by record.
+
+Reports docs/s, p50/p99 latency and SQL statements per document for each
+pipeline and action, and the time spent waiting on the simulated database.
+Exits with status 1 when a hook logged an error.
+
+Usage:
+    python -m erpnext_custom.benchmarks.bench_hook_pipelines
+    python -m erpnext_custom.benchmarks.bench_hook_pipelines --docs 1000 --latency lan
+    python -m erpnext_custom.benchmarks.bench_hook_pipelines --workload workload.jsonl
+"""
+
+import argparse
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List
+
+from erpnext_custom.benchmarks.frappe_standin import FrappeStandIn, LATENCY_PROFILES, latency_profile
+from erpnext_custom.benchmarks.bench_month_end import (
+    make_credit_note,
+    make_delivery_note,
+    make_items,
+    make_purchase_invoice,
+    make_sales_invoice,
+    make_sales_return,
+    month_dates,
+    setup_site,
+    summarize_latencies
+)
+from erpnext_custom.benchmarks.workload import read_workload
+
+
+PIPELINES = ["Sales Invoice", "Purchase Invoice", "Credit Note", "Sales Return"]
+ACTIONS = ["submit", "cancel"]
+
+
+def run_pipelines(docs: int = 200, latency: str = None, seed: int = 42) -> Dict[str, Any]:
+    """
+    Submit and cancel documents of every pipeline on a fresh stand-in site.
+
+    Sales Invoices are split in quarters: one gets Credit Notes, one is
+    delivered and partly returned, and the other half is cancelled.
+
+    Args:
+        docs: Sales Invoices to submit (Purchase Invoices: half as many)
+        latency: Name of a LATENCY_PROFILES entry, or None for no latency
+        seed: Random seed for documents and latency jitter
+
+    Returns:
+        Dict containing:
+            - pipelines: Dict of pipeline -> action -> latency summary,
+              with queries_per_doc added
+            - latency_seconds: Time spent waiting on the simulated database
+            - seconds: Wall time of the run
+            - errors: Error Log entries written by the hooks
+    """
+    rng = random.Random(seed)
+    dates = month_dates("2024-01")
+    customers = [f"CUST-{i:04d}" for i in range(max(10, docs // 20))]
+    suppliers = [f"SUPP-{i:03d}" for i in range(max(5, docs // 100))]
+    sales_persons = [f"Sales {i:02d}" for i in range(12)]
+    items = make_items(rng, 200)
+    latencies = {(pipeline, action): [] for pipeline in PIPELINES for action in ACTIONS}
+    queries = dict.fromkeys(latencies, 0)
+
+    standin = FrappeStandIn(latency=latency_profile(latency, seed))
+    started = time.perf_counter()
+
+    with standin.installed() as frappe:
+        setup_site(standin)
+
+        def timed(pipeline: str, action: str, run: Callable[[], Any]) -> Any:
+            query_count = standin.db.query_count
+            begin = time.perf_counter()
+            result = run()
+            standin.end_request()
+            latencies[(pipeline, action)].append(time.perf_counter() - begin)
+            queries[(pipeline, action)] += standin.db.query_count - query_count
+            return result
+
+        def cancel(pipeline: str, doc: Any) -> None:
+            timed(pipeline, "cancel", lambda: frappe.get_doc(doc.doctype, doc.name).cancel())
+
+        invoices = [
+            timed("Sales Invoice", "submit", frappe.get_doc(
+                make_sales_invoice(rng, rng.choice(dates), customers, items, sales_persons)
+            ).submit)
+            for _ in range(docs)
+        ]
+        purchase_invoices = [
+            timed("Purchase Invoice", "submit", frappe.get_doc(
+                make_purchase_invoice(rng, rng.choice(dates), suppliers, items)
+            ).submit)
+            for _ in range(docs // 2)
+        ]
+
+        quarter = docs // 4
+        credit_notes = [
+            timed("Credit Note", "submit", frappe.get_doc(
+                make_credit_note(rng, invoice, max(invoice.posting_date, rng.choice(dates)))
+            ).submit)
+            for invoice in invoices[:quarter]
+        ]
+
+        sales_returns = []
+        for invoice in invoices[quarter:2 * quarter]:
+            delivery_note = frappe.get_doc(make_delivery_note(invoice)).submit()
+            standin.end_request()
+            sales_returns.append(timed("Sales Return", "submit", frappe.get_doc(
+                make_sales_return(rng, delivery_note, max(invoice.posting_date, rng.choice(dates)))
+            ).submit))
+
+        for credit_note in credit_notes:
+            cancel("Credit Note", credit_note)
+        for sales_return in sales_returns:
+            cancel("Sales Return", sales_return)
+        for invoice in invoices[2 * quarter:]:
+            cancel("Sales Invoice", invoice)
+        for purchase_invoice in purchase_invoices:
+            cancel("Purchase Invoice", purchase_invoice)
+
+    return summarize_pipelines(standin, latencies, queries, started)
+
+
+def replay_workload(records: Iterable[Dict[str, Any]], latency: str = None, seed: int = 42) -> Dict[str, Any]:
+    """
+    Replay workload records (see workload.py) on a fresh stand-in site.
+
+    Company records are inserted untimed; every other record is one timed
+    request, reported under its kind and action.
+
+    Args:
+        records: Workload records, in stream order
+        latency: Name of a LATENCY_PROFILES entry, or None for no latency
+        seed: Seed of the latency jitter
+
+    Returns:
+        Dict in the format of run_pipelines
+    """
+    latencies = {}
+    queries = {}
+
+    standin = FrappeStandIn(latency=latency_profile(latency, seed))
+    started = time.perf_counter()
+
+    with standin.installed() as frappe:
+        setup_site(standin)
+
+        for record in records:
+            if record["action"] == "insert":
+                frappe.get_doc(record["doc"]).insert()
+                standin.end_request()
+                continue
+
+            if record["action"] == "cancel":
+                run = lambda: frappe.get_doc(record["doctype"], record["name"]).cancel()
+            else:
+                run = getattr(frappe.get_doc(record["doc"]), record["action"])
+
+            key = (record["kind"], record["action"])
+            query_count = standin.db.query_count
+            begin = time.perf_counter()
+            run()
+            standin.end_request()
+            latencies.setdefault(key, []).append(time.perf_counter() - begin)
+            queries[key] = queries.get(key, 0) + standin.db.query_count - query_count
+
+    return summarize_pipelines(standin, latencies, queries, started)
+
+
+def summarize_pipelines(
+    standin: FrappeStandIn,
+    latencies: Dict[tuple, List[float]],
+    queries: Dict[tuple, int],
+    started: float
+) -> Dict[str, Any]:
+    pipelines = {}
+    for (pipeline, action), samples in latencies.items():
+        summary = summarize_latencies(samples)
+        summary["queries_per_doc"] = round(queries[(pipeline, action)] / len(samples), 1) if samples else 0
+        pipelines.setdefault(pipeline, {})[action] = summary
+
+    return {
+        "pipelines": pipelines,
+        "latency_seconds": round(standin.db.latency_seconds, 3),
+        "seconds": round(time.perf_counter() - started, 3),
+        "errors": standin.error_log
+    }
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    lines = [f"{'pipeline':>18} {'action':>7} {'docs':>6} {'docs/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'SQL/doc':>8}"]
+    for pipeline, actions in report["pipelines"].items():
+        for action, summary in actions.items():
+            lines.append(
+                f"{pipeline:>18} {action:>7} {summary['count']:>6} {summary['docs_per_second']:>10,.1f} "
+                f"{summary['p50_ms']:>10.3f} {summary['p99_ms']:>10.3f} {summary['queries_per_doc']:>8}"
+            )
+    return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the submit and cancel pipelines of the hooks")
+    parser.add_argument("--docs", type=int, default=200, help="Sales Invoices to submit")
+    parser.add_argument("--latency", choices=["none"] + list(LATENCY_PROFILES), default="none",
+                        help="Simulated database latency")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--workload", help="Replay a workload.py JSON Lines file instead")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    if args.workload:
+        print(f"HOOK PIPELINE BENCHMARK: workload {args.workload}, latency {args.latency}")
+    else:
+        print(f"HOOK PIPELINE BENCHMARK: {args.docs} invoices, latency {args.latency}, seed {args.seed}")
+    print("=" * 80)
+
+    if args.workload:
+        report = replay_workload(read_workload(args.workload), latency=args.latency, seed=args.seed)
+    else:
+        report = run_pipelines(docs=args.docs, latency=args.latency, seed=args.seed)
+
+    for line in format_report(report):
+        print(line)
+
+    print(f"\nRun time:        {report['seconds']:.3f}s")
+    print(f"Database wait:   {report['latency_seconds']:.3f}s (simulated)")
+    print("=" * 80)
+
+    if report["errors"]:
+        for error in report["errors"]:
+            print(f"❌ Error Log: {error['title']}: {error['message']}")
+        sys.exit(1)
+
+    print("✅ All pipelines ran without hook errors")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Import Time of Hooks and the Frappe-Free Core
+
+Every scenario is imported in a fresh interpreter, several times, and the
+median import time is reported together with whether frappe got imported.
+
+Scenarios:
+    hooks:       erpnext_custom.hooks as Frappe loads it for a doc event
+    core:        all CORE_MODULES (what tests and tooling import)
+    hooks-eager: hooks plus every module its hooks use, i.e. the cost every
+                 worker paid at boot before the hook imports became lazy
+                 (needs frappe)
+
+Usage:
+    python -m erpnext_custom.benchmarks.bench_import_time
+    python -m erpnext_custom.benchmarks.bench_import_time --runs 20
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+from erpnext_custom import CORE_MODULES
+
+
+# Modules the hooks in erpnext_custom.hooks import when they run
+HOOK_MODULES = [
+    "erpnext_custom.gl_entry_sales",
+    "erpnext_custom.gl_entry_purchase",
+    "erpnext_custom.invoice_cancellation",
+    "erpnext_custom.credit_note_commission",
+    "erpnext_custom.commission_ledger",
+    "erpnext_custom.stock_adjustment_gl_fix"
+]
+
+SCENARIOS = {
+    "hooks": ["erpnext_custom.hooks"],
+    "core": CORE_MODULES,
+    "hooks-eager": ["erpnext_custom.hooks"] + HOOK_MODULES
+}
+
+CHILD_SCRIPT = """
+import importlib, json, sys, time
+started = time.perf_counter()
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+print(json.dumps({"seconds": time.perf_counter() - started, "frappe": "frappe" in sys.modules}))
+"""
+
+
+def time_import(modules: List[str]) -> Dict[str, Any]:
+    """Import modules in a fresh interpreter"""
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT] + modules,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1]}
+
+    return json.loads(completed.stdout)
+
+
+def run(name: str, runs: int) -> Dict[str, Any]:
+    """Median import time of one scenario"""
+    samples = []
+    imports_frappe = False
+
+    for _ in range(runs):
+        sample = time_import(SCENARIOS[name])
+        if "error" in sample:
+            return {"scenario": name, "error": sample["error"]}
+        samples.append(sample["seconds"])
+        imports_frappe = sample["frappe"]
+
+    return {
+        "scenario": name,
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "imports_frappe": imports_frappe
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark import time of erpnext_custom hooks and core")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per scenario")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"IMPORT TIME BENCHMARK: median of {args.runs} fresh interpreters")
+    print("=" * 80)
+
+    results = [run(name, args.runs) for name in SCENARIOS]
+
+    for result in results:
+        if "error" in result:
+            print(f"{result['scenario']:>12}: ❌ {result['error']}")
+        else:
+            print(f"{result['scenario']:>12}: {result['median_ms']:8.2f} ms"
+                  f"{'  (imports frappe)' if result['imports_frappe'] else ''}")
+
+    timings = {result["scenario"]: result.get("median_ms") for result in results}
+    if timings.get("hooks") and timings.get("hooks-eager"):
+        print(f"\nHooks import speedup: {timings['hooks-eager'] / timings['hooks']:.1f}x")
+    print("=" * 80)
@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Month-End Close
+
+Simulates one month of one company against the in-memory frappe stand-in
+(see frappe_standin), with the production hooks registered as doc events:
+    1. Sales Invoices with tiered discounts and PPN 11%, one or two sales persons
+    2. Purchase Invoices with PPN 11% and PPh 23 (2%) withheld
+    3. Credit Notes against a share of the invoices (commission adjustment)
+    4. Delivery Notes and Sales Returns against a share of the invoices
+    5. Mass cancellation of a share of the remaining invoices
+    6. Period close: ledger audit, commission recompute, closing entries
+
+ERPNext's own ledger posting is simulated by an extra on_submit event that
+writes the lines of post_sales_invoice_gl_entry / post_purchase_invoice_gl_entry
+to GL Entry, so cancellation and the audits have a ledger to work on. Every
+document ends its own "request" (commit, fresh frappe.local).
+
+Reports throughput and p50/p99 latency per document type and the peak memory
+traced by tracemalloc. Mass cancellation latency is per invoice, amortized
+over its batch. Exits with status 1 when a hook logged an error, the audit
+found problems or the commission totals drifted.
+
+Usage:
+    python -m erpnext_custom.benchmarks.bench_month_end
+    python -m erpnext_custom.benchmarks.bench_month_end --invoices 5000 --seed 7
+    python -m erpnext_custom.benchmarks.bench_month_end --no-memory
+    python -m erpnext_custom.benchmarks.bench_month_end --latency lan
+"""
+
+import argparse
+import calendar
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from erpnext_custom.benchmarks.frappe_standin import FrappeStandIn, LATENCY_PROFILES, latency_profile
+from erpnext_custom.discount_calculator import calculate_discount
+from erpnext_custom.tax_calculator import calculate_taxes
+from erpnext_custom.gl_entry_sales import post_sales_invoice_gl_entry
+from erpnext_custom.gl_entry_purchase import post_purchase_invoice_gl_entry
+from erpnext_custom.hooks import DOC_EVENTS
+
+
+COMPANY = "PT Benchmark Abadi"
+COMPANY_ABBR = "BAC"
+WAREHOUSE = f"Stores - {COMPANY_ABBR}"
+COST_CENTER = f"Main - {COMPANY_ABBR}"
+RETAINED_EARNINGS_ACCOUNT = "3200 - Laba Ditahan"
+
+# Discount percentage by invoice subtotal, highest tier first
+DISCOUNT_TIERS = [(50000000, 10), (10000000, 5), (0, 0)]
+
+# Commission on the net line amount
+COMMISSION_RATE = 0.02
+
+SALES_TAX_TEMPLATE = {"taxes": [
+    {"charge_type": "On Net Total", "account_head": "2210 - Hutang PPN", "description": "PPN 11%", "rate": 11}
+]}
+
+PURCHASE_TAX_TEMPLATE = {"taxes": [
+    {"charge_type": "On Net Total", "account_head": "1410 - PPN Masukan", "description": "PPN 11%", "rate": 11},
+    {"charge_type": "On Net Total", "account_head": "2230 - Hutang PPh 23", "description": "PPh 23",
+     "rate": 2, "add_deduct_tax": "Deduct"}
+]}
+
+SALES_RETURN_EVENTS = {
+    "Sales Return": {
+        "validate": "erpnext_custom.sales_return.sales_return_validation.validate",
+        "on_submit": "erpnext_custom.sales_return.sales_return_validation.on_submit",
+        "on_cancel": "erpnext_custom.sales_return.sales_return_validation.on_cancel"
+    }
+}
+
+STAGES = ["Sales Invoice", "Purchase Invoice", "Credit Note", "Sales Return", "Mass Cancellation", "Period Close"]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of unsorted samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize_latencies(samples: List[float]) -> Dict[str, Any]:
+    """Count, total seconds, documents per second and p50/p99 in milliseconds"""
+    seconds = sum(samples)
+    return {
+        "count": len(samples),
+        "seconds": round(seconds, 4),
+        "docs_per_second": round(len(samples) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3)
+    }
+
+
+def discount_percentage_for(subtotal: float) -> float:
+    for threshold, percentage in DISCOUNT_TIERS:
+        if subtotal >= threshold:
+            return percentage
+    return 0
+
+
+def make_items(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    """Item master: codes with a skewed price list"""
+    return [
+        {"item_code": f"ITEM-{i:04d}", "rate": float(rng.choice([15000, 45000, 120000, 350000, 1250000]))}
+        for i in range(count)
+    ]
+
+
+def make_sales_invoice(
+    rng: random.Random,
+    posting_date: str,
+    customers: List[str],
+    items: List[Dict[str, Any]],
+    sales_persons: List[str]
+) -> Dict[str, Any]:
+    """Sales Invoice with 1-10 lines, tiered discount, PPN and item commission"""
+    lines = []
+    for item in rng.sample(items, rng.randint(1, 10)):
+        qty = rng.randint(1, 20)
+        lines.append({
+            "item_code": item["item_code"],
+            "qty": qty,
+            "uom": "Nos",
+            "rate": item["rate"],
+            "amount": qty * item["rate"],
+            "warehouse": WAREHOUSE
+        })
+
+    total = sum(line["amount"] for line in lines)
+    discount = calculate_discount(total, discount_percentage_for(total))
+    taxes = calculate_taxes(discount["net_total"], SALES_TAX_TEMPLATE)
+
+    factor = discount["net_total"] / total
+    for line in lines:
+        line["custom_komisi_sales"] = round(line["amount"] * factor * COMMISSION_RATE, 2)
+
+    team = rng.sample(sales_persons, rng.choice([1, 1, 2]))
+    shares = [100] if len(team) == 1 else [60, 40]
+
+    return {
+        "doctype": "Sales Invoice",
+        "naming_series": "SINV-.YYYY.-",
+        "company": COMPANY,
+        "customer": rng.choice(customers),
+        "posting_date": posting_date,
+        "is_return": 0,
+        "status": "Unpaid",
+        "items": lines,
+        "total": total,
+        "discount_percentage": discount["discount_percentage"],
+        "discount_amount": discount["discount_amount"],
+        "net_total": discount["net_total"],
+        "taxes": taxes["taxes"],
+        "grand_total": taxes["grand_total"],
+        "custom_total_komisi_sales": round(sum(line["custom_komisi_sales"] for line in lines), 2),
+        "sales_team": [
+            {"sales_person": person, "allocated_percentage": share}
+            for person, share in zip(team, shares)
+        ]
+    }
+
+
+def make_credit_note(rng: random.Random, invoice: Any, posting_date: str) -> Dict[str, Any]:
+    """Credit Note returning part of the first line of an invoice, at the invoice's discount"""
+    line = invoice.items[0]
+    qty = max(1, line.qty // 2)
+    net_amount = round(qty * line.rate * (1 - (invoice.discount_percentage or 0) / 100), 2)
+    taxes = calculate_taxes(net_amount, SALES_TAX_TEMPLATE)
+    commission = round(line.custom_komisi_sales * qty / line.qty, 2)
+
+    return {
+        "doctype": "Sales Invoice",
+        "naming_series": "SRET-.YYYY.-",
+        "company": COMPANY,
+        "customer": invoice.customer,
+        "posting_date": posting_date,
+        "is_return": 1,
+        "return_against": invoice.name,
+        "status": "Return",
+        "items": [{
+            "item_code": line.item_code,
+            "qty": -qty,
+            "uom": line.uom,
+            "rate": line.rate,
+            "amount": -net_amount,
+            "warehouse": WAREHOUSE,
+            "custom_komisi_sales": -commission
+        }],
+        "total": -net_amount,
+        "discount_amount": 0,
+        "net_total": -net_amount,
+        "taxes": [dict(tax, tax_amount=-tax["tax_amount"]) for tax in taxes["taxes"]],
+        "grand_total": -taxes["grand_total"],
+        "custom_total_komisi_sales": -commission
+    }
+
+
+def make_purchase_invoice(
+    rng: random.Random,
+    posting_date: str,
+    suppliers: List[str],
+    items: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Purchase Invoice with 1-5 lines, PPN and PPh 23 withheld"""
+    lines = []
+    for item in rng.sample(items, rng.randint(1, 5)):
+        qty = rng.randint(5, 100)
+        rate = round(item["rate"] * 0.7, 2)
+        lines.append({"item_code": item["item_code"], "qty": qty, "rate": rate, "amount": qty * rate})
+
+    total = sum(line["amount"] for line in lines)
+    taxes = calculate_taxes(total, PURCHASE_TAX_TEMPLATE, tax_type="Purchase")
+
+    return {
+        "doctype": "Purchase Invoice",
+        "naming_series": "PINV-.YYYY.-",
+        "company": COMPANY,
+        "supplier": rng.choice(suppliers),
+        "posting_date": posting_date,
+        "is_return": 0,
+        "status": "Unpaid",
+        "items": lines,
+        "total": total,
+        "discount_amount": 0,
+        "net_total": total,
+        "taxes": taxes["taxes"],
+        "grand_total": taxes["grand_total"]
+    }
+
+
+def make_delivery_note(invoice: Any) -> Dict[str, Any]:
+    return {
+        "doctype": "Delivery Note",
+        "company": COMPANY,
+        "customer": invoice.customer,
+        "posting_date": invoice.posting_date,
+        "items": [
+            {
+                "item_code": line.item_code,
+                "item_name": line.item_code,
+                "qty": line.qty,
+                "uom": line.uom,
+                "rate": line.rate,
+                "warehouse": line.warehouse
+            }
+            for line in invoice.items
+        ]
+    }
+
+
+def make_sales_return(rng: random.Random, delivery_note: Any, posting_date: str) -> Dict[str, Any]:
+    """Sales Return of part of every Delivery Note line"""
+    return {
+        "doctype": "Sales Return",
+        "company": COMPANY,
+        "customer": delivery_note.customer,
+        "delivery_note": delivery_note.name,
+        "posting_date": posting_date,
+        "items": [
+            {
+                "item_code": line.item_code,
+                "delivery_note_item": line.name,
+                "qty": rng.randint(1, line.qty),
+                "uom": line.uom,
+                "rate": line.rate,
+                "warehouse": line.warehouse,
+                "return_reason": rng.choice(["Damaged", "Wrong Item", "Other"]),
+                "return_notes": "Benchmark return"
+            }
+            for line in delivery_note.items
+        ]
+    }
+
+
+def post_ledger_entries(doc: Any, method: str = None) -> None:
+    """
+    Write the invoice's GL lines, standing in for ERPNext's make_gl_entries.
+
+    Party lines carry party_type and party like ERPNext's receivable and
+    payable rows.
+    """
+    import frappe
+
+    invoice = {
+        "name": doc.name,
+        "customer": doc.customer,
+        "supplier": doc.supplier,
+        "total": doc.total,
+        "discount_amount": doc.get("discount_amount") or 0,
+        "discount_percentage": doc.get("discount_percentage") or 0,
+        "net_total": doc.net_total,
+        "taxes": [
+            {"account_head": tax.account_head, "description": tax.description, "tax_amount": tax.tax_amount}
+            for tax in doc.taxes
+        ],
+        "grand_total": doc.grand_total
+    }
+    if doc.doctype == "Sales Invoice":
+        gl_result = post_sales_invoice_gl_entry(invoice, str(doc.posting_date))
+        party_type, party, party_account = "Customer", doc.customer, "1210 - Piutang Usaha"
+    else:
+        gl_result = post_purchase_invoice_gl_entry(invoice, str(doc.posting_date))
+        party_type, party, party_account = "Supplier", doc.supplier, "2110 - Hutang Usaha"
+
+    now = frappe.utils.now()
+    user = frappe.session.user
+    rows = []
+    for entry in gl_result["gl_entries"]:
+        is_party_line = entry["account"] == party_account
+        rows.append(dict(
+            entry,
+            name=frappe.generate_hash(length=10),
+            creation=now,
+            modified=now,
+            owner=user,
+            modified_by=user,
+            docstatus=1,
+            is_cancelled=0,
+            company=doc.company,
+            cost_center=COST_CENTER,
+            against=entry.get("against"),
+            party_type=party_type if is_party_line else None,
+            party=party if is_party_line else None
+        ))
+
+    fields = list(rows[0])
+    frappe.db.bulk_insert("GL Entry", fields, [tuple(row[field] for field in fields) for row in rows])
+
+
+def close_period(from_date: str, to_date: str) -> Dict[str, Any]:
+    """
+    Period close: ledger audit, commission recompute and closing entries that
+    move the income and expense balances to retained earnings.
+
+    Returns:
+        Dict containing:
+            - audit: audit_ledger_integrity report
+            - commission_drift: Invoices whose stored commission needed a fix
+            - closing_entries: Number of closing GL lines
+            - net_profit: Balance moved to retained earnings
+    """
+    import frappe
+    from erpnext_custom.gl_audit import audit_ledger_integrity
+    from erpnext_custom.commission_recompute import recompute_commission_totals
+
+    audit = audit_ledger_integrity(from_date, to_date)
+    recompute = recompute_commission_totals(from_date, to_date)
+
+    balances = frappe.db.sql("""
+        SELECT account, SUM(debit) - SUM(credit) AS balance
+        FROM `tabGL Entry`
+        WHERE is_cancelled = 0
+        AND posting_date BETWEEN %s AND %s
+        AND (account LIKE '4%%' OR account LIKE '5%%')
+        GROUP BY account
+    """, (from_date, to_date), as_dict=True)
+
+    now = frappe.utils.now()
+    voucher_no = f"PCV-{to_date}"
+    rows = []
+    net_profit = 0.0
+    for row in balances:
+        balance = round(row.balance, 2)
+        if not balance:
+            continue
+        net_profit -= balance
+        rows.append((voucher_no, row.account, max(-balance, 0), max(balance, 0)))
+    rows.append((voucher_no, RETAINED_EARNINGS_ACCOUNT, max(net_profit, 0), max(-net_profit, 0)))
+
+    fields = ["name", "posting_date", "account", "debit", "credit", "voucher_type", "voucher_no",
+              "remarks", "is_cancelled", "company", "creation", "modified", "docstatus"]
+    frappe.db.bulk_insert("GL Entry", fields, [
+        (frappe.generate_hash(length=10), to_date, account, debit, credit, "Period Closing Voucher",
+         voucher, f"Period Closing Voucher {voucher}", 0, COMPANY, now, now, 1)
+        for voucher, account, debit, credit in rows
+    ])
+
+    return {
+        "audit": audit,
+        "commission_drift": len(recompute["changes"]),
+        "closing_entries": len(rows),
+        "net_profit": round(net_profit, 2)
+    }
+
+
+def setup_site(standin: FrappeStandIn) -> None:
+    """Tables, company and doc events of a fresh stand-in site"""
+    import frappe
+    from erpnext_custom.commission_ledger import install_commission_ledger
+    from erpnext_custom.sales_return.returned_qty_index import install_returned_qty_index
+
+    install_commission_ledger()
+    install_returned_qty_index()
+
+    frappe.get_doc({
+        "doctype": "Company",
+        "name": COMPANY,
+        "abbr": COMPANY_ABBR,
+        "default_currency": "IDR",
+        "enable_perpetual_inventory": 0
+    }).insert()
+
+    # ERPNext posts its ledger before the app's doc_events run
+    standin.register_doc_events({
+        "Sales Invoice": {"on_submit": post_ledger_entries},
+        "Purchase Invoice": {"on_submit": post_ledger_entries}
+    })
+    standin.register_doc_events(DOC_EVENTS)
+    standin.register_doc_events(SALES_RETURN_EVENTS)
+    standin.end_request()
+
+
+def month_dates(month: str) -> List[str]:
+    year, month_number = (int(part) for part in month.split("-"))
+    days = calendar.monthrange(year, month_number)[1]
+    return [f"{month}-{day:02d}" for day in range(1, days + 1)]
+
+
+def run_month(
+    invoices: int = 1000,
+    purchase_invoices: int = None,
+    credit_note_rate: float = 0.05,
+    return_rate: float = 0.03,
+    cancel_rate: float = 0.02,
+    month: str = "2024-01",
+    seed: int = 42,
+    batch_size: int = 100,
+    trace_memory: bool = True,
+    latency: str = None
+) -> Dict[str, Any]:
+    """
+    Run one simulated month on a fresh stand-in site.
+
+    Args:
+        invoices: Sales Invoices to post
+        purchase_invoices: Purchase Invoices to post (defaults to half the invoices)
+        credit_note_rate: Share of invoices that get a Credit Note
+        return_rate: Share of invoices delivered and partly returned
+        cancel_rate: Share of the untouched invoices mass-cancelled
+        month: Month to simulate (YYYY-MM)
+        seed: Random seed; the same seed posts the same documents
+        batch_size: Invoices per mass cancellation call
+        trace_memory: Trace peak memory (slows the run down)
+        latency: Name of a LATENCY_PROFILES entry, or None for no latency
+
+    Returns:
+        Dict containing:
+            - stages: Dict of stage -> latency summary
+            - total: Summary over all documents
+            - peak_memory_mb: Peak traced memory (None when not traced)
+            - queries: Number of SQL statements run
+            - latency_seconds: Time spent waiting on the simulated database
+            - errors: Error Log entries written by the hooks
+            - close: close_period result
+    """
+    if purchase_invoices is None:
+        purchase_invoices = invoices // 2
+
+    rng = random.Random(seed)
+    dates = month_dates(month)
+    customers = [f"CUST-{i:04d}" for i in range(max(10, invoices // 20))]
+    suppliers = [f"SUPP-{i:03d}" for i in range(max(5, invoices // 100))]
+    sales_persons = [f"Sales {i:02d}" for i in range(12)]
+    items = make_items(rng, 200)
+    latencies = {stage: [] for stage in STAGES}
+
+    standin = FrappeStandIn(latency=latency_profile(latency, seed))
+
+    if trace_memory:
+        tracemalloc.start()
+
+    with standin.installed() as frappe:
+        setup_site(standin)
+
+        def timed(stage: str, action: Callable[[], Any]) -> Any:
+            started = time.perf_counter()
+            result = action()
+            standin.end_request()
+            latencies[stage].append(time.perf_counter() - started)
+            return result
+
+        submitted = []
+        for _ in range(invoices):
+            data = make_sales_invoice(rng, rng.choice(dates), customers, items, sales_persons)
+            submitted.append(timed("Sales Invoice", frappe.get_doc(data).submit))
+
+        for _ in range(purchase_invoices):
+            data = make_purchase_invoice(rng, rng.choice(dates), suppliers, items)
+            timed("Purchase Invoice", frappe.get_doc(data).submit)
+
+        rng.shuffle(submitted)
+        credit_noted = submitted[:int(invoices * credit_note_rate)]
+        returned = submitted[len(credit_noted):len(credit_noted) + int(invoices * return_rate)]
+        untouched = submitted[len(credit_noted) + len(returned):]
+
+        for invoice in credit_noted:
+            data = make_credit_note(rng, invoice, max(invoice.posting_date, rng.choice(dates)))
+            timed("Credit Note", frappe.get_doc(data).submit)
+
+        for invoice in returned:
+            delivery_note = frappe.get_doc(make_delivery_note(invoice)).submit()
+            standin.end_request()
+            data = make_sales_return(rng, delivery_note, max(invoice.posting_date, rng.choice(dates)))
+            timed("Sales Return", frappe.get_doc(data).submit)
+
+        from erpnext_custom.mass_cancellation import mass_cancel_invoices
+        to_cancel = [invoice.name for invoice in untouched[:int(invoices * cancel_rate)]]
+        for start in range(0, len(to_cancel), batch_size):
+            batch = to_cancel[start:start + batch_size]
+            started = time.perf_counter()
+            mass_cancel_invoices("Sales Invoice", batch, cancellation_date=dates[-1], batch_size=batch_size)
+            standin.end_request()
+            elapsed = time.perf_counter() - started
+            latencies["Mass Cancellation"].extend([elapsed / len(batch)] * len(batch))
+
+        close = timed("Period Close", lambda: close_period(dates[0], dates[-1]))
+
+    peak_memory_mb = None
+    if trace_memory:
+        peak_memory_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+
+    all_samples = [sample for stage in STAGES for sample in latencies[stage]]
+
+    return {
+        "stages": {stage: summarize_latencies(latencies[stage]) for stage in STAGES},
+        "total": summarize_latencies(all_samples),
+        "peak_memory_mb": peak_memory_mb,
+        "queries": standin.db.query_count,
+        "latency_seconds": round(standin.db.latency_seconds, 3),
+        "errors": standin.error_log,
+        "close": close
+    }
+
+
+def find_problems(report: Dict[str, Any]) -> List[str]:
+    """Reasons the simulated month did not close cleanly"""
+    problems = [f"Error Log: {error['title']}: {error['message']}" for error in report["errors"]]
+
+    for check, count in report["close"]["audit"]["counts"].items():
+        if count:
+            problems.append(f"Audit {check}: {count} findings")
+
+    if report["close"]["commission_drift"]:
+        problems.append(f"Commission drift on {report['close']['commission_drift']} invoices")
+
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark a simulated month-end close")
+    parser.add_argument("--invoices", type=int, default=1000, help="Sales Invoices to post")
+    parser.add_argument("--purchase-invoices", type=int, help="Purchase Invoices (default: half the invoices)")
+    parser.add_argument("--credit-note-rate", type=float, default=0.05, help="Share of invoices with a Credit Note")
+    parser.add_argument("--return-rate", type=float, default=0.03, help="Share of invoices partly returned")
+    parser.add_argument("--cancel-rate", type=float, default=0.02, help="Share of invoices mass-cancelled")
+    parser.add_argument("--month", default="2024-01", help="Month to simulate (YYYY-MM)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace memory (faster, no peak memory)")
+    parser.add_argument("--latency", choices=["none"] + list(LATENCY_PROFILES), default="none",
+                        help="Simulated database latency")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"MONTH-END CLOSE BENCHMARK: {args.invoices} invoices, {args.month}, seed {args.seed}")
+    print("=" * 80)
+
+    report = run_month(
+        invoices=args.invoices,
+        purchase_invoices=args.purchase_invoices,
+        credit_note_rate=args.credit_note_rate,
+        return_rate=args.return_rate,
+        cancel_rate=args.cancel_rate,
+        month=args.month,
+        seed=args.seed,
+        trace_memory=not args.no_memory,
+        latency=args.latency
+    )
+
+    print(f"{'stage':>18} {'docs':>7} {'docs/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for stage, summary in list(report["stages"].items()) + [("Total", report["total"])]:
+        print(f"{stage:>18} {summary['count']:>7} {summary['docs_per_second']:>10,.1f} "
+              f"{summary['p50_ms']:>10.3f} {summary['p99_ms']:>10.3f}")
+
+    print(f"\nSQL statements:  {report['queries']:,}")
+    if report["latency_seconds"]:
+        print(f"Database wait:   {report['latency_seconds']:.3f}s (simulated)")
+    if report["peak_memory_mb"] is not None:
+        print(f"Peak memory:     {report['peak_memory_mb']} MB")
+    print(f"Net profit:      {report['close']['net_profit']:,.2f} "
+          f"({report['close']['closing_entries']} closing entries)")
+
+    problems = find_problems(report)
+    print("=" * 80)
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+
+    print("✅ Month closed cleanly: audit clean, no commission drift, no hook errors")
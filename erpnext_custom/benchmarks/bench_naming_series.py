@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Naming Series Counter vs Block Allocator
+
+Simulates concurrent bulk inserts from several worker processes against a
+local SQLite stand-in.
+
+The series counter lives in one shared database file, like the single
+`tabSeries` row. Documents go to one file per worker, because inserts of
+different documents do not block each other in InnoDB. Each insert holds its
+transaction open for --work-ms to stand for validation and child rows.
+
+Modes:
+    counter: the counter is incremented inside the document transaction, so
+             the counter lock is held for the whole insert (Frappe default)
+    block:   numbers come from blocks reserved by BlockAllocator with one
+             short committed update per block
+
+Both modes check that every generated name is unique across workers.
+
+Usage:
+    python -m erpnext_custom.benchmarks.bench_naming_series
+    python -m erpnext_custom.benchmarks.bench_naming_series --workers 8 --docs 500 --block-size 200
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from erpnext_custom.naming_series_allocator import (
+    BlockAllocator,
+    SQLiteSeriesBackend,
+    DEFAULT_BLOCK_SIZE,
+    DEFAULT_DIGITS
+)
+
+
+PREFIX = "ACC-SINV-2024-"
+
+
+def _open_documents(directory: str, worker: int) -> sqlite3.Connection:
+    connection = sqlite3.connect(
+        os.path.join(directory, f"documents-{worker}.db"),
+        timeout=60,
+        isolation_level=None
+    )
+    connection.execute("CREATE TABLE IF NOT EXISTS document (name TEXT PRIMARY KEY)")
+    return connection
+
+
+def insert_with_counter(directory: str, worker: int, docs: int, work_ms: float) -> List[str]:
+    """Insert docs, incrementing the shared counter inside each insert"""
+    series = sqlite3.connect(os.path.join(directory, "series.db"), timeout=60, isolation_level=None)
+    documents = _open_documents(directory, worker)
+    names = []
+
+    for _ in range(docs):
+        series.execute("BEGIN IMMEDIATE")
+        series.execute("""
+            INSERT INTO series (name, current) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET current = current + 1
+        """, (PREFIX,))
+        number = series.execute("SELECT current FROM series WHERE name = ?", (PREFIX,)).fetchone()[0]
+        name = f"{PREFIX}{str(number).zfill(DEFAULT_DIGITS)}"
+
+        documents.execute("BEGIN")
+        documents.execute("INSERT INTO document (name) VALUES (?)", (name,))
+        time.sleep(work_ms / 1000)
+        documents.execute("COMMIT")
+
+        # The counter row is only released when the document commits
+        series.execute("COMMIT")
+        names.append(name)
+
+    return names
+
+
+def insert_with_blocks(directory: str, worker: int, docs: int, work_ms: float,
+                       block_size: int) -> List[str]:
+    """Insert docs, taking names from blocks reserved per process"""
+    allocator = BlockAllocator(SQLiteSeriesBackend(os.path.join(directory, "series.db"), timeout=60), block_size)
+    documents = _open_documents(directory, worker)
+    names = []
+
+    for _ in range(docs):
+        name = allocator.next_name(PREFIX)
+
+        documents.execute("BEGIN")
+        documents.execute("INSERT INTO document (name) VALUES (?)", (name,))
+        time.sleep(work_ms / 1000)
+        documents.execute("COMMIT")
+        names.append(name)
+
+    allocator.release()
+
+    return names
+
+
+def run(mode: str, workers: int, docs: int, work_ms: float, block_size: int) -> Dict[str, Any]:
+    """Run one mode in a fresh temporary directory"""
+    with tempfile.TemporaryDirectory() as directory:
+        backend = SQLiteSeriesBackend(os.path.join(directory, "series.db"))
+        backend.install()
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            if mode == "counter":
+                futures = [executor.submit(insert_with_counter, directory, w, docs, work_ms)
+                           for w in range(workers)]
+            else:
+                futures = [executor.submit(insert_with_blocks, directory, w, docs, work_ms, block_size)
+                           for w in range(workers)]
+            names = [name for future in futures for name in future.result()]
+        seconds = time.perf_counter() - started
+
+        gaps = backend.get_gaps(PREFIX)
+
+    if len(set(names)) != len(names):
+        raise AssertionError(f"{mode}: duplicate names generated")
+
+    return {
+        "mode": mode,
+        "documents": len(names),
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(len(names) / seconds, 1),
+        "gap_numbers": sum(to_number - from_number + 1 for _prefix, from_number, to_number, _reason in gaps)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark naming series allocation under concurrent inserts")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--docs", type=int, default=200, help="Documents per worker")
+    parser.add_argument("--work-ms", type=float, default=2.0, help="Time each insert transaction stays open")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"NAMING SERIES BENCHMARK: {args.workers} workers x {args.docs} documents, "
+          f"{args.work_ms} ms per insert, block size {args.block_size}")
+    print("=" * 80)
+
+    results = [
+        run(mode, args.workers, args.docs, args.work_ms, args.block_size)
+        for mode in ("counter", "block")
+    ]
+
+    for result in results:
+        print(f"{result['mode']:>8}: {result['documents']} documents in {result['seconds']}s "
+              f"({result['docs_per_second']} docs/s), gap numbers: {result['gap_numbers']}")
+
+    print(f"\nSpeedup: {results[1]['docs_per_second'] / results[0]['docs_per_second']:.1f}x")
+    print("=" * 80)
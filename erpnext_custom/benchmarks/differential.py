@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Differential Harness: Batch Engines vs the Scalar Calculators
+
+Runs a batch (or vectorized) engine against the scalar reference functions
+on generated inputs and reports every input whose result differs:
+    calculate_discount:              subtotal, percentage and amount discounts
+    calculate_taxes:                 templates with On Net Total, On Previous
+                                     Row Total and Actual rows, Add/Deduct
+    post_sales_invoice_gl_entry:     invoices with discount, PPN and PPh 23
+    post_purchase_invoice_gl_entry:  invoices with PPN and PPh 23
+
+Results must be exactly equal (==, no tolerance), so a batch engine has to
+round like the scalar one does. Where the reference raises, the engine must
+raise (or return) an exception of the same type. An engine that raises for
+a whole batch is retried one input at a time.
+
+Inputs are generated in chunks from the seed, each chunk in a worker process;
+the same seed gives the same inputs and the same report, whatever the number
+of workers. Mismatching inputs are shrunk to a minimal case: list entries are
+dropped and numbers made smaller and rounder while the mismatch persists.
+
+An engine is a function engine(target, cases) -> results, where target is
+one of TARGETS, cases a list of keyword-argument dicts for the scalar
+function and results a list of the same length. reference_engine is the
+scalar loop itself; it is the default, as a self-check of the harness.
+
+This module does not need frappe.
+
+Usage:
+    python -m erpnext_custom.benchmarks.differential --engine mypackage.batch:engine
+    python -m erpnext_custom.benchmarks.differential --engine mypackage.batch:engine --cases 5000000 --workers 8
+    python -m erpnext_custom.benchmarks.differential --targets calculate_discount --cases 100000
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from erpnext_custom.discount_calculator import calculate_discount
+from erpnext_custom.tax_calculator import calculate_taxes
+from erpnext_custom.gl_entry_sales import post_sales_invoice_gl_entry
+from erpnext_custom.gl_entry_purchase import post_purchase_invoice_gl_entry
+
+
+DEFAULT_CASES = 1000000
+DEFAULT_CHUNK_SIZE = 10000
+
+# Mismatches shrunk and reported per target; the rest are only counted
+DEFAULT_MAX_MISMATCHES = 10
+
+# Engine calls one shrink may spend
+MAX_SHRINK_STEPS = 2000
+
+CHARGE_TYPES = ["On Net Total", "On Net Total", "On Previous Row Total", "Actual"]
+TAX_ACCOUNTS = ["2210 - Hutang PPN", "2230 - Hutang PPh 23", "1410 - Pajak Dibayar Dimuka"]
+COMMON_RATES = [11, 12, 2, 0]
+
+# Amounts where rounding or validation changes behaviour
+EDGE_AMOUNTS = [0, -1.0, 0.005, 0.01, 0.125, 1.005, 2.675, 1000000.005]
+
+
+# Input generators
+
+def _amount(rng: random.Random, high: float) -> float:
+    shape = rng.random()
+    if shape < 0.02:
+        return rng.choice(EDGE_AMOUNTS)
+    if shape < 0.4:
+        return float(rng.randint(1, int(high)))
+    if shape < 0.8:
+        return round(rng.uniform(0.01, high), 2)
+    return round(rng.uniform(0.01, high), rng.randint(3, 6))
+
+
+def _rate(rng: random.Random, invalid: float) -> float:
+    shape = rng.random()
+    if shape < invalid:
+        return rng.choice([-1, 100.5, 150])
+    if shape < 0.5:
+        return rng.choice(COMMON_RATES)
+    return round(rng.uniform(0, 20), rng.randint(0, 3))
+
+
+def _tax_rows(rng: random.Random, invalid: float = 0.0) -> List[Dict[str, Any]]:
+    rows = []
+    for i in range(rng.choice([0, 1, 1, 2, 2, 3, 4])):
+        row = {
+            "charge_type": rng.choice(CHARGE_TYPES),
+            "account_head": rng.choice(TAX_ACCOUNTS),
+            "description": f"Tax {i + 1}",
+            "rate": _rate(rng, invalid),
+            "add_deduct_tax": rng.choice(["Add", "Add", "Deduct"])
+        }
+        if row["charge_type"] == "Actual":
+            row["tax_amount"] = _amount(rng, 1000000)
+        rows.append(row)
+    return rows
+
+
+def discount_case(rng: random.Random, index: int) -> Dict[str, Any]:
+    subtotal = _amount(rng, 10000000)
+
+    shape = rng.random()
+    if shape < 0.3:
+        percentage = 0
+    elif shape < 0.6:
+        percentage = rng.randint(0, 100)
+    elif shape < 0.95:
+        percentage = round(rng.uniform(0, 100), rng.randint(1, 3))
+    else:
+        percentage = round(rng.uniform(-5, 105), 2)
+
+    shape = rng.random()
+    if shape < 0.6 or subtotal <= 0:
+        amount = 0
+    elif shape < 0.95:
+        amount = round(rng.uniform(0, subtotal), 2)
+    else:
+        amount = rng.choice([subtotal, subtotal + 0.01, -0.01])
+
+    return {"subtotal": subtotal, "discount_percentage": percentage, "discount_amount": amount}
+
+
+def taxes_case(rng: random.Random, index: int) -> Dict[str, Any]:
+    template = None if rng.random() < 0.05 else {"taxes": _tax_rows(rng, invalid=0.02)}
+    return {
+        "net_total": _amount(rng, 10000000),
+        "tax_template": template,
+        "tax_type": rng.choice(["Sales", "Purchase"])
+    }
+
+
+def _invoice_totals(rng: random.Random, discount_percentage: float) -> Dict[str, Any]:
+    """Totals as the calculators compute them, so most invoices balance"""
+    total = max(_amount(rng, 50000000), 1.0)
+    discount = calculate_discount(total, discount_percentage)
+    taxes = calculate_taxes(discount["net_total"], {"taxes": _tax_rows(rng)})
+    return {
+        "total": total,
+        "discount_amount": discount["discount_amount"],
+        "discount_percentage": discount["discount_percentage"],
+        "net_total": discount["net_total"],
+        "taxes": taxes["taxes"],
+        "grand_total": taxes["grand_total"]
+    }
+
+
+def sales_gl_case(rng: random.Random, index: int) -> Dict[str, Any]:
+    invoice = {
+        "name": f"SINV-2024-{index:07d}",
+        "customer": f"CUST-{rng.randint(0, 999):05d}",
+        "posting_date": "2024-01-15"
+    }
+    invoice.update(_invoice_totals(rng, rng.choice([0, 0, 5, 10, round(rng.uniform(0, 30), 2)])))
+    return {"invoice": invoice, "posting_date": rng.choice([None, "2024-01-31"])}
+
+
+def purchase_gl_case(rng: random.Random, index: int) -> Dict[str, Any]:
+    invoice = {
+        "name": f"PINV-2024-{index:07d}",
+        "supplier": f"SUPP-{rng.randint(0, 99):04d}",
+        "posting_date": "2024-01-15"
+    }
+    invoice.update(_invoice_totals(rng, rng.choice([0, 0, 0, round(rng.uniform(0, 10), 2)])))
+    del invoice["discount_percentage"]
+    return {"invoice": invoice, "posting_date": rng.choice([None, "2024-01-31"])}
+
+
+# Target name -> (scalar reference, input generator)
+TARGETS: Dict[str, Tuple[Callable[..., Any], Callable[[random.Random, int], Dict[str, Any]]]] = {
+    "calculate_discount": (calculate_discount, discount_case),
+    "calculate_taxes": (calculate_taxes, taxes_case),
+    "post_sales_invoice_gl_entry": (post_sales_invoice_gl_entry, sales_gl_case),
+    "post_purchase_invoice_gl_entry": (post_purchase_invoice_gl_entry, purchase_gl_case)
+}
+
+
+def generate_cases(target: str, seed: int, chunk: int, size: int) -> List[Dict[str, Any]]:
+    """The inputs of one chunk; the same arguments give the same inputs"""
+    rng = random.Random(f"{seed}-{target}-{chunk}")
+    generate = TARGETS[target][1]
+    return [generate(rng, chunk * size + i) for i in range(size)]
+
+
+# Engines and comparison
+
+Engine = Callable[[str, List[Dict[str, Any]]], List[Any]]
+
+
+def reference_engine(target: str, cases: List[Dict[str, Any]]) -> List[Any]:
+    """The scalar functions in a loop; exceptions are returned, not raised"""
+    function = TARGETS[target][0]
+    results = []
+    for case in cases:
+        try:
+            results.append(function(**case))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def resolve_engine(engine: Union[str, Engine]) -> Engine:
+    """Accepts an engine or its "module:function" path"""
+    if callable(engine):
+        return engine
+    module, _, name = engine.partition(":")
+    if not name:
+        raise ValueError(f"Engine must be given as module:function, got {engine!r}")
+    return getattr(importlib.import_module(module), name)
+
+
+def engine_results(engine: Engine, target: str, cases: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Results of the engine for the cases, one per case.
+
+    A batch that raises, or returns the wrong number of results, is retried
+    one case at a time; exceptions then become the result of their case.
+    """
+    try:
+        results = list(engine(target, cases))
+        if len(results) == len(cases):
+            return results
+    except Exception:
+        pass
+
+    results = []
+    for case in cases:
+        try:
+            results.append(engine(target, [case])[0])
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def first_difference(expected: Any, actual: Any, path: str = "$") -> Optional[str]:
+    """
+    Path of the first value where two results differ, or None if they match.
+
+    Numbers must be exactly equal. Exceptions match exceptions of the same
+    type; their messages are not compared.
+    """
+    if isinstance(expected, BaseException) or isinstance(actual, BaseException):
+        return None if type(expected) is type(actual) else path
+
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        if expected.keys() != actual.keys():
+            return path
+        for key in expected:
+            difference = first_difference(expected[key], actual[key], f"{path}.{key}")
+            if difference:
+                return difference
+        return None
+
+    if isinstance(expected, (list, tuple)) and isinstance(actual, (list, tuple)):
+        if len(expected) != len(actual):
+            return path
+        for i, (left, right) in enumerate(zip(expected, actual)):
+            difference = first_difference(left, right, f"{path}[{i}]")
+            if difference:
+                return difference
+        return None
+
+    return None if expected == actual else path
+
+
+def describe(result: Any) -> Any:
+    """A result as it is reported: exceptions as "Type: message" """
+    if isinstance(result, BaseException):
+        return f"{type(result).__name__}: {result}"
+    return result
+
+
+def _mismatch(engine: Engine, target: str, case: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    expected = reference_engine(target, [case])[0]
+    actual = engine_results(engine, target, [case])[0]
+    path = first_difference(expected, actual)
+    if path is None:
+        return None
+    return {"path": path, "expected": describe(expected), "actual": describe(actual)}
+
+
+# Shrinking
+
+def complexity(value: Any) -> Tuple[int, int, float]:
+    """(list entries, decimal places, magnitude) summed over the value; smaller is simpler"""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return (0, 0, 0)
+    if isinstance(value, (int, float)):
+        decimals = max(0, -Decimal(repr(value)).normalize().as_tuple().exponent) if isinstance(value, float) else 0
+        return (0, decimals, abs(value))
+    items = value.values() if isinstance(value, dict) else value
+    entries = len(value) if isinstance(value, list) else 0
+    totals = [complexity(item) for item in items]
+    return (
+        entries + sum(total[0] for total in totals),
+        sum(total[1] for total in totals),
+        sum(total[2] for total in totals)
+    )
+
+
+def _smaller_numbers(number: Union[int, float]) -> Iterator[Union[int, float]]:
+    candidates = [0, 1, round(number), round(number, 1), round(number, 2), round(number / 2, 2), abs(number)]
+    for candidate in candidates:
+        candidate = float(candidate) if isinstance(number, float) else int(candidate)
+        if candidate != number:
+            yield candidate
+
+
+def _candidates(value: Any) -> Iterator[Any]:
+    """Copies of the value with one list entry dropped or one number simplified"""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return
+    if isinstance(value, (int, float)):
+        yield from _smaller_numbers(value)
+    elif isinstance(value, list):
+        for i in range(len(value)):
+            yield value[:i] + value[i + 1:]
+        for i, item in enumerate(value):
+            for candidate in _candidates(item):
+                yield value[:i] + [candidate] + value[i + 1:]
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            for candidate in _candidates(item):
+                yield {**value, key: candidate}
+
+
+def shrink(engine: Engine, target: str, case: Dict[str, Any], max_steps: int = MAX_SHRINK_STEPS) -> Dict[str, Any]:
+    """
+    Greedily simplify a mismatching case while it keeps mismatching.
+
+    Every accepted step lowers complexity(), so shrinking ends; max_steps
+    bounds the engine calls.
+
+    Args:
+        engine: The engine under test
+        target: Target name (key of TARGETS)
+        case: Keyword arguments the engine and reference disagree on
+        max_steps: Candidates to try at most
+
+    Returns:
+        The simplest mismatching case found
+    """
+    steps = 0
+    improved = True
+    while improved and steps < max_steps:
+        improved = False
+        current = complexity(case)
+        for candidate in _candidates(case):
+            if complexity(candidate) >= current:
+                continue
+            steps += 1
+            if _mismatch(engine, target, candidate) is not None:
+                case = candidate
+                improved = True
+                break
+            if steps >= max_steps:
+                break
+    return case
+
+
+# Running
+
+def check_chunk(
+    engine: Union[str, Engine],
+    target: str,
+    seed: int,
+    chunk: int,
+    size: int,
+    max_mismatches: int = DEFAULT_MAX_MISMATCHES
+) -> Dict[str, Any]:
+    """
+    Compare the engine with the reference on one chunk of generated cases.
+
+    Runs in a worker process; the engine is resolved there.
+
+    Returns:
+        Dict containing:
+            - cases: Cases compared
+            - mismatches: Cases that differed
+            - reported: Up to max_mismatches of them, each with the case,
+              its shrunk form and the differing path and results
+    """
+    engine = resolve_engine(engine)
+    cases = generate_cases(target, seed, chunk, size)
+    expected = reference_engine(target, cases)
+    actual = engine_results(engine, target, cases)
+
+    mismatches = 0
+    reported = []
+    for case, left, right in zip(cases, expected, actual):
+        path = first_difference(left, right)
+        if path is None:
+            continue
+        mismatches += 1
+        if len(reported) < max_mismatches:
+            shrunk = shrink(engine, target, case)
+            details = _mismatch(engine, target, shrunk)
+            if details is None:
+                # Differs only within its batch: report it as found
+                shrunk, details = case, {"path": path, "expected": describe(left), "actual": describe(right)}
+            reported.append(dict(details, target=target, case=case, shrunk=shrunk))
+
+    return {"cases": len(cases), "mismatches": mismatches, "reported": reported}
+
+
+def run_differential(
+    engine: Union[str, Engine] = reference_engine,
+    targets: Optional[List[str]] = None,
+    cases: int = DEFAULT_CASES,
+    seed: int = 42,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_mismatches: int = DEFAULT_MAX_MISMATCHES
+) -> Dict[str, Any]:
+    """
+    Run the engine against the scalar reference on generated cases.
+
+    Args:
+        engine: Engine, or "module:function" path of one. With workers > 1
+            it must be importable by the worker processes (module level).
+        targets: Target names (default: all of TARGETS)
+        cases: Cases per target
+        seed: Seed of the generated cases
+        workers: Worker processes; 1 runs in this process
+        chunk_size: Cases per chunk of work
+        max_mismatches: Shrunk mismatches to report per target
+
+    Returns:
+        Dict containing:
+            - targets: Dict of target -> {"cases", "mismatches"}
+            - mismatches: Reported mismatches, in case order; each has
+              target, case, shrunk, path, expected and actual. Cases
+              shrinking to the same minimal case are reported once.
+            - seconds: Wall time of the run
+    """
+    targets = targets or list(TARGETS)
+    for target in targets:
+        if target not in TARGETS:
+            raise ValueError(f"Unknown target {target!r}, expected one of {', '.join(TARGETS)}")
+
+    jobs = []
+    for target in targets:
+        for chunk, start in enumerate(range(0, cases, chunk_size)):
+            jobs.append((engine, target, seed, chunk, min(chunk_size, cases - start), max_mismatches))
+
+    started = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(check_chunk, *zip(*jobs)))
+    else:
+        results = [check_chunk(*job) for job in jobs]
+
+    summary = {target: {"cases": 0, "mismatches": 0} for target in targets}
+    mismatches = []
+    seen = {target: set() for target in targets}
+    for (_, target, *_), result in zip(jobs, results):
+        summary[target]["cases"] += result["cases"]
+        summary[target]["mismatches"] += result["mismatches"]
+        for mismatch in result["reported"]:
+            key = json.dumps(mismatch["shrunk"], sort_keys=True)
+            if key not in seen[target] and len(seen[target]) < max_mismatches:
+                seen[target].add(key)
+                mismatches.append(mismatch)
+
+    return {
+        "targets": summary,
+        "mismatches": mismatches,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare a batch engine with the scalar calculators")
+    parser.add_argument("--engine", default="erpnext_custom.benchmarks.differential:reference_engine",
+                        help="Engine under test, as module:function")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), help="Functions to compare (default: all)")
+    parser.add_argument("--cases", type=int, default=DEFAULT_CASES, help="Cases per target")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Cases per chunk of work")
+    parser.add_argument("--max-mismatches", type=int, default=DEFAULT_MAX_MISMATCHES,
+                        help="Shrunk mismatches to report per target")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"DIFFERENTIAL CHECK: {args.engine}, {args.cases:,} cases per target, seed {args.seed}")
+    print("=" * 80)
+
+    report = run_differential(
+        engine=args.engine,
+        targets=args.targets,
+        cases=args.cases,
+        seed=args.seed,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        max_mismatches=args.max_mismatches
+    )
+
+    for target, summary in report["targets"].items():
+        status = "✅" if summary["mismatches"] == 0 else "❌"
+        print(f"{status} {target:<32} {summary['cases']:>12,} cases {summary['mismatches']:>10,} mismatches")
+
+    for mismatch in report["mismatches"]:
+        print(f"\n❌ {mismatch['target']} differs at {mismatch['path']}")
+        print(f"   Minimal case: {json.dumps(mismatch['shrunk'], sort_keys=True, default=str)}")
+        print(f"   Expected:     {json.dumps(mismatch['expected'], sort_keys=True, default=str)}")
+        print(f"   Actual:       {json.dumps(mismatch['actual'], sort_keys=True, default=str)}")
+
+    print(f"\nRun time: {report['seconds']:.3f}s")
+    print("=" * 80)
+
+    if any(summary["mismatches"] for summary in report["targets"].values()):
+        sys.exit(1)
+
+    print("✅ The engine matches the scalar calculators on every case")
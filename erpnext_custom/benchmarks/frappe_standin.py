@@ -0,0 +1,957 @@
+"""
+In-Memory Frappe Stand-In
+
+A small SQLite-backed replacement for the parts of the frappe API that the
+erpnext_custom hooks and bulk tools use. Whole document flows (submit,
+Credit Note, Sales Return, mass cancellation, audits) can run and be
+benchmarked without a site, MariaDB or ERPNext.
+
+Covered API:
+    frappe.db: sql, sql_ddl, get_value, set_value, exists, count,
+               bulk_insert, get_global, set_global, commit, rollback
+    frappe:    get_doc, new_doc, get_all, get_list, throw, msgprint,
+               log_error, logger, generate_hash, whitelist, has_permission,
+               _, session, local, flags, utils
+    Document:  get, set, append, insert, save, submit, cancel, add_comment,
+               db_set, as_dict
+
+The MySQL syntax used by the modules is translated for SQLite: %s and
+%(name)s placeholders (tuples expand to IN lists), ON DUPLICATE KEY UPDATE,
+IF/GREATEST/LEAST, and KEY/ENGINE clauses in DDL. Document tables are created
+on first insert and gain columns as documents bring new fields; selecting a
+field no document has set yet returns NULL, as an empty column would.
+
+Document events registered with register_doc_events run on insert, save,
+submit and cancel, the way frappe runs doc_events from hooks.py. Naming and
+hashes are counter based, so a seeded run names its documents the same way
+every time.
+
+Database latency can be injected with a LatencyModel (or one of the
+LATENCY_PROFILES): every statement then waits a round trip plus a cost per
+row returned or written, and every commit waits for its flush, the way a
+MariaDB server on the same host, the LAN or in the cloud would. Waits use
+time.sleep and release the GIL. Jitter is seeded, so runs stay repeatable.
+
+This is a benchmarking tool. It does not check permissions, links,
+mandatory fields or meta, and it is not a test double for frappe semantics.
+
+Usage:
+    from erpnext_custom.benchmarks.frappe_standin import FrappeStandIn
+    from erpnext_custom.hooks import DOC_EVENTS
+
+    standin = FrappeStandIn(latency=latency_profile("lan"))
+    standin.register_doc_events(DOC_EVENTS)
+    with standin.installed() as frappe:
+        frappe.get_doc({"doctype": "Sales Invoice", ...}).submit()
+"""
+
+import hashlib
+import importlib
+import logging
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+import types
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+
+# Child tables of the doctypes the hooks touch: (parent, fieldname) -> child doctype
+CHILD_DOCTYPES = {
+    ("Sales Invoice", "items"): "Sales Invoice Item",
+    ("Sales Invoice", "taxes"): "Sales Taxes and Charges",
+    ("Sales Invoice", "sales_team"): "Sales Team",
+    ("Purchase Invoice", "items"): "Purchase Invoice Item",
+    ("Purchase Invoice", "taxes"): "Purchase Taxes and Charges",
+    ("Delivery Note", "items"): "Delivery Note Item",
+    ("Sales Return", "items"): "Sales Return Item",
+    ("Stock Entry", "items"): "Stock Entry Detail",
+    ("Stock Reconciliation", "items"): "Stock Reconciliation Item"
+}
+
+DEFAULT_SITE = "standin.local"
+
+DEFAULT_USER = "Administrator"
+
+# Document events run by the stand-in, in frappe's order per action
+INSERT_EVENTS = ("validate", "before_insert", "after_insert")
+SUBMIT_EVENTS = ("validate", "before_submit", "on_submit")
+CANCEL_EVENTS = ("before_cancel", "on_cancel")
+
+# Simulated database latency (seconds): round trip per statement, cost per
+# row returned or written, flush per commit, and relative jitter
+LATENCY_PROFILES = {
+    "local": {"round_trip": 0.00015, "per_row": 0.000002, "commit": 0.0005, "jitter": 0.2},
+    "lan": {"round_trip": 0.0005, "per_row": 0.000004, "commit": 0.002, "jitter": 0.3},
+    "cloud": {"round_trip": 0.0015, "per_row": 0.00001, "commit": 0.005, "jitter": 0.5}
+}
+
+PLACEHOLDER_PATTERN = re.compile(r"%%|%s|%\((\w+)\)s")
+DDL_KEY_PATTERN = re.compile(r"^\s*(UNIQUE\s+|FULLTEXT\s+)?(KEY|INDEX)\s+`?\w+`?\s*\([^)]*\)\s*,?\s*$", re.I | re.M)
+DDL_TABLE_OPTIONS_PATTERN = re.compile(r"\)\s*(ENGINE|DEFAULT CHARSET|CHARSET|COLLATE|ROW_FORMAT)\b[^;]*$", re.I)
+IDENTIFIER_PATTERN = re.compile(r"^\w+$")
+
+
+class StandInError(Exception):
+    """Exception raised for API use the stand-in does not support"""
+    pass
+
+
+class ValidationError(Exception):
+    """Stand-in for frappe.ValidationError, raised by frappe.throw"""
+    pass
+
+
+class DoesNotExistError(ValidationError):
+    """Stand-in for frappe.DoesNotExistError"""
+    pass
+
+
+class LatencyModel:
+    """
+    Simulated latency of a database server.
+
+    Every wait is spread by a log-normal factor with mean 1 (jitter is its
+    sigma; 0.3 is roughly +-30%), drawn from a seeded random generator.
+    """
+
+    def __init__(
+        self,
+        round_trip: float = 0.0,
+        per_row: float = 0.0,
+        commit: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0
+    ):
+        self.round_trip = round_trip
+        self.per_row = per_row
+        self.commit = commit
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+
+    def _spread(self, seconds: float) -> float:
+        if not self.jitter or not seconds:
+            return seconds
+        return seconds * self.rng.lognormvariate(-self.jitter ** 2 / 2, self.jitter)
+
+    def statement_delay(self, rows: int = 0) -> float:
+        """Wait for one statement that returned or wrote rows"""
+        return self._spread(self.round_trip + self.per_row * rows)
+
+    def rows_delay(self, rows: int) -> float:
+        """Wait for fetching rows of a statement already waited for"""
+        return self._spread(self.per_row * rows)
+
+    def commit_delay(self) -> float:
+        return self._spread(self.commit)
+
+
+def latency_profile(name: Optional[str], seed: int = 0) -> Optional[LatencyModel]:
+    """LatencyModel for a LATENCY_PROFILES name; None for "none" or None"""
+    if not name or name == "none":
+        return None
+    if name not in LATENCY_PROFILES:
+        raise StandInError(f"Unknown latency profile {name!r}; use one of {', '.join(LATENCY_PROFILES)}")
+    return LatencyModel(seed=seed, **LATENCY_PROFILES[name])
+
+
+class _dict(dict):
+    """Dict with attribute access, like frappe._dict"""
+
+    def __getattr__(self, key):
+        return self.get(key)
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+def _adapt(value: Any) -> Any:
+    """Python value as stored by SQLite"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return str(value)
+    return value
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "") + "`"
+
+
+def translate_query(query: str, values: Any = None) -> Tuple[str, List[Any]]:
+    """
+    Translate a MySQL query with pyformat placeholders to SQLite.
+
+    Tuples and lists bound to a placeholder expand to a parenthesized list,
+    as the MySQL driver renders them for IN clauses. Without values the
+    query is not formatted, so %% stays as written.
+
+    Args:
+        query: Query as passed to frappe.db.sql
+        values: Sequence for %s or dict for %(name)s placeholders
+
+    Returns:
+        Tuple of (SQLite query with ? placeholders, flat parameter list)
+    """
+    params = []
+
+    if values:
+        positional = iter(values) if not isinstance(values, dict) else None
+
+        def replace(match):
+            if match.group(0) == "%%":
+                return "%"
+            if match.group(1) is not None:
+                value = values[match.group(1)]
+            else:
+                value = next(positional)
+            if isinstance(value, (tuple, list, set)):
+                value = list(value)
+                params.extend(_adapt(item) for item in value)
+                return "(" + ", ".join(["?"] * len(value)) + ")" if value else "(NULL)"
+            params.append(_adapt(value))
+            return "?"
+
+        query = PLACEHOLDER_PATTERN.sub(replace, query)
+
+    query = re.sub(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", "ON CONFLICT DO UPDATE SET", query, flags=re.I)
+    query = re.sub(r"\bVALUES\((\w+)\)", r"excluded.\1", query, flags=re.I)
+
+    return query, params
+
+
+def translate_ddl(query: str) -> str:
+    """
+    Translate MySQL CREATE TABLE DDL to SQLite.
+
+    Secondary KEY/INDEX lines and table options are dropped; SQLite accepts
+    the MySQL column types as written.
+    """
+    query = DDL_KEY_PATTERN.sub("", query)
+    query = re.sub(r",(\s*\))", r"\1", query.rstrip())
+    query = DDL_TABLE_OPTIONS_PATTERN.sub(")", query)
+    return re.sub(r"\bAUTO_INCREMENT\b", "", query, flags=re.I)
+
+
+def _mysql_if(condition, then_value, else_value):
+    return then_value if condition else else_value
+
+
+def _greatest(*args):
+    return max(args)
+
+
+def _least(*args):
+    return min(args)
+
+
+class StandInDatabase:
+    """
+    frappe.db backed by one SQLite connection.
+
+    Every statement goes through _execute, which counts queries and injects
+    the latency model's wait (latency_seconds sums the waits).
+    """
+
+    def __init__(self, standin: "FrappeStandIn", path: str = ":memory:", latency: Optional[LatencyModel] = None):
+        self.standin = standin
+        self.latency = latency
+        self.latency_seconds = 0.0
+        self.connection = sqlite3.connect(path)
+        self.connection.create_function("IF", 3, _mysql_if, deterministic=True)
+        self.connection.create_function("GREATEST", -1, _greatest, deterministic=True)
+        self.connection.create_function("LEAST", -1, _least, deterministic=True)
+        self.connection.create_function("NOW", -1, lambda *args: self.standin.now(), deterministic=False)
+        self._cursor = self.connection.cursor()
+        self._columns = {}
+        self.query_count = 0
+
+    # Statements
+
+    def _execute(self, query: str, params: List[Any] = ()) -> sqlite3.Cursor:
+        self.query_count += 1
+        self._cursor = self.connection.execute(query, params)
+        if self.latency:
+            self._wait(self.latency.statement_delay(max(self._cursor.rowcount, 0)))
+        return self._cursor
+
+    def _fetchall(self, cursor: sqlite3.Cursor) -> List[tuple]:
+        rows = cursor.fetchall()
+        if self.latency and rows:
+            self._wait(self.latency.rows_delay(len(rows)))
+        return rows
+
+    def _wait(self, seconds: float) -> None:
+        self.latency_seconds += seconds
+        time.sleep(seconds)
+
+    def sql(
+        self,
+        query: str,
+        values: Any = (),
+        as_dict: bool = False,
+        pluck: bool = False,
+        **kwargs
+    ) -> Union[List[tuple], List[_dict], List[Any]]:
+        """frappe.db.sql: rows as tuples, _dicts (as_dict) or first values (pluck)"""
+        query, params = translate_query(query, values)
+        cursor = self._execute(query, params)
+
+        if cursor.description is None:
+            return []
+
+        rows = self._fetchall(cursor)
+        if pluck:
+            return [row[0] for row in rows]
+        if as_dict:
+            keys = [column[0] for column in cursor.description]
+            return [_dict(zip(keys, row)) for row in rows]
+        return [tuple(row) for row in rows]
+
+    def sql_ddl(self, query: str) -> None:
+        """frappe.db.sql_ddl; DDL commits like it does on MariaDB"""
+        self.commit()
+        self._execute(translate_ddl(query))
+        self._columns.clear()
+
+    def commit(self) -> None:
+        self.connection.commit()
+        if self.latency:
+            self._wait(self.latency.commit_delay())
+
+    def rollback(self, save_point: Optional[str] = None) -> None:
+        if save_point:
+            self.connection.execute(f"ROLLBACK TO SAVEPOINT {save_point}")
+            return
+        self.connection.rollback()
+
+    def savepoint(self, save_point: str) -> None:
+        """frappe.db.savepoint: mark a point the transaction can roll back to"""
+        self.connection.execute(f"SAVEPOINT {save_point}")
+
+    # Tables
+
+    def table_columns(self, doctype: str) -> set:
+        """Columns of `tab{doctype}` (empty when the table does not exist)"""
+        table = f"tab{doctype}"
+        if table not in self._columns:
+            rows = self.connection.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+            self._columns[table] = {row[1] for row in rows}
+        return self._columns[table]
+
+    def table_exists(self, doctype: str, cached: bool = True) -> bool:
+        """frappe.db.table_exists: whether `tab{doctype}` has been created"""
+        return bool(self.table_columns(doctype))
+
+    def has_column(self, doctype: str, column: str) -> bool:
+        """frappe.db.has_column: whether `tab{doctype}` has a column"""
+        return column in self.table_columns(doctype)
+
+    def ensure_columns(self, doctype: str, fields: List[str]) -> None:
+        """Create `tab{doctype}` and add missing columns"""
+        table = f"tab{doctype}"
+        columns = self.table_columns(doctype)
+
+        if not columns:
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} (name VARCHAR(140) PRIMARY KEY)")
+            columns.add("name")
+
+        for field in fields:
+            if field not in columns:
+                self.connection.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(field)}")
+                columns.add(field)
+
+    def _field_sql(self, doctype: str, field: str) -> str:
+        """Quoted column, NULL for fields no row has set yet, or the expression as written"""
+        if IDENTIFIER_PATTERN.match(field):
+            return _quote(field) if field in self.table_columns(doctype) else "NULL"
+        return field
+
+    def _fields_sql(self, doctype: str, fields: List[str]) -> str:
+        selected = []
+        for field in fields:
+            if field == "*":
+                selected.append("*")
+            elif IDENTIFIER_PATTERN.match(field):
+                selected.append(f"{self._field_sql(doctype, field)} AS {_quote(field)}")
+            else:
+                selected.append(field)
+        return ", ".join(selected)
+
+    def _conditions_sql(self, doctype: str, filters: Any) -> Tuple[str, List[Any]]:
+        """WHERE clause for dict or list filters, as accepted by frappe.get_all"""
+        if not filters:
+            return "", []
+        if isinstance(filters, str):
+            filters = {"name": filters}
+
+        if isinstance(filters, dict):
+            items = [
+                (field, value[0], value[1]) if isinstance(value, (list, tuple)) else (field, "=", value)
+                for field, value in filters.items()
+            ]
+        else:
+            items = [tuple(condition[-3:]) for condition in filters]
+
+        conditions = []
+        params = []
+        for field, operator, value in items:
+            column = self._field_sql(doctype, field)
+            operator = operator.lower()
+
+            if operator in ("in", "not in"):
+                value = list(value) if isinstance(value, (list, tuple, set)) else [value]
+                if not value:
+                    conditions.append("1 = 0" if operator == "in" else "1 = 1")
+                    continue
+                conditions.append(f"{column} {operator.upper()} ({', '.join(['?'] * len(value))})")
+                params.extend(_adapt(item) for item in value)
+            elif operator == "between":
+                conditions.append(f"{column} BETWEEN ? AND ?")
+                params.extend(_adapt(item) for item in value)
+            elif operator == "is":
+                conditions.append(f"{column} IS {'NOT ' if value == 'set' else ''}NULL")
+            elif operator in ("=", "!=", "<", ">", "<=", ">=", "like", "not like"):
+                conditions.append(f"{column} {operator.upper()} ?")
+                params.append(_adapt(value))
+            else:
+                raise StandInError(f"Unsupported filter operator: {operator}")
+
+        return "WHERE " + " AND ".join(conditions), params
+
+    def select(
+        self,
+        doctype: str,
+        filters: Any = None,
+        fields: Optional[List[str]] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[_dict]:
+        """Rows of a doctype as _dicts; [] when the table does not exist yet"""
+        if not self.table_columns(doctype):
+            return []
+
+        where, params = self._conditions_sql(doctype, filters)
+        query = f"SELECT {self._fields_sql(doctype, fields or ['*'])} FROM {_quote('tab' + doctype)} {where}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+
+        cursor = self._execute(query, params)
+        keys = [column[0] for column in cursor.description]
+        return [_dict(zip(keys, row)) for row in self._fetchall(cursor)]
+
+    def insert_rows(self, doctype: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert row dicts into `tab{doctype}`, adding columns as needed"""
+        if not rows:
+            return
+
+        fields = list(dict.fromkeys(field for row in rows for field in row))
+        self.ensure_columns(doctype, fields)
+        self.query_count += 1
+        self._cursor = self.connection.executemany(
+            f"INSERT INTO {_quote('tab' + doctype)} ({', '.join(_quote(field) for field in fields)}) "
+            f"VALUES ({', '.join(['?'] * len(fields))})",
+            [tuple(_adapt(row.get(field)) for field in fields) for row in rows]
+        )
+        if self.latency:
+            self._wait(self.latency.statement_delay(len(rows)))
+
+    # frappe.db API
+
+    def get_value(
+        self,
+        doctype: str,
+        filters: Any = None,
+        fieldname: Union[str, List[str]] = "name",
+        as_dict: bool = False,
+        order_by: Optional[str] = None,
+        **kwargs
+    ) -> Any:
+        """frappe.db.get_value: scalar, tuple or _dict of the first match, None when missing"""
+        fields = [fieldname] if isinstance(fieldname, str) else list(fieldname)
+        rows = self.select(doctype, filters, fields, order_by, limit=1)
+
+        if not rows:
+            return None
+        if as_dict:
+            return rows[0]
+        if isinstance(fieldname, str):
+            return rows[0][fieldname]
+        return tuple(rows[0][field] for field in fields)
+
+    def set_value(
+        self,
+        doctype: str,
+        name: Any,
+        fieldname: Union[str, Dict[str, Any]],
+        value: Any = None,
+        update_modified: bool = True
+    ) -> None:
+        """frappe.db.set_value on one document (name) or every match (filters)"""
+        updates = dict(fieldname) if isinstance(fieldname, dict) else {fieldname: value}
+        if update_modified:
+            updates["modified"] = self.standin.now()
+            updates["modified_by"] = self.standin.session.user
+
+        self.ensure_columns(doctype, list(updates))
+        where, params = self._conditions_sql(doctype, name)
+        self._execute(
+            f"UPDATE {_quote('tab' + doctype)} SET "
+            f"{', '.join(f'{_quote(field)} = ?' for field in updates)} {where}",
+            [_adapt(value) for value in updates.values()] + params
+        )
+
+    def exists(self, doctype: str, name: Any = None) -> Optional[str]:
+        """Name of the first matching document, or None"""
+        return self.get_value(doctype, name, "name")
+
+    def count(self, doctype: str, filters: Any = None) -> int:
+        rows = self.select(doctype, filters, ["count(*) AS count"])
+        return rows[0]["count"] if rows else 0
+
+    def bulk_insert(
+        self,
+        doctype: str,
+        fields: List[str],
+        values: List[tuple],
+        ignore_duplicates: bool = False
+    ) -> None:
+        """frappe.db.bulk_insert: rows as tuples in the order of fields"""
+        self.insert_rows(doctype, [dict(zip(fields, row)) for row in values])
+
+    def get_global(self, key: str) -> Optional[str]:
+        return self.get_value("DefaultValue", {"parent": "__global", "defkey": key}, "defvalue")
+
+    def set_global(self, key: str, value: Any) -> None:
+        filters = {"parent": "__global", "defkey": key}
+        if self.exists("DefaultValue", filters):
+            self.set_value("DefaultValue", filters, "defvalue", value, update_modified=False)
+        else:
+            self.insert_rows("DefaultValue", [dict(
+                filters, name=self.standin.generate_hash(length=10), defvalue=value
+            )])
+
+
+class Document:
+    """
+    frappe Document stand-in.
+
+    Fields are plain attributes; fields never set read as None, as fields
+    defined in the meta do on a real document. Child rows are Documents too.
+    """
+
+    def __init__(self, standin: "FrappeStandIn", data: Dict[str, Any]):
+        self._standin = standin
+        self.flags = _dict()
+        self.doctype = data["doctype"]
+        self.docstatus = 0
+
+        for field, value in data.items():
+            if isinstance(value, list) and (not value or isinstance(value[0], (dict, Document))):
+                self.__dict__[field] = []
+                for row in value:
+                    self.append(field, row)
+            else:
+                self.__dict__[field] = value
+
+    def __getattr__(self, key):
+        if key.startswith("__"):
+            raise AttributeError(key)
+        return None
+
+    def __repr__(self):
+        return f"<{self.doctype}: {self.name}>"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.__dict__.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        self.__dict__[key] = value
+
+    def update(self, values: Dict[str, Any]) -> "Document":
+        for key, value in values.items():
+            self.set(key, value)
+        return self
+
+    def as_dict(self) -> _dict:
+        return _dict(
+            (key, [row.as_dict() for row in value] if self._is_table(key) else value)
+            for key, value in self.__dict__.items()
+            if not key.startswith("_") and key != "flags"
+        )
+
+    def _is_table(self, key: str) -> bool:
+        return isinstance(self.__dict__.get(key), list)
+
+    def append(self, fieldname: str, row: Union[Dict[str, Any], "Document", None] = None) -> "Document":
+        """Add a child row; its doctype comes from the row or CHILD_DOCTYPES"""
+        rows = self.__dict__.setdefault(fieldname, [])
+
+        if not isinstance(row, Document):
+            row = dict(row or {})
+            child_doctype = row.pop("doctype", None) or CHILD_DOCTYPES.get((self.doctype, fieldname))
+            if not child_doctype:
+                raise StandInError(f"Unknown child table {self.doctype}.{fieldname}")
+            row = Document(self._standin, dict(row, doctype=child_doctype))
+
+        row.parentfield = fieldname
+        row.parenttype = self.doctype
+        row.idx = len(rows) + 1
+        rows.append(row)
+        return row
+
+    def run_method(self, method: str) -> None:
+        self._standin.run_doc_event(self, method)
+
+    def _run_events(self, events: Tuple[str, ...]) -> None:
+        for event in events:
+            self.run_method(event)
+
+    def insert(self, ignore_permissions: bool = False, **kwargs) -> "Document":
+        """Name and store a new document; runs validate, before_insert and after_insert"""
+        self._standin.autoname(self)
+        self._run_events(INSERT_EVENTS[:2])
+        self._standin.store_document(self)
+        self._run_events(INSERT_EVENTS[2:])
+        return self
+
+    def save(self, ignore_permissions: bool = False, **kwargs) -> "Document":
+        """Store a changed document (or insert a new one); runs validate"""
+        if not self._standin.db.exists(self.doctype, self.name or ""):
+            return self.insert()
+
+        self.run_method("validate")
+        self._standin.store_document(self, update=True)
+        return self
+
+    def submit(self) -> "Document":
+        """Set docstatus 1 and store; runs validate, before_submit and on_submit"""
+        is_new = not self.name or not self._standin.db.exists(self.doctype, self.name)
+        if is_new:
+            self._standin.autoname(self)
+
+        self.docstatus = 1
+        self._run_events(SUBMIT_EVENTS[:2])
+        self._standin.store_document(self, update=not is_new)
+        self._run_events(SUBMIT_EVENTS[2:])
+        return self
+
+    def cancel(self) -> "Document":
+        """Set docstatus 2; runs before_cancel and on_cancel"""
+        self.run_method(CANCEL_EVENTS[0])
+        self.docstatus = 2
+        self.db_set({"docstatus": 2, "status": "Cancelled"})
+        self.run_method(CANCEL_EVENTS[1])
+        return self
+
+    def db_set(self, fieldname: Union[str, Dict[str, Any]], value: Any = None, **kwargs) -> None:
+        values = fieldname if isinstance(fieldname, dict) else {fieldname: value}
+        self.update(values)
+        self._standin.db.set_value(self.doctype, self.name, values)
+
+    def add_comment(self, comment_type: str = "Comment", text: str = None, **kwargs) -> "Document":
+        return self._standin.get_doc({
+            "doctype": "Comment",
+            "comment_type": comment_type,
+            "reference_doctype": self.doctype,
+            "reference_name": self.name,
+            "content": text
+        }).insert(ignore_permissions=True)
+
+
+class FrappeStandIn:
+    """
+    One in-memory site: database, session, logs and document events.
+
+    The frappe module built from it is available as .module and is put in
+    sys.modules by installed().
+    """
+
+    def __init__(
+        self,
+        site: str = DEFAULT_SITE,
+        user: str = DEFAULT_USER,
+        path: str = ":memory:",
+        latency: Optional[LatencyModel] = None
+    ):
+        self.site = site
+        self.session = _dict(user=user)
+        self.doc_events = {}
+        self.error_log = []
+        self.messages = []
+        self.clock = None
+        self._counters = {}
+        self._hashes = 0
+        self._logger = logging.getLogger(f"erpnext_custom.benchmarks.frappe_standin.{site}")
+        self._logger.addHandler(logging.NullHandler())
+        self._logger.propagate = False
+        self.db = StandInDatabase(self, path, latency)
+        self.module = self._build_module()
+
+    # Clock and naming
+
+    def now(self) -> str:
+        """Current timestamp; a fixed clock can be set with .clock for repeatable runs"""
+        moment = self.clock() if self.clock else datetime.now()
+        return moment.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+    def generate_hash(self, txt: str = None, length: int = 10) -> str:
+        """Counter based: the nth hash of a stand-in is the same every run"""
+        self._hashes += 1
+        return hashlib.sha1(f"{self.site}:{self._hashes}".encode()).hexdigest()[:length]
+
+    def autoname(self, doc: Document) -> None:
+        """Name from naming_series (e.g. "SINV-.YYYY.-") or doctype initials, 5-digit counter"""
+        if doc.name:
+            return
+
+        if doc.get("naming_series"):
+            year = str(doc.get("posting_date") or self.now())[:4]
+            prefix = doc.naming_series.replace(".YYYY.", year).replace(".", "").replace("#", "")
+        else:
+            prefix = "".join(word[0] for word in doc.doctype.split()).upper() + "-"
+
+        self._counters[prefix] = self._counters.get(prefix, 0) + 1
+        doc.name = f"{prefix}{self._counters[prefix]:05d}"
+
+    # Documents
+
+    def register_doc_events(self, doc_events: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Add document events in the format of hooks.py doc_events.
+
+        Handlers may be dotted paths or callables, one or a list per event.
+        """
+        for doctype, events in doc_events.items():
+            for event, handlers in events.items():
+                if not isinstance(handlers, (list, tuple)):
+                    handlers = [handlers]
+                self.doc_events.setdefault(doctype, {}).setdefault(event, []).extend(handlers)
+
+    def run_doc_event(self, doc: Document, event: str) -> None:
+        for handler in self.doc_events.get(doc.doctype, {}).get(event, []):
+            if isinstance(handler, str):
+                module_name, _dot, function = handler.rpartition(".")
+                handler = getattr(importlib.import_module(module_name), function)
+            handler(doc, event)
+
+    def store_document(self, doc: Document, update: bool = False) -> None:
+        """Write a document and its child rows; update replaces the stored version"""
+        now = self.now()
+        user = self.session.user
+
+        if not update:
+            doc.owner = doc.owner or user
+            doc.creation = doc.creation or now
+        doc.modified = now
+        doc.modified_by = user
+
+        header = {}
+        tables = {}
+        for field, value in doc.as_dict().items():
+            if doc._is_table(field):
+                tables[field] = doc.get(field)
+            elif field != "doctype":
+                header[field] = value
+
+        if update:
+            self.db.ensure_columns(doc.doctype, list(header))
+            self.db._execute(f"DELETE FROM {_quote('tab' + doc.doctype)} WHERE name = ?", [doc.name])
+        self.db.insert_rows(doc.doctype, [header])
+
+        for field, rows in tables.items():
+            if not rows:
+                continue
+            child_doctype = rows[0].doctype
+            if update and self.db.table_columns(child_doctype):
+                self.db._execute(
+                    f"DELETE FROM {_quote('tab' + child_doctype)} "
+                    f"WHERE parent = ? AND parenttype = ? AND parentfield = ?",
+                    [doc.name, doc.doctype, field]
+                )
+
+            child_rows = []
+            for row in rows:
+                row.name = row.name or self.generate_hash(length=10)
+                row.parent = doc.name
+                row.docstatus = doc.docstatus
+                row.owner = row.owner or user
+                row.creation = row.creation or now
+                row.modified = now
+                row.modified_by = user
+                child_rows.append({
+                    key: value for key, value in row.as_dict().items() if key != "doctype"
+                })
+            self.db.insert_rows(child_doctype, child_rows)
+
+    def get_doc(self, arg: Union[str, Dict[str, Any]], name: Any = None, **kwargs) -> Document:
+        """New document from a dict, or the stored document with its child rows"""
+        if isinstance(arg, dict):
+            return Document(self, arg)
+
+        doctype = arg
+        rows = self.db.select(doctype, name, limit=1)
+        if not rows:
+            raise DoesNotExistError(f"{doctype} {name} not found")
+
+        data = dict(rows[0], doctype=doctype)
+        for (parent, fieldname), child_doctype in CHILD_DOCTYPES.items():
+            if parent == doctype:
+                data[fieldname] = [
+                    dict(row, doctype=child_doctype)
+                    for row in self.db.select(
+                        child_doctype,
+                        {"parent": data["name"], "parenttype": doctype, "parentfield": fieldname},
+                        order_by="idx asc"
+                    )
+                ]
+
+        return Document(self, data)
+
+    def new_doc(self, doctype: str, **kwargs) -> Document:
+        return Document(self, {"doctype": doctype})
+
+    def get_all(
+        self,
+        doctype: str,
+        filters: Any = None,
+        fields: Union[str, List[str], None] = None,
+        order_by: Optional[str] = None,
+        limit_page_length: int = 0,
+        pluck: Optional[str] = None,
+        limit: Optional[int] = None,
+        **kwargs
+    ) -> List[Any]:
+        """frappe.get_all: _dicts of the matching rows, or one field per row with pluck"""
+        if pluck:
+            fields = [pluck]
+        elif isinstance(fields, str):
+            fields = [fields]
+
+        rows = self.db.select(doctype, filters, fields or ["name"], order_by, limit or limit_page_length)
+        if pluck:
+            return [row[pluck] for row in rows]
+        return rows
+
+    # Messages and errors
+
+    def throw(self, msg: str, exc: type = ValidationError, title: str = None, **kwargs) -> None:
+        raise exc(msg)
+
+    def msgprint(self, msg: str, title: str = None, raise_exception: Any = False, **kwargs) -> None:
+        self.messages.append(msg)
+        if raise_exception:
+            self.throw(msg, raise_exception if isinstance(raise_exception, type) else ValidationError)
+
+    def log_error(self, message: str = None, title: str = None, **kwargs) -> None:
+        self.error_log.append({"title": title, "message": message})
+
+    def logger(self, module: str = None, **kwargs) -> logging.Logger:
+        return self._logger
+
+    def end_request(self) -> None:
+        """Commit and drop request state (frappe.local, frappe.flags), as frappe does after a request"""
+        self.db.commit()
+        self.module.local = types.SimpleNamespace(site=self.site, flags=_dict())
+        self.module.flags = _dict()
+
+    # Module
+
+    def _build_module(self) -> types.ModuleType:
+        module = types.ModuleType("frappe")
+        module.__doc__ = "In-memory frappe stand-in for site " + self.site
+
+        utils = types.ModuleType("frappe.utils")
+        utils.now = self.now
+        utils.nowdate = utils.today = lambda: self.now()[:10]
+        utils.nowtime = lambda: self.now()[11:]
+        utils.getdate = lambda value=None: (
+            date.fromisoformat(str(value)[:10]) if value else date.fromisoformat(self.now()[:10])
+        )
+        utils.flt = lambda value, precision=None: (
+            round(float(value or 0), precision) if precision is not None else float(value or 0)
+        )
+        utils.cint = lambda value: int(float(value or 0))
+        utils.get_sites = lambda: [self.site]
+
+        def whitelist(*args, **kwargs):
+            if args and callable(args[0]):
+                return args[0]
+            return lambda function: function
+
+        module.__dict__.update({
+            "db": self.db,
+            "utils": utils,
+            "session": self.session,
+            "local": types.SimpleNamespace(site=self.site, flags=_dict()),
+            "flags": _dict(),
+            "conf": _dict(),
+            "_dict": _dict,
+            "_": lambda msg, *args, **kwargs: msg,
+            "ValidationError": ValidationError,
+            "DoesNotExistError": DoesNotExistError,
+            "get_doc": self.get_doc,
+            "get_cached_doc": self.get_doc,
+            "new_doc": self.new_doc,
+            "get_all": self.get_all,
+            "get_list": self.get_all,
+            "throw": self.throw,
+            "msgprint": self.msgprint,
+            "log_error": self.log_error,
+            "logger": self.logger,
+            "generate_hash": self.generate_hash,
+            "whitelist": whitelist,
+            "has_permission": lambda *args, **kwargs: True,
+            "only_for": lambda *args, **kwargs: None,
+            "get_site_path": lambda *path: os.path.join(".", self.site, *path),
+            "clear_cache": lambda *args, **kwargs: None,
+            "clear_document_cache": lambda *args, **kwargs: None
+        })
+        return module
+
+    @contextmanager
+    def installed(self) -> Iterator[types.ModuleType]:
+        """
+        Make `import frappe` return this stand-in.
+
+        erpnext_custom modules imported before (e.g. against another frappe)
+        have their module-level frappe rebound for the duration; modules
+        first imported inside are bound to the previous frappe on exit.
+        """
+        saved = {name: sys.modules.get(name) for name in ("frappe", "frappe.utils")}
+        sys.modules["frappe"] = self.module
+        sys.modules["frappe.utils"] = self.module.utils
+
+        rebound = []
+        for name, loaded in list(sys.modules.items()):
+            if not name.startswith("erpnext_custom") or loaded is None:
+                continue
+            previous = vars(loaded).get("frappe")
+            if isinstance(previous, types.ModuleType) and previous is not self.module:
+                rebound.append((loaded, previous))
+                loaded.frappe = self.module
+
+        try:
+            yield self.module
+        finally:
+            for loaded, previous in rebound:
+                loaded.frappe = previous
+            if saved["frappe"] is not None:
+                for name, loaded in list(sys.modules.items()):
+                    if name.startswith("erpnext_custom") and loaded is not None \
+                            and vars(loaded).get("frappe") is self.module:
+                        loaded.frappe = saved["frappe"]
+            for name, previous in saved.items():
+                if previous is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = previous
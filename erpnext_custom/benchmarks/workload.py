@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Synthetic Invoice Workload
+
+Generates a deterministic stream of documents for the benchmark and load-test
+harnesses, in the shapes the hooks see in production:
+    - Sales Invoices with tiered discounts, PPN and item commission
+    - Purchase Invoices with PPN; service purchases also withhold PPh 23 (2%)
+    - Credit Notes returning part of an earlier Sales Invoice
+    - Delivery Notes with a Sales Return of part of their lines
+    - Cancellations of earlier, untouched Sales Invoices
+
+PPN is 11% before PPN_12_FROM and 12% from then on, so the default period
+(December 2024 - January 2025) carries both rates. Documents are spread over
+several companies, and customers and items are drawn from a Zipf-like
+distribution (a few customers and items account for most documents), like
+the ones the property tests in tests/test_properties.py sample uniformly.
+
+Records are written as JSON Lines, one per document action:
+    {"seq": 1, "kind": "Sales Invoice", "action": "submit", "doc": {...}}
+    {"seq": 9, "kind": "Sales Invoice", "action": "cancel",
+     "doctype": "Sales Invoice", "name": "SINV-2024-0000004"}
+Company records ("insert") come first. Every document and child row carries
+its name, and references point at names of earlier records, so a stream can
+be replayed as is. The same seed and options give the same stream; memory
+stays constant however many documents are generated.
+
+This module does not need frappe.
+
+Usage:
+    python -m erpnext_custom.benchmarks.workload --documents 1000000 --seed 7 --output workload.jsonl
+    python -m erpnext_custom.benchmarks.bench_hook_pipelines --workload workload.jsonl
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import random
+import sys
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from erpnext_custom.benchmarks.bench_month_end import COMMISSION_RATE, discount_percentage_for
+from erpnext_custom.discount_calculator import calculate_discount
+from erpnext_custom.tax_calculator import calculate_taxes
+
+
+COMPANIES = [
+    ("PT Sinar Nusantara", "SNU"),
+    ("PT Maju Bersama", "MJB"),
+    ("CV Karya Mandiri", "KMD"),
+    ("PT Sumber Rejeki", "SRJ"),
+    ("PT Cahaya Timur", "CHT")
+]
+
+PPN_12_FROM = "2025-01-01"
+PPH_23_RATE = 2
+
+# Recent Sales Invoices kept as targets for Credit Notes, returns and cancels
+POOL_SIZE = 2000
+
+PRICE_POINTS = [15000, 45000, 120000, 350000, 1250000, 4500000]
+
+
+def sales_tax_template(posting_date: str) -> Dict[str, Any]:
+    rate = 12 if posting_date >= PPN_12_FROM else 11
+    return {"taxes": [
+        {"charge_type": "On Net Total", "account_head": "2210 - Hutang PPN", "description": f"PPN {rate}%", "rate": rate}
+    ]}
+
+
+def purchase_tax_template(posting_date: str, withhold_pph23: bool) -> Dict[str, Any]:
+    rate = 12 if posting_date >= PPN_12_FROM else 11
+    taxes = [
+        {"charge_type": "On Net Total", "account_head": "1410 - PPN Masukan", "description": f"PPN {rate}%", "rate": rate}
+    ]
+    if withhold_pph23:
+        taxes.append({
+            "charge_type": "On Net Total", "account_head": "2230 - Hutang PPh 23",
+            "description": "PPh 23", "rate": PPH_23_RATE, "add_deduct_tax": "Deduct"
+        })
+    return {"taxes": taxes}
+
+
+class ZipfChoice:
+    """Draws from a sequence with weight 1 / rank ** skew (skew 0 is uniform)"""
+
+    def __init__(self, values: List[Any], skew: float):
+        self.values = values
+        self.cumulative = list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, len(values) + 1)))
+
+    def draw(self, rng: random.Random) -> Any:
+        position = bisect.bisect_left(self.cumulative, rng.random() * self.cumulative[-1])
+        return self.values[min(position, len(self.values) - 1)]
+
+
+class WorkloadGenerator:
+    """
+    Streams workload records from one seeded random generator.
+
+    Each step posts a Sales or Purchase Invoice; after it, follow-ups
+    (Credit Note, Delivery Note with Sales Return, cancellation) are drawn
+    at their rates against recent, not yet used Sales Invoices.
+    """
+
+    def __init__(
+        self,
+        seed: int = 42,
+        companies: int = 3,
+        customers: int = 500,
+        suppliers: int = 80,
+        items: int = 1000,
+        start_date: str = "2024-12-01",
+        days: int = 62,
+        purchase_rate: float = 0.3,
+        service_rate: float = 0.4,
+        credit_note_rate: float = 0.05,
+        return_rate: float = 0.03,
+        cancel_rate: float = 0.02,
+        skew: float = 1.1
+    ):
+        if not 1 <= companies <= len(COMPANIES):
+            raise ValueError(f"companies must be between 1 and {len(COMPANIES)}")
+        if customers < 1 or suppliers < 1 or items < 1:
+            raise ValueError("customers, suppliers and items must be at least 1")
+
+        self.rng = random.Random(seed)
+        self.companies = COMPANIES[:companies]
+        self.start = date.fromisoformat(start_date)
+        self.days = days
+        self.purchase_rate = purchase_rate
+        self.service_rate = service_rate
+        self.credit_note_rate = credit_note_rate
+        self.return_rate = return_rate
+        self.cancel_rate = cancel_rate
+
+        rng = self.rng
+        self.customers = ZipfChoice(
+            [(f"CUST-{i:05d}", self.companies[i % companies]) for i in range(customers)], skew
+        )
+        self.suppliers = ZipfChoice(
+            [(f"SUPP-{i:04d}", self.companies[i % companies]) for i in range(suppliers)], skew
+        )
+        self.items = ZipfChoice(
+            [{"item_code": f"ITEM-{i:05d}", "rate": float(rng.choice(PRICE_POINTS))} for i in range(items)], skew
+        )
+        self.sales_persons = [f"Sales {i:02d}" for i in range(12)]
+
+        self.pool: Deque[Dict[str, Any]] = deque(maxlen=POOL_SIZE)
+        self.counters: Dict[str, int] = {}
+        self.seq = 0
+
+    # Naming
+
+    def _name(self, prefix: str, posting_date: str) -> str:
+        key = f"{prefix}-{posting_date[:4]}-"
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return f"{key}{self.counters[key]:07d}"
+
+    def _record(self, kind: str, action: str, **fields) -> Dict[str, Any]:
+        self.seq += 1
+        return dict({"seq": self.seq, "kind": kind, "action": action}, **fields)
+
+    def _lines(self, count: int) -> List[Dict[str, Any]]:
+        # Lines have distinct items, so there can be no more than there are items
+        count = min(count, len(self.items.values))
+        chosen = {}
+        while len(chosen) < count:
+            item = self.items.draw(self.rng)
+            chosen[item["item_code"]] = item
+        return list(chosen.values())
+
+    # Documents
+
+    def sales_invoice(self, posting_date: str) -> Dict[str, Any]:
+        rng = self.rng
+        customer, (company, abbr) = self.customers.draw(rng)
+        name = self._name("SINV", posting_date)
+
+        lines = []
+        for idx, item in enumerate(self._lines(rng.randint(1, 10)), start=1):
+            qty = rng.randint(1, 20)
+            lines.append({
+                "name": f"{name}-{idx}",
+                "idx": idx,
+                "item_code": item["item_code"],
+                "qty": qty,
+                "uom": "Nos",
+                "rate": item["rate"],
+                "amount": qty * item["rate"],
+                "warehouse": f"Stores - {abbr}"
+            })
+
+        total = sum(line["amount"] for line in lines)
+        discount = calculate_discount(total, discount_percentage_for(total))
+        taxes = calculate_taxes(discount["net_total"], sales_tax_template(posting_date))
+
+        factor = discount["net_total"] / total
+        for line in lines:
+            line["custom_komisi_sales"] = round(line["amount"] * factor * COMMISSION_RATE, 2)
+
+        team = rng.sample(self.sales_persons, rng.choice([1, 1, 2]))
+        shares = [100] if len(team) == 1 else [60, 40]
+
+        return {
+            "doctype": "Sales Invoice",
+            "name": name,
+            "company": company,
+            "customer": customer,
+            "posting_date": posting_date,
+            "is_return": 0,
+            "status": "Unpaid",
+            "items": lines,
+            "total": total,
+            "discount_percentage": discount["discount_percentage"],
+            "discount_amount": discount["discount_amount"],
+            "net_total": discount["net_total"],
+            "taxes": taxes["taxes"],
+            "grand_total": taxes["grand_total"],
+            "custom_total_komisi_sales": round(sum(line["custom_komisi_sales"] for line in lines), 2),
+            "sales_team": [
+                {"name": f"{name}-st{idx}", "sales_person": person, "allocated_percentage": share}
+                for idx, (person, share) in enumerate(zip(team, shares), start=1)
+            ]
+        }
+
+    def purchase_invoice(self, posting_date: str) -> Dict[str, Any]:
+        rng = self.rng
+        supplier, (company, abbr) = self.suppliers.draw(rng)
+        name = self._name("PINV", posting_date)
+        is_service = rng.random() < self.service_rate
+
+        lines = []
+        for idx, item in enumerate(self._lines(rng.randint(1, 5)), start=1):
+            qty = rng.randint(5, 100)
+            rate = round(item["rate"] * 0.7, 2)
+            lines.append({
+                "name": f"{name}-{idx}",
+                "idx": idx,
+                "item_code": item["item_code"],
+                "qty": qty,
+                "rate": rate,
+                "amount": round(qty * rate, 2)
+            })
+
+        total = round(sum(line["amount"] for line in lines), 2)
+        taxes = calculate_taxes(total, purchase_tax_template(posting_date, is_service), tax_type="Purchase")
+
+        return {
+            "doctype": "Purchase Invoice",
+            "name": name,
+            "company": company,
+            "supplier": supplier,
+            "posting_date": posting_date,
+            "is_return": 0,
+            "status": "Unpaid",
+            "items": lines,
+            "total": total,
+            "discount_amount": 0,
+            "net_total": total,
+            "taxes": taxes["taxes"],
+            "grand_total": taxes["grand_total"]
+        }
+
+    def credit_note(self, invoice: Dict[str, Any], posting_date: str) -> Dict[str, Any]:
+        """Credit Note returning part of one line, at the invoice's discount and PPN"""
+        line = self.rng.choice(invoice["items"])
+        qty = max(1, line["qty"] // 2)
+        net_amount = round(qty * line["rate"] * (1 - (invoice["discount_percentage"] or 0) / 100), 2)
+        taxes = calculate_taxes(net_amount, sales_tax_template(invoice["posting_date"]))
+        commission = round(line["custom_komisi_sales"] * qty / line["qty"], 2)
+        name = self._name("SRET", posting_date)
+
+        return {
+            "doctype": "Sales Invoice",
+            "name": name,
+            "company": invoice["company"],
+            "customer": invoice["customer"],
+            "posting_date": posting_date,
+            "is_return": 1,
+            "return_against": invoice["name"],
+            "status": "Return",
+            "items": [{
+                "name": f"{name}-1",
+                "idx": 1,
+                "item_code": line["item_code"],
+                "qty": -qty,
+                "uom": line["uom"],
+                "rate": line["rate"],
+                "amount": -net_amount,
+                "warehouse": line["warehouse"],
+                "custom_komisi_sales": -commission
+            }],
+            "total": -net_amount,
+            "discount_amount": 0,
+            "net_total": -net_amount,
+            "taxes": [dict(tax, tax_amount=-tax["tax_amount"]) for tax in taxes["taxes"]],
+            "grand_total": -taxes["grand_total"],
+            "custom_total_komisi_sales": -commission
+        }
+
+    def delivery_note(self, invoice: Dict[str, Any]) -> Dict[str, Any]:
+        name = self._name("DN", invoice["posting_date"])
+        return {
+            "doctype": "Delivery Note",
+            "name": name,
+            "company": invoice["company"],
+            "customer": invoice["customer"],
+            "posting_date": invoice["posting_date"],
+            "items": [
+                {
+                    "name": f"{name}-{line['idx']}",
+                    "idx": line["idx"],
+                    "item_code": line["item_code"],
+                    "item_name": line["item_code"],
+                    "qty": line["qty"],
+                    "uom": line["uom"],
+                    "rate": line["rate"],
+                    "warehouse": line["warehouse"]
+                }
+                for line in invoice["items"]
+            ]
+        }
+
+    def sales_return(self, delivery_note: Dict[str, Any], posting_date: str) -> Dict[str, Any]:
+        """Sales Return of part of some Delivery Note lines"""
+        rng = self.rng
+        name = self._name("SR", posting_date)
+        lines = rng.sample(delivery_note["items"], rng.randint(1, len(delivery_note["items"])))
+
+        return {
+            "doctype": "Sales Return",
+            "name": name,
+            "company": delivery_note["company"],
+            "customer": delivery_note["customer"],
+            "delivery_note": delivery_note["name"],
+            "posting_date": posting_date,
+            "items": [
+                {
+                    "name": f"{name}-{idx}",
+                    "idx": idx,
+                    "item_code": line["item_code"],
+                    "delivery_note_item": line["name"],
+                    "qty": rng.randint(1, line["qty"]),
+                    "uom": line["uom"],
+                    "rate": line["rate"],
+                    "warehouse": line["warehouse"],
+                    "return_reason": rng.choice(["Damaged", "Wrong Item", "Expired", "Other"]),
+                    "return_notes": "Workload return"
+                }
+                for idx, line in enumerate(lines, start=1)
+            ]
+        }
+
+    # Stream
+
+    def _take_from_pool(self) -> Optional[Dict[str, Any]]:
+        """Remove and return a random recent Sales Invoice"""
+        if not self.pool:
+            return None
+        position = self.rng.randrange(len(self.pool))
+        self.pool[position], self.pool[-1] = self.pool[-1], self.pool[position]
+        return self.pool.pop()
+
+    def records(self, documents: int) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the records of a workload.
+
+        Args:
+            documents: Sales and Purchase Invoices to post; follow-ups come on top
+
+        Returns:
+            Iterator of records, Company inserts first
+        """
+        rng = self.rng
+
+        for company, abbr in self.companies:
+            yield self._record("Company", "insert", doc={
+                "doctype": "Company",
+                "name": company,
+                "abbr": abbr,
+                "default_currency": "IDR",
+                "enable_perpetual_inventory": 0
+            })
+
+        for step in range(documents):
+            posting_date = (self.start + timedelta(days=step * self.days // max(documents, 1))).isoformat()
+
+            if rng.random() < self.purchase_rate:
+                yield self._record("Purchase Invoice", "submit", doc=self.purchase_invoice(posting_date))
+            else:
+                invoice = self.sales_invoice(posting_date)
+                yield self._record("Sales Invoice", "submit", doc=invoice)
+                self.pool.append(invoice)
+
+            if rng.random() < self.credit_note_rate:
+                invoice = self._take_from_pool()
+                if invoice:
+                    yield self._record("Credit Note", "submit", doc=self.credit_note(invoice, posting_date))
+
+            if rng.random() < self.return_rate:
+                invoice = self._take_from_pool()
+                if invoice:
+                    delivery_note = self.delivery_note(invoice)
+                    yield self._record("Delivery Note", "submit", doc=delivery_note)
+                    yield self._record("Sales Return", "submit", doc=self.sales_return(delivery_note, posting_date))
+
+            if rng.random() < self.cancel_rate:
+                invoice = self._take_from_pool()
+                if invoice:
+                    yield self._record(
+                        "Sales Invoice", "cancel", doctype="Sales Invoice", name=invoice["name"]
+                    )
+
+
+def write_workload(records: Iterable[Dict[str, Any]], output) -> int:
+    """Write records as JSON Lines to a file object; returns the number written"""
+    count = 0
+    for record in records:
+        output.write(json.dumps(record, separators=(",", ":")) + "\n")
+        count += 1
+    return count
+
+
+def read_workload(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of a JSON Lines workload file ("-" reads stdin)"""
+    handle = sys.stdin if path == "-" else open(path)
+    try:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic invoice workload as JSON Lines")
+    parser.add_argument("--documents", type=int, default=10000, help="Sales and Purchase Invoices to generate")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--companies", type=int, default=3, help=f"Companies (1-{len(COMPANIES)})")
+    parser.add_argument("--customers", type=int, default=500, help="Customers")
+    parser.add_argument("--suppliers", type=int, default=80, help="Suppliers")
+    parser.add_argument("--items", type=int, default=1000, help="Items")
+    parser.add_argument("--start-date", default="2024-12-01", help="First posting date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=62, help="Days the documents are spread over")
+    parser.add_argument("--purchase-rate", type=float, default=0.3, help="Share of Purchase Invoices")
+    parser.add_argument("--service-rate", type=float, default=0.4, help="Share of Purchase Invoices for services (PPh 23)")
+    parser.add_argument("--credit-note-rate", type=float, default=0.05, help="Credit Notes per invoice")
+    parser.add_argument("--return-rate", type=float, default=0.03, help="Sales Returns per invoice")
+    parser.add_argument("--cancel-rate", type=float, default=0.02, help="Cancellations per invoice")
+    parser.add_argument("--skew", type=float, default=1.1, help="Customer and item skew (0 = uniform)")
+    parser.add_argument("--output", default="-", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    generator = WorkloadGenerator(
+        seed=args.seed,
+        companies=args.companies,
+        customers=args.customers,
+        suppliers=args.suppliers,
+        items=args.items,
+        start_date=args.start_date,
+        days=args.days,
+        purchase_rate=args.purchase_rate,
+        service_rate=args.service_rate,
+        credit_note_rate=args.credit_note_rate,
+        return_rate=args.return_rate,
+        cancel_rate=args.cancel_rate,
+        skew=args.skew
+    )
+
+    if args.output == "-":
+        written = write_workload(generator.records(args.documents), sys.stdout)
+    else:
+        with open(args.output, "w") as output:
+            written = write_workload(generator.records(args.documents), output)
+        print(f"✅ {written:,} records written to {args.output}", file=sys.stderr)
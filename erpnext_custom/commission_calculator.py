@@ -0,0 +1,267 @@
+"""
+Commission Calculator Module
+
+This module provides the commission math shared by the Credit Note
+adjustment, the batch recomputation and the commission ledger:
+- Commission adjustment of a Credit Note and its validation
+- Per-invoice totals from grouped invoice and Credit Note commission rows
+- Splitting commission across the Sales Team of an invoice
+
+Like discount_calculator and tax_calculator it does not import frappe, so it
+can be imported (and tested) without a site.
+
+Requirements: 7.3, 7.4
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+# Label used in the report for invoices without a Sales Team row
+UNASSIGNED_SALES_PERSON = "Unassigned"
+
+
+def calculate_commission_adjustment(credit_note: Any) -> float:
+    """
+    Calculate total commission adjustment from Credit Note items.
+
+    Args:
+        credit_note: Credit Note (Sales Invoice) document
+
+    Returns:
+        Total commission adjustment (negative value)
+
+    Example:
+        >>> credit_note = frappe.get_doc("Sales Invoice", "CN-2024-00001")
+        >>> adjustment = calculate_commission_adjustment(credit_note)
+        >>> adjustment
+        -50000.0
+    """
+    total_commission = 0.0
+
+    if hasattr(credit_note, "items") and credit_note.items:
+        for item in credit_note.items:
+            item_commission = item.get("custom_komisi_sales", 0)
+            total_commission += item_commission
+
+    return round(total_commission, 2)
+
+
+def validate_commission_adjustment(
+    original_invoice: Any,
+    credit_note: Any
+) -> Dict[str, Any]:
+    """
+    Validate commission adjustment before applying.
+
+    Args:
+        original_invoice: Original Sales Invoice document
+        credit_note: Credit Note document
+
+    Returns:
+        Dict with validation result:
+            - valid: Boolean
+            - message: Error message if invalid
+            - original_commission: Original commission value
+            - adjustment: Commission adjustment value
+            - new_commission: New commission after adjustment
+    """
+    result = {
+        "valid": True,
+        "message": "",
+        "original_commission": 0.0,
+        "adjustment": 0.0,
+        "new_commission": 0.0
+    }
+
+    # Get original commission
+    original_commission = original_invoice.get("custom_total_komisi_sales", 0)
+    result["original_commission"] = original_commission
+
+    # Get Credit Note commission
+    credit_note_commission = credit_note.get("custom_total_komisi_sales", 0)
+    result["adjustment"] = credit_note_commission
+
+    # Calculate new commission
+    new_commission = original_commission - abs(credit_note_commission)
+    result["new_commission"] = new_commission
+
+    # Validate: new commission should not be negative
+    if new_commission < 0:
+        result["valid"] = False
+        result["message"] = (
+            f"Commission adjustment would result in negative commission: "
+            f"{original_commission} - {abs(credit_note_commission)} = {new_commission}"
+        )
+        return result
+
+    # Validate: Credit Note commission should be negative or zero
+    if credit_note_commission > 0:
+        result["valid"] = False
+        result["message"] = (
+            f"Credit Note commission should be negative or zero, got: {credit_note_commission}"
+        )
+        return result
+
+    return result
+
+
+def aggregate_commission_rows(rows: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Fold grouped commission rows into per-invoice totals.
+
+    Each row is the item commission of one voucher (a Sales Invoice or a Credit
+    Note) grouped under the original invoice it belongs to. Credit Note
+    commission is deducted as an absolute value, matching on_credit_note_submit.
+
+    Args:
+        rows: Iterable of dicts containing:
+            - invoice: Original Sales Invoice name
+            - voucher: Sales Invoice or Credit Note name
+            - is_return: 1 for Credit Notes
+            - commission: Sum of custom_komisi_sales over the voucher items
+            - stored_total: Current custom_total_komisi_sales of the invoice
+
+    Returns:
+        Dict of invoice -> dict containing:
+            - commission: Commission from the invoice items
+            - credit_note_commission: Commission deducted by Credit Notes
+            - total: Recomputed custom_total_komisi_sales
+            - stored_total: Current custom_total_komisi_sales
+
+    Example:
+        >>> rows = [
+        ...     {"invoice": "SI-001", "voucher": "SI-001", "is_return": 0,
+        ...      "commission": 100000, "stored_total": 100000},
+        ...     {"invoice": "SI-001", "voucher": "CN-001", "is_return": 1,
+        ...      "commission": -30000, "stored_total": 100000}
+        ... ]
+        >>> aggregate_commission_rows(rows)["SI-001"]["total"]
+        70000.0
+    """
+    totals = {}
+
+    for row in rows:
+        invoice = row["invoice"]
+
+        if invoice not in totals:
+            totals[invoice] = {
+                "commission": 0.0,
+                "credit_note_commission": 0.0,
+                "total": 0.0,
+                "stored_total": float(row.get("stored_total") or 0)
+            }
+
+        commission = float(row.get("commission") or 0)
+        if row.get("is_return"):
+            totals[invoice]["credit_note_commission"] += abs(commission)
+        else:
+            totals[invoice]["commission"] += commission
+
+    for values in totals.values():
+        values["commission"] = round(values["commission"], 2)
+        values["credit_note_commission"] = round(values["credit_note_commission"], 2)
+        values["total"] = round(
+            values["commission"] - values["credit_note_commission"], 2
+        )
+
+    return totals
+
+
+def find_changed_totals(
+    invoice_totals: Dict[str, Dict[str, float]],
+    tolerance: float = 0.01
+) -> List[Tuple[str, float]]:
+    """
+    List invoices whose stored commission total has drifted.
+
+    Args:
+        invoice_totals: Output of aggregate_commission_rows
+        tolerance: Differences up to this amount are treated as rounding
+
+    Returns:
+        List of (invoice, recomputed total) tuples, sorted by invoice name
+    """
+    changes = []
+
+    for invoice, values in invoice_totals.items():
+        if abs(values["total"] - values["stored_total"]) > tolerance:
+            changes.append((invoice, values["total"]))
+
+    return sorted(changes)
+
+
+def split_amount_by_sales_team(
+    amount: float,
+    sales_team: List[Dict[str, Any]]
+) -> List[Tuple[str, float]]:
+    """
+    Split a commission amount across the Sales Team of an invoice.
+
+    Each sales person receives allocated_percentage of the amount, rounded to
+    2 decimals; the last row takes the rounding remainder. If no row has an
+    allocated percentage, the amount is split equally. An empty Sales Team
+    yields a single Unassigned share.
+
+    Args:
+        amount: Commission amount to split
+        sales_team: Rows with sales_person and allocated_percentage
+
+    Returns:
+        List of (sales_person, amount) tuples in Sales Team order
+    """
+    team = sales_team or [
+        {"sales_person": UNASSIGNED_SALES_PERSON, "allocated_percentage": 100}
+    ]
+
+    percentages = [float(member.get("allocated_percentage") or 0) for member in team]
+    if not any(percentages):
+        percentages = [100.0 / len(team)] * len(team)
+
+    shares = [round(amount * percentage / 100, 2) for percentage in percentages]
+
+    # Give the rounding remainder to the last row, so the shares add up to
+    # the allocated part of the amount (all of it at 100%)
+    allocated = round(amount * sum(percentages) / 100, 2)
+    shares[-1] = round(allocated - sum(shares[:-1]), 2)
+
+    return [
+        (member.get("sales_person") or UNASSIGNED_SALES_PERSON, share)
+        for member, share in zip(team, shares)
+    ]
+
+
+def allocate_commission_to_sales_persons(
+    invoice_totals: Dict[str, Dict[str, float]],
+    sales_team_rows: Iterable[Dict[str, Any]]
+) -> Dict[str, Dict[str, float]]:
+    """
+    Split recomputed invoice totals across the invoice Sales Team.
+
+    Args:
+        invoice_totals: Output of aggregate_commission_rows
+        sales_team_rows: Iterable of dicts with parent, sales_person and
+            allocated_percentage (rows of `tabSales Team`)
+
+    Returns:
+        Dict of sales_person -> dict containing:
+            - total: Commission total for the sales person
+            - invoices: Dict of invoice -> allocated commission
+    """
+    teams = {}
+    for row in sales_team_rows:
+        teams.setdefault(row["parent"], []).append(row)
+
+    report = {}
+
+    for invoice, values in invoice_totals.items():
+        shares = split_amount_by_sales_team(values["total"], teams.get(invoice))
+
+        for sales_person, amount in shares:
+            if sales_person not in report:
+                report[sales_person] = {"total": 0.0, "invoices": {}}
+
+            invoices = report[sales_person]["invoices"]
+            invoices[invoice] = round(invoices.get(invoice, 0.0) + amount, 2)
+            report[sales_person]["total"] = round(report[sales_person]["total"] + amount, 2)
+
+    return report
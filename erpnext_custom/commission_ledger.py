@@ -0,0 +1,558 @@
+"""
+Commission Adjustment Ledger Module
+
+This module keeps an append-only ledger of commission movements per Sales
+Invoice and sales person, and a materialized table of running totals that is
+updated incrementally with every ledger row.
+
+Ledger rows are never updated or deleted:
+- Submitting a Sales Invoice records its commission
+- Submitting a Credit Note records the (negative) commission adjustment
+- Cancelling either records reversing rows for everything the document posted
+
+get_sales_person_totals, get_commission_totals and the period report
+(get_commission_report) read the materialized totals instead of scanning
+invoices and their items. Each total carries the posting date and company of
+its invoice, so a period is one indexed range read; Credit Notes count in the
+period of the invoice they return against, as in commission_recompute.
+Recomputing from items (commission_recompute.recompute_commission_totals)
+remains the repair and verification path.
+
+Tables (created by install_commission_ledger, which runs after every
+`bench migrate` through AFTER_MIGRATE in erpnext_custom.hooks):
+    `tabCommission Adjustment Ledger`: one immutable row per movement
+    `tabCommission Total`: running total per (invoice, sales_person), with
+        the invoice's posting_date and company
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.commission_ledger import install_commission_ledger
+    >>> install_commission_ledger()
+"""
+
+from typing import Any, Dict, List, Optional
+import frappe
+
+from .commission_calculator import UNASSIGNED_SALES_PERSON
+from .commission_recompute import (
+    DEFAULT_CHUNK_SIZE,
+    get_commission_rows,
+    aggregate_commission_rows,
+    get_sales_team_rows,
+    split_amount_by_sales_team
+)
+
+
+LEDGER_TABLE = "tabCommission Adjustment Ledger"
+TOTALS_DOCTYPE = "Commission Total"
+TOTALS_TABLE = f"tab{TOTALS_DOCTYPE}"
+
+# Ledger entry types
+ENTRY_INVOICE = "Invoice"
+ENTRY_CREDIT_NOTE = "Credit Note"
+ENTRY_OPENING = "Opening"
+ENTRY_REVERSAL = "Reversal"
+
+LEDGER_FIELDS = [
+    "name", "invoice", "voucher", "sales_person", "entry_type",
+    "delta", "reverses", "creation", "owner"
+]
+
+
+def build_ledger_entries(
+    invoice: str,
+    voucher: str,
+    delta: float,
+    sales_team: List[Dict[str, Any]],
+    entry_type: str,
+    timestamp: str
+) -> List[Dict[str, Any]]:
+    """
+    Build ledger rows for one commission movement, one per sales person.
+
+    Args:
+        invoice: Original Sales Invoice the commission belongs to
+        voucher: Document causing the movement (invoice or Credit Note)
+        delta: Commission movement (negative for Credit Notes)
+        sales_team: Sales Team rows of the original invoice
+        entry_type: One of the ENTRY_* constants
+        timestamp: Creation timestamp of the rows
+
+    Returns:
+        List of ledger row dicts (without name and owner)
+
+    Example:
+        >>> build_ledger_entries(
+        ...     "SI-001", "CN-001", -30000,
+        ...     [{"sales_person": "Andi", "allocated_percentage": 100}],
+        ...     ENTRY_CREDIT_NOTE, "2024-01-20 09:00:00"
+        ... )
+        [{'invoice': 'SI-001', 'voucher': 'CN-001', 'sales_person': 'Andi', ...}]
+    """
+    return [
+        {
+            "invoice": invoice,
+            "voucher": voucher,
+            "sales_person": sales_person,
+            "entry_type": entry_type,
+            "delta": amount,
+            "reverses": None,
+            "creation": timestamp
+        }
+        for sales_person, amount in split_amount_by_sales_team(delta, sales_team)
+        if amount
+    ]
+
+
+def build_reversal_entries(
+    ledger_rows: List[Dict[str, Any]],
+    timestamp: str
+) -> List[Dict[str, Any]]:
+    """
+    Build reversing rows for ledger rows that are not reversed yet.
+
+    Args:
+        ledger_rows: Existing ledger rows of the cancelled voucher
+        timestamp: Creation timestamp of the reversing rows
+
+    Returns:
+        List of reversing ledger row dicts (without name and owner)
+    """
+    reversed_names = {row["reverses"] for row in ledger_rows if row.get("reverses")}
+
+    return [
+        {
+            "invoice": row["invoice"],
+            "voucher": row["voucher"],
+            "sales_person": row["sales_person"],
+            "entry_type": ENTRY_REVERSAL,
+            "delta": -float(row["delta"]),
+            "reverses": row["name"],
+            "creation": timestamp
+        }
+        for row in ledger_rows
+        if row["entry_type"] != ENTRY_REVERSAL and row["name"] not in reversed_names
+    ]
+
+
+def summarize_ledger_entries(entries: List[Dict[str, Any]]) -> Dict[tuple, float]:
+    """
+    Sum ledger rows per (invoice, sales_person).
+
+    Args:
+        entries: Ledger row dicts
+
+    Returns:
+        Dict of (invoice, sales_person) -> summed delta
+    """
+    totals = {}
+
+    for entry in entries:
+        key = (entry["invoice"], entry["sales_person"])
+        totals[key] = round(totals.get(key, 0.0) + float(entry["delta"]), 2)
+
+    return totals
+
+
+def install_commission_ledger() -> None:
+    """
+    Create the ledger and totals tables if they do not exist.
+
+    DDL commits implicitly, so this runs at install time (after_migrate)
+    and never from document hooks. A totals table from before the period
+    columns is recreated and rebuilt from the ledger; otherwise re-running
+    is a no-op.
+    """
+    if frappe.db.table_exists(TOTALS_DOCTYPE, cached=False) and not frappe.db.has_column(
+        TOTALS_DOCTYPE, "posting_date"
+    ):
+        frappe.db.sql_ddl(f"DROP TABLE `{TOTALS_TABLE}`")
+        rebuild = True
+    else:
+        rebuild = False
+
+    frappe.db.sql_ddl(f"""
+        CREATE TABLE IF NOT EXISTS `{LEDGER_TABLE}` (
+            name VARCHAR(140) NOT NULL PRIMARY KEY,
+            invoice VARCHAR(140) NOT NULL,
+            voucher VARCHAR(140) NOT NULL,
+            sales_person VARCHAR(140) NOT NULL,
+            entry_type VARCHAR(20) NOT NULL,
+            delta DECIMAL(21, 9) NOT NULL DEFAULT 0,
+            reverses VARCHAR(140),
+            creation DATETIME(6) NOT NULL,
+            owner VARCHAR(140),
+            KEY invoice (invoice),
+            KEY voucher (voucher),
+            KEY sales_person (sales_person)
+        ) ENGINE=InnoDB
+    """)
+
+    frappe.db.sql_ddl(f"""
+        CREATE TABLE IF NOT EXISTS `{TOTALS_TABLE}` (
+            invoice VARCHAR(140) NOT NULL,
+            sales_person VARCHAR(140) NOT NULL,
+            posting_date DATE,
+            company VARCHAR(140),
+            total DECIMAL(21, 9) NOT NULL DEFAULT 0,
+            modified DATETIME(6) NOT NULL,
+            PRIMARY KEY (invoice, sales_person),
+            KEY sales_person (sales_person),
+            KEY period (posting_date, sales_person)
+        ) ENGINE=InnoDB
+    """)
+
+    if rebuild:
+        rebuild_commission_totals()
+        frappe.db.commit()
+
+
+def get_invoice_periods(invoices: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Posting date and company of many Sales Invoices in one query.
+
+    Args:
+        invoices: Sales Invoice names
+
+    Returns:
+        Dict of invoice -> dict with posting_date and company
+    """
+    if not invoices:
+        return {}
+
+    rows = frappe.get_all(
+        "Sales Invoice",
+        filters={"name": ["in", list(invoices)]},
+        fields=["name", "posting_date", "company"],
+        limit_page_length=0
+    )
+
+    return {row["name"]: {"posting_date": row["posting_date"], "company": row["company"]} for row in rows}
+
+
+def _insert_ledger_entries(entries: List[Dict[str, Any]]) -> None:
+    """
+    Append ledger rows and fold them into the materialized totals.
+
+    Both statements are multi-row, and the invoices' posting dates are read
+    with one more query, so one movement costs three queries regardless of
+    the Sales Team size.
+    """
+    if not entries:
+        return
+
+    owner = frappe.session.user
+    for entry in entries:
+        entry["name"] = frappe.generate_hash(length=12)
+        entry["owner"] = owner
+
+    row_placeholder = "(" + ", ".join(["%s"] * len(LEDGER_FIELDS)) + ")"
+    frappe.db.sql(f"""
+        INSERT INTO `{LEDGER_TABLE}` ({", ".join(LEDGER_FIELDS)})
+        VALUES {", ".join([row_placeholder] * len(entries))}
+    """, tuple(entry[field] for entry in entries for field in LEDGER_FIELDS))
+
+    totals = summarize_ledger_entries(entries)
+    periods = get_invoice_periods(sorted({invoice for invoice, _sales_person in totals}))
+    modified = entries[0]["creation"]
+    frappe.db.sql(f"""
+        INSERT INTO `{TOTALS_TABLE}` (invoice, sales_person, posting_date, company, total, modified)
+        VALUES {", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(totals))}
+        ON DUPLICATE KEY UPDATE
+            total = total + VALUES(total),
+            modified = VALUES(modified)
+    """, tuple(
+        value
+        for (invoice, sales_person), total in totals.items()
+        for value in (
+            invoice,
+            sales_person,
+            periods.get(invoice, {}).get("posting_date"),
+            periods.get(invoice, {}).get("company"),
+            total,
+            modified
+        )
+    ))
+
+
+def record_commission_movement(
+    invoice: str,
+    voucher: str,
+    delta: float,
+    entry_type: str,
+    sales_team: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Append a commission movement to the ledger and update the totals.
+
+    Args:
+        invoice: Original Sales Invoice the commission belongs to
+        voucher: Document causing the movement
+        delta: Commission movement (negative for Credit Notes)
+        entry_type: One of the ENTRY_* constants
+        sales_team: Sales Team rows of the invoice (fetched when omitted)
+
+    Returns:
+        List of inserted ledger rows
+    """
+    if sales_team is None:
+        sales_team = get_sales_team_rows([invoice])
+
+    entries = build_ledger_entries(
+        invoice,
+        voucher,
+        delta,
+        sales_team,
+        entry_type,
+        frappe.utils.now()
+    )
+    _insert_ledger_entries(entries)
+
+    return entries
+
+
+def reverse_commission_movements(voucher: str) -> List[Dict[str, Any]]:
+    """
+    Append reversing rows for every live movement posted by a voucher.
+
+    Args:
+        voucher: Cancelled Sales Invoice or Credit Note
+
+    Returns:
+        List of inserted reversing rows
+    """
+    return reverse_commission_movements_bulk([voucher])
+
+
+def reverse_commission_movements_bulk(vouchers: List[str]) -> List[Dict[str, Any]]:
+    """
+    Append reversing rows for the live movements of many vouchers at once.
+
+    Args:
+        vouchers: Cancelled Sales Invoices or Credit Notes
+
+    Returns:
+        List of inserted reversing rows
+    """
+    if not vouchers:
+        return []
+
+    ledger_rows = frappe.db.sql(f"""
+        SELECT name, invoice, voucher, sales_person, entry_type, delta, reverses
+        FROM `{LEDGER_TABLE}`
+        WHERE voucher IN %s
+    """, (tuple(vouchers),), as_dict=True)
+
+    entries = build_reversal_entries(ledger_rows, frappe.utils.now())
+    _insert_ledger_entries(entries)
+
+    return entries
+
+
+def record_invoice_commission(doc: Any) -> List[Dict[str, Any]]:
+    """
+    Record the commission of a submitted Sales Invoice (not a Credit Note).
+
+    Args:
+        doc: Sales Invoice document object
+
+    Returns:
+        List of inserted ledger rows
+    """
+    sales_team = [
+        {
+            "sales_person": member.sales_person,
+            "allocated_percentage": member.allocated_percentage
+        }
+        for member in (doc.get("sales_team") or [])
+    ]
+
+    return record_commission_movement(
+        doc.name,
+        doc.name,
+        doc.get("custom_total_komisi_sales", 0) or 0,
+        ENTRY_INVOICE,
+        sales_team
+    )
+
+
+def get_commission_totals(
+    sales_person: Optional[str] = None,
+    invoices: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Read materialized commission totals per invoice and sales person.
+
+    Args:
+        sales_person: Restrict to one sales person (optional)
+        invoices: Restrict to these invoices (optional)
+
+    Returns:
+        List of dicts with invoice, sales_person and total
+    """
+    conditions = []
+    values = {}
+
+    if sales_person:
+        conditions.append("sales_person = %(sales_person)s")
+        values["sales_person"] = sales_person
+
+    if invoices:
+        conditions.append("invoice IN %(invoices)s")
+        values["invoices"] = tuple(invoices)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    return frappe.db.sql(f"""
+        SELECT invoice, sales_person, total
+        FROM `{TOTALS_TABLE}`
+        {where}
+        ORDER BY sales_person, invoice
+    """, values, as_dict=True)
+
+
+def get_sales_person_totals() -> Dict[str, float]:
+    """
+    Commission total per sales person from the materialized totals.
+
+    Returns:
+        Dict of sales_person -> total commission
+    """
+    rows = frappe.db.sql(f"""
+        SELECT sales_person, SUM(total) AS total
+        FROM `{TOTALS_TABLE}`
+        GROUP BY sales_person
+    """, as_dict=True)
+
+    return {row.sales_person: round(float(row.total or 0), 2) for row in rows}
+
+
+def get_commission_report(
+    from_date: str,
+    to_date: str,
+    company: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Commission per sales person for a period from the materialized totals.
+
+    Reads the totals of invoices posted in the period with one range query
+    on (posting_date, sales_person); Credit Notes are included in the total
+    of the invoice they return against.
+
+    Args:
+        from_date: Period start (posting_date of the invoice)
+        to_date: Period end (inclusive)
+        company: Restrict to one company (optional)
+
+    Returns:
+        Dict of sales_person -> dict containing:
+            - total: Commission total for the sales person
+            - invoices: Dict of invoice -> commission
+    """
+    conditions = ""
+    if company:
+        conditions = "AND company = %(company)s"
+
+    rows = frappe.db.sql(f"""
+        SELECT invoice, sales_person, total
+        FROM `{TOTALS_TABLE}`
+        WHERE posting_date BETWEEN %(from_date)s AND %(to_date)s
+        {conditions}
+        ORDER BY sales_person, invoice
+    """, {"from_date": from_date, "to_date": to_date, "company": company}, as_dict=True)
+
+    report = {}
+
+    for row in rows:
+        sales_person = row["sales_person"] or UNASSIGNED_SALES_PERSON
+        amount = round(float(row["total"] or 0), 2)
+        if sales_person not in report:
+            report[sales_person] = {"total": 0.0, "invoices": {}}
+        report[sales_person]["invoices"][row["invoice"]] = amount
+        report[sales_person]["total"] = round(report[sales_person]["total"] + amount, 2)
+
+    return report
+
+
+def rebuild_commission_totals() -> int:
+    """
+    Rebuild the materialized totals from the ledger.
+
+    Returns:
+        Number of (invoice, sales_person) totals written
+    """
+    frappe.db.sql(f"DELETE FROM `{TOTALS_TABLE}`")
+    frappe.db.sql(f"""
+        INSERT INTO `{TOTALS_TABLE}` (invoice, sales_person, posting_date, company, total, modified)
+        SELECT ledger.invoice, ledger.sales_person, si.posting_date, si.company,
+            SUM(ledger.delta), MAX(ledger.creation)
+        FROM `{LEDGER_TABLE}` ledger
+        LEFT JOIN `tabSales Invoice` si ON si.name = ledger.invoice
+        GROUP BY ledger.invoice, ledger.sales_person, si.posting_date, si.company
+    """)
+
+    return frappe.db.sql(f"SELECT COUNT(*) FROM `{TOTALS_TABLE}`")[0][0]
+
+
+def seed_commission_ledger(
+    from_date: str,
+    to_date: str,
+    company: Optional[str] = None
+) -> int:
+    """
+    Write Opening rows for invoices submitted before the ledger existed.
+
+    Commission is recomputed from items (see commission_recompute); invoices
+    that already have ledger rows are skipped. Every voucher gets Opening rows
+    of its own - the invoice its item commission, each Credit Note its
+    (negative) adjustment - so cancelling a seeded Credit Note later reverses
+    its rows like those of a Credit Note posted through the hook.
+
+    Args:
+        from_date: Period start
+        to_date: Period end (inclusive)
+        company: Restrict to one company (optional)
+
+    Returns:
+        Number of invoices seeded
+    """
+    rows = get_commission_rows(from_date, to_date, company)
+    invoice_totals = aggregate_commission_rows(rows)
+    if not invoice_totals:
+        return 0
+
+    existing = {
+        row[0] for row in frappe.db.sql(f"""
+            SELECT DISTINCT invoice FROM `{LEDGER_TABLE}` WHERE invoice IN %s
+        """, (tuple(invoice_totals),))
+    }
+    pending = sorted(set(invoice_totals) - existing)
+
+    # Movement per voucher, as the hooks post it: the invoice first, then its
+    # Credit Notes deducted as absolute values
+    movements = {}
+    for row in sorted(rows, key=lambda row: (row["invoice"], bool(row["is_return"]), row["voucher"])):
+        commission = float(row["commission"] or 0)
+        delta = -abs(commission) if row["is_return"] else commission
+        movements.setdefault(row["invoice"], []).append((row["voucher"], delta))
+
+    teams = {}
+    for row in get_sales_team_rows(pending):
+        teams.setdefault(row["parent"], []).append(row)
+
+    timestamp = frappe.utils.now()
+    for start in range(0, len(pending), DEFAULT_CHUNK_SIZE):
+        entries = []
+        for invoice in pending[start:start + DEFAULT_CHUNK_SIZE]:
+            for voucher, delta in movements[invoice]:
+                entries.extend(build_ledger_entries(
+                    invoice,
+                    voucher,
+                    delta,
+                    teams.get(invoice, []),
+                    ENTRY_OPENING,
+                    timestamp
+                ))
+        _insert_ledger_entries(entries)
+
+    return len(pending)
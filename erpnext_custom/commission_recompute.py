@@ -0,0 +1,227 @@
+"""
+Batch Commission Recomputation Module
+
+This module recomputes custom_total_komisi_sales for every Sales Invoice in a
+period from the item-level custom_komisi_sales values of the invoice and all
+Credit Notes (is_return=1) raised against it. It is used to repair drift left
+by the per-document adjustment in credit_note_commission and to verify the
+materialized commission totals (the period report, get_commission_report,
+reads those totals; see commission_ledger).
+
+All invoice and Credit Note items are aggregated in one grouped query, and only
+invoices whose stored total differs from the recomputed total are written back,
+in bulk.
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.commission_recompute import recompute_commission_totals
+    >>> recompute_commission_totals("2024-01-01", "2024-01-31", dry_run=True)
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import frappe
+
+from .commission_calculator import (
+    UNASSIGNED_SALES_PERSON,
+    aggregate_commission_rows,
+    find_changed_totals,
+    split_amount_by_sales_team,
+    allocate_commission_to_sales_persons
+)
+
+
+# Number of invoices per bulk UPDATE / IN (...) query
+DEFAULT_CHUNK_SIZE = 500
+
+
+def get_commission_rows(
+    from_date: str,
+    to_date: str,
+    company: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetch item commission of every invoice in the period and its Credit Notes.
+
+    Runs one grouped query over `tabSales Invoice Item`. Credit Notes are
+    grouped under their original invoice whatever their own posting date,
+    but a return is never dated before its original, so vouchers posted
+    before the period start are skipped on the posting_date index instead
+    of joining every invoice ever submitted.
+
+    Args:
+        from_date: Period start (posting_date of the original invoice)
+        to_date: Period end (inclusive)
+        company: Restrict to one company (optional)
+
+    Returns:
+        List of rows as expected by aggregate_commission_rows
+    """
+    conditions = ""
+    if company:
+        conditions = "AND orig.company = %(company)s"
+
+    return frappe.db.sql(f"""
+        SELECT
+            orig.name AS invoice,
+            si.name AS voucher,
+            si.is_return AS is_return,
+            SUM(IFNULL(sii.custom_komisi_sales, 0)) AS commission,
+            IFNULL(orig.custom_total_komisi_sales, 0) AS stored_total
+        FROM `tabSales Invoice` si
+        INNER JOIN `tabSales Invoice` orig
+            ON orig.name = IF(si.is_return = 1, si.return_against, si.name)
+        INNER JOIN `tabSales Invoice Item` sii
+            ON sii.parent = si.name AND sii.parenttype = 'Sales Invoice'
+        WHERE si.docstatus = 1
+        AND si.posting_date >= %(from_date)s
+        AND orig.docstatus = 1
+        AND orig.is_return = 0
+        AND orig.posting_date BETWEEN %(from_date)s AND %(to_date)s
+        {conditions}
+        GROUP BY orig.name, si.name, si.is_return, orig.custom_total_komisi_sales
+    """, {"from_date": from_date, "to_date": to_date, "company": company}, as_dict=True)
+
+
+def get_sales_team_rows(
+    invoice_names: List[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> List[Dict[str, Any]]:
+    """
+    Fetch Sales Team rows for many invoices, one query per chunk.
+
+    Args:
+        invoice_names: Sales Invoice names
+        chunk_size: Number of invoices per query
+
+    Returns:
+        List of dicts with parent, sales_person and allocated_percentage
+    """
+    rows = []
+
+    for start in range(0, len(invoice_names), chunk_size):
+        chunk = invoice_names[start:start + chunk_size]
+        rows.extend(frappe.get_all(
+            "Sales Team",
+            filters={"parenttype": "Sales Invoice", "parent": ["in", chunk]},
+            fields=["parent", "sales_person", "allocated_percentage"],
+            order_by="parent asc, idx asc",
+            limit_page_length=0
+        ))
+
+    return rows
+
+
+def write_commission_totals(
+    changes: List[Tuple[str, float]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    Write recomputed totals back with one UPDATE per chunk.
+
+    Args:
+        changes: List of (invoice, total) tuples from find_changed_totals
+        chunk_size: Number of invoices per UPDATE statement
+
+    Returns:
+        Number of invoices updated
+    """
+    modified = frappe.utils.now()
+
+    for start in range(0, len(changes), chunk_size):
+        chunk = changes[start:start + chunk_size]
+
+        cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+        placeholders = ", ".join(["%s"] * len(chunk))
+        values = [value for change in chunk for value in change]
+        values.append(modified)
+        values.extend(invoice for invoice, _total in chunk)
+
+        frappe.db.sql(f"""
+            UPDATE `tabSales Invoice`
+            SET custom_total_komisi_sales = CASE name {cases} END,
+                modified = %s
+            WHERE name IN ({placeholders})
+        """, tuple(values))
+
+    return len(changes)
+
+
+def recompute_commission_totals(
+    from_date: str,
+    to_date: str,
+    company: Optional[str] = None,
+    dry_run: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Recompute commission totals for every invoice and sales person in a period.
+
+    Process:
+    1. Aggregate invoice and Credit Note item commission in one grouped query
+    2. Compare recomputed totals with custom_total_komisi_sales
+    3. Write changed totals back in bulk (skipped when dry_run)
+    4. Allocate totals to sales persons for the commission report
+
+    Args:
+        from_date: Period start (posting_date of the original invoice)
+        to_date: Period end (inclusive)
+        company: Restrict to one company (optional)
+        dry_run: Only report drift, do not write
+        chunk_size: Number of invoices per bulk query
+
+    Returns:
+        Dict containing:
+            - invoices: Dict of invoice -> recomputed values
+            - changes: List of (invoice, total) tuples that drifted
+            - updated: Number of invoices written
+            - sales_persons: Commission report per sales person
+    """
+    invoice_totals = aggregate_commission_rows(
+        get_commission_rows(from_date, to_date, company)
+    )
+    changes = find_changed_totals(invoice_totals)
+
+    updated = 0
+    if changes and not dry_run:
+        updated = write_commission_totals(changes, chunk_size)
+        frappe.logger().info(
+            f"Commission totals recomputed for {from_date} - {to_date}: "
+            f"{updated} of {len(invoice_totals)} invoices updated"
+        )
+
+    sales_team_rows = get_sales_team_rows(sorted(invoice_totals), chunk_size)
+
+    return {
+        "invoices": invoice_totals,
+        "changes": changes,
+        "updated": updated,
+        "sales_persons": allocate_commission_to_sales_persons(
+            invoice_totals,
+            sales_team_rows
+        )
+    }
+
+
+def get_commission_report(
+    from_date: str,
+    to_date: str,
+    company: Optional[str] = None
+) -> Dict[str, Dict[str, float]]:
+    """
+    Commission per sales person for a period, from the materialized totals.
+
+    Use recompute_commission_totals(..., dry_run=True) to recompute the same
+    figures from items, e.g. to verify the totals.
+
+    Args:
+        from_date: Period start
+        to_date: Period end (inclusive)
+        company: Restrict to one company (optional)
+
+    Returns:
+        Dict of sales_person -> dict with total and per-invoice commission
+    """
+    # commission_ledger imports this module
+    from .commission_ledger import get_commission_report as get_report_from_totals
+
+    return get_report_from_totals(from_date, to_date, company)
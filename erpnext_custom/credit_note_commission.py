@@ -5,6 +5,16 @@ This module handles commission adjustments when Credit Notes (Sales Invoice retu
 are submitted or cancelled. It automatically updates the custom_total_komisi_sales 
 field on the original Sales Invoice.
 
+The adjustment is applied as an atomic in-database increment, so the original
+invoice is never loaded or re-saved and concurrent Credit Notes cannot lose
+an update (each increment holds the row lock until commit). Every
+adjustment is also appended to the commission ledger (see commission_ledger),
+and cancellation appends reversing rows instead of rewriting history.
+
+A failing adjustment does not block the Credit Note, but the hook first rolls
+back to a savepoint taken before the increment, so the invoice total and the
+ledger never drift apart: either both are written or neither is.
+
 Requirements: 7.3, 7.4
 
 Usage:
@@ -22,6 +32,79 @@ from typing import Any, Dict
 import frappe
 from frappe import _
 
+from .commission_calculator import (
+    calculate_commission_adjustment,
+    validate_commission_adjustment
+)
+from .commission_ledger import (
+    ENTRY_CREDIT_NOTE,
+    record_commission_movement,
+    reverse_commission_movements
+)
+from .hook_metrics import hook_timer, STAGE_PERSIST, STAGE_COMMISSION, STAGE_COMMENT
+
+
+# Savepoint the hooks roll back to when the adjustment fails part way
+ADJUSTMENT_SAVEPOINT = "credit_note_commission"
+
+
+def apply_commission_delta(invoice_name: str, delta: float) -> Dict[str, float]:
+    """
+    Add delta to custom_total_komisi_sales of a submitted Sales Invoice.
+    
+    The update is a single in-database increment; the row lock it takes
+    serializes concurrent Credit Notes, so no version check is needed. The
+    document is never loaded, validated or re-saved, and its cached copy is
+    dropped so later reads see the new total.
+    
+    Args:
+        invoice_name: Sales Invoice to adjust
+        delta: Amount added to the commission (negative to deduct)
+    
+    Returns:
+        Dict containing:
+            - original_commission: Commission before the update
+            - new_commission: Commission after the update
+    
+    Raises:
+        frappe.DoesNotExistError: If the invoice does not exist
+    """
+    frappe.db.sql("""
+        UPDATE `tabSales Invoice`
+        SET custom_total_komisi_sales = IFNULL(custom_total_komisi_sales, 0) + %s,
+            modified = %s
+        WHERE name = %s
+    """, (delta, frappe.utils.now(), invoice_name))
+    
+    # Read back under the row lock the update holds
+    new_commission = frappe.db.get_value("Sales Invoice", invoice_name, "custom_total_komisi_sales")
+    if new_commission is None:
+        raise frappe.DoesNotExistError(f"Sales Invoice {invoice_name} not found")
+    
+    frappe.clear_document_cache("Sales Invoice", invoice_name)
+    
+    return {
+        "original_commission": round(new_commission - delta, 2),
+        "new_commission": round(new_commission, 2)
+    }
+
+
+def add_invoice_comment(invoice_name: str, content: str) -> None:
+    """
+    Add an Info comment to a Sales Invoice without loading the invoice.
+    
+    Args:
+        invoice_name: Sales Invoice name
+        content: Comment text
+    """
+    frappe.get_doc({
+        "doctype": "Comment",
+        "comment_type": "Info",
+        "reference_doctype": "Sales Invoice",
+        "reference_name": invoice_name,
+        "content": content
+    }).insert(ignore_permissions=True)
+
 
 def on_credit_note_submit(doc: Any, method: str = None) -> None:
     """
@@ -32,7 +115,7 @@ def on_credit_note_submit(doc: Any, method: str = None) -> None:
     1. Check if this is a Credit Note (is_return=1)
     2. Get the original Sales Invoice (return_against)
     3. Calculate commission adjustment from Credit Note items
-    4. Update custom_total_komisi_sales on original invoice
+    4. Decrement custom_total_komisi_sales on original invoice in the database
     
     Args:
         doc: Sales Invoice document object
@@ -40,76 +123,91 @@ def on_credit_note_submit(doc: Any, method: str = None) -> None:
     
     Requirements: 7.3, 7.4
     """
-    try:
-        # Check if this is a Credit Note
-        if not doc.is_return or doc.is_return != 1:
-            # Not a Credit Note, skip commission adjustment
-            return
-        
-        # Get original Sales Invoice reference
-        original_invoice_name = doc.return_against
-        if not original_invoice_name:
+    with hook_timer("on_credit_note_submit") as timer:
+        savepoint = None
+        try:
+            # Check if this is a Credit Note
+            if not doc.is_return or doc.is_return != 1:
+                # Not a Credit Note, skip commission adjustment
+                return
+            
+            # Get original Sales Invoice reference
+            original_invoice_name = doc.return_against
+            if not original_invoice_name:
+                frappe.log_error(
+                    message=f"Credit Note {doc.name} has no return_against reference",
+                    title="Commission Adjustment Error"
+                )
+                return
+            
+            # Calculate commission adjustment from Credit Note
+            credit_note_commission = doc.get("custom_total_komisi_sales", 0)
+            
+            # Credit Note commission should be negative
+            # We subtract it from original (which adds back the negative value)
+            savepoint = ADJUSTMENT_SAVEPOINT
+            frappe.db.savepoint(savepoint)
+            with timer.stage(STAGE_PERSIST):
+                try:
+                    update = apply_commission_delta(
+                        original_invoice_name,
+                        -abs(credit_note_commission)
+                    )
+                except frappe.DoesNotExistError:
+                    frappe.throw(
+                        _(f"Original Sales Invoice {original_invoice_name} not found")
+                    )
+                    return
+            
+            original_commission = update["original_commission"]
+            adjusted_commission = update["new_commission"]
+            
+            # Append the adjustment to the commission ledger
+            with timer.stage(STAGE_COMMISSION):
+                record_commission_movement(
+                    original_invoice_name,
+                    doc.name,
+                    -abs(credit_note_commission),
+                    ENTRY_CREDIT_NOTE
+                )
+            
+            # Log the adjustment
+            frappe.logger().info(
+                f"Commission adjusted for Sales Invoice {original_invoice_name}: "
+                f"Original={original_commission}, "
+                f"Credit Note={credit_note_commission}, "
+                f"Adjusted={adjusted_commission}"
+            )
+            
+            # Add comment to original invoice for audit trail
+            with timer.stage(STAGE_COMMENT):
+                add_invoice_comment(
+                    original_invoice_name,
+                    f"Commission adjusted by Credit Note {doc.name}: "
+                    f"{original_commission} - {abs(credit_note_commission)} = {adjusted_commission}"
+                )
+                
+                # Add comment to Credit Note
+                doc.add_comment(
+                    "Info",
+                    f"Commission adjustment applied to {original_invoice_name}: "
+                    f"Reduced by {abs(credit_note_commission)}"
+                )
+            
+        except Exception as e:
+            # Undo the increment together with any ledger rows
+            if savepoint:
+                frappe.db.rollback(save_point=savepoint)
             frappe.log_error(
-                message=f"Credit Note {doc.name} has no return_against reference",
-                title="Commission Adjustment Error"
+                message=str(e),
+                title=f"Commission Adjustment Error - Credit Note {doc.name}"
             )
-            return
-        
-        # Get original Sales Invoice
-        try:
-            original_invoice = frappe.get_doc("Sales Invoice", original_invoice_name)
-        except frappe.DoesNotExistError:
-            frappe.throw(
-                _(f"Original Sales Invoice {original_invoice_name} not found")
+            # Don't throw error to prevent blocking Credit Note submission
+            # Just log the error for manual review
+            frappe.msgprint(
+                _(f"Warning: Commission adjustment failed: {str(e)}"),
+                indicator="orange"
             )
-            return
-        
-        # Calculate commission adjustment from Credit Note
-        credit_note_commission = doc.get("custom_total_komisi_sales", 0)
-        
-        # Credit Note commission should be negative
-        # We subtract it from original (which adds back the negative value)
-        original_commission = original_invoice.get("custom_total_komisi_sales", 0)
-        adjusted_commission = original_commission - abs(credit_note_commission)
-        
-        # Update original invoice commission
-        original_invoice.custom_total_komisi_sales = adjusted_commission
-        original_invoice.flags.ignore_validate_update_after_submit = True
-        original_invoice.save(ignore_permissions=True)
-        
-        # Log the adjustment
-        frappe.logger().info(
-            f"Commission adjusted for Sales Invoice {original_invoice_name}: "
-            f"Original={original_commission}, "
-            f"Credit Note={credit_note_commission}, "
-            f"Adjusted={adjusted_commission}"
-        )
-        
-        # Add comment to original invoice for audit trail
-        original_invoice.add_comment(
-            "Info",
-            f"Commission adjusted by Credit Note {doc.name}: "
-            f"{original_commission} - {abs(credit_note_commission)} = {adjusted_commission}"
-        )
-        
-        # Add comment to Credit Note
-        doc.add_comment(
-            "Info",
-            f"Commission adjustment applied to {original_invoice_name}: "
-            f"Reduced by {abs(credit_note_commission)}"
-        )
-        
-    except Exception as e:
-        frappe.log_error(
-            message=str(e),
-            title=f"Commission Adjustment Error - Credit Note {doc.name}"
-        )
-        # Don't throw error to prevent blocking Credit Note submission
-        # Just log the error for manual review
-        frappe.msgprint(
-            _(f"Warning: Commission adjustment failed: {str(e)}"),
-            indicator="orange"
-        )
 
 
 def on_credit_note_cancel(doc: Any, method: str = None) -> None:
@@ -121,7 +219,7 @@ def on_credit_note_cancel(doc: Any, method: str = None) -> None:
     1. Check if this is a Credit Note (is_return=1)
     2. Get the original Sales Invoice (return_against)
     3. Calculate commission reversal (add back the commission)
-    4. Update custom_total_komisi_sales on original invoice
+    4. Increment custom_total_komisi_sales on original invoice in the database
     
     Args:
         doc: Sales Invoice document object
@@ -129,157 +227,82 @@ def on_credit_note_cancel(doc: Any, method: str = None) -> None:
     
     Requirements: 7.3, 7.4
     """
-    try:
-        # Check if this is a Credit Note
-        if not doc.is_return or doc.is_return != 1:
-            # Not a Credit Note, skip commission adjustment
-            return
-        
-        # Get original Sales Invoice reference
-        original_invoice_name = doc.return_against
-        if not original_invoice_name:
+    with hook_timer("on_credit_note_cancel") as timer:
+        savepoint = None
+        try:
+            # Check if this is a Credit Note
+            if not doc.is_return or doc.is_return != 1:
+                # Not a Credit Note, skip commission adjustment
+                return
+            
+            # Get original Sales Invoice reference
+            original_invoice_name = doc.return_against
+            if not original_invoice_name:
+                frappe.log_error(
+                    message=f"Credit Note {doc.name} has no return_against reference",
+                    title="Commission Reversal Error"
+                )
+                return
+            
+            # Calculate commission reversal from Credit Note
+            credit_note_commission = doc.get("custom_total_komisi_sales", 0)
+            
+            # Reverse the adjustment: add back the commission that was deducted
+            savepoint = ADJUSTMENT_SAVEPOINT
+            frappe.db.savepoint(savepoint)
+            with timer.stage(STAGE_PERSIST):
+                try:
+                    update = apply_commission_delta(
+                        original_invoice_name,
+                        abs(credit_note_commission)
+                    )
+                except frappe.DoesNotExistError:
+                    frappe.throw(
+                        _(f"Original Sales Invoice {original_invoice_name} not found")
+                    )
+                    return
+            
+            original_commission = update["original_commission"]
+            reversed_commission = update["new_commission"]
+            
+            # Append reversing rows to the commission ledger
+            with timer.stage(STAGE_COMMISSION):
+                reverse_commission_movements(doc.name)
+            
+            # Log the reversal
+            frappe.logger().info(
+                f"Commission reversed for Sales Invoice {original_invoice_name}: "
+                f"Current={original_commission}, "
+                f"Credit Note={credit_note_commission}, "
+                f"Reversed={reversed_commission}"
+            )
+            
+            # Add comment to original invoice for audit trail
+            with timer.stage(STAGE_COMMENT):
+                add_invoice_comment(
+                    original_invoice_name,
+                    f"Commission reversal by Credit Note {doc.name} cancellation: "
+                    f"{original_commission} + {abs(credit_note_commission)} = {reversed_commission}"
+                )
+                
+                # Add comment to Credit Note
+                doc.add_comment(
+                    "Info",
+                    f"Commission reversal applied to {original_invoice_name}: "
+                    f"Added back {abs(credit_note_commission)}"
+                )
+            
+        except Exception as e:
+            # Undo the increment together with any reversing ledger rows
+            if savepoint:
+                frappe.db.rollback(save_point=savepoint)
             frappe.log_error(
-                message=f"Credit Note {doc.name} has no return_against reference",
-                title="Commission Reversal Error"
+                message=str(e),
+                title=f"Commission Reversal Error - Credit Note {doc.name}"
             )
-            return
-        
-        # Get original Sales Invoice
-        try:
-            original_invoice = frappe.get_doc("Sales Invoice", original_invoice_name)
-        except frappe.DoesNotExistError:
-            frappe.throw(
-                _(f"Original Sales Invoice {original_invoice_name} not found")
+            # Don't throw error to prevent blocking Credit Note cancellation
+            # Just log the error for manual review
+            frappe.msgprint(
+                _(f"Warning: Commission reversal failed: {str(e)}"),
+                indicator="orange"
             )
-            return
-        
-        # Calculate commission reversal from Credit Note
-        credit_note_commission = doc.get("custom_total_komisi_sales", 0)
-        
-        # Reverse the adjustment: add back the commission that was deducted
-        original_commission = original_invoice.get("custom_total_komisi_sales", 0)
-        reversed_commission = original_commission + abs(credit_note_commission)
-        
-        # Update original invoice commission
-        original_invoice.custom_total_komisi_sales = reversed_commission
-        original_invoice.flags.ignore_validate_update_after_submit = True
-        original_invoice.save(ignore_permissions=True)
-        
-        # Log the reversal
-        frappe.logger().info(
-            f"Commission reversed for Sales Invoice {original_invoice_name}: "
-            f"Current={original_commission}, "
-            f"Credit Note={credit_note_commission}, "
-            f"Reversed={reversed_commission}"
-        )
-        
-        # Add comment to original invoice for audit trail
-        original_invoice.add_comment(
-            "Info",
-            f"Commission reversal by Credit Note {doc.name} cancellation: "
-            f"{original_commission} + {abs(credit_note_commission)} = {reversed_commission}"
-        )
-        
-        # Add comment to Credit Note
-        doc.add_comment(
-            "Info",
-            f"Commission reversal applied to {original_invoice_name}: "
-            f"Added back {abs(credit_note_commission)}"
-        )
-        
-    except Exception as e:
-        frappe.log_error(
-            message=str(e),
-            title=f"Commission Reversal Error - Credit Note {doc.name}"
-        )
-        # Don't throw error to prevent blocking Credit Note cancellation
-        # Just log the error for manual review
-        frappe.msgprint(
-            _(f"Warning: Commission reversal failed: {str(e)}"),
-            indicator="orange"
-        )
-
-
-def calculate_commission_adjustment(credit_note: Any) -> float:
-    """
-    Calculate total commission adjustment from Credit Note items.
-    
-    Args:
-        credit_note: Credit Note (Sales Invoice) document
-    
-    Returns:
-        Total commission adjustment (negative value)
-    
-    Example:
-        >>> credit_note = frappe.get_doc("Sales Invoice", "CN-2024-00001")
-        >>> adjustment = calculate_commission_adjustment(credit_note)
-        >>> adjustment
-        -50000.0
-    """
-    total_commission = 0.0
-    
-    if hasattr(credit_note, "items") and credit_note.items:
-        for item in credit_note.items:
-            item_commission = item.get("custom_komisi_sales", 0)
-            total_commission += item_commission
-    
-    return round(total_commission, 2)
-
-
-def validate_commission_adjustment(
-    original_invoice: Any,
-    credit_note: Any
-) -> Dict[str, Any]:
-    """
-    Validate commission adjustment before applying.
-    
-    Args:
-        original_invoice: Original Sales Invoice document
-        credit_note: Credit Note document
-    
-    Returns:
-        Dict with validation result:
-            - valid: Boolean
-            - message: Error message if invalid
-            - original_commission: Original commission value
-            - adjustment: Commission adjustment value
-            - new_commission: New commission after adjustment
-    """
-    result = {
-        "valid": True,
-        "message": "",
-        "original_commission": 0.0,
-        "adjustment": 0.0,
-        "new_commission": 0.0
-    }
-    
-    # Get original commission
-    original_commission = original_invoice.get("custom_total_komisi_sales", 0)
-    result["original_commission"] = original_commission
-    
-    # Get Credit Note commission
-    credit_note_commission = credit_note.get("custom_total_komisi_sales", 0)
-    result["adjustment"] = credit_note_commission
-    
-    # Calculate new commission
-    new_commission = original_commission - abs(credit_note_commission)
-    result["new_commission"] = new_commission
-    
-    # Validate: new commission should not be negative
-    if new_commission < 0:
-        result["valid"] = False
-        result["message"] = (
-            f"Commission adjustment would result in negative commission: "
-            f"{original_commission} - {abs(credit_note_commission)} = {new_commission}"
-        )
-        return result
-    
-    # Validate: Credit Note commission should be negative or zero
-    if credit_note_commission > 0:
-        result["valid"] = False
-        result["message"] = (
-            f"Credit Note commission should be negative or zero, got: {credit_note_commission}"
-        )
-        return result
-    
-    return result
@@ -0,0 +1,91 @@
+"""
+Document Mapping Module
+
+This module provides a read-only mapping view of a frappe Document, so the
+calculators and posting functions, which read invoices as dicts
+(invoice["name"], invoice.get("taxes", []), tax_row.get("tax_amount", 0)),
+can read a document directly instead of a copy of its fields.
+
+Nothing is copied: every lookup reads the document, and child tables are
+sequences of views of their rows. Fields that are None (not set on the
+document) count as missing, so get() falls back to its default as it does
+for a dict without the key.
+
+This module does not need frappe; anything with get(key) works as the
+document, including plain dicts.
+
+Usage:
+    from erpnext_custom.document_mapping import DocumentMapping
+
+    gl_result = post_sales_invoice_gl_entry(DocumentMapping(doc), str(doc.posting_date))
+"""
+
+from collections.abc import Mapping, Sequence
+from typing import Any, Iterator
+
+
+# Attributes of a frappe Document that are not fields
+INTERNAL_ATTRIBUTES = {"flags", "dont_update_if_missing"}
+
+
+class DocumentMapping(Mapping):
+    """
+    Read-only mapping of a document's fields.
+
+    Child tables (list fields) read as DocumentRows.
+    """
+
+    __slots__ = ("_doc",)
+
+    def __init__(self, doc: Any):
+        self._doc = doc
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._doc.get(key)
+        if value is None:
+            raise KeyError(key)
+        return DocumentRows(value) if isinstance(value, list) else value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._doc.get(key)
+        if value is None:
+            return default
+        return DocumentRows(value) if isinstance(value, list) else value
+
+    def __iter__(self) -> Iterator[str]:
+        fields = self._doc if isinstance(self._doc, Mapping) else vars(self._doc)
+        for key in fields:
+            if key.startswith("_") or key in INTERNAL_ATTRIBUTES:
+                continue
+            if self._doc.get(key) is not None:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"DocumentMapping({self._doc!r})"
+
+
+class DocumentRows(Sequence):
+    """Read-only sequence of DocumentMapping views of a child table's rows"""
+
+    __slots__ = ("_rows",)
+
+    def __init__(self, rows: list):
+        self._rows = rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return DocumentRows(self._rows[index])
+        return DocumentMapping(self._rows[index])
+
+    def __iter__(self) -> Iterator[DocumentMapping]:
+        for row in self._rows:
+            yield DocumentMapping(row)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __repr__(self) -> str:
+        return f"DocumentRows({self._rows!r})"
@@ -0,0 +1,63 @@
+"""
+Employee Naming Series Module
+
+This module moves the Employee naming series counter (HR-EMP-) of the
+connected site to the highest Employee number in use, so the next Employee
+does not collide with an existing one (e.g. after an import or restore).
+
+The audit itself is naming_series_audit.audit_naming_series restricted to the
+HR-EMP- prefix: one index range read per DocType, no scan of Employee names,
+and the same counter convention as every other series (the counter is the
+last number used, never moved back).
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.employee_naming_series import fix_employee_naming_series
+    >>> fix_employee_naming_series()
+
+    All sites in parallel:
+    python3 scripts/fix_all_sites_naming_series.py --all --workers 4 --timeout 600
+"""
+
+from typing import Any, Dict
+import frappe
+
+from .naming_series_audit import audit_naming_series
+
+
+EMPLOYEE_SERIES_PREFIX = "HR-EMP-"
+
+# Digits of the Employee number (HR-EMP-00001)
+EMPLOYEE_NUMBER_DIGITS = 5
+
+
+def fix_employee_naming_series() -> Dict[str, Any]:
+    """
+    Set the Employee naming series counter of the connected site.
+
+    Returns:
+        Dict containing:
+            - site: Site name
+            - success: True
+            - total_employees: Number of Employees
+            - highest_number: Highest HR-EMP- number in use (0 if none)
+            - previous_counter: Counter before the fix (None if not set or
+              no Employee uses the series)
+            - counter: Counter after the fix
+            - next_id: Name the next Employee will get
+    """
+    report = audit_naming_series(apply=True, prefixes=[EMPLOYEE_SERIES_PREFIX], all_series=False)
+    frappe.db.commit()
+
+    series = report["series"][0] if report["series"] else {"max_used": 0, "current": None}
+    counter = max(series["max_used"], series["current"] or 0)
+
+    return {
+        'site': frappe.local.site,
+        'success': True,
+        'total_employees': frappe.db.count('Employee'),
+        'highest_number': series["max_used"],
+        'previous_counter': series["current"],
+        'counter': counter,
+        'next_id': f"{EMPLOYEE_SERIES_PREFIX}{str(counter + 1).zfill(EMPLOYEE_NUMBER_DIGITS)}"
+    }
@@ -0,0 +1,544 @@
+"""
+GL Audit Module
+
+This module audits posted GL Entries in bulk:
+- Net-effect audit: every cancelled voucher (original + reversal rows) nets
+  to zero per account
+- Ledger integrity audit: unbalanced vouchers, vouchers posted twice,
+  reversals without originals, cancelled documents with live GL rows and
+  invoice grand-total mismatches
+
+Balances are summed by the database (GROUP BY), and vouchers or posting-date
+windows are walked in chunks, so memory use is bounded by the chunk size
+regardless of the period audited.
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.gl_audit import audit_cancellation_net_effect
+    >>> audit_cancellation_net_effect("2024-01-01", "2024-12-31")
+
+    All sites in parallel:
+    python3 scripts/audit_ledger_integrity.py --from 2024-01-01 --to 2024-12-31
+
+    The net-effect audit is scheduled weekly over the current fiscal year via
+    SCHEDULER_EVENTS in erpnext_custom.hooks.
+"""
+
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import frappe
+
+from .invoice_cancellation import iter_unbalanced_vouchers
+from .gl_entry_sales import validate_sales_invoice_for_gl_posting
+from .gl_entry_purchase import validate_purchase_invoice_for_gl_posting
+
+
+# Vouchers per keyset page
+DEFAULT_CHUNK_SIZE = 1000
+
+# Unbalanced vouchers kept in the returned report (all are counted)
+MAX_REPORTED_VOUCHERS = 500
+
+# Posting-date window per integrity query
+DEFAULT_CHUNK_DAYS = 7
+
+# Invoices per grand-total validation chunk
+DEFAULT_INVOICE_CHUNK_SIZE = 500
+
+# Integrity checks
+CHECK_UNBALANCED = "unbalanced_voucher"
+CHECK_DUPLICATE = "duplicate_posting"
+CHECK_ORPHAN_REVERSAL = "reversal_without_original"
+CHECK_CANCELLED_LIVE = "cancelled_document_with_live_gl"
+CHECK_GRAND_TOTAL = "grand_total_mismatch"
+
+INTEGRITY_CHECKS = [
+    CHECK_UNBALANCED,
+    CHECK_DUPLICATE,
+    CHECK_ORPHAN_REVERSAL,
+    CHECK_CANCELLED_LIVE,
+    CHECK_GRAND_TOTAL
+]
+
+# Invoice doctypes audited for cancelled documents and grand totals
+INVOICE_DOCTYPES = {
+    "Sales Invoice": {
+        "party_field": "customer",
+        "taxes_doctype": "Sales Taxes and Charges",
+        "validate": validate_sales_invoice_for_gl_posting
+    },
+    "Purchase Invoice": {
+        "party_field": "supplier",
+        "taxes_doctype": "Purchase Taxes and Charges",
+        "validate": validate_purchase_invoice_for_gl_posting
+    }
+}
+
+
+class AuditTimeBudgetExceeded(Exception):
+    """Exception raised when an audit runs past its deadline"""
+    pass
+
+
+def get_cancelled_voucher_page(
+    from_date: str,
+    to_date: str,
+    after: Optional[Tuple[str, str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> List[Tuple[str, str]]:
+    """
+    Fetch the next page of cancelled vouchers posted in the period.
+
+    Args:
+        from_date: Period start (posting_date of the voucher rows)
+        to_date: Period end (inclusive)
+        after: Last (voucher_type, voucher_no) of the previous page
+        chunk_size: Vouchers per page
+
+    Returns:
+        List of (voucher_type, voucher_no) tuples in key order
+    """
+    conditions = ""
+    values = {"from_date": from_date, "to_date": to_date, "limit": chunk_size}
+
+    if after:
+        conditions = "AND (voucher_type, voucher_no) > (%(after_type)s, %(after_no)s)"
+        values.update({"after_type": after[0], "after_no": after[1]})
+
+    rows = frappe.db.sql(f"""
+        SELECT DISTINCT voucher_type, voucher_no
+        FROM `tabGL Entry`
+        WHERE is_cancelled = 1
+        AND posting_date BETWEEN %(from_date)s AND %(to_date)s
+        {conditions}
+        ORDER BY voucher_type, voucher_no
+        LIMIT %(limit)s
+    """, values)
+
+    return [(row[0], row[1]) for row in rows]
+
+
+def get_voucher_account_nets(vouchers: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Sum debit - credit per voucher and account for a page of vouchers.
+
+    All rows of the vouchers are included, whatever their posting date, so
+    reversals posted after the period are netted against their originals.
+
+    Args:
+        vouchers: (voucher_type, voucher_no) tuples
+
+    Returns:
+        Rows with voucher_type, voucher_no, account and net, grouped by voucher
+    """
+    if not vouchers:
+        return []
+
+    by_type = {}
+    for voucher_type, voucher_no in vouchers:
+        by_type.setdefault(voucher_type, []).append(voucher_no)
+
+    rows = []
+    for voucher_type in sorted(by_type):
+        rows.extend(frappe.db.sql("""
+            SELECT voucher_type, voucher_no, account, SUM(debit) - SUM(credit) AS net
+            FROM `tabGL Entry`
+            WHERE voucher_type = %s
+            AND voucher_no IN %s
+            GROUP BY voucher_type, voucher_no, account
+            ORDER BY voucher_no, account
+        """, (voucher_type, tuple(by_type[voucher_type])), as_dict=True))
+
+    return rows
+
+
+def stream_cancelled_voucher_nets(
+    from_date: str,
+    to_date: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream net balances per account of every cancelled voucher in a period.
+
+    Args:
+        from_date: Period start
+        to_date: Period end (inclusive)
+        chunk_size: Vouchers per page
+
+    Yields:
+        Rows with voucher_type, voucher_no, account and net, grouped by voucher
+    """
+    after = None
+
+    while True:
+        vouchers = get_cancelled_voucher_page(from_date, to_date, after, chunk_size)
+        if not vouchers:
+            return
+
+        yield from get_voucher_account_nets(vouchers)
+
+        if len(vouchers) < chunk_size:
+            return
+        after = vouchers[-1]
+
+
+def audit_cancellation_net_effect(
+    from_date: str,
+    to_date: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Report every cancelled voucher whose original + reversal is not zero.
+
+    Args:
+        from_date: Period start
+        to_date: Period end (inclusive)
+        chunk_size: Vouchers per page
+
+    Returns:
+        Dict containing:
+            - is_valid: Boolean (every cancelled voucher nets to zero)
+            - unbalanced_count: Number of unbalanced vouchers
+            - unbalanced: Reports of up to MAX_REPORTED_VOUCHERS vouchers
+    """
+    unbalanced = []
+    unbalanced_count = 0
+
+    for report in iter_unbalanced_vouchers(
+        stream_cancelled_voucher_nets(from_date, to_date, chunk_size)
+    ):
+        unbalanced_count += 1
+        if len(unbalanced) < MAX_REPORTED_VOUCHERS:
+            unbalanced.append(report)
+
+    return {
+        "is_valid": unbalanced_count == 0,
+        "unbalanced_count": unbalanced_count,
+        "unbalanced": unbalanced
+    }
+
+
+def run_scheduled_net_effect_audit() -> None:
+    """
+    Scheduler entry point: audit the current fiscal year.
+
+    Unbalanced vouchers are written to the Error Log for review.
+    """
+    from erpnext.accounts.utils import get_fiscal_year
+
+    _fiscal_year, from_date, to_date = get_fiscal_year(frappe.utils.today())[:3]
+    result = audit_cancellation_net_effect(str(from_date), str(to_date))
+
+    if result["is_valid"]:
+        frappe.logger().info(
+            f"GL net-effect audit {from_date} - {to_date}: all cancelled vouchers net to zero"
+        )
+        return
+
+    lines = [
+        f"{report['voucher_type']} {report['voucher_no']}: {'; '.join(report['errors'])}"
+        for report in result["unbalanced"]
+    ]
+    frappe.log_error(
+        message="\n".join(lines),
+        title=f"GL Net-Effect Audit: {result['unbalanced_count']} unbalanced vouchers"
+    )
+
+
+def iter_date_windows(
+    from_date: str,
+    to_date: str,
+    chunk_days: int = DEFAULT_CHUNK_DAYS
+) -> Iterator[Tuple[str, str]]:
+    """
+    Split a period into consecutive posting-date windows.
+
+    Args:
+        from_date: Period start (YYYY-MM-DD)
+        to_date: Period end (inclusive)
+        chunk_days: Days per window
+
+    Yields:
+        (window_start, window_end) tuples, both inclusive
+    """
+    start = frappe.utils.getdate(from_date)
+    end = frappe.utils.getdate(to_date)
+
+    while start <= end:
+        window_end = min(start + timedelta(days=chunk_days - 1), end)
+        yield str(start), str(window_end)
+        start = window_end + timedelta(days=1)
+
+
+def _finding(check: str, voucher_type: str, voucher_no: str, detail: str) -> Dict[str, str]:
+    return {
+        "check": check,
+        "voucher_type": voucher_type,
+        "voucher_no": voucher_no,
+        "detail": detail
+    }
+
+
+def find_unbalanced_vouchers(from_date: str, to_date: str) -> Iterator[Dict[str, str]]:
+    """
+    Live vouchers whose debit and credit differ, the same rule
+    post_sales_invoice_gl_entry enforces before posting.
+    """
+    rows = frappe.db.sql("""
+        SELECT voucher_type, voucher_no, SUM(debit) AS debit, SUM(credit) AS credit
+        FROM `tabGL Entry`
+        WHERE is_cancelled = 0
+        AND posting_date BETWEEN %s AND %s
+        GROUP BY voucher_type, voucher_no
+        HAVING ABS(SUM(debit) - SUM(credit)) >= 0.01
+    """, (from_date, to_date), as_dict=True)
+
+    for row in rows:
+        yield _finding(
+            CHECK_UNBALANCED, row.voucher_type, row.voucher_no,
+            f"GL Entry not balanced: Debit={row.debit}, Credit={row.credit}"
+        )
+
+
+def find_duplicate_postings(from_date: str, to_date: str) -> Iterator[Dict[str, str]]:
+    """Live vouchers with the same account line posted more than once"""
+    rows = frappe.db.sql("""
+        SELECT voucher_type, voucher_no, account, debit, credit, COUNT(*) AS times
+        FROM `tabGL Entry`
+        WHERE is_cancelled = 0
+        AND posting_date BETWEEN %s AND %s
+        GROUP BY voucher_type, voucher_no, account, party, debit, credit
+        HAVING COUNT(*) > 1
+    """, (from_date, to_date), as_dict=True)
+
+    for row in rows:
+        yield _finding(
+            CHECK_DUPLICATE, row.voucher_type, row.voucher_no,
+            f"Account {row.account} posted {row.times} times "
+            f"(Debit={row.debit}, Credit={row.credit})"
+        )
+
+
+def find_orphan_reversals(from_date: str, to_date: str) -> Iterator[Dict[str, str]]:
+    """
+    Vouchers with reversal rows (see create_reversal_gl_entry) in the window
+    and no original entries at any date.
+    """
+    rows = frappe.db.sql("""
+        SELECT rev.voucher_type, rev.voucher_no, COUNT(*) AS reversal_rows
+        FROM `tabGL Entry` rev
+        WHERE rev.remarks LIKE 'Reversal:%%'
+        AND rev.posting_date BETWEEN %s AND %s
+        AND NOT EXISTS (
+            SELECT 1
+            FROM `tabGL Entry` orig
+            WHERE orig.voucher_type = rev.voucher_type
+            AND orig.voucher_no = rev.voucher_no
+            AND IFNULL(orig.remarks, '') NOT LIKE 'Reversal:%%'
+        )
+        GROUP BY rev.voucher_type, rev.voucher_no
+    """, (from_date, to_date), as_dict=True)
+
+    for row in rows:
+        yield _finding(
+            CHECK_ORPHAN_REVERSAL, row.voucher_type, row.voucher_no,
+            f"{row.reversal_rows} reversal rows without original entries"
+        )
+
+
+def find_cancelled_documents_with_live_gl(
+    from_date: str,
+    to_date: str
+) -> Iterator[Dict[str, str]]:
+    """Cancelled invoices that still have GL rows with is_cancelled = 0"""
+    for doctype in INVOICE_DOCTYPES:
+        rows = frappe.db.sql(f"""
+            SELECT gle.voucher_no, COUNT(*) AS live_rows
+            FROM `tabGL Entry` gle
+            INNER JOIN `tab{doctype}` doc ON doc.name = gle.voucher_no
+            WHERE gle.voucher_type = %s
+            AND gle.is_cancelled = 0
+            AND gle.posting_date BETWEEN %s AND %s
+            AND doc.docstatus = 2
+            GROUP BY gle.voucher_no
+        """, (doctype, from_date, to_date), as_dict=True)
+
+        for row in rows:
+            yield _finding(
+                CHECK_CANCELLED_LIVE, doctype, row.voucher_no,
+                f"Cancelled document has {row.live_rows} live GL rows"
+            )
+
+
+def find_grand_total_mismatches(
+    from_date: str,
+    to_date: str,
+    chunk_size: int = DEFAULT_INVOICE_CHUNK_SIZE
+) -> Iterator[Dict[str, str]]:
+    """
+    Submitted invoices rejected by validate_sales_invoice_for_gl_posting or
+    validate_purchase_invoice_for_gl_posting.
+
+    Invoices are read in keyset-paginated chunks; the tax rows of a chunk
+    are fetched with one query.
+    """
+    for doctype, config in INVOICE_DOCTYPES.items():
+        party_field = config["party_field"]
+        after = ""
+
+        while True:
+            invoices = frappe.db.sql(f"""
+                SELECT name, {party_field}, total, discount_amount, net_total, grand_total
+                FROM `tab{doctype}`
+                WHERE docstatus = 1
+                AND posting_date BETWEEN %s AND %s
+                AND name > %s
+                ORDER BY name
+                LIMIT %s
+            """, (from_date, to_date, after, chunk_size), as_dict=True)
+
+            if not invoices:
+                break
+
+            taxes = {}
+            for tax in frappe.db.sql(f"""
+                SELECT parent, tax_amount
+                FROM `tab{config["taxes_doctype"]}`
+                WHERE parenttype = %s
+                AND parent IN %s
+            """, (doctype, tuple(invoice.name for invoice in invoices)), as_dict=True):
+                taxes.setdefault(tax.parent, []).append({"tax_amount": tax.tax_amount})
+
+            for invoice in invoices:
+                invoice_data = dict(invoice)
+                invoice_data["taxes"] = taxes.get(invoice.name, [])
+
+                error = config["validate"](invoice_data)
+                if error:
+                    yield _finding(CHECK_GRAND_TOTAL, doctype, invoice.name, error)
+
+            if len(invoices) < chunk_size:
+                break
+            after = invoices[-1].name
+
+
+INTEGRITY_CHECK_FUNCTIONS = {
+    CHECK_UNBALANCED: find_unbalanced_vouchers,
+    CHECK_DUPLICATE: find_duplicate_postings,
+    CHECK_ORPHAN_REVERSAL: find_orphan_reversals,
+    CHECK_CANCELLED_LIVE: find_cancelled_documents_with_live_gl,
+    CHECK_GRAND_TOTAL: find_grand_total_mismatches
+}
+
+
+def audit_ledger_integrity(
+    from_date: str,
+    to_date: str,
+    checks: Optional[List[str]] = None,
+    chunk_days: int = DEFAULT_CHUNK_DAYS,
+    deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Run the ledger integrity checks on the current site.
+
+    Each check runs one query per posting-date window. When a deadline is
+    given, the audit stops at the next window boundary after it passes and
+    the report is marked incomplete. The database enforces the deadline too:
+    the session's statement timeout is set to the time left before each
+    window, so a slow query is interrupted at the deadline instead of
+    holding the worker past it.
+
+    Args:
+        from_date: Period start
+        to_date: Period end (inclusive)
+        checks: Subset of INTEGRITY_CHECKS (defaults to all)
+        chunk_days: Days per posting-date window
+        deadline: time.monotonic() value after which the audit stops
+
+    Returns:
+        Dict containing:
+            - site: Site name
+            - complete: False if the deadline cut the audit short
+            - counts: Dict of check -> number of findings
+            - findings: List of findings (up to MAX_REPORTED_VOUCHERS per check)
+            - checked_until: Last posting date fully audited per check
+    """
+    checks = checks or INTEGRITY_CHECKS
+    report = {
+        "site": frappe.local.site,
+        "complete": True,
+        "counts": {check: 0 for check in checks},
+        "findings": [],
+        "checked_until": {}
+    }
+
+    try:
+        for check in checks:
+            for window_start, window_end in iter_date_windows(from_date, to_date, chunk_days):
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise AuditTimeBudgetExceeded()
+                    set_statement_timeout(max(remaining, 0.001))
+
+                for finding in INTEGRITY_CHECK_FUNCTIONS[check](window_start, window_end):
+                    report["counts"][check] += 1
+                    if report["counts"][check] <= MAX_REPORTED_VOUCHERS:
+                        report["findings"].append(finding)
+
+                report["checked_until"][check] = window_end
+    except AuditTimeBudgetExceeded:
+        report["complete"] = False
+    except frappe.QueryTimeoutError:
+        report["complete"] = False
+    finally:
+        if deadline is not None:
+            set_statement_timeout(0)
+
+    return report
+
+
+def audit_ledger_integrity_until(
+    from_date: str,
+    to_date: str,
+    deadline_epoch: float,
+    checks: Optional[List[str]] = None,
+    chunk_days: int = DEFAULT_CHUNK_DAYS
+) -> Dict[str, Any]:
+    """
+    Run audit_ledger_integrity until a wall-clock deadline.
+
+    For worker processes sharing one deadline: time.monotonic() values do not
+    carry across processes, so the deadline is given as time.time().
+
+    Args:
+        from_date: Period start
+        to_date: Period end (inclusive)
+        deadline_epoch: time.time() value after which the audit stops
+        checks: Subset of INTEGRITY_CHECKS (defaults to all)
+        chunk_days: Days per posting-date window
+
+    Returns:
+        The audit_ledger_integrity report
+    """
+    deadline = time.monotonic() + max(0, deadline_epoch - time.time())
+    return audit_ledger_integrity(
+        from_date,
+        to_date,
+        checks=checks,
+        chunk_days=chunk_days,
+        deadline=deadline
+    )
+
+
+def set_statement_timeout(seconds: float) -> None:
+    """
+    Set the session's statement timeout (MariaDB max_statement_time).
+
+    Statements running longer are interrupted with frappe.QueryTimeoutError.
+
+    Args:
+        seconds: Seconds per statement (0 for no timeout)
+    """
+    frappe.db.sql("SET SESSION max_statement_time = %s", (round(seconds, 3),))
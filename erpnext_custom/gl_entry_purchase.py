@@ -7,7 +7,7 @@ Ensures balanced entries (total debit = total credit) and proper account mapping
 Requirements: 7.1, 7.2, 7.3, 7.5, 9.1, 9.2, 9.3, 10.2, 10.3
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Mapping
 from datetime import date
 
 
@@ -17,7 +17,7 @@ class GLEntryError(Exception):
 
 
 def post_purchase_invoice_gl_entry(
-    invoice: Dict[str, Any],
+    invoice: Mapping[str, Any],
     posting_date: str = None
 ) -> Dict[str, Any]:
     """
@@ -32,7 +32,7 @@ def post_purchase_invoice_gl_entry(
     for purchase discount. The discount reduces the cost of inventory.
     
     Args:
-        invoice: Purchase Invoice object containing:
+        invoice: Purchase Invoice dict, or DocumentMapping of the document, containing:
             - name: Invoice number
             - supplier: Supplier ID
             - total: Total before discount
@@ -170,12 +170,12 @@ def post_purchase_invoice_gl_entry(
     }
 
 
-def validate_purchase_invoice_for_gl_posting(invoice: Dict[str, Any]) -> str:
+def validate_purchase_invoice_for_gl_posting(invoice: Mapping[str, Any]) -> str:
     """
     Validate purchase invoice before GL Entry posting.
     
     Args:
-        invoice: Purchase Invoice object
+        invoice: Purchase Invoice dict or DocumentMapping
     
     Returns:
         None if valid, error message string if invalid
@@ -7,7 +7,7 @@ Ensures balanced entries (total debit = total credit) and proper account mapping
 Requirements: 6.1, 6.2, 6.3, 6.5, 8.1, 8.2, 8.3
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Mapping
 from datetime import date
 
 
@@ -17,7 +17,7 @@ class GLEntryError(Exception):
 
 
 def post_sales_invoice_gl_entry(
-    invoice: Dict[str, Any],
+    invoice: Mapping[str, Any],
     posting_date: str = None
 ) -> Dict[str, Any]:
     """
@@ -30,7 +30,7 @@ def post_sales_invoice_gl_entry(
     - Credit: Hutang PPN (tax_amount) - for each tax row
     
     Args:
-        invoice: Sales Invoice object containing:
+        invoice: Sales Invoice dict, or DocumentMapping of the document, containing:
             - name: Invoice number
             - customer: Customer ID
             - total: Total before discount
@@ -185,12 +185,12 @@ def post_sales_invoice_gl_entry(
     }
 
 
-def validate_sales_invoice_for_gl_posting(invoice: Dict[str, Any]) -> str:
+def validate_sales_invoice_for_gl_posting(invoice: Mapping[str, Any]) -> str:
     """
     Validate sales invoice before GL Entry posting.
     
     Args:
-        invoice: Sales Invoice object
+        invoice: Sales Invoice dict or DocumentMapping
     
     Returns:
         None if valid, error message string if invalid
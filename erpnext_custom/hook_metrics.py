@@ -0,0 +1,340 @@
+"""
+Hook Latency Metrics Module
+
+This module times the stages of the document hooks (validate, build GL,
+persist, commission, comment) and keeps one latency histogram per site, hook
+and stage (see latency_histogram), exported in the Prometheus text format.
+
+Metrics are off unless enabled in the site config; a disabled site pays one
+config lookup per hook:
+    bench --site [site-name] set-config erpnext_custom_hook_metrics 1
+
+Every worker process keeps its own histograms and writes them, at most once
+per erpnext_custom_hook_metrics_interval seconds (default 60), to
+    [site]/hook_metrics/erpnext_custom_hooks_[pid].prom
+or to the directory set in erpnext_custom_hook_metrics_dir, for the
+node_exporter textfile collector. Series carry a pid label so the files of
+different workers do not collide. System Managers can read the current
+process's metrics from get_hook_metrics.
+
+The same timers guard against query explosions (see query_counter): with
+erpnext_custom_query_guard set to "warn" (or "raise"), every hook call counts
+its frappe.db statements and logs (or raises) when it runs more than
+erpnext_custom_query_max of them, or one statement shape more than
+erpnext_custom_query_max_repeats times. The guard is opt-in per site, test
+sites included. Queries of documents a hook submits or cancels itself (e.g. a
+Stock Entry) run inside timer.uncounted() and count against that document's
+own code, not the hook's budget. When metrics are enabled too, the time spent
+in the database is recorded as the "db" stage.
+
+Usage:
+    from erpnext_custom.hook_metrics import hook_timer, STAGE_VALIDATE
+
+    with hook_timer("on_sales_invoice_submit") as timer:
+        with timer.stage(STAGE_VALIDATE):
+            ...
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import frappe
+
+from .latency_histogram import LatencyHistogram, render_prometheus
+from .query_counter import QueryCounter, QueryBudgetExceeded, DEFAULT_MAX_QUERIES, DEFAULT_MAX_REPEATS
+
+
+# Site config keys
+CONFIG_ENABLED = "erpnext_custom_hook_metrics"
+CONFIG_DIRECTORY = "erpnext_custom_hook_metrics_dir"
+CONFIG_INTERVAL = "erpnext_custom_hook_metrics_interval"
+CONFIG_QUERY_GUARD = "erpnext_custom_query_guard"
+CONFIG_MAX_QUERIES = "erpnext_custom_query_max"
+CONFIG_MAX_REPEATS = "erpnext_custom_query_max_repeats"
+
+# Query guard modes
+GUARD_WARN = "warn"
+GUARD_RAISE = "raise"
+
+DEFAULT_EXPORT_INTERVAL = 60
+
+METRIC_NAME = "erpnext_custom_hook_stage_duration_seconds"
+METRIC_HELP = "Duration of erpnext_custom document hook stages"
+METRIC_LABELS = ("site", "hook", "stage", "pid")
+
+# Hook stages
+STAGE_LOAD = "load"
+STAGE_VALIDATE = "validate"
+STAGE_BUILD_GL = "build_gl"
+STAGE_PERSIST = "persist"
+STAGE_COMMISSION = "commission"
+STAGE_COMMENT = "comment"
+STAGE_DB = "db"
+STAGE_TOTAL = "total"
+
+# (site, hook, stage) -> histogram, for this process
+_histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+_lock = threading.Lock()
+_last_export: Dict[str, float] = {}
+
+
+def _get_conf() -> Dict:
+    return frappe.conf or {}
+
+
+def is_enabled() -> bool:
+    """Whether the current site has hook metrics enabled"""
+    return bool(_get_conf().get(CONFIG_ENABLED))
+
+
+def query_guard_mode() -> Optional[str]:
+    """Query guard mode of the current site: GUARD_WARN, GUARD_RAISE or None (off)"""
+    mode = _get_conf().get(CONFIG_QUERY_GUARD)
+    if mode:
+        return GUARD_RAISE if mode == GUARD_RAISE else GUARD_WARN
+    return None
+
+
+class _StageTimer:
+    """
+    Adds the time spent inside a with block to one stage of a HookTimer.
+
+    An uncounted stage also pauses the hook's query counter.
+    """
+
+    __slots__ = ("timer", "name", "started", "uncounted", "paused")
+
+    def __init__(self, timer: "HookTimer", name: str, uncounted: bool = False):
+        self.timer = timer
+        self.name = name
+        self.uncounted = uncounted
+        self.paused = None
+
+    def __enter__(self):
+        if self.uncounted and self.timer.queries:
+            self.paused = self.timer.queries.paused()
+            self.paused.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        stages = self.timer.stages
+        stages[self.name] = stages.get(self.name, 0.0) + time.perf_counter() - self.started
+        if self.paused:
+            self.paused.__exit__(*exc_info)
+            self.paused = None
+        return False
+
+
+class HookTimer:
+    """
+    Times one hook call.
+
+    Stages entered more than once in a call are summed. On exit the stage
+    times and the total are recorded, also when the hook raised.
+
+    With a guard mode the call's queries are counted and checked against the
+    site's budget on exit.
+    """
+
+    __slots__ = ("hook", "stages", "started", "record", "guard", "queries")
+
+    def __init__(self, hook: str, record: bool = True, guard: Optional[str] = None):
+        self.hook = hook
+        self.stages: Dict[str, float] = {}
+        self.record = record
+        self.guard = guard
+        self.queries: Optional[QueryCounter] = None
+
+    def stage(self, name: str) -> _StageTimer:
+        return _StageTimer(self, name)
+
+    def uncounted(self, name: str) -> _StageTimer:
+        """Stage whose queries are left out of the query budget"""
+        return _StageTimer(self, name, uncounted=True)
+
+    def __enter__(self):
+        if self.guard:
+            conf = _get_conf()
+            self.queries = QueryCounter(
+                frappe.db,
+                max_queries=conf.get(CONFIG_MAX_QUERIES) or DEFAULT_MAX_QUERIES,
+                max_repeats=conf.get(CONFIG_MAX_REPEATS) or DEFAULT_MAX_REPEATS
+            ).__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stages[STAGE_TOTAL] = time.perf_counter() - self.started
+
+        if self.queries:
+            self.queries.__exit__(exc_type, exc_value, traceback)
+            self.stages[STAGE_DB] = self.queries.seconds
+
+        if self.record:
+            site = frappe.local.site
+            record_hook_timings(site, self.hook, self.stages)
+            _maybe_export(site)
+
+        if self.queries:
+            # A failing hook keeps its own error; the budget is only logged
+            _check_query_budget(self.hook, self.queries, self.guard == GUARD_RAISE and exc_type is None)
+        return False
+
+
+class _DisabledStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _DisabledTimer:
+    """HookTimer stand-in for sites without metrics: records nothing"""
+
+    __slots__ = ()
+
+    def stage(self, name: str) -> _DisabledStage:
+        return _DISABLED_STAGE
+
+    def uncounted(self, name: str) -> _DisabledStage:
+        return _DISABLED_STAGE
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_DISABLED_STAGE = _DisabledStage()
+_DISABLED_TIMER = _DisabledTimer()
+
+
+def hook_timer(hook: str):
+    """
+    Timer for one call of a hook; a no-op when the site has neither metrics
+    nor the query guard enabled.
+
+    Args:
+        hook: Hook name, e.g. "on_sales_invoice_submit"
+
+    Returns:
+        Context manager with a stage(name) method
+    """
+    record = is_enabled()
+    guard = query_guard_mode()
+    if not record and not guard:
+        return _DISABLED_TIMER
+    return HookTimer(hook, record=record, guard=guard)
+
+
+def _check_query_budget(hook: str, counter: QueryCounter, raise_error: bool) -> None:
+    """Log, or raise, the query budget violations of one hook call"""
+    violations = counter.violations()
+    if not violations:
+        return
+
+    message = f"Query budget exceeded in {hook}: " + "; ".join(violations)
+    if raise_error:
+        raise QueryBudgetExceeded(message)
+    frappe.logger().warning(message)
+
+
+def record_hook_timings(site: str, hook: str, stages: Dict[str, float]) -> None:
+    """Add one hook call's stage durations (seconds) to the histograms"""
+    with _lock:
+        for stage, seconds in stages.items():
+            key = (site, hook, stage)
+            histogram = _histograms.get(key)
+            if histogram is None:
+                histogram = _histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+
+def get_hook_histograms(site: Optional[str] = None) -> Dict[Tuple[str, str, str], LatencyHistogram]:
+    """Copies of this process's histograms, optionally for one site"""
+    with _lock:
+        return {
+            key: histogram.copy()
+            for key, histogram in _histograms.items()
+            if site is None or key[0] == site
+        }
+
+
+def reset_hook_metrics() -> None:
+    """Drop all histograms of this process"""
+    with _lock:
+        _histograms.clear()
+        _last_export.clear()
+
+
+def render_hook_metrics(site: Optional[str] = None) -> str:
+    """Prometheus text exposition of this process's histograms"""
+    pid = str(os.getpid())
+    return render_prometheus(
+        METRIC_NAME,
+        METRIC_HELP,
+        METRIC_LABELS,
+        [(key + (pid,), histogram) for key, histogram in sorted(get_hook_histograms(site).items())]
+    )
+
+
+def get_export_path() -> str:
+    """Metrics file of this process for the current site"""
+    directory = _get_conf().get(CONFIG_DIRECTORY) or frappe.get_site_path("hook_metrics")
+    return os.path.join(directory, f"erpnext_custom_hooks_{os.getpid()}.prom")
+
+
+def export_hook_metrics(path: Optional[str] = None) -> str:
+    """
+    Write the current site's metrics to a file, atomically.
+
+    Args:
+        path: Target file (defaults to get_export_path())
+
+    Returns:
+        Path written
+    """
+    site = frappe.local.site
+    path = path or get_export_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as f:
+        f.write(render_hook_metrics(site))
+    os.replace(temporary_path, path)
+
+    return path
+
+
+def _maybe_export(site: str) -> None:
+    """Export when the site's last export is older than the interval"""
+    interval = _get_conf().get(CONFIG_INTERVAL) or DEFAULT_EXPORT_INTERVAL
+    now = time.monotonic()
+
+    if now - _last_export.get(site, 0.0) < interval:
+        return
+    _last_export[site] = now
+
+    try:
+        export_hook_metrics()
+    except Exception as e:
+        # Metrics must never break a document hook
+        frappe.logger().warning(f"Hook metrics export failed for {site}: {str(e)}")
+
+
+@frappe.whitelist()
+def get_hook_metrics() -> str:
+    """
+    Prometheus text of this worker's hook metrics for the current site.
+
+    Only System Managers may read it. Each call is answered by one worker,
+    so scrape the exported files for complete data.
+    """
+    frappe.only_for("System Manager")
+    return render_hook_metrics(frappe.local.site)
@@ -4,6 +4,9 @@ ERPNext Hooks Configuration
 This file configures hooks for automatic GL Entry posting when invoices are submitted or cancelled.
 These hooks integrate with ERPNext's document lifecycle events.
 
+frappe and the posting modules are imported inside each hook, so importing
+this module (e.g. to read DOC_EVENTS) is cheap and works without frappe.
+
 Requirements: 6.6, 7.6, 8.6, 9.6
 
 Usage:
@@ -19,146 +22,150 @@ Usage:
             "on_cancel": "erpnext_custom.hooks.on_purchase_invoice_cancel"
         }
     }
+    after_migrate = ["erpnext_custom.commission_ledger.install_commission_ledger"]
 """
 
 from typing import Any
-import frappe
-from frappe import _
-
-from .gl_entry_sales import post_sales_invoice_gl_entry, validate_sales_invoice_for_gl_posting
-from .gl_entry_purchase import post_purchase_invoice_gl_entry, validate_purchase_invoice_for_gl_posting
-from .invoice_cancellation import cancel_invoice_with_gl_reversal
-from .credit_note_commission import on_credit_note_submit, on_credit_note_cancel
-from .stock_adjustment_gl_fix import fix_stock_adjustment_gl_entries
 
 
 def on_sales_invoice_submit(doc: Any, method: str = None) -> None:
     """
     Hook called when Sales Invoice is submitted.
     Posts GL Entry for discount and tax.
-    Also handles commission adjustment for Credit Notes.
+    Also records invoice commission in the commission ledger, or handles
+    commission adjustment for Credit Notes.
     
     Args:
         doc: Sales Invoice document object
         method: Hook method name (not used)
     """
-    try:
-        # Handle Credit Note commission adjustment first
-        if doc.is_return and doc.is_return == 1:
-            on_credit_note_submit(doc, method)
-        
-        # Convert doc to dict for processing
-        invoice_data = {
-            "name": doc.name,
-            "customer": doc.customer,
-            "posting_date": str(doc.posting_date),
-            "total": doc.total,
-            "discount_amount": doc.get("discount_amount", 0),
-            "discount_percentage": doc.get("discount_percentage", 0),
-            "net_total": doc.net_total,
-            "taxes": [],
-            "grand_total": doc.grand_total
-        }
-        
-        # Extract tax rows
-        if hasattr(doc, "taxes") and doc.taxes:
-            for tax_row in doc.taxes:
-                invoice_data["taxes"].append({
-                    "account_head": tax_row.account_head,
-                    "description": tax_row.description,
-                    "rate": tax_row.rate,
-                    "tax_amount": tax_row.tax_amount
-                })
-        
-        # Validate before posting
-        error = validate_sales_invoice_for_gl_posting(invoice_data)
-        if error:
-            frappe.throw(_(f"GL Entry validation failed: {error}"))
-        
-        # Post GL Entry
-        gl_result = post_sales_invoice_gl_entry(invoice_data, str(doc.posting_date))
-        
-        # Log success
-        frappe.logger().info(
-            f"GL Entry posted for Sales Invoice {doc.name}: "
-            f"Debit={gl_result['total_debit']}, Credit={gl_result['total_credit']}"
-        )
-        
-        # Store GL entries in doc for reference (optional)
-        doc.add_comment(
-            "Info",
-            f"GL Entry posted: {len(gl_result['gl_entries'])} entries, "
-            f"Total Debit: {gl_result['total_debit']}, "
-            f"Total Credit: {gl_result['total_credit']}"
-        )
-        
-    except Exception as e:
-        frappe.log_error(
-            message=str(e),
-            title=f"GL Entry Error - Sales Invoice {doc.name}"
-        )
-        frappe.throw(_(f"Failed to post GL Entry: {str(e)}"))
+    import frappe
+    from frappe import _
+    from .gl_entry_sales import post_sales_invoice_gl_entry, validate_sales_invoice_for_gl_posting
+    from .document_mapping import DocumentMapping
+    from .credit_note_commission import on_credit_note_submit
+    from .commission_ledger import record_invoice_commission
+    from .hook_metrics import hook_timer, STAGE_VALIDATE, STAGE_BUILD_GL, STAGE_COMMISSION, STAGE_COMMENT
+    
+    with hook_timer("on_sales_invoice_submit") as timer:
+        try:
+            # Handle Credit Note commission adjustment first
+            with timer.stage(STAGE_COMMISSION):
+                if doc.is_return and doc.is_return == 1:
+                    on_credit_note_submit(doc, method)
+                else:
+                    record_invoice_commission(doc)
+            
+            # Read the doc (and its tax rows) through a mapping view, without copying
+            invoice_data = DocumentMapping(doc)
+            
+            # Validate before posting
+            with timer.stage(STAGE_VALIDATE):
+                error = validate_sales_invoice_for_gl_posting(invoice_data)
+            if error:
+                frappe.throw(_(f"GL Entry validation failed: {error}"))
+            
+            # Post GL Entry
+            with timer.stage(STAGE_BUILD_GL):
+                gl_result = post_sales_invoice_gl_entry(invoice_data, str(doc.posting_date))
+            
+            # Log success
+            frappe.logger().info(
+                f"GL Entry posted for Sales Invoice {doc.name}: "
+                f"Debit={gl_result['total_debit']}, Credit={gl_result['total_credit']}"
+            )
+            
+            # Store GL entries in doc for reference (optional)
+            with timer.stage(STAGE_COMMENT):
+                doc.add_comment(
+                    "Info",
+                    f"GL Entry posted: {len(gl_result['gl_entries'])} entries, "
+                    f"Total Debit: {gl_result['total_debit']}, "
+                    f"Total Credit: {gl_result['total_credit']}"
+                )
+            
+        except Exception as e:
+            frappe.log_error(
+                message=str(e),
+                title=f"GL Entry Error - Sales Invoice {doc.name}"
+            )
+            frappe.throw(_(f"Failed to post GL Entry: {str(e)}"))
 
 
 def on_sales_invoice_cancel(doc: Any, method: str = None) -> None:
     """
     Hook called when Sales Invoice is cancelled.
     Creates reversal GL Entry.
-    Also handles commission reversal for Credit Notes.
+    Also reverses invoice commission in the commission ledger, or handles
+    commission reversal for Credit Notes.
     
     Args:
         doc: Sales Invoice document object
         method: Hook method name (not used)
     """
-    try:
-        # Handle Credit Note commission reversal first
-        if doc.is_return and doc.is_return == 1:
-            on_credit_note_cancel(doc, method)
-        
-        # Get original GL entries
-        original_gl_entries = frappe.get_all(
-            "GL Entry",
-            filters={
-                "voucher_type": "Sales Invoice",
-                "voucher_no": doc.name,
-                "is_cancelled": 0
-            },
-            fields=["*"]
-        )
-        
-        if not original_gl_entries:
-            frappe.logger().warning(
-                f"No GL entries found for Sales Invoice {doc.name}"
+    import frappe
+    from frappe import _
+    from .invoice_cancellation import cancel_invoice_with_gl_reversal, GL_ENTRY_REVERSAL_FIELDS
+    from .credit_note_commission import on_credit_note_cancel
+    from .commission_ledger import reverse_commission_movements
+    from .hook_metrics import hook_timer, STAGE_LOAD, STAGE_BUILD_GL, STAGE_COMMISSION, STAGE_COMMENT
+    
+    with hook_timer("on_sales_invoice_cancel") as timer:
+        try:
+            # Handle Credit Note commission reversal first
+            with timer.stage(STAGE_COMMISSION):
+                if doc.is_return and doc.is_return == 1:
+                    on_credit_note_cancel(doc, method)
+                else:
+                    reverse_commission_movements(doc.name)
+            
+            # Get original GL entries
+            with timer.stage(STAGE_LOAD):
+                original_gl_entries = frappe.get_all(
+                    "GL Entry",
+                    filters={
+                        "voucher_type": "Sales Invoice",
+                        "voucher_no": doc.name,
+                        "is_cancelled": 0
+                    },
+                    fields=GL_ENTRY_REVERSAL_FIELDS
+                )
+            
+            if not original_gl_entries:
+                frappe.logger().warning(
+                    f"No GL entries found for Sales Invoice {doc.name}"
+                )
+                return
+            
+            # Create reversal
+            with timer.stage(STAGE_BUILD_GL):
+                cancellation_result = cancel_invoice_with_gl_reversal(
+                    invoice_name=doc.name,
+                    invoice_type="Sales Invoice",
+                    original_gl_entries=original_gl_entries,
+                    cancellation_date=str(frappe.utils.today())
+                )
+            
+            if not cancellation_result["success"]:
+                frappe.throw(_(cancellation_result["message"]))
+            
+            # Log success
+            frappe.logger().info(
+                f"Reversal GL Entry posted for Sales Invoice {doc.name}"
+            )
+            
+            with timer.stage(STAGE_COMMENT):
+                doc.add_comment(
+                    "Info",
+                    f"Reversal GL Entry posted: {len(cancellation_result['reversal_entries'])} entries"
+                )
+            
+        except Exception as e:
+            frappe.log_error(
+                message=str(e),
+                title=f"GL Reversal Error - Sales Invoice {doc.name}"
             )
-            return
-        
-        # Create reversal
-        cancellation_result = cancel_invoice_with_gl_reversal(
-            invoice_name=doc.name,
-            invoice_type="Sales Invoice",
-            original_gl_entries=original_gl_entries,
-            cancellation_date=str(frappe.utils.today())
-        )
-        
-        if not cancellation_result["success"]:
-            frappe.throw(_(cancellation_result["message"]))
-        
-        # Log success
-        frappe.logger().info(
-            f"Reversal GL Entry posted for Sales Invoice {doc.name}"
-        )
-        
-        doc.add_comment(
-            "Info",
-            f"Reversal GL Entry posted: {len(cancellation_result['reversal_entries'])} entries"
-        )
-        
-    except Exception as e:
-        frappe.log_error(
-            message=str(e),
-            title=f"GL Reversal Error - Sales Invoice {doc.name}"
-        )
-        frappe.throw(_(f"Failed to create reversal GL Entry: {str(e)}"))
+            frappe.throw(_(f"Failed to create reversal GL Entry: {str(e)}"))
 
 
 def on_purchase_invoice_submit(doc: Any, method: str = None) -> None:
@@ -170,66 +177,47 @@ def on_purchase_invoice_submit(doc: Any, method: str = None) -> None:
         doc: Purchase Invoice document object
         method: Hook method name (not used)
     """
-    try:
-        # Convert doc to dict for processing
-        invoice_data = {
-            "name": doc.name,
-            "supplier": doc.supplier,
-            "posting_date": str(doc.posting_date),
-            "total": doc.total,
-            "discount_amount": doc.get("discount_amount", 0),
-            "net_total": doc.net_total,
-            "taxes": [],
-            "grand_total": doc.grand_total,
-            "items": []
-        }
-        
-        # Extract items for stock valuation
-        if hasattr(doc, "items") and doc.items:
-            for item in doc.items:
-                invoice_data["items"].append({
-                    "item_code": item.item_code,
-                    "qty": item.qty,
-                    "rate": item.rate
-                })
-        
-        # Extract tax rows
-        if hasattr(doc, "taxes") and doc.taxes:
-            for tax_row in doc.taxes:
-                invoice_data["taxes"].append({
-                    "account_head": tax_row.account_head,
-                    "description": tax_row.description,
-                    "rate": tax_row.rate,
-                    "tax_amount": tax_row.tax_amount
-                })
-        
-        # Validate before posting
-        error = validate_purchase_invoice_for_gl_posting(invoice_data)
-        if error:
-            frappe.throw(_(f"GL Entry validation failed: {error}"))
-        
-        # Post GL Entry
-        gl_result = post_purchase_invoice_gl_entry(invoice_data, str(doc.posting_date))
-        
-        # Log success
-        frappe.logger().info(
-            f"GL Entry posted for Purchase Invoice {doc.name}: "
-            f"Debit={gl_result['total_debit']}, Credit={gl_result['total_credit']}"
-        )
-        
-        doc.add_comment(
-            "Info",
-            f"GL Entry posted: {len(gl_result['gl_entries'])} entries, "
-            f"Total Debit: {gl_result['total_debit']}, "
-            f"Total Credit: {gl_result['total_credit']}"
-        )
-        
-    except Exception as e:
-        frappe.log_error(
-            message=str(e),
-            title=f"GL Entry Error - Purchase Invoice {doc.name}"
-        )
-        frappe.throw(_(f"Failed to post GL Entry: {str(e)}"))
+    import frappe
+    from frappe import _
+    from .gl_entry_purchase import post_purchase_invoice_gl_entry, validate_purchase_invoice_for_gl_posting
+    from .document_mapping import DocumentMapping
+    from .hook_metrics import hook_timer, STAGE_VALIDATE, STAGE_BUILD_GL, STAGE_COMMENT
+    
+    with hook_timer("on_purchase_invoice_submit") as timer:
+        try:
+            # Read the doc (and its tax and item rows) through a mapping view, without copying
+            invoice_data = DocumentMapping(doc)
+            
+            # Validate before posting
+            with timer.stage(STAGE_VALIDATE):
+                error = validate_purchase_invoice_for_gl_posting(invoice_data)
+            if error:
+                frappe.throw(_(f"GL Entry validation failed: {error}"))
+            
+            # Post GL Entry
+            with timer.stage(STAGE_BUILD_GL):
+                gl_result = post_purchase_invoice_gl_entry(invoice_data, str(doc.posting_date))
+            
+            # Log success
+            frappe.logger().info(
+                f"GL Entry posted for Purchase Invoice {doc.name}: "
+                f"Debit={gl_result['total_debit']}, Credit={gl_result['total_credit']}"
+            )
+            
+            with timer.stage(STAGE_COMMENT):
+                doc.add_comment(
+                    "Info",
+                    f"GL Entry posted: {len(gl_result['gl_entries'])} entries, "
+                    f"Total Debit: {gl_result['total_debit']}, "
+                    f"Total Credit: {gl_result['total_credit']}"
+                )
+            
+        except Exception as e:
+            frappe.log_error(
+                message=str(e),
+                title=f"GL Entry Error - Purchase Invoice {doc.name}"
+            )
+            frappe.throw(_(f"Failed to post GL Entry: {str(e)}"))
 
 
 def on_purchase_invoice_cancel(doc: Any, method: str = None) -> None:
@@ -241,51 +229,60 @@ def on_purchase_invoice_cancel(doc: Any, method: str = None) -> None:
         doc: Purchase Invoice document object
         method: Hook method name (not used)
     """
-    try:
-        # Get original GL entries
-        original_gl_entries = frappe.get_all(
-            "GL Entry",
-            filters={
-                "voucher_type": "Purchase Invoice",
-                "voucher_no": doc.name,
-                "is_cancelled": 0
-            },
-            fields=["*"]
-        )
-        
-        if not original_gl_entries:
-            frappe.logger().warning(
-                f"No GL entries found for Purchase Invoice {doc.name}"
+    import frappe
+    from frappe import _
+    from .invoice_cancellation import cancel_invoice_with_gl_reversal, GL_ENTRY_REVERSAL_FIELDS
+    from .hook_metrics import hook_timer, STAGE_LOAD, STAGE_BUILD_GL, STAGE_COMMENT
+    
+    with hook_timer("on_purchase_invoice_cancel") as timer:
+        try:
+            # Get original GL entries
+            with timer.stage(STAGE_LOAD):
+                original_gl_entries = frappe.get_all(
+                    "GL Entry",
+                    filters={
+                        "voucher_type": "Purchase Invoice",
+                        "voucher_no": doc.name,
+                        "is_cancelled": 0
+                    },
+                    fields=GL_ENTRY_REVERSAL_FIELDS
+                )
+            
+            if not original_gl_entries:
+                frappe.logger().warning(
+                    f"No GL entries found for Purchase Invoice {doc.name}"
+                )
+                return
+            
+            # Create reversal
+            with timer.stage(STAGE_BUILD_GL):
+                cancellation_result = cancel_invoice_with_gl_reversal(
+                    invoice_name=doc.name,
+                    invoice_type="Purchase Invoice",
+                    original_gl_entries=original_gl_entries,
+                    cancellation_date=str(frappe.utils.today())
+                )
+            
+            if not cancellation_result["success"]:
+                frappe.throw(_(cancellation_result["message"]))
+            
+            # Log success
+            frappe.logger().info(
+                f"Reversal GL Entry posted for Purchase Invoice {doc.name}"
+            )
+            
+            with timer.stage(STAGE_COMMENT):
+                doc.add_comment(
+                    "Info",
+                    f"Reversal GL Entry posted: {len(cancellation_result['reversal_entries'])} entries"
+                )
+            
+        except Exception as e:
+            frappe.log_error(
+                message=str(e),
+                title=f"GL Reversal Error - Purchase Invoice {doc.name}"
             )
-            return
-        
-        # Create reversal
-        cancellation_result = cancel_invoice_with_gl_reversal(
-            invoice_name=doc.name,
-            invoice_type="Purchase Invoice",
-            original_gl_entries=original_gl_entries,
-            cancellation_date=str(frappe.utils.today())
-        )
-        
-        if not cancellation_result["success"]:
-            frappe.throw(_(cancellation_result["message"]))
-        
-        # Log success
-        frappe.logger().info(
-            f"Reversal GL Entry posted for Purchase Invoice {doc.name}"
-        )
-        
-        doc.add_comment(
-            "Info",
-            f"Reversal GL Entry posted: {len(cancellation_result['reversal_entries'])} entries"
-        )
-        
-    except Exception as e:
-        frappe.log_error(
-            message=str(e),
-            title=f"GL Reversal Error - Purchase Invoice {doc.name}"
-        )
-        frappe.throw(_(f"Failed to create reversal GL Entry: {str(e)}"))
+            frappe.throw(_(f"Failed to create reversal GL Entry: {str(e)}"))
 
 
 # Hook configuration to be added to ERPNext custom app
@@ -308,3 +305,32 @@ DOC_EVENTS = {
         "on_submit": "erpnext_custom.stock_adjustment_gl_fix.fix_stock_adjustment_gl_entries"
     }
 }
+
+
+# Scheduled jobs to be added to ERPNext custom app
+SCHEDULER_EVENTS = {
+    "weekly": [
+        "erpnext_custom.gl_audit.run_scheduled_net_effect_audit"
+    ]
+}
+
+
+# Migration hooks to be added to ERPNext custom app: create the raw tables the
+# document hooks write to (commission ledger and totals, returned quantity
+# index, filled once when created, naming series blocks and gaps);
+# re-running is a no-op
+AFTER_MIGRATE = [
+    "erpnext_custom.commission_ledger.install_commission_ledger",
+    "erpnext_custom.sales_return.returned_qty_index.sync_returned_qty_index",
+    "erpnext_custom.naming_series_allocator.install_naming_series_tables"
+]
+
+
+# Request hooks to be added to ERPNext custom app (opt-in sampling profiler,
+# idle unless enabled in site config or requested by header)
+BEFORE_REQUEST = [
+    "erpnext_custom.request_profiler.before_request"
+]
+AFTER_REQUEST = [
+    "erpnext_custom.request_profiler.after_request"
+]
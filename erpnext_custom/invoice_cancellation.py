@@ -7,10 +7,40 @@ Ensures that cancellation completely reverses the original transaction.
 Requirements: 6.4, 7.4, 8.4, 9.4, 10.5
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Iterator
 from datetime import date
 
 
+# GL Entry columns needed to build and persist a reversal.
+# Used instead of fields=["*"] when loading original GL entries.
+GL_ENTRY_REVERSAL_FIELDS = [
+    "voucher_type",
+    "voucher_no",
+    "account",
+    "debit",
+    "credit",
+    "against",
+    "remarks",
+    "company",
+    "cost_center",
+    "party_type",
+    "party",
+    "account_currency",
+    "debit_in_account_currency",
+    "credit_in_account_currency",
+    "against_voucher_type",
+    "against_voucher",
+    "fiscal_year",
+    "is_opening"
+]
+
+# Accounting dimensions copied unchanged from original to reversal entries
+REVERSAL_PASSTHROUGH_FIELDS = [
+    "company", "cost_center", "party_type", "party", "account_currency",
+    "against_voucher_type", "against_voucher", "fiscal_year", "is_opening"
+]
+
+
 class CancellationError(Exception):
     """Exception raised for cancellation errors"""
     pass
@@ -128,34 +158,13 @@ def verify_cancellation_net_effect(
     account_balances = {}
     
     # Sum original entries
-    for entry in original_gl_entries:
-        account = entry.get("account", "")
-        debit = entry.get("debit", 0)
-        credit = entry.get("credit", 0)
-        net = debit - credit
-        
-        if account not in account_balances:
-            account_balances[account] = 0
-        account_balances[account] += net
+    _accumulate_account_balances(original_gl_entries, account_balances)
     
     # Sum reversal entries
-    for entry in reversal_gl_entries:
-        account = entry.get("account", "")
-        debit = entry.get("debit", 0)
-        credit = entry.get("credit", 0)
-        net = debit - credit
-        
-        if account not in account_balances:
-            account_balances[account] = 0
-        account_balances[account] += net
+    _accumulate_account_balances(reversal_gl_entries, account_balances)
     
     # Check if all accounts have net balance of zero
-    errors = []
-    for account, balance in account_balances.items():
-        if abs(balance) > 0.01:  # Allow rounding error
-            errors.append(
-                f"Account {account} has non-zero net balance: {balance}"
-            )
+    errors = _net_balance_errors(account_balances)
     
     return {
         "is_valid": len(errors) == 0,
@@ -166,6 +175,104 @@ def verify_cancellation_net_effect(
     }
 
 
+def _accumulate_account_balances(
+    entries: Iterable[Dict[str, Any]],
+    account_balances: Dict[str, float]
+) -> None:
+    """
+    Add the net (debit - credit) of each entry to its account balance.
+    
+    Entries may carry a precomputed "net" instead of debit and credit,
+    e.g. rows already summed per account by the database.
+    """
+    for entry in entries:
+        account = entry.get("account", "")
+        if "net" in entry:
+            net = entry["net"]
+        else:
+            net = entry.get("debit", 0) - entry.get("credit", 0)
+        
+        account_balances[account] = account_balances.get(account, 0) + net
+
+
+def _net_balance_errors(account_balances: Dict[str, float]) -> List[str]:
+    """List accounts whose net balance is not zero"""
+    errors = []
+    for account, balance in account_balances.items():
+        if abs(balance) > 0.01:  # Allow rounding error
+            errors.append(
+                f"Account {account} has non-zero net balance: {balance}"
+            )
+    return errors
+
+
+def iter_unbalanced_vouchers(
+    gl_rows: Iterable[Dict[str, Any]]
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream vouchers whose original + reversal entries do not net to zero.
+    
+    Generalizes verify_cancellation_net_effect to any number of vouchers.
+    Rows must arrive grouped by voucher (e.g. ORDER BY voucher_type,
+    voucher_no); only the balances of the current voucher are held in
+    memory, so arbitrarily large result sets can be checked.
+    
+    Args:
+        gl_rows: GL Entry rows with voucher_type, voucher_no, account and
+            either debit/credit or a precomputed net per account
+    
+    Yields:
+        Dict per unbalanced voucher containing:
+            - voucher_type: Voucher type
+            - voucher_no: Voucher number
+            - account_balances: Dict of account -> net balance
+            - errors: List of error messages
+    
+    Example:
+        >>> rows = [
+        ...     {"voucher_type": "Sales Invoice", "voucher_no": "SI-001",
+        ...      "account": "1210 - Piutang Usaha", "net": 0},
+        ...     {"voucher_type": "Sales Invoice", "voucher_no": "SI-002",
+        ...      "account": "1210 - Piutang Usaha", "net": 1000}
+        ... ]
+        >>> [v["voucher_no"] for v in iter_unbalanced_vouchers(rows)]
+        ['SI-002']
+    """
+    current = None
+    account_balances = {}
+    
+    for row in gl_rows:
+        voucher = (row.get("voucher_type", ""), row.get("voucher_no", ""))
+        
+        if voucher != current:
+            if current is not None:
+                yield from _unbalanced_voucher(current, account_balances)
+            current = voucher
+            account_balances = {}
+        
+        _accumulate_account_balances((row,), account_balances)
+    
+    if current is not None:
+        yield from _unbalanced_voucher(current, account_balances)
+
+
+def _unbalanced_voucher(
+    voucher: tuple,
+    account_balances: Dict[str, float]
+) -> Iterator[Dict[str, Any]]:
+    """Yield a report for the voucher if any account does not net to zero"""
+    errors = _net_balance_errors(account_balances)
+    if errors:
+        yield {
+            "voucher_type": voucher[0],
+            "voucher_no": voucher[1],
+            "account_balances": {
+                k: round(v, 2) for k, v in account_balances.items()
+            },
+            "errors": errors
+        }
+
+
 def cancel_invoice_with_gl_reversal(
     invoice_name: str,
     invoice_type: str,
@@ -228,3 +335,101 @@ def cancel_invoice_with_gl_reversal(
             "message": f"Cancellation failed: {str(e)}",
             "errors": [str(e)]
         }
+
+
+def create_reversal_gl_entries_bulk(
+    original_gl_entries: Iterable[Dict[str, Any]],
+    cancellation_date: str = None
+) -> Dict[str, Any]:
+    """
+    Create reversal GL Entries for many vouchers in one loop over the rows.
+    
+    Applies the same rules as create_reversal_gl_entry to every voucher.
+    A reversal is built by swapping each row, so it always nets the original
+    to zero; the check that can fail is the balance of the original rows
+    themselves. Vouchers whose rows do not balance (e.g. a partially loaded
+    or hand-edited voucher) are reported and left out.
+    
+    Columns in REVERSAL_PASSTHROUGH_FIELDS are copied when set, and the
+    account-currency amounts are swapped like debit and credit.
+    
+    Args:
+        original_gl_entries: Original GL Entry lines of any number of vouchers
+        cancellation_date: Date for reversal entries (defaults to today)
+    
+    Returns:
+        Dict containing:
+            - reversals: Dict of (voucher_type, voucher_no) -> reversal lines
+            - failed: Dict of (voucher_type, voucher_no) -> error messages
+            - total_debit: Sum of all reversal debits that passed
+            - total_credit: Sum of all reversal credits that passed
+    
+    Example:
+        >>> rows = [
+        ...     {"voucher_type": "Sales Invoice", "voucher_no": "SI-001",
+        ...      "account": "1210 - Piutang Usaha", "debit": 999000, "credit": 0},
+        ...     {"voucher_type": "Sales Invoice", "voucher_no": "SI-001",
+        ...      "account": "4100 - Pendapatan Penjualan", "debit": 0, "credit": 999000}
+        ... ]
+        >>> result = create_reversal_gl_entries_bulk(rows, "2024-02-01")
+        >>> len(result["reversals"][("Sales Invoice", "SI-001")])
+        2
+    """
+    if not cancellation_date:
+        cancellation_date = str(date.today())
+    
+    reversals = {}
+    voucher_totals = {}
+    
+    for entry in original_gl_entries:
+        voucher = (entry.get("voucher_type", ""), entry.get("voucher_no", ""))
+        account = entry.get("account", "")
+        debit = entry.get("debit", 0)
+        credit = entry.get("credit", 0)
+        
+        # Swap debit and credit
+        reversal_entry = {
+            "account": account,
+            "debit": credit,
+            "credit": debit,
+            "against": entry.get("against", ""),
+            "posting_date": cancellation_date,
+            "voucher_type": voucher[0],
+            "voucher_no": voucher[1],
+            "remarks": f"Reversal: {entry.get('remarks', '')}",
+            "is_cancelled": 1
+        }
+        for field in REVERSAL_PASSTHROUGH_FIELDS:
+            if entry.get(field) is not None:
+                reversal_entry[field] = entry[field]
+        if entry.get("debit_in_account_currency") is not None:
+            reversal_entry["debit_in_account_currency"] = entry.get("credit_in_account_currency") or 0
+            reversal_entry["credit_in_account_currency"] = entry["debit_in_account_currency"]
+        
+        reversals.setdefault(voucher, []).append(reversal_entry)
+        
+        totals = voucher_totals.setdefault(voucher, [0, 0])
+        totals[0] += credit
+        totals[1] += debit
+    
+    failed = {}
+    total_debit = 0
+    total_credit = 0
+    
+    for voucher, (voucher_debit, voucher_credit) in voucher_totals.items():
+        if abs(voucher_debit - voucher_credit) >= 0.01:  # Allow rounding error
+            failed[voucher] = [
+                f"Reversal GL Entry not balanced: Debit={voucher_debit}, Credit={voucher_credit}"
+            ]
+            del reversals[voucher]
+            continue
+        
+        total_debit += voucher_debit
+        total_credit += voucher_credit
+    
+    return {
+        "reversals": reversals,
+        "failed": failed,
+        "total_debit": round(total_debit, 2),
+        "total_credit": round(total_credit, 2)
+    }
@@ -0,0 +1,189 @@
+"""
+Latency Histogram Module
+
+This module records durations in HDR-style log-linear histograms and renders
+them in the Prometheus text exposition format.
+
+Each power of two of microseconds is split into SUB_BUCKETS linear buckets,
+so a recorded value is known to within 1/SUB_BUCKETS of its true value from
+1 microsecond to hours, with O(1) recording and memory bounded by the number
+of distinct buckets hit (a few hundred at most). The Prometheus le buckets
+are counted exactly alongside.
+
+This module does not need frappe.
+
+Usage:
+    >>> histogram = LatencyHistogram()
+    >>> for seconds in (0.0042, 0.0131, 0.0468):
+    ...     histogram.record(seconds)
+    >>> histogram.value_at_percentile(50)
+    0.013311
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Linear buckets per power of two (2 ** SUB_BUCKET_BITS); 16 = 6.25% precision
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# Upper bounds (seconds) of the cumulative buckets exported to Prometheus,
+# counted exactly at record time
+DEFAULT_EXPORT_BOUNDS = [
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+]
+
+
+def bucket_index(microseconds: int) -> int:
+    """
+    Bucket of a duration in whole microseconds.
+
+    Values below SUB_BUCKETS have one bucket each; above, every power of two
+    is split into SUB_BUCKETS buckets.
+    """
+    if microseconds < SUB_BUCKETS:
+        return max(microseconds, 0)
+
+    shift = microseconds.bit_length() - SUB_BUCKET_BITS - 1
+    return SUB_BUCKETS + shift * SUB_BUCKETS + (microseconds >> shift) - SUB_BUCKETS
+
+
+def bucket_upper_bound(index: int) -> int:
+    """Highest duration in microseconds that falls into a bucket"""
+    if index < SUB_BUCKETS:
+        return index
+
+    shift, sub_bucket = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+    return ((SUB_BUCKETS + sub_bucket + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in seconds.
+
+    count, sum, min, max and the counts at the export bounds are exact;
+    percentiles are reported at the upper bound of the bucket a value fell
+    into.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max", "bounds", "bound_counts")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_EXPORT_BOUNDS):
+        self.bounds = list(bounds)
+        self.bound_counts = [0] * (len(self.bounds) + 1)
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, seconds: float) -> None:
+        """Add one duration"""
+        index = bucket_index(int(seconds * 1000000))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.bound_counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Add another histogram (with the same bounds) into this one"""
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different export bounds")
+
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        for position, count in enumerate(other.bound_counts):
+            self.bound_counts[position] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    def copy(self) -> "LatencyHistogram":
+        return LatencyHistogram(self.bounds).merge(self)
+
+    def value_at_percentile(self, percentile: float) -> float:
+        """
+        Duration in seconds at or below which percentile (0-100) of the
+        values fall, never above the recorded maximum.
+        """
+        if not self.count:
+            return 0.0
+
+        threshold = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= threshold:
+                return min(bucket_upper_bound(index) / 1000000, self.max)
+
+        return self.max
+
+    def cumulative_counts(self) -> List[int]:
+        """Number of values <= each export bound, as Prometheus le buckets"""
+        result = []
+        seen = 0
+        for count in self.bound_counts[:-1]:
+            seen += count
+            result.append(seen)
+        return result
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    labels = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus(
+    name: str,
+    help_text: str,
+    label_names: Sequence[str],
+    histograms: Iterable[Tuple[Sequence[str], LatencyHistogram]]
+) -> str:
+    """
+    Render histograms as one Prometheus histogram metric family.
+
+    Args:
+        name: Metric name, e.g. "erpnext_custom_hook_stage_duration_seconds"
+        help_text: HELP line
+        label_names: Label names, in the order of each label value tuple
+        histograms: (label values, histogram) pairs; buckets are the
+            histogram's export bounds
+
+    Returns:
+        Text exposition with _bucket, _sum and _count series
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+
+    for label_values, histogram in histograms:
+        for bound, count in zip(histogram.bounds, histogram.cumulative_counts()):
+            labels = _format_labels(label_names, label_values, f'le="{_format_number(bound)}"')
+            lines.append(f"{name}_bucket{labels} {count}")
+
+        labels = _format_labels(label_names, label_values, 'le="+Inf"')
+        lines.append(f"{name}_bucket{labels} {histogram.count}")
+
+        labels = _format_labels(label_names, label_values)
+        lines.append(f"{name}_sum{labels} {round(histogram.total, 6)}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+
+    return "\n".join(lines) + "\n"
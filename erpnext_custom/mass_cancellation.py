@@ -0,0 +1,367 @@
+"""
+Mass Invoice Cancellation Module
+
+This module cancels many submitted Sales or Purchase Invoices at once, e.g. a
+wrongly imported batch. GL Entries of a whole batch are fetched with one
+narrow-projection query, all reversals are built in one loop over the rows
+(see invoice_cancellation.create_reversal_gl_entries_bulk), and the results
+are persisted with multi-row inserts, one transaction per batch.
+
+The bulk path only writes what cancelling a plain invoice changes: the GL
+Entries, the Payment Ledger Entries, the docstatus of the invoice and its
+child rows, the invoice status and the commission ledger. Invoices where ERPNext's cancel does more are excluded and reported,
+so they can be cancelled through the document:
+- invoices that update stock (Stock Ledger reversal)
+- invoices referenced by a submitted Payment Entry or Journal Entry
+- invoices with a submitted Credit Note or Debit Note against them
+
+Vouchers whose GL Entries do not balance are reported and left untouched. Credit Notes
+and Debit Notes (is_return=1) are skipped; cancel them through the document so
+the commission and stock adjustments run.
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.mass_cancellation import mass_cancel_invoices
+    >>> mass_cancel_invoices("Sales Invoice", names, dry_run=True)
+"""
+
+from typing import Any, Dict, List, Optional
+import frappe
+
+from .invoice_cancellation import (
+    GL_ENTRY_REVERSAL_FIELDS,
+    REVERSAL_PASSTHROUGH_FIELDS,
+    create_reversal_gl_entries_bulk
+)
+from .commission_ledger import reverse_commission_movements_bulk
+
+
+# Invoices per batch (one transaction per batch)
+DEFAULT_BATCH_SIZE = 500
+
+SUPPORTED_INVOICE_TYPES = ("Sales Invoice", "Purchase Invoice")
+
+# Child tables cancelled together with the invoice (docstatus follows the parent)
+INVOICE_CHILD_DOCTYPES = {
+    "Sales Invoice": [
+        "Sales Invoice Item", "Sales Taxes and Charges", "Sales Team", "Payment Schedule",
+        "Sales Invoice Advance", "Sales Invoice Payment"
+    ],
+    "Purchase Invoice": [
+        "Purchase Invoice Item", "Purchase Taxes and Charges", "Payment Schedule",
+        "Purchase Invoice Advance"
+    ]
+}
+
+# GL Entry columns written for each reversal row
+REVERSAL_INSERT_FIELDS = [
+    "name", "creation", "modified", "owner", "modified_by", "docstatus",
+    "posting_date", "account", "debit", "credit", "against",
+    "voucher_type", "voucher_no", "remarks", "is_cancelled",
+    "debit_in_account_currency", "credit_in_account_currency"
+] + REVERSAL_PASSTHROUGH_FIELDS
+
+
+def get_cancellable_invoices(invoice_type: str, invoice_names: List[str]) -> List[str]:
+    """
+    Filter invoice names down to submitted, non-return invoices.
+
+    Args:
+        invoice_type: "Sales Invoice" or "Purchase Invoice"
+        invoice_names: Candidate invoice names
+
+    Returns:
+        Names that can be mass-cancelled, in input order
+    """
+    cancellable = set(frappe.get_all(
+        invoice_type,
+        filters={"name": ["in", invoice_names], "docstatus": 1, "is_return": 0},
+        pluck="name",
+        limit_page_length=0
+    ))
+
+    return [name for name in invoice_names if name in cancellable]
+
+
+def get_excluded_invoices(invoice_type: str, invoice_names: List[str]) -> Dict[str, str]:
+    """
+    Find invoices that must be cancelled through the document.
+
+    Args:
+        invoice_type: "Sales Invoice" or "Purchase Invoice"
+        invoice_names: Submitted invoice names
+
+    Returns:
+        Dict of invoice -> reason it is excluded from the bulk path
+    """
+    if not invoice_names:
+        return {}
+
+    excluded = {}
+
+    for name in frappe.get_all(
+        invoice_type,
+        filters={"name": ["in", invoice_names], "update_stock": 1},
+        pluck="name",
+        limit_page_length=0
+    ):
+        excluded[name] = "Updates stock"
+
+    for row in frappe.get_all(
+        invoice_type,
+        filters={"return_against": ["in", invoice_names], "docstatus": 1},
+        fields=["name", "return_against"],
+        limit_page_length=0
+    ):
+        excluded.setdefault(row.return_against, f"Return {row.name} is submitted against it")
+
+    for doctype, parent_doctype, type_field, name_field in (
+        ("Payment Entry Reference", "Payment Entry", "reference_doctype", "reference_name"),
+        ("Journal Entry Account", "Journal Entry", "reference_type", "reference_name")
+    ):
+        for row in frappe.get_all(
+            doctype,
+            filters={type_field: invoice_type, name_field: ["in", invoice_names], "docstatus": 1},
+            fields=["parent", name_field],
+            limit_page_length=0
+        ):
+            excluded.setdefault(row[name_field], f"{parent_doctype} {row.parent} is linked")
+
+    return excluded
+
+
+def get_fiscal_year_name(posting_date: str) -> Optional[str]:
+    """
+    Name of the Fiscal Year containing a date.
+
+    Args:
+        posting_date: Date (YYYY-MM-DD)
+
+    Returns:
+        Fiscal Year name, or None when no enabled Fiscal Year covers the date
+    """
+    names = frappe.get_all(
+        "Fiscal Year",
+        filters={
+            "year_start_date": ["<=", posting_date],
+            "year_end_date": [">=", posting_date],
+            "disabled": 0
+        },
+        pluck="name",
+        limit_page_length=1
+    )
+    return names[0] if names else None
+
+
+def get_gl_entries_for_vouchers(
+    invoice_type: str,
+    voucher_nos: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Fetch the live GL Entries of many vouchers in one query.
+
+    Args:
+        invoice_type: Voucher type
+        voucher_nos: Voucher names
+
+    Returns:
+        List of GL Entry rows restricted to GL_ENTRY_REVERSAL_FIELDS
+    """
+    return frappe.get_all(
+        "GL Entry",
+        filters={
+            "voucher_type": invoice_type,
+            "voucher_no": ["in", voucher_nos],
+            "is_cancelled": 0
+        },
+        fields=GL_ENTRY_REVERSAL_FIELDS,
+        order_by="voucher_no asc",
+        limit_page_length=0
+    )
+
+
+def persist_reversal_batch(
+    invoice_type: str,
+    reversals: Dict[tuple, List[Dict[str, Any]]],
+    fiscal_year: Optional[str] = None
+) -> int:
+    """
+    Write reversal GL Entries and mark originals and invoices cancelled.
+
+    The invoices' child rows (INVOICE_CHILD_DOCTYPES) get docstatus 2 with
+    them, so reports filtering child rows by docstatus drop them. Also delinks the invoices' Payment Ledger Entries, as ERPNext's cancel
+    does, and reverses their commission ledger movements.
+
+    Args:
+        invoice_type: Voucher type
+        reversals: Dict of (voucher_type, voucher_no) -> reversal lines
+        fiscal_year: Fiscal Year of the cancellation date (defaults to the
+            original entry's)
+
+    Returns:
+        Number of reversal GL Entries written
+    """
+    voucher_nos = [voucher_no for _voucher_type, voucher_no in reversals]
+    now = frappe.utils.now()
+    user = frappe.session.user
+
+    values = []
+    for entries in reversals.values():
+        for entry in entries:
+            row = dict(entry)
+            row.update({
+                "name": frappe.generate_hash(length=10),
+                "creation": now,
+                "modified": now,
+                "owner": user,
+                "modified_by": user,
+                "docstatus": 1
+            })
+            if fiscal_year:
+                row["fiscal_year"] = fiscal_year
+            values.append(tuple(row.get(field) for field in REVERSAL_INSERT_FIELDS))
+
+    frappe.db.bulk_insert("GL Entry", REVERSAL_INSERT_FIELDS, values)
+
+    frappe.db.sql("""
+        UPDATE `tabGL Entry`
+        SET is_cancelled = 1, modified = %s, modified_by = %s
+        WHERE voucher_type = %s
+        AND voucher_no IN %s
+        AND is_cancelled = 0
+    """, (now, user, invoice_type, tuple(voucher_nos)))
+
+    if frappe.db.table_exists("Payment Ledger Entry"):
+        frappe.db.sql("""
+            UPDATE `tabPayment Ledger Entry`
+            SET delinked = 1, modified = %s, modified_by = %s
+            WHERE voucher_type = %s
+            AND voucher_no IN %s
+        """, (now, user, invoice_type, tuple(voucher_nos)))
+
+    frappe.db.sql(f"""
+        UPDATE `tab{invoice_type}`
+        SET docstatus = 2, status = 'Cancelled', modified = %s, modified_by = %s
+        WHERE name IN %s
+        AND docstatus = 1
+    """, (now, user, tuple(voucher_nos)))
+
+    for child_doctype in INVOICE_CHILD_DOCTYPES[invoice_type]:
+        if not frappe.db.table_exists(child_doctype):
+            continue
+        frappe.db.sql(f"""
+            UPDATE `tab{child_doctype}`
+            SET docstatus = 2, modified = %s, modified_by = %s
+            WHERE parenttype = %s
+            AND parent IN %s
+            AND docstatus = 1
+        """, (now, user, invoice_type, tuple(voucher_nos)))
+
+    if invoice_type == "Sales Invoice":
+        reverse_commission_movements_bulk(voucher_nos)
+
+    return len(values)
+
+
+def mass_cancel_invoices(
+    invoice_type: str,
+    invoice_names: List[str],
+    cancellation_date: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Cancel many invoices with GL reversal, one transaction per batch.
+
+    Invoices that update stock or have linked submitted documents are
+    excluded up front (see get_excluded_invoices).
+
+    Process per batch:
+    1. Fetch GL Entries of every invoice in the batch with one query
+    2. Build all reversals, leaving out vouchers whose GL does not balance
+    3. Persist reversals, flag originals and invoices as cancelled
+    4. Commit (skipped when dry_run)
+
+    Args:
+        invoice_type: "Sales Invoice" or "Purchase Invoice"
+        invoice_names: Invoices to cancel
+        cancellation_date: Date for reversal entries (defaults to today)
+        batch_size: Invoices per batch
+        dry_run: Build reversals only, do not write
+
+    Returns:
+        Dict containing:
+            - cancelled: Invoice names cancelled (or cancellable in dry run)
+            - skipped: Invoice names not submitted, returns or without GL
+            - excluded: Dict of invoice -> reason to cancel it through the document
+            - failed: Dict of invoice -> errors
+            - reversal_entries: Number of reversal GL Entries
+    """
+    if invoice_type not in SUPPORTED_INVOICE_TYPES:
+        raise ValueError(f"Unsupported invoice type: {invoice_type}")
+
+    if not cancellation_date:
+        cancellation_date = str(frappe.utils.today())
+
+    submitted = get_cancellable_invoices(invoice_type, invoice_names)
+    excluded = get_excluded_invoices(invoice_type, submitted)
+    cancellable = [name for name in submitted if name not in excluded]
+    submitted_names = set(submitted)
+    result = {
+        "cancelled": [],
+        "skipped": [name for name in invoice_names if name not in submitted_names],
+        "excluded": {name: excluded[name] for name in submitted if name in excluded},
+        "failed": {},
+        "reversal_entries": 0
+    }
+    fiscal_year = get_fiscal_year_name(cancellation_date)
+
+    for start in range(0, len(cancellable), batch_size):
+        batch = cancellable[start:start + batch_size]
+
+        bulk = create_reversal_gl_entries_bulk(
+            get_gl_entries_for_vouchers(invoice_type, batch),
+            cancellation_date
+        )
+
+        for (_voucher_type, voucher_no), errors in bulk["failed"].items():
+            result["failed"][voucher_no] = errors
+
+        reversed_vouchers = {voucher_no for _voucher_type, voucher_no in bulk["reversals"]}
+        result["skipped"].extend(
+            name for name in batch
+            if name not in reversed_vouchers and name not in result["failed"]
+        )
+
+        if not bulk["reversals"]:
+            continue
+
+        if dry_run:
+            result["reversal_entries"] += sum(len(rows) for rows in bulk["reversals"].values())
+        else:
+            try:
+                result["reversal_entries"] += persist_reversal_batch(
+                    invoice_type,
+                    bulk["reversals"],
+                    fiscal_year
+                )
+                frappe.db.commit()
+            except Exception as e:
+                frappe.db.rollback()
+                frappe.log_error(
+                    message=str(e),
+                    title=f"Mass Cancellation Error - {invoice_type} batch {batch[0]}"
+                )
+                for voucher_no in reversed_vouchers:
+                    result["failed"][voucher_no] = [str(e)]
+                continue
+
+        result["cancelled"].extend(name for name in batch if name in reversed_vouchers)
+
+    frappe.logger().info(
+        f"Mass cancellation of {invoice_type}: {len(result['cancelled'])} cancelled, "
+        f"{len(result['failed'])} failed, {len(result['excluded'])} excluded, "
+        f"{len(result['skipped'])} skipped"
+    )
+
+    return result
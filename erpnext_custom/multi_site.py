@@ -0,0 +1,327 @@
+"""
+Multi-Site Executor Module
+
+This module runs a per-site maintenance function on many sites of a bench in
+a bounded pool of worker processes, instead of one site after another.
+
+Each site runs isolated in a worker process:
+- frappe.init / frappe.connect before, frappe.destroy after every attempt
+- Rollback on error, so a failed attempt leaves nothing behind
+- Per-site timeout (SIGALRM in the worker), retries on error or timeout
+
+Every site produces one structured result; run_on_all_sites returns them in
+site order and summarize_site_results aggregates them. When total_timeout
+passes, worker processes still busy on a site are terminated.
+
+Functions are passed either as a callable defined at module level of an
+importable module, or as a path ("erpnext_custom.gl_audit:audit_ledger_integrity"
+or "erpnext_custom.gl_audit.audit_ledger_integrity"), so they can be sent to
+worker processes. Functions defined in a script run as __main__ are rejected:
+workers only find them when the pool forks.
+
+Usage (from the frappe-bench/sites directory):
+    >>> from erpnext_custom.multi_site import run_on_all_sites, print_site_results
+    >>> results = run_on_all_sites(
+    ...     "erpnext_custom.gl_audit:audit_cancellation_net_effect",
+    ...     args=("2024-01-01", "2024-12-31"),
+    ...     workers=4, timeout=600, retries=1
+    ... )
+    >>> print_site_results(results)
+"""
+
+import importlib
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+import frappe
+
+
+DEFAULT_WORKERS = 4
+
+# Seconds a terminated worker gets to exit before it is killed
+TERMINATE_GRACE_SECONDS = 5
+
+# Site result statuses
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+
+
+class SiteTimeoutError(Exception):
+    """Raised in a worker when a site exceeds its timeout"""
+    pass
+
+
+def resolve_function(func: Union[str, Callable]) -> Callable:
+    """
+    Resolve a path to a callable.
+
+    Args:
+        func: Callable, "package.module:function" or "package.module.function"
+
+    Returns:
+        The callable
+    """
+    if callable(func):
+        return func
+
+    if ":" in func:
+        module_name, _, function_name = func.partition(":")
+    else:
+        module_name, _, function_name = func.rpartition(".")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _raise_timeout(signum, frame):
+    raise SiteTimeoutError("Site exceeded its timeout")
+
+
+def run_on_site(
+    site: str,
+    func: Union[str, Callable],
+    args: Sequence[Any] = (),
+    kwargs: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+    retries: int = 0,
+    commit: bool = True
+) -> Dict[str, Any]:
+    """
+    Run a function on one site, with timeout and retries.
+
+    Runs in the worker process. The timeout interrupts Python code; a single
+    long database statement is interrupted when it returns.
+
+    Args:
+        site: Site name
+        func: Callable or dotted path to run with the site connected
+        args: Positional arguments for func
+        kwargs: Keyword arguments for func
+        timeout: Seconds per attempt (no timeout when None)
+        retries: Extra attempts after an error or timeout
+        commit: Commit after a successful attempt
+
+    Returns:
+        Dict containing:
+            - site: Site name
+            - status: STATUS_SUCCESS, STATUS_FAILED or STATUS_TIMEOUT
+            - result: Return value of func (None unless successful)
+            - error: Error message of the last attempt (None if successful)
+            - attempts: Number of attempts made
+            - duration: Seconds spent on the site, all attempts included
+    """
+    func = resolve_function(func)
+    kwargs = kwargs or {}
+    started = time.monotonic()
+    result = {
+        "site": site,
+        "status": STATUS_FAILED,
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "duration": 0.0
+    }
+
+    for attempt in range(retries + 1):
+        result["attempts"] = attempt + 1
+        previous_handler = None
+
+        try:
+            frappe.init(site=site)
+            frappe.connect()
+
+            if timeout:
+                previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+
+            try:
+                value = func(*args, **kwargs)
+            finally:
+                if timeout:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+                    signal.signal(signal.SIGALRM, previous_handler)
+
+            if commit:
+                frappe.db.commit()
+
+            result.update({"status": STATUS_SUCCESS, "result": value, "error": None})
+            break
+
+        except SiteTimeoutError as e:
+            result.update({"status": STATUS_TIMEOUT, "error": str(e)})
+            _rollback()
+
+        except Exception as e:
+            result.update({"status": STATUS_FAILED, "error": str(e)})
+            _rollback()
+
+        finally:
+            frappe.destroy()
+
+    result["duration"] = round(time.monotonic() - started, 3)
+
+    return result
+
+
+def _rollback() -> None:
+    """Roll back a failed attempt if the site got connected"""
+    try:
+        frappe.db.rollback()
+    except Exception:
+        pass
+
+
+def run_on_all_sites(
+    func: Union[str, Callable],
+    sites: Optional[List[str]] = None,
+    args: Sequence[Any] = (),
+    kwargs: Optional[Dict[str, Any]] = None,
+    workers: int = DEFAULT_WORKERS,
+    timeout: Optional[float] = None,
+    retries: int = 0,
+    commit: bool = True,
+    total_timeout: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run a function on many sites in a bounded process pool.
+
+    Args:
+        func: Callable defined at module level of an importable module, or
+            path ("package.module:function")
+        sites: Site names (defaults to every site of the bench)
+        args: Positional arguments for func
+        kwargs: Keyword arguments for func
+        workers: Maximum number of sites processed at the same time
+        timeout: Seconds per site attempt
+        retries: Extra attempts per site after an error or timeout
+        commit: Commit after each successful site
+        total_timeout: Seconds for the whole run; sites not finished by then
+            are reported as timed out and their workers terminated
+
+    Returns:
+        One run_on_site result per site, in site order
+
+    Raises:
+        ValueError: If func is defined in __main__
+    """
+    if callable(func) and getattr(func, "__module__", None) == "__main__":
+        raise ValueError(
+            f"{func.__name__} is defined in __main__; move it to an importable module "
+            f"and pass it as \"module:function\""
+        )
+
+    sites = list(sites or frappe.utils.get_sites())
+    results = {}
+
+    executor = ProcessPoolExecutor(max_workers=max(1, min(workers, len(sites) or 1)))
+    try:
+        futures = {
+            executor.submit(run_on_site, site, func, args, kwargs, timeout, retries, commit): site
+            for site in sites
+        }
+
+        done, not_done = wait(futures, timeout=total_timeout)
+
+        if not_done:
+            # Stuck workers would otherwise run on, and be joined at exit
+            _terminate_workers(executor)
+
+        for future in done:
+            site = futures[future]
+            try:
+                results[site] = future.result()
+            except Exception as e:
+                # Worker crashed (e.g. killed), the site never reported back
+                results[site] = _site_error(site, STATUS_FAILED, f"Worker error: {e}")
+
+        for future in not_done:
+            site = futures[future]
+            results[site] = _site_error(site, STATUS_TIMEOUT, "Not finished within total timeout")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return [results[site] for site in sites]
+
+
+def _terminate_workers(executor: ProcessPoolExecutor) -> None:
+    """Terminate the pool's worker processes, killing those that do not exit"""
+    processes = list((executor._processes or {}).values())
+
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+    for process in processes:
+        process.join(TERMINATE_GRACE_SECONDS)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+
+def _site_error(site: str, status: str, error: str) -> Dict[str, Any]:
+    """Result for a site that did not report back from its worker"""
+    return {
+        "site": site,
+        "status": status,
+        "result": None,
+        "error": error,
+        "attempts": 0,
+        "duration": 0.0
+    }
+
+
+def summarize_site_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate per-site results.
+
+    Args:
+        results: Results from run_on_all_sites
+
+    Returns:
+        Dict containing:
+            - total: Number of sites
+            - succeeded / failed / timed_out: Site names per status
+            - retried: Site names that needed more than one attempt
+            - duration: Sum of per-site durations
+    """
+    return {
+        "total": len(results),
+        "succeeded": [r["site"] for r in results if r["status"] == STATUS_SUCCESS],
+        "failed": [r["site"] for r in results if r["status"] == STATUS_FAILED],
+        "timed_out": [r["site"] for r in results if r["status"] == STATUS_TIMEOUT],
+        "retried": [r["site"] for r in results if r["attempts"] > 1],
+        "duration": round(sum(r["duration"] for r in results), 3)
+    }
+
+
+def print_site_results(
+    results: List[Dict[str, Any]],
+    describe: Optional[Callable[[Any], str]] = None
+) -> None:
+    """
+    Print a summary block and one line per site.
+
+    Args:
+        results: Results from run_on_all_sites
+        describe: Formats a successful site's return value (optional)
+    """
+    summary = summarize_site_results(results)
+
+    print("\n" + "=" * 80)
+    print("SUMMARY")
+    print("=" * 80)
+
+    print(f"\n✅ Succeeded: {len(summary['succeeded'])} sites")
+    print(f"❌ Failed: {len(summary['failed'])} sites")
+    print(f"⏱️  Timed out: {len(summary['timed_out'])} sites\n")
+
+    for result in results:
+        if result["status"] == STATUS_SUCCESS:
+            detail = describe(result["result"]) if describe else "done"
+            print(f"✅ {result['site']}: {detail} ({result['duration']}s)")
+        elif result["status"] == STATUS_TIMEOUT:
+            print(f"⏱️  {result['site']}: {result['error']} (attempts: {result['attempts']})")
+        else:
+            print(f"❌ {result['site']}: {result['error']} (attempts: {result['attempts']})")
+
+    print("\n" + "=" * 80)
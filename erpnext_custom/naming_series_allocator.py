@@ -0,0 +1,440 @@
+"""
+Block-Reserving Naming Series Allocator
+
+Every document insert normally increments its series counter in `tabSeries`
+inside the insert's transaction, so the counter row stays locked until the
+document commits and concurrent inserts of the same series queue behind it.
+
+This module reserves a block of numbers per worker process with one short,
+separately committed update, and hands numbers out of that block from
+memory. The counter row is then locked once per block instead of once per
+document.
+
+Every block is recorded when it is reserved, in the same committed
+transaction as the counter update, so audits can tell numbers of a reserved
+block that were never used from missing documents, even when the worker was
+killed (e.g. SIGKILL on timeout) and never got to clean up. Numbers known to
+be unused (the rest of a block when the process exits cleanly, or numbers of
+inserts whose transaction rolled back) are also recorded as gaps.
+
+Allocators are kept per site (frappe.local.site). A reservation opens a
+connection to the site's database, commits and closes it again, so idle
+workers hold no extra connection; the connect costs once per block, not
+once per document.
+
+Backends:
+    FrappeSeriesBackend: `tabSeries` through short-lived connections of its own
+    SQLiteSeriesBackend: a local SQLite file (benchmarks and tests)
+
+Usage:
+    The block and gap tables are created after every migrate
+    (install_naming_series_tables in AFTER_MIGRATE, erpnext_custom.hooks).
+
+    Enable for bulk imports in the custom app's hooks.py:
+
+    doc_events = {
+        "Sales Invoice": {
+            "autoname": "erpnext_custom.naming_series_allocator.allocate_document_name"
+        }
+    }
+
+    >>> frappe.flags.use_block_allocator = True  # only inserts with this flag use blocks
+
+Benchmark:
+    python -m erpnext_custom.benchmarks.bench_naming_series
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_BLOCK_SIZE = 100
+
+DEFAULT_DIGITS = 5
+
+BLOCK_TABLE = "tabNaming Series Block"
+GAP_TABLE = "tabNaming Series Gap"
+
+# Gap reasons
+GAP_UNUSED_BLOCK = "Unused block"
+GAP_FAILED_INSERT = "Failed insert"
+
+
+class SeriesBackend:
+    """Storage of series counters and gaps"""
+
+    def reserve(self, prefix: str, count: int) -> int:
+        """
+        Atomically advance a counter by count and record the reserved block.
+
+        Returns:
+            First number of the reserved block
+        """
+        raise NotImplementedError
+
+    def record_gaps(self, gaps: List[Tuple[str, int, int, str]]) -> None:
+        """Record (prefix, from_number, to_number, reason) gaps"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Close the backend's connection (it is reopened on next use)"""
+        pass
+
+
+class FrappeSeriesBackend(SeriesBackend):
+    """
+    `tabSeries` on the site database.
+
+    Every reservation opens its own short-lived connection, commits and
+    closes it, so the counter row is never held by a document transaction
+    and no connection stays open between blocks. The connection uses the
+    configuration of the site that is current (see get_allocator, which
+    keeps one backend per site). A connection passed in is used as is and
+    left to its owner.
+    """
+
+    def __init__(self, db: Any = None, site: Optional[str] = None):
+        self.site = site
+        self._db = db
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """The injected connection, or a new one closed after use"""
+        if self._db is not None:
+            yield self._db
+            return
+
+        import frappe
+        db = frappe.database.get_db()
+        try:
+            yield db
+        finally:
+            try:
+                db.close()
+            except Exception:
+                pass
+
+    def reserve(self, prefix: str, count: int) -> int:
+        with self.connection() as db:
+            # LAST_INSERT_ID(expr) returns the new counter to this connection only
+            db.sql("""
+                INSERT INTO `tabSeries` (name, current)
+                VALUES (%s, LAST_INSERT_ID(%s))
+                ON DUPLICATE KEY UPDATE current = LAST_INSERT_ID(current + %s)
+            """, (prefix, count, count))
+            start = int(db.sql("SELECT LAST_INSERT_ID()")[0][0]) - count + 1
+            db.sql(f"""
+                INSERT INTO `{BLOCK_TABLE}` (prefix, from_number, to_number, pid, creation)
+                VALUES (%s, %s, %s, %s, NOW(6))
+            """, (prefix, start, start + count - 1, os.getpid()))
+            db.commit()
+
+        return start
+
+    def record_gaps(self, gaps: List[Tuple[str, int, int, str]]) -> None:
+        if not gaps:
+            return
+
+        with self.connection() as db:
+            db.sql(f"""
+                INSERT INTO `{GAP_TABLE}` (prefix, from_number, to_number, reason, creation)
+                VALUES {", ".join(["(%s, %s, %s, %s, NOW(6))"] * len(gaps))}
+            """, tuple(value for gap in gaps for value in gap))
+            db.commit()
+
+    def install(self) -> None:
+        """Create the block and gap tables if they do not exist"""
+        with self.connection() as db:
+            self._create_tables(db)
+
+    @staticmethod
+    def _create_tables(db: Any) -> None:
+        db.sql_ddl(f"""
+            CREATE TABLE IF NOT EXISTS `{BLOCK_TABLE}` (
+                id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                prefix VARCHAR(140) NOT NULL,
+                from_number BIGINT NOT NULL,
+                to_number BIGINT NOT NULL,
+                pid INT NOT NULL,
+                creation DATETIME(6) NOT NULL,
+                KEY prefix (prefix)
+            ) ENGINE=InnoDB
+        """)
+        db.sql_ddl(f"""
+            CREATE TABLE IF NOT EXISTS `{GAP_TABLE}` (
+                id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                prefix VARCHAR(140) NOT NULL,
+                from_number BIGINT NOT NULL,
+                to_number BIGINT NOT NULL,
+                reason VARCHAR(40) NOT NULL,
+                creation DATETIME(6) NOT NULL,
+                KEY prefix (prefix)
+            ) ENGINE=InnoDB
+        """)
+
+
+class SQLiteSeriesBackend(SeriesBackend):
+    """
+    Series counters in a local SQLite file.
+
+    Safe across processes: reservations take the database write lock
+    (BEGIN IMMEDIATE). Connections are opened per process.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._pid = os.getpid()
+        return self._connection
+
+    def install(self) -> None:
+        """Create the series, block and gap tables if they do not exist"""
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS series (
+                name TEXT PRIMARY KEY,
+                current INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS series_block (
+                prefix TEXT NOT NULL,
+                from_number INTEGER NOT NULL,
+                to_number INTEGER NOT NULL,
+                pid INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS series_gap (
+                prefix TEXT NOT NULL,
+                from_number INTEGER NOT NULL,
+                to_number INTEGER NOT NULL,
+                reason TEXT NOT NULL
+            );
+        """)
+
+    def reserve(self, prefix: str, count: int) -> int:
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("""
+                INSERT INTO series (name, current) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET current = current + excluded.current
+            """, (prefix, count))
+            start = connection.execute(
+                "SELECT current FROM series WHERE name = ?", (prefix,)
+            ).fetchone()[0] - count + 1
+            connection.execute(
+                "INSERT INTO series_block (prefix, from_number, to_number, pid) VALUES (?, ?, ?, ?)",
+                (prefix, start, start + count - 1, os.getpid())
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        return start
+
+    def record_gaps(self, gaps: List[Tuple[str, int, int, str]]) -> None:
+        if not gaps:
+            return
+
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        connection.executemany(
+            "INSERT INTO series_gap (prefix, from_number, to_number, reason) VALUES (?, ?, ?, ?)",
+            gaps
+        )
+        connection.execute("COMMIT")
+
+    def get_blocks(self, prefix: Optional[str] = None) -> List[Tuple[str, int, int]]:
+        """Reserved blocks, ordered by prefix and number"""
+        query = "SELECT prefix, from_number, to_number FROM series_block"
+        values = ()
+        if prefix:
+            query += " WHERE prefix = ?"
+            values = (prefix,)
+
+        return self.connection.execute(query + " ORDER BY prefix, from_number", values).fetchall()
+
+    def get_gaps(self, prefix: Optional[str] = None) -> List[Tuple[str, int, int, str]]:
+        """Recorded gaps, ordered by prefix and number"""
+        query = "SELECT prefix, from_number, to_number, reason FROM series_gap"
+        values = ()
+        if prefix:
+            query += " WHERE prefix = ?"
+            values = (prefix,)
+
+        return self.connection.execute(query + " ORDER BY prefix, from_number", values).fetchall()
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+
+class BlockAllocator:
+    """
+    Hands out series numbers from blocks reserved per process.
+
+    Thread-safe within a process. A process created by fork never reuses its
+    parent's blocks: blocks are dropped when the process id changes.
+    """
+
+    def __init__(self, backend: SeriesBackend, block_size: int = DEFAULT_BLOCK_SIZE):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+
+        self.backend = backend
+        self.block_size = block_size
+        self.reservations = 0
+        self._blocks: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def next_number(self, prefix: str) -> int:
+        """
+        Next number of a series.
+
+        Args:
+            prefix: Expanded series prefix (e.g. "ACC-SINV-2024-")
+
+        Returns:
+            Series number, unique across all processes sharing the backend
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._blocks = {}
+                self._pid = os.getpid()
+
+            block = self._blocks.get(prefix)
+            if not block or block[0] > block[1]:
+                start = self.backend.reserve(prefix, self.block_size)
+                block = [start, start + self.block_size - 1]
+                self._blocks[prefix] = block
+                self.reservations += 1
+
+            number = block[0]
+            block[0] += 1
+
+            return number
+
+    def next_name(self, prefix: str, digits: int = DEFAULT_DIGITS) -> str:
+        """Next document name of a series, e.g. "ACC-SINV-2024-00042" """
+        return f"{prefix}{str(self.next_number(prefix)).zfill(digits)}"
+
+    def record_failed(self, prefix: str, number: int) -> None:
+        """Record a number whose insert failed as a gap"""
+        self.backend.record_gaps([(prefix, number, number, GAP_FAILED_INSERT)])
+
+    def release(self) -> List[Tuple[str, int, int, str]]:
+        """
+        Give up the unused rest of every block, record it as a gap and close
+        the backend's connection.
+
+        Returns:
+            The recorded gaps
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Blocks belong to the parent process
+                self._blocks = {}
+                return []
+
+            gaps = [
+                (prefix, block[0], block[1], GAP_UNUSED_BLOCK)
+                for prefix, block in self._blocks.items()
+                if block[0] <= block[1]
+            ]
+            self._blocks = {}
+
+        try:
+            self.backend.record_gaps(gaps)
+        finally:
+            self.backend.close()
+
+        return gaps
+
+
+# Allocators of this process per site
+_allocators: Dict[str, BlockAllocator] = {}
+_allocators_lock = threading.Lock()
+
+
+def get_allocator(site: Optional[str] = None, block_size: int = DEFAULT_BLOCK_SIZE) -> BlockAllocator:
+    """
+    Allocator of a site's database, one per site and process.
+
+    Blocks are reserved in that site's `tabSeries`, so sites sharing a worker
+    process never hand out each other's numbers. Each block is recorded when
+    it is reserved; the unused rest is also recorded as a gap when the
+    process exits cleanly.
+
+    Args:
+        site: Site name (defaults to frappe.local.site)
+        block_size: Numbers per block for a new allocator
+
+    Returns:
+        The site's BlockAllocator
+    """
+    if site is None:
+        import frappe
+        site = frappe.local.site
+
+    with _allocators_lock:
+        allocator = _allocators.get(site)
+        if allocator is None:
+            allocator = BlockAllocator(FrappeSeriesBackend(site=site), block_size)
+            _allocators[site] = allocator
+            atexit.register(allocator.release)
+
+    return allocator
+
+
+def install_naming_series_tables() -> None:
+    """
+    Create the block and gap tables of the connected site (after_migrate).
+
+    DDL commits implicitly, so this never runs from document hooks.
+    Re-running is a no-op.
+    """
+    import frappe
+
+    FrappeSeriesBackend(frappe.db).install()
+
+
+def allocate_document_name(doc: Any, method: Optional[str] = None) -> None:
+    """
+    autoname hook: name documents from reserved blocks during bulk imports.
+
+    Only active while frappe.flags.use_block_allocator is set; otherwise
+    Frappe's standard naming runs. Setting the name here makes Frappe skip
+    its own naming_series lookup, so `tabSeries` is only touched per block.
+
+    If the transaction of the insert rolls back, the number is recorded as a
+    failed-insert gap (frappe.db.after_rollback).
+
+    Args:
+        doc: Document being inserted (with naming_series)
+        method: Hook method name (not used)
+    """
+    import frappe
+    from frappe.model.naming import parse_naming_series
+
+    if not frappe.flags.use_block_allocator or not doc.get("naming_series") or doc.get("amended_from"):
+        return
+
+    digits = doc.naming_series.count("#") or DEFAULT_DIGITS
+    prefix = parse_naming_series(doc.naming_series.replace("#", "").rstrip("."), doc=doc)
+    allocator = get_allocator()
+    number = allocator.next_number(prefix)
+
+    frappe.db.after_rollback.add(lambda: allocator.record_failed(prefix, number))
+    doc.name = f"{prefix}{str(number).zfill(digits)}"
+
@@ -0,0 +1,281 @@
+"""
+Naming Series Audit Module
+
+This module checks the naming series counters in `tabSeries` against the
+documents that actually exist, for every DocType with a naming_series field,
+and moves counters that fell behind forward in one batch.
+
+A counter behind the highest number in use makes the next insert fail with a
+duplicate name (e.g. after imports or restores). The audit is driven by the
+prefixes in `tabSeries`: per prefix, one statement reads MAX(name) of every
+DocType over the primary-key range of names continuing the prefix with a
+digit, and the number is parsed from the name in Python. No document names
+are scanned beyond the last one of each prefix.
+
+Rules:
+- Only documents with a naming_series value count
+- Amended documents (amended_from set) are skipped, their names reuse the
+  number of the original
+- Counters are only moved forward (GREATEST), never back
+- The number is the digits right after the prefix, so prefixes ending in a
+  digit (e.g. "INV-2024") work too
+- Numbers are compared as names, so they must have a fixed width, as frappe
+  pads them (a number grown past its padding sorts below the padded ones)
+- Prefixes missing from `tabSeries` are only audited when passed in
+- The counter holds the last number used (frappe names the next document
+  current + 1), so a correct counter equals the highest number in use
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.naming_series_audit import audit_naming_series
+    >>> audit_naming_series()              # report only
+    >>> audit_naming_series(apply=True)    # also correct counters
+    >>> audit_naming_series(prefixes=["HR-EMP-"], all_series=False)   # one prefix only
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+import frappe
+
+
+# Series statuses
+SERIES_OK = "ok"
+SERIES_BEHIND = "behind"
+SERIES_MISSING = "missing"
+SERIES_AHEAD = "ahead"
+
+# Number at the start of what follows the prefix in a name
+SERIES_NUMBER_PATTERN = re.compile(r"[0-9]+")
+
+
+def get_naming_series_doctypes() -> List[Dict[str, Any]]:
+    """
+    DocTypes that have a naming_series field (standard or custom).
+
+    Returns:
+        List of dicts with doctype and is_submittable
+    """
+    return frappe.db.sql("""
+        SELECT dt.name AS doctype, dt.is_submittable
+        FROM `tabDocType` dt
+        WHERE dt.issingle = 0
+        AND dt.istable = 0
+        AND IFNULL(dt.is_virtual, 0) = 0
+        AND (
+            EXISTS (
+                SELECT 1 FROM `tabDocField` df
+                WHERE df.parent = dt.name AND df.fieldname = 'naming_series'
+            )
+            OR EXISTS (
+                SELECT 1 FROM `tabCustom Field` cf
+                WHERE cf.dt = dt.name AND cf.fieldname = 'naming_series'
+            )
+        )
+        ORDER BY dt.name
+    """, as_dict=True)
+
+
+def get_series_counters(prefixes: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Counters of every prefix in `tabSeries`.
+
+    Args:
+        prefixes: Only read these prefixes (optional)
+
+    Returns:
+        Dict of prefix -> current
+    """
+    if prefixes is not None:
+        if not prefixes:
+            return {}
+        rows = frappe.db.sql(
+            "SELECT name, current FROM `tabSeries` WHERE name IN %s", (tuple(prefixes),), as_dict=True
+        )
+    else:
+        rows = frappe.db.sql("SELECT name, current FROM `tabSeries`", as_dict=True)
+
+    return {row["name"]: row["current"] for row in rows}
+
+
+def build_prefix_query(doctypes: List[Dict[str, Any]]) -> str:
+    """
+    Build the query for the highest name of one prefix in every DocType.
+
+    Each DocType contributes one MAX(name) over the primary-key range of
+    names that continue the prefix with a digit (%(start)s = prefix + "0",
+    %(end)s = prefix + "A"; digits sort before letters in the binary and
+    the case-insensitive collations), so the database reads one index range
+    per DocType instead of every name.
+
+    Args:
+        doctypes: Rows from get_naming_series_doctypes
+
+    Returns:
+        SQL returning one name (NULL when the DocType has none) per DocType
+    """
+    per_doctype = []
+    for row in doctypes:
+        amended_condition = "AND amended_from IS NULL" if row["is_submittable"] else ""
+        per_doctype.append(f"""
+            SELECT MAX(name) AS name
+            FROM `tab{row["doctype"]}`
+            WHERE name >= %(start)s
+            AND name < %(end)s
+            AND IFNULL(naming_series, '') != ''
+            {amended_condition}
+        """)
+
+    return " UNION ALL ".join(per_doctype)
+
+
+def parse_series_number(name: Optional[str], prefix: str) -> Optional[int]:
+    """
+    Number of a document name in a series.
+
+    Args:
+        name: Document name, e.g. "ACC-SINV-2024-00042" (or None)
+        prefix: Series prefix, e.g. "ACC-SINV-2024-"
+
+    Returns:
+        The digits following the prefix as int, or None if there are none
+    """
+    match = SERIES_NUMBER_PATTERN.match(name[len(prefix):]) if name else None
+    return int(match.group()) if match else None
+
+
+def get_max_used(doctypes: List[Dict[str, Any]], prefix: str) -> Optional[int]:
+    """
+    Highest number of a prefix used by any DocType.
+
+    Args:
+        doctypes: Rows from get_naming_series_doctypes
+        prefix: Series prefix
+
+    Returns:
+        Highest number in use, or None if no document uses the prefix
+    """
+    rows = frappe.db.sql(
+        build_prefix_query(doctypes),
+        {"start": f"{prefix}0", "end": f"{prefix}A"},
+        as_dict=True
+    )
+    numbers = [
+        number for number in (parse_series_number(row["name"], prefix) for row in rows)
+        if number is not None
+    ]
+    return max(numbers) if numbers else None
+
+
+def classify_series(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compare the highest number in use with the counter of every prefix.
+
+    Args:
+        rows: Rows with prefix, max_used and current
+
+    Returns:
+        List of dicts with prefix, max_used, current and status
+            (SERIES_OK, SERIES_BEHIND, SERIES_MISSING or SERIES_AHEAD)
+    """
+    series = []
+
+    for row in rows:
+        max_used = int(row["max_used"] or 0)
+        current = row["current"]
+
+        if current is None:
+            status = SERIES_MISSING
+        elif int(current) < max_used:
+            status = SERIES_BEHIND
+        elif int(current) > max_used:
+            status = SERIES_AHEAD
+        else:
+            status = SERIES_OK
+
+        series.append({
+            "prefix": row["prefix"],
+            "max_used": max_used,
+            "current": None if current is None else int(current),
+            "status": status
+        })
+
+    return series
+
+
+def apply_series_corrections(series: List[Dict[str, Any]]) -> int:
+    """
+    Move behind or missing counters to the highest number in use.
+
+    One multi-row upsert; GREATEST keeps counters that moved on meanwhile.
+
+    Args:
+        series: Output of classify_series
+
+    Returns:
+        Number of counters written
+    """
+    corrections = [
+        row for row in series
+        if row["status"] in (SERIES_BEHIND, SERIES_MISSING)
+    ]
+    if not corrections:
+        return 0
+
+    frappe.db.sql(f"""
+        INSERT INTO `tabSeries` (name, current)
+        VALUES {", ".join(["(%s, %s)"] * len(corrections))}
+        ON DUPLICATE KEY UPDATE current = GREATEST(current, VALUES(current))
+    """, tuple(value for row in corrections for value in (row["prefix"], row["max_used"])))
+
+    return len(corrections)
+
+
+def audit_naming_series(
+    apply: bool = False,
+    prefixes: Optional[List[str]] = None,
+    all_series: bool = True
+) -> Dict[str, Any]:
+    """
+    Audit every naming series of the connected site.
+
+    Args:
+        apply: Correct behind and missing counters (commit is left to the caller)
+        prefixes: Prefixes to audit even if they have no `tabSeries` row
+            (reported as missing when documents use them)
+        all_series: Also audit every prefix in `tabSeries`; False audits
+            only the passed prefixes
+
+    Returns:
+        Dict containing:
+            - site: Site name
+            - doctypes: Number of DocTypes audited
+            - series: Every prefix in use with max_used, current and status
+            - behind: Prefixes whose counter is behind or missing
+            - corrected: Number of counters written (0 unless apply)
+    """
+    doctypes = get_naming_series_doctypes()
+    counters = get_series_counters(None if all_series else list(prefixes or []))
+    rows = []
+
+    if doctypes:
+        for prefix in sorted(set(counters) | set(prefixes or [])):
+            max_used = get_max_used(doctypes, prefix)
+            if max_used is not None:
+                rows.append({"prefix": prefix, "max_used": max_used, "current": counters.get(prefix)})
+
+    series = classify_series(rows)
+
+    behind = [
+        row["prefix"] for row in series
+        if row["status"] in (SERIES_BEHIND, SERIES_MISSING)
+    ]
+
+    corrected = apply_series_corrections(series) if apply else 0
+
+    return {
+        "site": frappe.local.site,
+        "doctypes": len(doctypes),
+        "series": series,
+        "behind": behind,
+        "corrected": corrected
+    }
@@ -0,0 +1,178 @@
+"""
+Query Counter Module
+
+This module counts the database statements run inside a block: how many,
+how long they took and how often each statement shape repeated. The shape of
+a statement is its text with literals and placeholder lists collapsed, so a
+lookup issued once per document row shows up as one shape with a count equal
+to the number of rows - the usual sign of an N+1 query.
+
+A block that runs more statements than max_queries, or one shape more than
+max_repeats times, violates its budget; check() raises QueryBudgetExceeded.
+Statements inside counter.paused() are not counted, e.g. those of another
+document's submit that the block triggers but does not own.
+
+This module does not need frappe; hook_metrics applies it to frappe.db
+inside the document hooks.
+
+Usage:
+    from erpnext_custom.query_counter import QueryCounter
+
+    with QueryCounter(frappe.db, max_queries=100, max_repeats=10) as counter:
+        validate(doc)
+    counter.check()
+"""
+
+import re
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+DEFAULT_MAX_QUERIES = 200
+DEFAULT_MAX_REPEATS = 20
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_PLACEHOLDER = re.compile(r"%\([A-Za-z_][A-Za-z0-9_]*\)s|%s|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a block runs more queries than its budget allows"""
+    pass
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(query: str) -> str:
+    """
+    Shape of a SQL statement: literals and placeholders become ?, lists of
+    them (?) and whitespace is collapsed.
+
+    >>> statement_shape("SELECT qty FROM `tabItem` WHERE name IN ('A', 'B') AND idx > 3")
+    'SELECT qty FROM `tabItem` WHERE name IN (?) AND idx > ?'
+    """
+    shape = _STRING_LITERAL.sub("?", str(query))
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _VALUE_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryCounter:
+    """
+    Counts the statements passed to a database object's query method while
+    the with block runs.
+
+    The method is wrapped on the instance and restored on exit, so counters
+    can be nested; an inner block's statements count for the outer one too.
+    """
+
+    def __init__(
+        self,
+        db: Any,
+        max_queries: int = DEFAULT_MAX_QUERIES,
+        max_repeats: int = DEFAULT_MAX_REPEATS,
+        method: str = "sql"
+    ):
+        self.db = db
+        self.method = method
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Dict[str, int] = {}
+        self._saved = None
+        self._paused = 0
+
+    def __enter__(self):
+        original = getattr(self.db, self.method)
+        self._saved = self.db.__dict__.get(self.method, _MISSING)
+
+        def counted(query, *args, **kwargs):
+            if self._paused:
+                return original(query, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return original(query, *args, **kwargs)
+            finally:
+                self.record(query, time.perf_counter() - started)
+
+        setattr(self.db, self.method, counted)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._saved is _MISSING:
+            delattr(self.db, self.method)
+        else:
+            setattr(self.db, self.method, self._saved)
+        return False
+
+    @contextmanager
+    def paused(self) -> Iterator["QueryCounter"]:
+        """Stop counting while the with block runs"""
+        self._paused += 1
+        try:
+            yield self
+        finally:
+            self._paused -= 1
+
+    def record(self, query: str, seconds: float) -> None:
+        """Count one statement"""
+        shape = statement_shape(query)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        self.count += 1
+        self.seconds += seconds
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Shapes run more than max_repeats times, most frequent first"""
+        return sorted(
+            ((shape, count) for shape, count in self.shapes.items() if count > self.max_repeats),
+            key=lambda entry: -entry[1]
+        )
+
+    def violations(self) -> List[str]:
+        """Descriptions of every exceeded threshold"""
+        messages = []
+
+        if self.count > self.max_queries:
+            messages.append(f"{self.count} queries (limit {self.max_queries})")
+
+        for shape, count in self.repeated():
+            messages.append(f"{count}x {shape[:200]} (limit {self.max_repeats})")
+
+        return messages
+
+    def check(self) -> None:
+        """
+        Raise when the budget was exceeded.
+
+        Raises:
+            QueryBudgetExceeded: With all violations in the message
+        """
+        violations = self.violations()
+        if violations:
+            raise QueryBudgetExceeded("; ".join(violations))
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the counted statements.
+
+        Returns:
+            Dict containing:
+                - queries: Number of statements
+                - seconds: Total time spent in them
+                - distinct_shapes: Number of distinct statement shapes
+                - repeated: (shape, count) pairs over max_repeats
+        """
+        return {
+            "queries": self.count,
+            "seconds": round(self.seconds, 6),
+            "distinct_shapes": len(self.shapes),
+            "repeated": self.repeated()
+        }
+
+
+_MISSING = object()
@@ -0,0 +1,113 @@
+"""
+Request Profiler Module
+
+This module runs the sampling profiler (see sampling_profiler) over single
+web requests and writes one collapsed-stack file per profiled request, ready
+for flamegraph.pl or speedscope.
+
+A request is profiled when either
+- the site config enables it for every request:
+    bench --site [site-name] set-config erpnext_custom_profiler 1
+- or a System Manager sends the X-Erpnext-Custom-Profile: 1 header.
+
+The sampling interval is erpnext_custom_profiler_interval seconds (default
+0.005). Files go to [site]/profiles/ or the directory set in
+erpnext_custom_profiler_dir, and the response names the file in the
+X-Erpnext-Custom-Profile-File header. Requests that are not profiled pay one
+config and one header lookup.
+
+Usage:
+    Add this to your ERPNext custom app's hooks.py file:
+
+    before_request = ["erpnext_custom.request_profiler.before_request"]
+    after_request = ["erpnext_custom.request_profiler.after_request"]
+"""
+
+import os
+import re
+import threading
+import frappe
+
+from .sampling_profiler import SamplingProfiler, DEFAULT_INTERVAL
+
+
+# Site config keys
+CONFIG_ENABLED = "erpnext_custom_profiler"
+CONFIG_INTERVAL = "erpnext_custom_profiler_interval"
+CONFIG_DIRECTORY = "erpnext_custom_profiler_dir"
+
+PROFILE_HEADER = "X-Erpnext-Custom-Profile"
+PROFILE_FILE_HEADER = "X-Erpnext-Custom-Profile-File"
+PROFILER_ROLE = "System Manager"
+
+_UNSAFE_FILE_CHARACTERS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def should_profile() -> bool:
+    """
+    Whether the current request is profiled.
+
+    The header is only honoured for System Managers, so other users cannot
+    switch sampling on.
+    """
+    conf = frappe.conf or {}
+    if conf.get(CONFIG_ENABLED):
+        return True
+
+    header = frappe.get_request_header(PROFILE_HEADER)
+    if not header or header in ("0", "false"):
+        return False
+    return PROFILER_ROLE in frappe.get_roles()
+
+
+def before_request() -> None:
+    """Start sampling the request thread when the request is profiled"""
+    try:
+        if not should_profile():
+            return
+
+        interval = float((frappe.conf or {}).get(CONFIG_INTERVAL) or DEFAULT_INTERVAL)
+        frappe.local.erpnext_custom_profiler = SamplingProfiler(interval, threading.get_ident()).start()
+    except Exception as e:
+        # Profiling must never break a request
+        frappe.logger().warning(f"Request profiler failed to start: {str(e)}")
+
+
+def after_request(response=None, request=None) -> None:
+    """Stop sampling and write the request's collapsed stacks"""
+    profiler = getattr(frappe.local, "erpnext_custom_profiler", None)
+    if profiler is None:
+        return
+    frappe.local.erpnext_custom_profiler = None
+
+    try:
+        profiler.stop()
+        path = write_profile(profiler, getattr(request, "path", None) or "request")
+        if response is not None:
+            response.headers[PROFILE_FILE_HEADER] = os.path.basename(path)
+    except Exception as e:
+        frappe.logger().warning(f"Request profiler failed to write: {str(e)}")
+
+
+def get_profile_path(label: str) -> str:
+    """File for one profile of the current site, named by time, label and pid"""
+    directory = (frappe.conf or {}).get(CONFIG_DIRECTORY) or frappe.get_site_path("profiles")
+    timestamp = frappe.utils.now().replace(" ", "T").replace(":", "")[:17]
+    label = _UNSAFE_FILE_CHARACTERS.sub("_", label).strip("_")[:80] or "request"
+    return os.path.join(directory, f"{timestamp}-{label}-{os.getpid()}.folded")
+
+
+def write_profile(profiler: SamplingProfiler, label: str) -> str:
+    """
+    Write a profiler's collapsed stacks to the site's profile directory.
+
+    Args:
+        profiler: Stopped profiler
+        label: Name of what was profiled, e.g. the request path
+
+    Returns:
+        Path written
+    """
+    path = get_profile_path(label)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return profiler.write(path)
@@ -0,0 +1,117 @@
+"""
+Return Custom Fields Module
+
+This module holds the custom fields of the Purchase Return and Debit Note
+features (Purchase Receipt and Purchase Invoice, with their item tables) and
+applies them to the connected site through erpnext_custom.schema_sync, so
+a site whose stored checksums match and whose fields are all in place is
+left untouched.
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.return_custom_fields import sync_return_custom_fields
+    >>> sync_return_custom_fields()
+
+    All sites in parallel:
+    ../env/bin/python ../apps/erpnext_custom/scripts/create-return-custom-fields.py --all --workers 4
+"""
+
+from typing import Any, Dict, List
+
+from .schema_sync import custom_fields_definition, sync_definitions
+
+
+# Custom fields for Purchase Receipt (Purchase Return)
+PURCHASE_RECEIPT_CUSTOM_FIELDS = {
+    'Purchase Receipt': [
+        {
+            'fieldname': 'custom_return_notes',
+            'label': 'Return Notes',
+            'fieldtype': 'Text Editor',
+            'insert_after': 'remarks',
+            'depends_on': 'eval:doc.is_return==1',
+            'description': 'Additional notes for purchase return',
+            'module': 'Batasku Custom',
+        }
+    ],
+    'Purchase Receipt Item': [
+        {
+            'fieldname': 'custom_return_reason',
+            'label': 'Return Reason',
+            'fieldtype': 'Select',
+            'options': '\nDamaged\nQuality Issue\nWrong Item\nSupplier Request\nExpired\nOther',
+            'insert_after': 'item_name',
+            'depends_on': 'eval:parent.is_return==1',
+            'description': 'Reason for returning this item',
+            'module': 'Batasku Custom',
+        },
+        {
+            'fieldname': 'custom_return_item_notes',
+            'label': 'Return Item Notes',
+            'fieldtype': 'Small Text',
+            'insert_after': 'custom_return_reason',
+            'depends_on': 'eval:parent.is_return==1',
+            'description': 'Additional notes for this return item (required for "Other" reason)',
+            'module': 'Batasku Custom',
+        }
+    ]
+}
+
+# Custom fields for Purchase Invoice (Debit Note)
+PURCHASE_INVOICE_CUSTOM_FIELDS = {
+    'Purchase Invoice': [
+        {
+            'fieldname': 'custom_return_notes',
+            'label': 'Return Notes',
+            'fieldtype': 'Text Editor',
+            'insert_after': 'remarks',
+            'depends_on': 'eval:doc.is_return==1',
+            'description': 'Additional notes for debit note',
+            'module': 'Batasku Custom',
+        }
+    ],
+    'Purchase Invoice Item': [
+        {
+            'fieldname': 'custom_return_reason',
+            'label': 'Return Reason',
+            'fieldtype': 'Select',
+            'options': '\nDamaged\nQuality Issue\nWrong Item\nSupplier Request\nExpired\nOther',
+            'insert_after': 'item_name',
+            'depends_on': 'eval:parent.is_return==1',
+            'description': 'Reason for returning this item',
+            'module': 'Batasku Custom',
+        },
+        {
+            'fieldname': 'custom_return_item_notes',
+            'label': 'Return Item Notes',
+            'fieldtype': 'Small Text',
+            'insert_after': 'custom_return_reason',
+            'depends_on': 'eval:parent.is_return==1',
+            'description': 'Additional notes for this return item (required for "Other" reason)',
+            'module': 'Batasku Custom',
+        }
+    ]
+}
+
+
+def get_custom_field_definitions() -> List[Dict[str, Any]]:
+    """Checksummed manifests of all return custom fields"""
+    return [
+        custom_fields_definition("Purchase Return", PURCHASE_RECEIPT_CUSTOM_FIELDS),
+        custom_fields_definition("Debit Note", PURCHASE_INVOICE_CUSTOM_FIELDS)
+    ]
+
+
+def sync_return_custom_fields(force: bool = False) -> Dict[str, Any]:
+    """
+    Create or update the changed return custom fields on the connected site.
+
+    Args:
+        force: Apply every manifest even if its checksum is unchanged
+
+    Returns:
+        Dict containing:
+            - changed: Keys of applied manifests
+            - unchanged: Keys of skipped manifests
+    """
+    return sync_definitions(get_custom_field_definitions(), force=force)
@@ -0,0 +1,219 @@
+"""
+Bulk Sales Return Submission
+
+This module submits many Sales Returns at once and posts their stock with one
+consolidated Material Receipt per (company, warehouse, posting_date), instead
+of one Stock Entry per return.
+
+Everything runs in one transaction: if any return or Stock Entry fails, the
+whole batch is rolled back. Every return keeps its own link in the
+`stock_entry` field, pointing at the consolidated entry that received it.
+
+Returns whose items go to more than one warehouse get a Material Receipt of
+their own, so each return is linked to exactly one Stock Entry.
+
+Cancelling a return whose Stock Entry was shared with other returns never
+cancels that entry; a Material Issue for the cancelled return's items is
+posted instead (see reverse_shared_stock_entry).
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.sales_return.bulk_submit import bulk_submit_sales_returns
+    >>> bulk_submit_sales_returns(["SR-00001", "SR-00002", "SR-00003"])
+"""
+
+from typing import Any, Dict, List
+import frappe
+from frappe import _
+
+
+# Set on a Sales Return to make on_submit skip its own Stock Entry
+SKIP_STOCK_ENTRY_FLAG = "skip_stock_entry"
+
+
+def group_returns_for_stock_entry(returns: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Group Sales Returns into consolidated Material Receipts.
+
+    Args:
+        returns: Sales Return documents (items with item_code, qty, uom,
+            warehouse, rate, amount)
+
+    Returns:
+        List of dicts, in first-seen order, containing:
+            - company: Company of the Stock Entry
+            - posting_date: Posting date of the Stock Entry
+            - warehouse: Target warehouse (None for mixed-warehouse returns)
+            - returns: Names of the Sales Returns in the group
+            - items: Stock Entry item rows
+    """
+    groups = {}
+
+    for doc in returns:
+        warehouses = {item.warehouse for item in doc.items}
+        warehouse = warehouses.pop() if len(warehouses) == 1 else None
+
+        # Mixed-warehouse returns are never merged with other returns
+        key = (doc.company, str(doc.posting_date), warehouse or doc.name)
+
+        group = groups.setdefault(key, {
+            "company": doc.company,
+            "posting_date": doc.posting_date,
+            "warehouse": warehouse,
+            "returns": [],
+            "items": []
+        })
+        group["returns"].append(doc.name)
+
+        for item in doc.items:
+            group["items"].append({
+                "item_code": item.item_code,
+                "qty": item.qty,
+                "uom": item.uom,
+                "t_warehouse": item.warehouse,  # Target warehouse (receiving)
+                "basic_rate": item.rate,
+                "basic_amount": item.amount,
+                "allow_zero_valuation_rate": 0
+            })
+
+    return list(groups.values())
+
+
+def create_consolidated_stock_entry(group: Dict[str, Any]) -> str:
+    """
+    Create and submit one Material Receipt for a group of Sales Returns.
+
+    Args:
+        group: One group from group_returns_for_stock_entry
+
+    Returns:
+        Name of the submitted Stock Entry
+    """
+    stock_entry = frappe.new_doc("Stock Entry")
+    stock_entry.stock_entry_type = "Material Receipt"
+    stock_entry.company = group["company"]
+    stock_entry.posting_date = group["posting_date"]
+    stock_entry.posting_time = frappe.utils.nowtime()
+    stock_entry.set_posting_time = 1
+    stock_entry.remarks = f"Created from Sales Returns: {', '.join(group['returns'])}"
+
+    for item in group["items"]:
+        stock_entry.append("items", item)
+
+    stock_entry.insert()
+    stock_entry.submit()
+
+    # Link every return of the group with one statement
+    frappe.db.sql("""
+        UPDATE `tabSales Return`
+        SET stock_entry = %s
+        WHERE name IN %s
+    """, (stock_entry.name, tuple(group["returns"])))
+
+    return stock_entry.name
+
+
+def bulk_submit_sales_returns(return_names: List[str]) -> Dict[str, Any]:
+    """
+    Submit many Sales Returns with consolidated Material Receipts.
+
+    Process:
+    1. Submit every return (validation and returned quantity index run as
+       usual, the per-return Stock Entry is skipped)
+    2. Group the returns by company, warehouse and posting date
+    3. Post one Material Receipt per group and link it to its returns
+    4. Commit once; roll back everything on any error
+
+    Args:
+        return_names: Draft Sales Returns to submit
+
+    Returns:
+        Dict containing:
+            - submitted: Names of the submitted Sales Returns
+            - stock_entries: Dict of Stock Entry name -> Sales Return names
+    """
+    result = {"submitted": [], "stock_entries": {}}
+
+    try:
+        returns = []
+        for name in return_names:
+            doc = frappe.get_doc("Sales Return", name)
+            doc.flags[SKIP_STOCK_ENTRY_FLAG] = True
+            doc.submit()
+            returns.append(doc)
+            result["submitted"].append(name)
+
+        for group in group_returns_for_stock_entry(returns):
+            stock_entry_name = create_consolidated_stock_entry(group)
+            result["stock_entries"][stock_entry_name] = group["returns"]
+
+        frappe.db.commit()
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(
+            message=str(e),
+            title="Bulk Sales Return Submission Error"
+        )
+        frappe.throw(_("Bulk submission rolled back: {0}").format(str(e)))
+
+    frappe.msgprint(_("{0} Sales Returns submitted with {1} Stock Entries").format(
+        len(result["submitted"]), len(result["stock_entries"])
+    ))
+
+    return result
+
+
+def is_shared_stock_entry(stock_entry_name: str, return_name: str) -> bool:
+    """
+    Check whether other Sales Returns are linked to a Stock Entry.
+
+    Cancelled returns count too: once one return of a consolidated entry was
+    reversed with a Material Issue, cancelling the whole entry for the last
+    return would reverse that return's stock a second time.
+
+    Args:
+        stock_entry_name: Stock Entry linked to the return
+        return_name: Sales Return being cancelled
+
+    Returns:
+        True if the Stock Entry also received other returns
+    """
+    return bool(frappe.db.count("Sales Return", {
+        "stock_entry": stock_entry_name,
+        "name": ["!=", return_name]
+    }))
+
+
+def reverse_shared_stock_entry(doc: Any) -> str:
+    """
+    Post a Material Issue for one return of a consolidated Material Receipt.
+
+    Args:
+        doc: Sales Return document being cancelled
+
+    Returns:
+        Name of the submitted Material Issue
+    """
+    stock_entry = frappe.new_doc("Stock Entry")
+    stock_entry.stock_entry_type = "Material Issue"
+    stock_entry.company = doc.company
+    stock_entry.posting_date = frappe.utils.today()
+    stock_entry.posting_time = frappe.utils.nowtime()
+    stock_entry.remarks = f"Reversal of cancelled Sales Return: {doc.name}"
+
+    for item in doc.items:
+        stock_entry.append("items", {
+            "item_code": item.item_code,
+            "qty": item.qty,
+            "uom": item.uom,
+            "s_warehouse": item.warehouse,  # Source warehouse (issuing)
+            "basic_rate": item.rate,
+            "basic_amount": item.amount,
+            "allow_zero_valuation_rate": 0
+        })
+
+    stock_entry.insert()
+    stock_entry.submit()
+
+    return stock_entry.name
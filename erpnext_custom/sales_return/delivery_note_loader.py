@@ -0,0 +1,157 @@
+"""
+Delivery Note Loader for Sales Returns
+
+This module reads only the Delivery Note fields Sales Returns need, instead of
+loading the full document with all child tables through frappe.get_doc.
+
+Headers and items are cached on frappe.local, so they are fetched once per
+request even when validation, submit and the returns API all ask for the same
+Delivery Note. The cache is released with the request.
+
+Usage:
+    >>> from erpnext_custom.sales_return.delivery_note_loader import get_remaining_returnable_qty
+    >>> get_remaining_returnable_qty("DN-00001")
+    [{'name': 'a1b2c3', 'item_code': 'ITEM-001', 'delivered_qty': 10.0,
+      'returned_qty': 4.0, 'remaining_qty': 6.0, ...}]
+
+    API (for the returns UI):
+    GET /api/method/erpnext_custom.sales_return.delivery_note_loader.get_returnable_items?delivery_note=DN-00001
+"""
+
+from typing import Any, Dict, List, Optional
+import frappe
+from frappe import _
+
+from erpnext_custom.sales_return.returned_qty_index import get_returned_qty
+
+
+HEADER_FIELDS = ["name", "docstatus", "customer", "company", "posting_date"]
+
+ITEM_FIELDS = ["name", "idx", "item_code", "item_name", "qty", "uom", "rate", "warehouse"]
+
+# Attribute on frappe.local holding the request-scoped cache
+CACHE_KEY = "sales_return_delivery_notes"
+
+
+def _get_cache() -> Dict[str, Dict[str, Any]]:
+    """Request-scoped cache of delivery_note -> {header, items}"""
+    cache = getattr(frappe.local, CACHE_KEY, None)
+    if cache is None:
+        cache = {}
+        setattr(frappe.local, CACHE_KEY, cache)
+
+    return cache
+
+
+def clear_delivery_note_cache(delivery_note: Optional[str] = None) -> None:
+    """
+    Drop cached data of one Delivery Note, or of all when omitted.
+
+    Args:
+        delivery_note: Delivery Note name (optional)
+    """
+    cache = _get_cache()
+    if delivery_note:
+        cache.pop(delivery_note, None)
+    else:
+        cache.clear()
+
+
+def get_delivery_note_header(delivery_note: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the Delivery Note header fields Sales Returns need.
+
+    Args:
+        delivery_note: Delivery Note name
+
+    Returns:
+        Dict restricted to HEADER_FIELDS, or None if it does not exist
+    """
+    entry = _get_cache().setdefault(delivery_note, {})
+    if "header" not in entry:
+        entry["header"] = frappe.db.get_value(
+            "Delivery Note",
+            delivery_note,
+            HEADER_FIELDS,
+            as_dict=True
+        )
+
+    return entry["header"]
+
+
+def get_delivery_note_items(delivery_note: str) -> List[Dict[str, Any]]:
+    """
+    Read the Delivery Note Items with one narrow query.
+
+    Args:
+        delivery_note: Delivery Note name
+
+    Returns:
+        List of item dicts restricted to ITEM_FIELDS, in row order
+    """
+    entry = _get_cache().setdefault(delivery_note, {})
+    if "items" not in entry:
+        entry["items"] = frappe.get_all(
+            "Delivery Note Item",
+            filters={"parent": delivery_note, "parenttype": "Delivery Note"},
+            fields=ITEM_FIELDS,
+            order_by="idx asc",
+            limit_page_length=0
+        )
+
+    return entry["items"]
+
+
+def get_remaining_returnable_qty(delivery_note: str) -> List[Dict[str, Any]]:
+    """
+    Remaining returnable quantity of every line of a Delivery Note.
+
+    Uses the cached items and one keyed lookup in the returned quantity index.
+
+    Args:
+        delivery_note: Delivery Note name
+
+    Returns:
+        List of item dicts with, in addition to ITEM_FIELDS:
+            - delivered_qty: Quantity delivered
+            - returned_qty: Quantity returned by submitted Sales Returns
+            - remaining_qty: Quantity that can still be returned
+    """
+    items = get_delivery_note_items(delivery_note)
+    returned_qty = get_returned_qty([item["name"] for item in items])
+
+    lines = []
+    for item in items:
+        delivered_qty = float(item["qty"] or 0)
+        returned = returned_qty[item["name"]]
+        line = dict(item)
+        line.update({
+            "delivered_qty": delivered_qty,
+            "returned_qty": returned,
+            "remaining_qty": max(delivered_qty - returned, 0.0)
+        })
+        lines.append(line)
+
+    return lines
+
+
+@frappe.whitelist()
+def get_returnable_items(delivery_note: str) -> List[Dict[str, Any]]:
+    """
+    API: remaining returnable quantity per line for the returns UI.
+
+    Args:
+        delivery_note: Submitted Delivery Note name
+
+    Returns:
+        See get_remaining_returnable_qty
+    """
+    frappe.has_permission("Delivery Note", "read", delivery_note, throw=True)
+
+    header = get_delivery_note_header(delivery_note)
+    if not header:
+        frappe.throw(_("Delivery Note {0} not found").format(delivery_note))
+    if header["docstatus"] != 1:
+        frappe.throw(_("Delivery Note {0} must be submitted before creating a return").format(delivery_note))
+
+    return get_remaining_returnable_qty(delivery_note)
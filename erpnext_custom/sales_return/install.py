@@ -11,13 +11,39 @@ Usage:
 """
 
 import frappe
-import json
 import os
 from frappe import _
 
-def install_sales_return():
+from erpnext_custom.schema_sync import (
+    doctype_definition,
+    custom_fields_definition,
+    sync_definitions,
+    clear_sync_checksums
+)
+from erpnext_custom.sales_return.returned_qty_index import sync_returned_qty_index
+
+# Custom fields added to Sales Return (create_custom_fields format)
+SALES_RETURN_CUSTOM_FIELDS = {
+    "Sales Return": [
+        {
+            # Tracks the linked stock entry
+            "fieldname": "stock_entry",
+            "label": "Stock Entry",
+            "fieldtype": "Link",
+            "options": "Stock Entry",
+            "read_only": 1,
+            "insert_after": "grand_total",
+            "no_copy": 1
+        }
+    ]
+}
+
+def install_sales_return(force=False):
     """
     Install Sales Return DocType and validation scripts
+    
+    Re-running is cheap: DocTypes and custom fields whose checksum did not
+    change since the last install are skipped. Pass force=True to re-save them.
     """
     
     print("=" * 60)
@@ -27,48 +53,35 @@ def install_sales_return():
     # Get the directory where this script is located
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # Step 1: Install Sales Return Item (Child Table)
-    print("\n[1/4] Installing Sales Return Item (Child Table)...")
+    # Step 1: Sync DocTypes and custom fields (only changed definitions are saved)
+    print("\n[1/3] Syncing Sales Return DocTypes and custom fields...")
     try:
-        install_doctype_from_json(
-            os.path.join(script_dir, "sales_return_item.json"),
-            "Sales Return Item"
-        )
-        print("✓ Sales Return Item installed successfully")
+        result = sync_definitions(get_schema_definitions(script_dir), force=force)
+        for key in result["changed"]:
+            print(f"✓ {key} installed")
+        for key in result["unchanged"]:
+            print(f"  {key} unchanged, skipped")
     except Exception as e:
-        print(f"✗ Error installing Sales Return Item: {str(e)}")
+        print(f"✗ Error syncing Sales Return schema: {str(e)}")
         return False
     
-    # Step 2: Install Sales Return (Parent DocType)
-    print("\n[2/4] Installing Sales Return (Parent DocType)...")
+    # Step 2: Create and fill the returned quantity index
+    print("\n[2/3] Creating returned quantity index...")
     try:
-        install_doctype_from_json(
-            os.path.join(script_dir, "sales_return.json"),
-            "Sales Return"
-        )
-        print("✓ Sales Return installed successfully")
+        result = sync_returned_qty_index()
+        if result["created"]:
+            print(f"✓ Returned quantity index built ({result['indexed'] or 0} delivery note items)")
+        else:
+            print("  Returned quantity index exists, skipped")
     except Exception as e:
-        print(f"✗ Error installing Sales Return: {str(e)}")
+        print(f"✗ Error creating returned quantity index: {str(e)}")
         return False
     
-    # Step 3: Add custom field for stock_entry reference
-    print("\n[3/4] Adding custom fields...")
-    try:
-        add_custom_fields()
-        print("✓ Custom fields added successfully")
-    except Exception as e:
-        print(f"✗ Error adding custom fields: {str(e)}")
-        # Continue anyway, this is not critical
-    
-    # Step 4: Setup validation scripts
-    print("\n[4/4] Setting up validation scripts...")
+    # Step 3: Setup validation scripts
+    print("\n[3/3] Setting up validation scripts...")
     print("Note: Validation scripts need to be added manually via ERPNext UI")
     print("      See README.md for instructions")
     
-    # Clear cache
-    print("\nClearing cache...")
-    frappe.clear_cache()
-    
     print("\n" + "=" * 60)
     print("Installation Complete!")
     print("=" * 60)
@@ -81,54 +94,18 @@ def install_sales_return():
     return True
 
 
-def install_doctype_from_json(json_path, doctype_name):
+def get_schema_definitions(script_dir=None):
     """
-    Install a DocType from JSON file
+    Checksummed Sales Return schema definitions, child table first
     """
     
-    # Check if file exists
-    if not os.path.exists(json_path):
-        raise Exception(f"JSON file not found: {json_path}")
-    
-    # Read JSON file
-    with open(json_path, 'r') as f:
-        doctype_dict = json.load(f)
+    script_dir = script_dir or os.path.dirname(os.path.abspath(__file__))
     
-    # Check if DocType already exists
-    if frappe.db.exists("DocType", doctype_name):
-        print(f"  DocType '{doctype_name}' already exists. Updating...")
-        doc = frappe.get_doc("DocType", doctype_name)
-        doc.update(doctype_dict)
-    else:
-        print(f"  Creating new DocType '{doctype_name}'...")
-        doc = frappe.get_doc(doctype_dict)
-    
-    # Save the DocType
-    doc.save(ignore_permissions=True)
-    frappe.db.commit()
-
-
-def add_custom_fields():
-    """
-    Add custom fields to Sales Return DocType
-    """
-    
-    # Add stock_entry field to track linked stock entry
-    if not frappe.db.exists("Custom Field", "Sales Return-stock_entry"):
-        custom_field = frappe.get_doc({
-            "doctype": "Custom Field",
-            "dt": "Sales Return",
-            "fieldname": "stock_entry",
-            "label": "Stock Entry",
-            "fieldtype": "Link",
-            "options": "Stock Entry",
-            "read_only": 1,
-            "insert_after": "grand_total",
-            "no_copy": 1
-        })
-        custom_field.insert(ignore_permissions=True)
-        frappe.db.commit()
-        print("  Added 'stock_entry' field")
+    return [
+        doctype_definition(os.path.join(script_dir, "sales_return_item.json")),
+        doctype_definition(os.path.join(script_dir, "sales_return.json")),
+        custom_fields_definition("Sales Return", SALES_RETURN_CUSTOM_FIELDS)
+    ]
 
 
 def uninstall_sales_return():
@@ -171,6 +148,9 @@ def uninstall_sales_return():
         if frappe.db.exists("DocType", "Sales Return Item"):
             frappe.delete_doc("DocType", "Sales Return Item", force=1)
         
+        # Forget stored checksums so a reinstall recreates everything
+        clear_sync_checksums(get_schema_definitions())
+        
         frappe.db.commit()
         frappe.clear_cache()
         
@@ -0,0 +1,226 @@
+"""
+Sales Return Returned Quantity Index
+
+This module maintains the quantity already returned per Delivery Note Item,
+so Sales Return validation can read the remaining returnable quantity of all
+rows with one keyed lookup instead of one SUM query per row.
+
+The index is updated incrementally:
+- Submitting a Sales Return adds its quantities
+- Cancelling a Sales Return subtracts them
+
+If the index is ever suspected to be out of sync (e.g. returns submitted
+before it existed, or manual database edits), find_index_drift reports the
+differences and rebuild_returned_qty_index recomputes it from the submitted
+Sales Returns.
+
+Table (created by sync_returned_qty_index, which runs after_migrate and from
+install_sales_return, and fills the table once when it creates it):
+    `tabSales Return Qty Index`: returned quantity per delivery_note_item
+
+Usage:
+    hooks.py:
+    after_migrate = ["erpnext_custom.sales_return.returned_qty_index.sync_returned_qty_index"]
+
+    bench --site [site-name] console
+    >>> from erpnext_custom.sales_return.returned_qty_index import rebuild_returned_qty_index
+    >>> rebuild_returned_qty_index()
+"""
+
+from typing import Any, Dict, List
+import frappe
+
+
+INDEX_DOCTYPE = "Sales Return Qty Index"
+INDEX_TABLE = f"tab{INDEX_DOCTYPE}"
+
+
+def summarize_return_items(items: List[Any]) -> Dict[str, float]:
+    """
+    Sum returned quantity per Delivery Note Item.
+
+    Rows without a delivery_note_item are ignored, they are not limited by
+    a delivered quantity.
+
+    Args:
+        items: Sales Return Item rows (documents or dicts)
+
+    Returns:
+        Dict of delivery_note_item -> returned qty
+    """
+    totals = {}
+
+    for item in items:
+        delivery_note_item = item.get("delivery_note_item")
+        if not delivery_note_item:
+            continue
+        totals[delivery_note_item] = totals.get(delivery_note_item, 0.0) + float(item.get("qty") or 0)
+
+    return totals
+
+
+def install_returned_qty_index() -> bool:
+    """
+    Create the index table if it does not exist.
+
+    DDL commits implicitly, so this runs at install time and never from
+    document hooks.
+
+    Returns:
+        True if the table was created by this call
+    """
+    if frappe.db.table_exists(INDEX_DOCTYPE, cached=False):
+        return False
+
+    frappe.db.sql_ddl(f"""
+        CREATE TABLE IF NOT EXISTS `{INDEX_TABLE}` (
+            delivery_note_item VARCHAR(140) NOT NULL PRIMARY KEY,
+            delivery_note VARCHAR(140) NOT NULL,
+            returned_qty DECIMAL(21, 9) NOT NULL DEFAULT 0,
+            modified DATETIME(6) NOT NULL,
+            KEY delivery_note (delivery_note)
+        ) ENGINE=InnoDB
+    """)
+
+    return True
+
+
+def sync_returned_qty_index() -> Dict[str, Any]:
+    """
+    Create the index table and fill it once, when it did not exist yet.
+
+    Runs after_migrate, so sites that had Sales Returns before the index
+    get it without a manual install. Re-running is a no-op: an existing
+    index is kept up to date by the submit and cancel hooks, and is only
+    rebuilt on request (rebuild_returned_qty_index).
+
+    Returns:
+        Dict containing:
+            - created: True if the table was created by this call
+            - indexed: Delivery Note Items filled in (None when not rebuilt)
+    """
+    created = install_returned_qty_index()
+    indexed = None
+
+    # Sales Return itself may not be installed yet (no returns to index)
+    if created and frappe.db.table_exists("Sales Return Item", cached=False):
+        indexed = rebuild_returned_qty_index()
+        frappe.db.commit()
+
+    return {"created": created, "indexed": indexed}
+
+
+def get_returned_qty(delivery_note_items: List[str]) -> Dict[str, float]:
+    """
+    Read the returned quantity of many Delivery Note Items in one query.
+
+    Args:
+        delivery_note_items: Delivery Note Item names
+
+    Returns:
+        Dict of delivery_note_item -> returned qty (0 when never returned)
+    """
+    returned = {name: 0.0 for name in delivery_note_items}
+    if not returned:
+        return returned
+
+    rows = frappe.db.sql(f"""
+        SELECT delivery_note_item, returned_qty
+        FROM `{INDEX_TABLE}`
+        WHERE delivery_note_item IN %s
+    """, (tuple(returned),), as_dict=True)
+
+    for row in rows:
+        returned[row.delivery_note_item] = float(row.returned_qty or 0)
+
+    return returned
+
+
+def update_returned_qty_index(doc: Any, sign: int) -> Dict[str, float]:
+    """
+    Add (sign=1) or subtract (sign=-1) a Sales Return's quantities.
+
+    All rows are written with one multi-row upsert.
+
+    Args:
+        doc: Sales Return document object
+        sign: 1 on submit, -1 on cancel
+
+    Returns:
+        Dict of delivery_note_item -> qty applied
+    """
+    totals = summarize_return_items(doc.items or [])
+    if not totals:
+        return {}
+
+    modified = frappe.utils.now()
+    frappe.db.sql(f"""
+        INSERT INTO `{INDEX_TABLE}` (delivery_note_item, delivery_note, returned_qty, modified)
+        VALUES {", ".join(["(%s, %s, %s, %s)"] * len(totals))}
+        ON DUPLICATE KEY UPDATE
+            returned_qty = returned_qty + VALUES(returned_qty),
+            modified = VALUES(modified)
+    """, tuple(
+        value
+        for delivery_note_item, qty in totals.items()
+        for value in (delivery_note_item, doc.delivery_note, sign * qty, modified)
+    ))
+
+    return {delivery_note_item: sign * qty for delivery_note_item, qty in totals.items()}
+
+
+def find_index_drift(tolerance: float = 0.001) -> List[Dict[str, Any]]:
+    """
+    Compare the index with quantities summed from submitted Sales Returns.
+
+    Args:
+        tolerance: Allowed difference per row
+
+    Returns:
+        List of dicts with delivery_note_item, indexed_qty and actual_qty
+    """
+    rows = frappe.db.sql(f"""
+        SELECT delivery_note_item, SUM(indexed_qty) AS indexed_qty, SUM(actual_qty) AS actual_qty
+        FROM (
+            SELECT delivery_note_item, returned_qty AS indexed_qty, 0 AS actual_qty
+            FROM `{INDEX_TABLE}`
+            UNION ALL
+            SELECT sri.delivery_note_item, 0, sri.qty
+            FROM `tabSales Return Item` sri
+            INNER JOIN `tabSales Return` sr ON sri.parent = sr.name
+            WHERE sr.docstatus = 1
+            AND IFNULL(sri.delivery_note_item, '') != ''
+        ) quantities
+        GROUP BY delivery_note_item
+    """, as_dict=True)
+
+    return [
+        {
+            "delivery_note_item": row.delivery_note_item,
+            "indexed_qty": float(row.indexed_qty or 0),
+            "actual_qty": float(row.actual_qty or 0)
+        }
+        for row in rows
+        if abs(float(row.indexed_qty or 0) - float(row.actual_qty or 0)) > tolerance
+    ]
+
+
+def rebuild_returned_qty_index() -> int:
+    """
+    Recompute the index from submitted Sales Returns.
+
+    Returns:
+        Number of Delivery Note Items in the index
+    """
+    frappe.db.sql(f"DELETE FROM `{INDEX_TABLE}`")
+    frappe.db.sql(f"""
+        INSERT INTO `{INDEX_TABLE}` (delivery_note_item, delivery_note, returned_qty, modified)
+        SELECT sri.delivery_note_item, MAX(sr.delivery_note), SUM(sri.qty), %s
+        FROM `tabSales Return Item` sri
+        INNER JOIN `tabSales Return` sr ON sri.parent = sr.name
+        WHERE sr.docstatus = 1
+        AND IFNULL(sri.delivery_note_item, '') != ''
+        GROUP BY sri.delivery_note_item
+    """, (frappe.utils.now(),))
+
+    return frappe.db.sql(f"SELECT COUNT(*) FROM `{INDEX_TABLE}`")[0][0]
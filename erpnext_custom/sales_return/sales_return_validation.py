@@ -7,6 +7,15 @@ via Setup > Customize Form > Sales Return > Server Script
 import frappe
 from frappe import _
 
+from erpnext_custom.sales_return.returned_qty_index import get_returned_qty, update_returned_qty_index
+from erpnext_custom.sales_return.delivery_note_loader import get_delivery_note_header, get_delivery_note_items
+from erpnext_custom.hook_metrics import hook_timer, STAGE_LOAD, STAGE_VALIDATE, STAGE_PERSIST
+from erpnext_custom.sales_return.bulk_submit import (
+    SKIP_STOCK_ENTRY_FLAG,
+    is_shared_stock_entry,
+    reverse_shared_stock_entry
+)
+
 def validate(doc, method=None):
     """
     Validate Sales Return document before saving
@@ -18,145 +27,177 @@ def validate(doc, method=None):
     - Calculates line totals and grand total
     """
     
-    # Validate delivery note exists and is submitted
-    if doc.delivery_note:
-        dn = frappe.get_doc("Delivery Note", doc.delivery_note)
-        if dn.docstatus != 1:
-            frappe.throw(_("Delivery Note {0} must be submitted before creating a return").format(doc.delivery_note))
-    
-    # Validate items
-    if not doc.items:
-        frappe.throw(_("Please add at least one item to return"))
-    
-    # Get delivered quantities from delivery note
-    dn_items = {}
-    if doc.delivery_note:
-        dn = frappe.get_doc("Delivery Note", doc.delivery_note)
-        for item in dn.items:
-            dn_items[item.name] = {
-                'qty': item.qty,
-                'item_code': item.item_code,
-                'rate': item.rate,
-                'warehouse': item.warehouse
-            }
-    
-    grand_total = 0
-    
-    for item in doc.items:
-        # Validate return quantity > 0
-        if item.qty <= 0:
-            frappe.throw(_("Row {0}: Return quantity must be greater than 0").format(item.idx))
+    with hook_timer("sales_return_validate") as timer:
+        # Validate delivery note exists and is submitted
+        with timer.stage(STAGE_LOAD):
+            if doc.delivery_note:
+                dn = get_delivery_note_header(doc.delivery_note)
+                if not dn:
+                    frappe.throw(_("Delivery Note {0} not found").format(doc.delivery_note))
+                if dn["docstatus"] != 1:
+                    frappe.throw(_("Delivery Note {0} must be submitted before creating a return").format(doc.delivery_note))
         
-        # Validate return quantity <= delivered quantity
-        if item.delivery_note_item and item.delivery_note_item in dn_items:
-            delivered_qty = dn_items[item.delivery_note_item]['qty']
-            
-            # Check for previous returns from the same delivery note item
-            previous_returns = frappe.db.sql("""
-                SELECT SUM(sri.qty) as total_returned
-                FROM `tabSales Return Item` sri
-                INNER JOIN `tabSales Return` sr ON sri.parent = sr.name
-                WHERE sr.docstatus = 1
-                AND sr.delivery_note = %s
-                AND sri.delivery_note_item = %s
-                AND sr.name != %s
-            """, (doc.delivery_note, item.delivery_note_item, doc.name), as_dict=True)
-            
-            total_returned = previous_returns[0].total_returned or 0
-            remaining_qty = delivered_qty - total_returned
+        # Validate items
+        if not doc.items:
+            frappe.throw(_("Please add at least one item to return"))
+        
+        # Get delivered quantities from delivery note (narrow, request-cached read)
+        with timer.stage(STAGE_LOAD):
+            dn_items = {}
+            if doc.delivery_note:
+                for item in get_delivery_note_items(doc.delivery_note):
+                    dn_items[item['name']] = {
+                        'qty': item['qty'],
+                        'item_code': item['item_code'],
+                        'rate': item['rate'],
+                        'warehouse': item['warehouse']
+                    }
             
-            if item.qty > remaining_qty:
-                frappe.throw(_(
-                    "Row {0}: Return quantity ({1}) exceeds remaining returnable quantity ({2}). "
-                    "Delivered: {3}, Previously returned: {4}"
-                ).format(item.idx, item.qty, remaining_qty, delivered_qty, total_returned))
+            # Get previously returned quantities for all rows in one lookup
+            # (the index only holds submitted returns, so this return is never counted)
+            returned_qty = get_returned_qty([
+                item.delivery_note_item for item in doc.items
+                if item.delivery_note_item and item.delivery_note_item in dn_items
+            ])
         
-        # Validate return reason is selected
-        if not item.return_reason:
-            frappe.throw(_("Row {0}: Please select a return reason").format(item.idx))
+        grand_total = 0
         
-        # Validate notes when reason is "Other"
-        if item.return_reason == "Other" and not item.return_notes:
-            frappe.throw(_("Row {0}: Please provide additional notes for return reason 'Other'").format(item.idx))
+        with timer.stage(STAGE_VALIDATE):
+            for item in doc.items:
+                # Validate return quantity > 0
+                if item.qty <= 0:
+                    frappe.throw(_("Row {0}: Return quantity must be greater than 0").format(item.idx))
+                
+                # Validate return quantity <= delivered quantity
+                if item.delivery_note_item and item.delivery_note_item in dn_items:
+                    delivered_qty = dn_items[item.delivery_note_item]['qty']
+                    total_returned = returned_qty[item.delivery_note_item]
+                    remaining_qty = delivered_qty - total_returned
+                    
+                    if item.qty > remaining_qty:
+                        frappe.throw(_(
+                            "Row {0}: Return quantity ({1}) exceeds remaining returnable quantity ({2}). "
+                            "Delivered: {3}, Previously returned: {4}"
+                        ).format(item.idx, item.qty, remaining_qty, delivered_qty, total_returned))
+                
+                # Validate return reason is selected
+                if not item.return_reason:
+                    frappe.throw(_("Row {0}: Please select a return reason").format(item.idx))
+                
+                # Validate notes when reason is "Other"
+                if item.return_reason == "Other" and not item.return_notes:
+                    frappe.throw(_("Row {0}: Please provide additional notes for return reason 'Other'").format(item.idx))
+                
+                # Calculate line total
+                item.amount = item.qty * item.rate
+                grand_total += item.amount
         
-        # Calculate line total
-        item.amount = item.qty * item.rate
-        grand_total += item.amount
-    
-    # Set grand total
-    doc.grand_total = grand_total
-    
-    # Set status based on docstatus
-    if doc.docstatus == 0:
-        doc.status = "Draft"
-    elif doc.docstatus == 1:
-        doc.status = "Submitted"
-    elif doc.docstatus == 2:
-        doc.status = "Cancelled"
+        # Set grand total
+        doc.grand_total = grand_total
+        
+        # Set status based on docstatus
+        if doc.docstatus == 0:
+            doc.status = "Draft"
+        elif doc.docstatus == 1:
+            doc.status = "Submitted"
+        elif doc.docstatus == 2:
+            doc.status = "Cancelled"
 
 
 def on_submit(doc, method=None):
     """
     Handle Sales Return submission
     Creates stock entries to increase inventory for returned items
-    """
-    
-    # Create Stock Entry for return
-    stock_entry = frappe.new_doc("Stock Entry")
-    stock_entry.stock_entry_type = "Material Receipt"
-    stock_entry.company = doc.company
-    stock_entry.posting_date = doc.posting_date
-    stock_entry.posting_time = frappe.utils.nowtime()
+    and adds the returned quantities to the returned quantity index
     
-    # Add reference to Sales Return
-    stock_entry.add_comment("Comment", f"Created from Sales Return: {doc.name}")
-    
-    for item in doc.items:
-        stock_entry.append("items", {
-            "item_code": item.item_code,
-            "qty": item.qty,
-            "uom": item.uom,
-            "t_warehouse": item.warehouse,  # Target warehouse (receiving)
-            "basic_rate": item.rate,
-            "basic_amount": item.amount,
-            "allow_zero_valuation_rate": 0
-        })
+    The Stock Entry is skipped when the return is submitted through
+    bulk_submit_sales_returns, which posts consolidated entries instead.
+    The surrounding request (or bulk submission) owns the transaction.
+    """
     
-    try:
-        stock_entry.insert()
-        stock_entry.submit()
+    with hook_timer("sales_return_on_submit") as timer:
+        with timer.stage(STAGE_PERSIST):
+            update_returned_qty_index(doc, 1)
+        
+        if doc.flags.get(SKIP_STOCK_ENTRY_FLAG):
+            return
         
-        # Link stock entry to sales return
-        frappe.db.set_value("Sales Return", doc.name, "stock_entry", stock_entry.name)
-        frappe.db.commit()
+        # Create Stock Entry for return
+        stock_entry = frappe.new_doc("Stock Entry")
+        stock_entry.stock_entry_type = "Material Receipt"
+        stock_entry.company = doc.company
+        stock_entry.posting_date = doc.posting_date
+        stock_entry.posting_time = frappe.utils.nowtime()
         
-        frappe.msgprint(_("Stock Entry {0} created successfully").format(stock_entry.name))
+        # Add reference to Sales Return
+        stock_entry.add_comment("Comment", f"Created from Sales Return: {doc.name}")
         
-    except Exception as e:
-        frappe.throw(_("Failed to create Stock Entry: {0}").format(str(e)))
+        for item in doc.items:
+            stock_entry.append("items", {
+                "item_code": item.item_code,
+                "qty": item.qty,
+                "uom": item.uom,
+                "t_warehouse": item.warehouse,  # Target warehouse (receiving)
+                "basic_rate": item.rate,
+                "basic_amount": item.amount,
+                "allow_zero_valuation_rate": 0
+            })
+        
+        # The Stock Entry's own queries (ERPNext's stock posting) are not
+        # this hook's, so they stay out of its query budget
+        with timer.uncounted(STAGE_PERSIST):
+            try:
+                stock_entry.insert()
+                stock_entry.submit()
+            except Exception as e:
+                frappe.throw(_("Failed to create Stock Entry: {0}").format(str(e)))
+        
+        with timer.stage(STAGE_PERSIST):
+            # Link stock entry to sales return
+            frappe.db.set_value("Sales Return", doc.name, "stock_entry", stock_entry.name)
+            
+            frappe.msgprint(_("Stock Entry {0} created successfully").format(stock_entry.name))
 
 
 def on_cancel(doc, method=None):
     """
     Handle Sales Return cancellation
     Cancels the associated stock entry to reverse inventory adjustments
-    """
+    and removes the returned quantities from the returned quantity index
     
-    # Get linked stock entry
-    stock_entry_name = frappe.db.get_value("Sales Return", doc.name, "stock_entry")
+    A consolidated Stock Entry shared with other returns is left in place
+    and a Material Issue for this return's items is posted instead.
+    """
     
-    if stock_entry_name:
-        try:
-            stock_entry = frappe.get_doc("Stock Entry", stock_entry_name)
-            
-            if stock_entry.docstatus == 1:
-                stock_entry.cancel()
-                frappe.msgprint(_("Stock Entry {0} cancelled successfully").format(stock_entry_name))
-            
-        except Exception as e:
-            frappe.throw(_("Failed to cancel Stock Entry: {0}").format(str(e)))
-    else:
-        frappe.msgprint(_("No Stock Entry found to cancel"), alert=True)
+    with hook_timer("sales_return_on_cancel") as timer:
+        with timer.stage(STAGE_PERSIST):
+            update_returned_qty_index(doc, -1)
+        
+        # Get linked stock entry
+        with timer.stage(STAGE_PERSIST):
+            stock_entry_name = frappe.db.get_value("Sales Return", doc.name, "stock_entry")
+        
+        # Stock Entry queries are ERPNext's, outside this hook's query budget
+        with timer.uncounted(STAGE_PERSIST):
+            if stock_entry_name and is_shared_stock_entry(stock_entry_name, doc.name):
+                try:
+                    reversal_name = reverse_shared_stock_entry(doc)
+                    frappe.msgprint(_("Stock Entry {0} created to reverse this return").format(reversal_name))
+                    
+                except Exception as e:
+                    frappe.throw(_("Failed to reverse Stock Entry: {0}").format(str(e)))
+            elif stock_entry_name:
+                try:
+                    stock_entry = frappe.get_doc("Stock Entry", stock_entry_name)
+                    
+                    if stock_entry.docstatus == 1:
+                        stock_entry.cancel()
+                        frappe.msgprint(_("Stock Entry {0} cancelled successfully").format(stock_entry_name))
+                    
+                except Exception as e:
+                    frappe.throw(_("Failed to cancel Stock Entry: {0}").format(str(e)))
+            else:
+                frappe.msgprint(_("No Stock Entry found to cancel"), alert=True)
 
 
 def before_cancel(doc, method=None):
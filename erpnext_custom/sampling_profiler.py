@@ -0,0 +1,132 @@
+"""
+Sampling Profiler Module
+
+This module samples the Python stack of one thread at a fixed interval from
+a background thread and counts identical stacks. The result is written in
+the collapsed ("folded") format read by flamegraph.pl, speedscope and
+inferno: one line per distinct stack, frames joined by ";" from the root to
+the leaf, followed by the number of samples.
+
+Nothing runs until start() is called; a running profiler costs the sampled
+thread one sys._current_frames() walk per interval.
+
+This module does not need frappe; request_profiler starts it per request.
+
+Usage:
+    from erpnext_custom.sampling_profiler import SamplingProfiler
+
+    with SamplingProfiler(interval=0.005) as profiler:
+        run_slow_code()
+    profiler.write("/tmp/slow_code.folded")
+"""
+
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+DEFAULT_INTERVAL = 0.005
+
+
+def frame_label(frame) -> str:
+    """Flame graph label of a frame's function: module.qualified_name"""
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or code.co_filename
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread (by default the one that creates it).
+
+    Frames are labelled per code object and cached, so a sample is one walk
+    up the stack and one dictionary update.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.started: Optional[float] = None
+        self.seconds = 0.0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        """Start sampling in a daemon thread"""
+        if self._thread is not None:
+            return self
+
+        self._stop.clear()
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="erpnext-custom-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        """Stop sampling and wait for the sampling thread"""
+        if self._thread is None:
+            return self
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.seconds += time.perf_counter() - self.started
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                # The sampled thread has finished
+                return
+            self.record(frame)
+
+    def record(self, frame) -> None:
+        """Count the stack ending at frame"""
+        labels = self._labels
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = frame_label(frame)
+            names.append(label)
+            frame = frame.f_back
+
+        names.reverse()
+        stack = ";".join(names)
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def collapsed(self) -> List[str]:
+        """Collapsed stack lines ("root;...;leaf count"), most sampled first"""
+        return [
+            f"{stack} {count}"
+            for stack, count in sorted(self.stacks.items(), key=lambda entry: (-entry[1], entry[0]))
+        ]
+
+    def write(self, path: str) -> str:
+        """
+        Write the collapsed stacks to a file.
+
+        Args:
+            path: Target file
+
+        Returns:
+            Path written
+        """
+        with open(path, "w") as f:
+            for line in self.collapsed():
+                f.write(line + "\n")
+        return path
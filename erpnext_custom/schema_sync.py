@@ -0,0 +1,278 @@
+"""
+Schema Sync Module
+
+This module applies DocType JSON files and custom-field manifests to a site
+only when they changed since the last sync.
+
+Every definition is hashed (SHA-256 of its canonical JSON) and the checksum
+is stored per site with frappe.db.set_global. A sync compares the current
+checksums with the stored ones and applies only the changed definitions:
+DocTypes are saved, all changed custom-field manifests go to one
+create_custom_fields call, and the site is committed and its cache cleared
+once. A stored checksum is only trusted while what it describes is still on
+the site: the DocType exists, and every custom field of a manifest exists
+with its fieldtype (one `tabCustom Field` query for all manifests). When
+nothing changed, a sync only reads the stored checksums and checks that.
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.schema_sync import doctype_definition, custom_fields_definition, sync_definitions
+    >>> sync_definitions([
+    ...     doctype_definition("apps/erpnext_custom/erpnext_custom/sales_return/sales_return.json"),
+    ...     custom_fields_definition("Purchase Return", {"Purchase Receipt": [...]})
+    ... ])
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List
+import frappe
+
+
+KIND_DOCTYPE = "DocType"
+KIND_CUSTOM_FIELDS = "Custom Fields"
+
+# Prefix of the per-definition keys stored with frappe.db.set_global
+CHECKSUM_KEY_PREFIX = "erpnext_custom_schema_sync:"
+
+
+def compute_checksum(payload: Any) -> str:
+    """
+    SHA-256 of a definition's canonical JSON.
+
+    Key order and whitespace do not change the checksum.
+
+    Args:
+        payload: DocType dict or custom-field manifest
+
+    Returns:
+        Hex digest
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def doctype_definition(json_path: str) -> Dict[str, Any]:
+    """
+    Definition of a DocType JSON file.
+
+    Args:
+        json_path: Path to the DocType JSON
+
+    Returns:
+        Dict with key, kind, name, payload and checksum
+    """
+    with open(json_path, "r") as f:
+        payload = json.load(f)
+
+    return {
+        "key": f"{KIND_DOCTYPE}:{payload['name']}",
+        "kind": KIND_DOCTYPE,
+        "name": payload["name"],
+        "payload": payload,
+        "checksum": compute_checksum(payload)
+    }
+
+
+def custom_fields_definition(name: str, manifest: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Definition of a custom-field manifest (create_custom_fields format).
+
+    Args:
+        name: Manifest name, unique per site
+        manifest: Dict of doctype -> custom field dicts
+
+    Returns:
+        Dict with key, kind, name, payload and checksum
+    """
+    return {
+        "key": f"{KIND_CUSTOM_FIELDS}:{name}",
+        "kind": KIND_CUSTOM_FIELDS,
+        "name": name,
+        "payload": manifest,
+        "checksum": compute_checksum(manifest)
+    }
+
+
+def plan_sync(
+    definitions: List[Dict[str, Any]],
+    stored_checksums: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """
+    Definitions whose checksum differs from the stored one.
+
+    Args:
+        definitions: Definitions to sync
+        stored_checksums: Dict of key -> checksum from the last sync
+
+    Returns:
+        Changed (or never synced) definitions, in input order
+    """
+    return [
+        definition for definition in definitions
+        if stored_checksums.get(definition["key"]) != definition["checksum"]
+    ]
+
+
+def get_stored_checksums(definitions: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Checksums stored by the last sync of the connected site.
+
+    A DocType that no longer exists has no checksum, so it is re-created;
+    likewise a manifest with a custom field that was deleted or whose
+    fieldtype was changed by hand.
+
+    Args:
+        definitions: Definitions to look up
+
+    Returns:
+        Dict of key -> checksum
+    """
+    stored = {}
+
+    for definition in definitions:
+        checksum = frappe.db.get_global(CHECKSUM_KEY_PREFIX + definition["key"])
+        if not checksum:
+            continue
+        if definition["kind"] == KIND_DOCTYPE and not frappe.db.exists("DocType", definition["name"]):
+            continue
+        stored[definition["key"]] = checksum
+
+    manifests = [
+        definition for definition in definitions
+        if definition["kind"] == KIND_CUSTOM_FIELDS and definition["key"] in stored
+    ]
+    if manifests:
+        fields = {}
+        for definition in manifests:
+            fields.update(_custom_field_types(definition["payload"]))
+
+        existing = {
+            row["name"]: row["fieldtype"]
+            for row in frappe.get_all(
+                "Custom Field",
+                filters={"name": ["in", list(fields)]},
+                fields=["name", "fieldtype"],
+                limit_page_length=0
+            )
+        }
+
+        for definition in manifests:
+            for name, fieldtype in _custom_field_types(definition["payload"]).items():
+                if name not in existing or (fieldtype and existing[name] != fieldtype):
+                    del stored[definition["key"]]
+                    break
+
+    return stored
+
+
+def _custom_field_types(manifest: Dict[str, List[Dict[str, Any]]]) -> Dict[str, str]:
+    """Custom Field names ("{doctype}-{fieldname}") of a manifest -> fieldtype"""
+    return {
+        f"{doctype}-{field['fieldname']}": field.get("fieldtype")
+        for doctype, fields in manifest.items()
+        for field in fields
+    }
+
+
+def _apply_doctype(payload: Dict[str, Any]) -> None:
+    """Create or update a DocType from its JSON dict (no commit)"""
+    if frappe.db.exists("DocType", payload["name"]):
+        doc = frappe.get_doc("DocType", payload["name"])
+        doc.update(payload)
+    else:
+        doc = frappe.get_doc(payload)
+
+    doc.save(ignore_permissions=True)
+
+
+def _merge_manifests(definitions: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Combine custom-field manifests into one create_custom_fields dict"""
+    merged = {}
+
+    for definition in definitions:
+        for doctype, fields in definition["payload"].items():
+            merged.setdefault(doctype, []).extend(fields)
+
+    return merged
+
+
+def _create_custom_fields(manifest: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Create or update custom fields (no commit)"""
+    from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+    create_custom_fields(manifest, update=True)
+
+
+def sync_definitions(
+    definitions: List[Dict[str, Any]],
+    force: bool = False
+) -> Dict[str, Any]:
+    """
+    Apply changed definitions to the connected site.
+
+    Process:
+    1. Compare checksums with the stored ones
+    2. Save changed DocTypes (in input order, so child tables go first)
+    3. Create all changed custom fields with one create_custom_fields call
+    4. Store the new checksums, commit and clear the cache once
+
+    Nothing is written and the cache is kept when nothing changed.
+
+    Saving a DocType and creating custom fields alter tables, and that DDL
+    commits implicitly, so a failure part way cannot undo what was applied
+    before it. The rollback only discards the checksums: none are stored
+    unless everything was applied, so the next sync applies the same
+    definitions again.
+
+    Args:
+        definitions: Definitions from doctype_definition / custom_fields_definition
+        force: Apply every definition regardless of checksums
+
+    Returns:
+        Dict containing:
+            - changed: Keys of applied definitions
+            - unchanged: Keys of skipped definitions
+    """
+    changed = definitions if force else plan_sync(definitions, get_stored_checksums(definitions))
+    changed_keys = {definition["key"] for definition in changed}
+    result = {
+        "changed": [definition["key"] for definition in changed],
+        "unchanged": [definition["key"] for definition in definitions if definition["key"] not in changed_keys]
+    }
+
+    if not changed:
+        return result
+
+    try:
+        for definition in changed:
+            if definition["kind"] == KIND_DOCTYPE:
+                _apply_doctype(definition["payload"])
+
+        manifests = [definition for definition in changed if definition["kind"] == KIND_CUSTOM_FIELDS]
+        if manifests:
+            _create_custom_fields(_merge_manifests(manifests))
+
+        for definition in changed:
+            frappe.db.set_global(CHECKSUM_KEY_PREFIX + definition["key"], definition["checksum"])
+
+        frappe.db.commit()
+
+    except Exception:
+        frappe.db.rollback()
+        raise
+
+    frappe.clear_cache()
+
+    return result
+
+
+def clear_sync_checksums(definitions: List[Dict[str, Any]]) -> None:
+    """
+    Forget stored checksums, so the next sync applies these definitions.
+
+    Args:
+        definitions: Definitions to forget
+    """
+    for definition in definitions:
+        frappe.db.set_global(CHECKSUM_KEY_PREFIX + definition["key"], None)
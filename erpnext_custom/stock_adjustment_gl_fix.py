@@ -0,0 +1,379 @@
+"""
+Stock Adjustment GL Fix Module
+
+This module makes sure the GL of a submitted Stock Entry or Stock
+Reconciliation matches its stock valuation. The valuation difference that is
+missing from the warehouse stock accounts is posted against the stock
+adjustment account.
+
+The whole voucher is processed in one pass, however many items it has:
+1. One grouped Stock Ledger Entry query returns the valuation difference per
+   item row and warehouse
+2. One query each resolves warehouse accounts and company defaults; a
+   warehouse without an account takes the nearest parent warehouse's, as in
+   ERPNext (one more query, only when such warehouses are involved)
+3. One grouped GL Entry query returns what is already posted per stock account
+4. The corrections are aggregated per account, so thousands of items become
+   a handful of GL lines, and posted with one make_gl_entries call
+
+The fix is idempotent: when the posted GL already matches the valuation,
+nothing is posted. Cancelling the voucher reverses these GL lines together
+with ERPNext's own.
+
+Journal Entry Structure (per stock account):
+- Debit:  Persediaan (warehouse account) - valuation increase
+- Credit: Stock Adjustment - valuation increase
+  (reversed for a valuation decrease)
+
+Usage:
+    Add hooks to your ERPNext custom app's hooks.py:
+
+    doc_events = {
+        "Stock Entry": {
+            "on_submit": "erpnext_custom.stock_adjustment_gl_fix.fix_stock_adjustment_gl_entries"
+        },
+        "Stock Reconciliation": {
+            "on_submit": "erpnext_custom.stock_adjustment_gl_fix.fix_stock_adjustment_gl_entries"
+        }
+    }
+"""
+
+from typing import Any, Dict, List, Optional
+import frappe
+from frappe import _
+
+
+# Differences below this are rounding noise
+PRECISION_THRESHOLD = 0.01
+
+COMPANY_DEFAULT_FIELDS = [
+    "stock_adjustment_account",
+    "default_inventory_account",
+    "cost_center",
+    "enable_perpetual_inventory"
+]
+
+
+class StockAdjustmentGLError(Exception):
+    """Exception raised when stock adjustment GL lines cannot be built"""
+    pass
+
+
+def _single_or_default(values: set, default: Optional[str]) -> Optional[str]:
+    """The only value of a set, or default when there are none or several"""
+    values = {value for value in values if value}
+    if len(values) == 1:
+        return next(iter(values))
+    return default
+
+
+def compute_stock_adjustment_gl_entries(
+    valuation_rows: List[Dict[str, Any]],
+    row_accounts: Dict[str, Dict[str, Any]],
+    warehouse_accounts: Dict[str, str],
+    posted_balances: Dict[str, float],
+    company_defaults: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Build the GL lines that bring stock accounts in line with the valuation.
+
+    Valuation differences are summed per warehouse stock account and compared
+    with the balance already posted on that account for the voucher. Each
+    remaining difference gets one stock account line and one adjustment line.
+    The adjustment account (and cost center) is the one set on the item rows
+    of that stock account when they agree, otherwise the company's default.
+
+    Args:
+        valuation_rows: Grouped Stock Ledger Entries containing:
+            - voucher_detail_no: Item row name
+            - warehouse: Warehouse
+            - stock_value_difference: Valuation difference
+        row_accounts: Dict of item row name -> expense_account, cost_center
+        warehouse_accounts: Dict of warehouse -> stock account
+        posted_balances: Dict of stock account -> posted debit - credit
+        company_defaults: Company stock_adjustment_account, default_inventory_account
+            and cost_center
+
+    Returns:
+        Dict containing:
+            - gl_entries: Array of GL Entry lines
+            - total_debit: Sum of all debits
+            - total_credit: Sum of all credits
+            - is_balanced: Boolean (total debit == total credit)
+
+    Raises:
+        StockAdjustmentGLError: If an account is missing or the lines do not balance
+
+    Example:
+        >>> compute_stock_adjustment_gl_entries(
+        ...     [{"voucher_detail_no": "row1", "warehouse": "Gudang - BAC", "stock_value_difference": 150000}],
+        ...     {"row1": {"expense_account": None, "cost_center": None}},
+        ...     {"Gudang - BAC": "1141.000 - Persediaan Barang - BAC"},
+        ...     {},
+        ...     {"stock_adjustment_account": "5130 - Penyesuaian Persediaan - BAC", "cost_center": "Main - BAC"}
+        ... )['total_debit']
+        150000.0
+    """
+    expected = {}
+    adjustment_accounts = {}
+    cost_centers = {}
+
+    for row in valuation_rows:
+        stock_account = (
+            warehouse_accounts.get(row["warehouse"])
+            or company_defaults.get("default_inventory_account")
+        )
+        if not stock_account:
+            raise StockAdjustmentGLError(f"No stock account for warehouse {row['warehouse']}")
+
+        accounts = row_accounts.get(row["voucher_detail_no"], {})
+        expected[stock_account] = expected.get(stock_account, 0) + (row["stock_value_difference"] or 0)
+        adjustment_accounts.setdefault(stock_account, set()).add(accounts.get("expense_account"))
+        cost_centers.setdefault(stock_account, set()).add(accounts.get("cost_center"))
+
+    gl_entries = []
+
+    for stock_account in sorted(expected):
+        difference = round(expected[stock_account] - (posted_balances.get(stock_account) or 0), 2)
+        if abs(difference) < PRECISION_THRESHOLD:
+            continue
+
+        adjustment_account = _single_or_default(
+            adjustment_accounts[stock_account],
+            company_defaults.get("stock_adjustment_account")
+        )
+        if not adjustment_account:
+            raise StockAdjustmentGLError("Stock Adjustment Account is not set for the company")
+
+        cost_center = _single_or_default(cost_centers[stock_account], company_defaults.get("cost_center"))
+        amount = abs(difference)
+
+        gl_entries.append({
+            "account": stock_account,
+            "against": adjustment_account,
+            "debit": amount if difference > 0 else 0,
+            "credit": amount if difference < 0 else 0,
+            "cost_center": cost_center
+        })
+        gl_entries.append({
+            "account": adjustment_account,
+            "against": stock_account,
+            "debit": amount if difference < 0 else 0,
+            "credit": amount if difference > 0 else 0,
+            "cost_center": cost_center
+        })
+
+    # Validate balanced entry
+    total_debit = sum(entry["debit"] for entry in gl_entries)
+    total_credit = sum(entry["credit"] for entry in gl_entries)
+    is_balanced = abs(total_debit - total_credit) < PRECISION_THRESHOLD
+
+    if not is_balanced:
+        raise StockAdjustmentGLError(
+            f"GL Entry not balanced: Debit={total_debit}, Credit={total_credit}"
+        )
+
+    return {
+        "gl_entries": gl_entries,
+        "total_debit": round(total_debit, 2),
+        "total_credit": round(total_credit, 2),
+        "is_balanced": is_balanced
+    }
+
+
+def get_valuation_differences(voucher_type: str, voucher_no: str) -> List[Dict[str, Any]]:
+    """
+    Valuation difference per item row and warehouse of a voucher, in one query.
+
+    Args:
+        voucher_type: Stock Entry or Stock Reconciliation
+        voucher_no: Voucher name
+
+    Returns:
+        Rows with voucher_detail_no, warehouse and stock_value_difference
+    """
+    return frappe.db.sql("""
+        SELECT voucher_detail_no, warehouse, SUM(stock_value_difference) AS stock_value_difference
+        FROM `tabStock Ledger Entry`
+        WHERE voucher_type = %s
+        AND voucher_no = %s
+        AND is_cancelled = 0
+        GROUP BY voucher_detail_no, warehouse
+    """, (voucher_type, voucher_no), as_dict=True)
+
+
+def get_warehouse_accounts(warehouses: List[str]) -> Dict[str, str]:
+    """
+    Stock account of each warehouse, resolved like ERPNext's get_warehouse_account.
+
+    A warehouse without its own account takes the account of its nearest
+    parent warehouse (of the same company) that has one. The parents are
+    looked up in one query over the warehouse tree, only for warehouses
+    that need it.
+
+    Args:
+        warehouses: Warehouse names
+
+    Returns:
+        Dict of warehouse -> account (warehouses without an account on
+        themselves or any parent are left out)
+    """
+    if not warehouses:
+        return {}
+
+    rows = frappe.get_all(
+        "Warehouse",
+        filters={"name": ["in", list(warehouses)]},
+        fields=["name", "account"]
+    )
+
+    accounts = {row["name"]: row["account"] for row in rows if row["account"]}
+
+    inherited = [warehouse for warehouse in warehouses if warehouse not in accounts]
+    if not inherited:
+        return accounts
+
+    # Nearest parent first: the deepest ancestor has the largest lft
+    parent_rows = frappe.db.sql("""
+        SELECT child.name AS warehouse, parent.account
+        FROM `tabWarehouse` child
+        INNER JOIN `tabWarehouse` parent
+            ON parent.lft < child.lft
+            AND parent.rgt > child.rgt
+            AND parent.company = child.company
+        WHERE child.name IN %s
+        AND IFNULL(parent.account, '') != ''
+        ORDER BY parent.lft DESC
+    """, (tuple(inherited),), as_dict=True)
+
+    for row in parent_rows:
+        accounts.setdefault(row["warehouse"], row["account"])
+
+    return accounts
+
+
+def get_posted_stock_balances(
+    voucher_type: str,
+    voucher_no: str,
+    accounts: List[str]
+) -> Dict[str, float]:
+    """
+    Debit - credit already posted on stock accounts for a voucher, in one query.
+
+    Args:
+        voucher_type: Stock Entry or Stock Reconciliation
+        voucher_no: Voucher name
+        accounts: Stock accounts
+
+    Returns:
+        Dict of account -> balance
+    """
+    if not accounts:
+        return {}
+
+    rows = frappe.db.sql("""
+        SELECT account, SUM(debit) - SUM(credit) AS balance
+        FROM `tabGL Entry`
+        WHERE voucher_type = %s
+        AND voucher_no = %s
+        AND account IN %s
+        AND is_cancelled = 0
+        GROUP BY account
+    """, (voucher_type, voucher_no, tuple(accounts)), as_dict=True)
+
+    return {row["account"]: row["balance"] for row in rows}
+
+
+def get_row_accounts(doc: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    Adjustment account and cost center per item row, from the document itself.
+
+    Stock Entry rows carry their own expense_account; Stock Reconciliation sets
+    one difference account on the document.
+
+    Args:
+        doc: Stock Entry or Stock Reconciliation document
+
+    Returns:
+        Dict of item row name -> expense_account, cost_center
+    """
+    return {
+        item.name: {
+            "expense_account": item.get("expense_account") or doc.get("expense_account"),
+            "cost_center": item.get("cost_center") or doc.get("cost_center")
+        }
+        for item in doc.get("items") or []
+    }
+
+
+def _make_gl_entries(gl_map: List[Dict[str, Any]]) -> None:
+    """Post GL lines through ERPNext's general ledger (validations, fiscal year, balances)"""
+    from erpnext.accounts.general_ledger import make_gl_entries
+
+    make_gl_entries(gl_map, merge_entries=False)
+
+
+def fix_stock_adjustment_gl_entries(doc: Any, method: str = None) -> None:
+    """
+    Hook called when Stock Entry or Stock Reconciliation is submitted.
+    Posts the valuation difference missing from the GL against the stock
+    adjustment account.
+
+    Args:
+        doc: Stock Entry or Stock Reconciliation document object
+        method: Hook method name (not used)
+    """
+    try:
+        company_defaults = frappe.db.get_value(
+            "Company", doc.company, COMPANY_DEFAULT_FIELDS, as_dict=True
+        ) or {}
+
+        # Without perpetual inventory ERPNext posts no stock GL, by design
+        if not company_defaults.get("enable_perpetual_inventory"):
+            return
+
+        valuation_rows = get_valuation_differences(doc.doctype, doc.name)
+        if not valuation_rows:
+            return
+
+        warehouse_accounts = get_warehouse_accounts({row["warehouse"] for row in valuation_rows})
+        stock_accounts = set(warehouse_accounts.values())
+        if company_defaults.get("default_inventory_account"):
+            stock_accounts.add(company_defaults["default_inventory_account"])
+
+        gl_result = compute_stock_adjustment_gl_entries(
+            valuation_rows,
+            get_row_accounts(doc),
+            warehouse_accounts,
+            get_posted_stock_balances(doc.doctype, doc.name, sorted(stock_accounts)),
+            company_defaults
+        )
+
+        if not gl_result["gl_entries"]:
+            return
+
+        remarks = f"Stock adjustment for {doc.doctype} {doc.name}"
+        _make_gl_entries([
+            doc.get_gl_dict(dict(entry, remarks=remarks))
+            for entry in gl_result["gl_entries"]
+        ])
+
+        # Log success
+        frappe.logger().info(
+            f"Stock adjustment GL Entry posted for {doc.doctype} {doc.name}: "
+            f"Debit={gl_result['total_debit']}, Credit={gl_result['total_credit']}"
+        )
+
+        doc.add_comment(
+            "Info",
+            f"Stock adjustment GL Entry posted: {len(gl_result['gl_entries'])} entries, "
+            f"Total Debit: {gl_result['total_debit']}, "
+            f"Total Credit: {gl_result['total_credit']}"
+        )
+
+    except Exception as e:
+        frappe.log_error(
+            message=str(e),
+            title=f"Stock Adjustment GL Error - {doc.doctype} {doc.name}"
+        )
+        frappe.throw(_(f"Failed to post stock adjustment GL Entry: {str(e)}"))
@@ -0,0 +1,247 @@
+"""
+Tax Template Rename Planner
+
+This module fixes Sales and Purchase Taxes and Charges Template names whose
+company suffix does not match the template's company, e.g.
+"PPN 11% - BAC" with company "Cirebon" becomes "PPN 11% - Cirebon".
+
+The work is split in two steps:
+1. Plan: the company-suffix pattern is compiled once and the full list of
+   renames (and title updates) is computed for both template DocTypes
+2. Apply: renames run in batches, one transaction per batch; titles are
+   written directly instead of loading and saving each template
+
+A plan is returned with its diff lines (see format_plan_diff), so the caller
+can print it (dry run) before anything is changed; nothing is printed here,
+so per-site diffs from parallel workers do not interleave.
+
+Usage:
+    bench --site [site-name] console
+    >>> from erpnext_custom.tax_template_rename import fix_tax_template_names
+    >>> print("\n".join(fix_tax_template_names(dry_run=True)["diff"]))   # plan only
+    >>> fix_tax_template_names()               # apply
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Pattern
+import frappe
+
+
+TAX_TEMPLATE_DOCTYPES = [
+    "Sales Taxes and Charges Template",
+    "Purchase Taxes and Charges Template"
+]
+
+# Renames per transaction
+DEFAULT_BATCH_SIZE = 50
+
+
+def compile_suffix_pattern(company_names: List[str]) -> Optional[Pattern]:
+    """
+    Compile the " - [Company]" suffix pattern for all companies.
+
+    Longer names are tried first so "PT Maju Jaya" wins over "Jaya".
+
+    Args:
+        company_names: Company names
+
+    Returns:
+        Compiled pattern with the company in group 1, or None without companies
+    """
+    if not company_names:
+        return None
+
+    alternatives = "|".join(
+        re.escape(name) for name in sorted(company_names, key=len, reverse=True)
+    )
+    return re.compile(r"\s*-\s*(" + alternatives + r")$")
+
+
+def plan_template_renames(
+    templates: Dict[str, List[Dict[str, Any]]],
+    suffix_pattern: Optional[Pattern]
+) -> List[Dict[str, Any]]:
+    """
+    Compute the renames for templates with a wrong company suffix.
+
+    Args:
+        templates: Dict of doctype -> template rows (name, company, title)
+        suffix_pattern: Pattern from compile_suffix_pattern
+
+    Returns:
+        List of dicts containing:
+            - doctype, old_name, new_name
+            - old_title, new_title (new_title None when the title is kept)
+            - conflict: Reason the rename cannot run, or None
+    """
+    if suffix_pattern is None:
+        return []
+
+    plan = []
+
+    for doctype, rows in templates.items():
+        existing = {row["name"] for row in rows}
+        targets = set()
+
+        for row in rows:
+            name = row["name"]
+            company = row["company"]
+            match = suffix_pattern.search(name)
+
+            if not match or not company or match.group(1) == company:
+                continue
+
+            new_name = f"{suffix_pattern.sub('', name)} - {company}"
+
+            # A template without a title shows its name
+            title = row.get("title") or name
+            new_title = None
+            if title and suffix_pattern.search(title):
+                new_title = f"{suffix_pattern.sub('', title)} - {company}"
+
+            conflict = None
+            if new_name in existing or new_name in targets:
+                conflict = f"{new_name} already exists"
+            targets.add(new_name)
+
+            plan.append({
+                "doctype": doctype,
+                "old_name": name,
+                "new_name": new_name,
+                "old_title": title,
+                "new_title": new_title,
+                "conflict": conflict
+            })
+
+    return plan
+
+
+def format_plan_diff(plan: List[Dict[str, Any]]) -> List[str]:
+    """
+    Render a plan as diff lines.
+
+    Args:
+        plan: Output of plan_template_renames
+
+    Returns:
+        Lines like "- old", "+ new", grouped per template
+    """
+    lines = []
+
+    for entry in plan:
+        lines.append(f"{entry['doctype']}:")
+        lines.append(f"  - {entry['old_name']}")
+        lines.append(f"  + {entry['new_name']}")
+        if entry["new_title"]:
+            lines.append(f"    title: {entry['old_title']} -> {entry['new_title']}")
+        if entry["conflict"]:
+            lines.append(f"    ✗ skipped: {entry['conflict']}")
+
+    return lines
+
+
+def get_rename_plan() -> List[Dict[str, Any]]:
+    """
+    Compute the rename plan of the connected site.
+
+    Returns:
+        See plan_template_renames
+    """
+    company_names = frappe.get_all("Company", pluck="name")
+    templates = {
+        doctype: frappe.get_all(
+            doctype,
+            fields=["name", "company", "title"],
+            limit_page_length=0
+        )
+        for doctype in TAX_TEMPLATE_DOCTYPES
+    }
+
+    return plan_template_renames(templates, compile_suffix_pattern(company_names))
+
+
+def apply_rename_plan(
+    plan: List[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Dict[str, Any]:
+    """
+    Apply a rename plan, one transaction per batch.
+
+    A failing batch is rolled back and reported; later batches still run.
+
+    Args:
+        plan: Output of plan_template_renames
+        batch_size: Renames per transaction
+
+    Returns:
+        Dict containing:
+            - renamed: New names of renamed templates
+            - failed: Dict of old name -> error
+    """
+    result = {"renamed": [], "failed": {}}
+    entries = [entry for entry in plan if not entry["conflict"]]
+
+    for start in range(0, len(entries), batch_size):
+        batch = entries[start:start + batch_size]
+
+        try:
+            for entry in batch:
+                frappe.rename_doc(entry["doctype"], entry["old_name"], entry["new_name"], force=True)
+
+                if entry["new_title"]:
+                    frappe.db.set_value(
+                        entry["doctype"],
+                        entry["new_name"],
+                        "title",
+                        entry["new_title"],
+                        update_modified=False
+                    )
+
+            frappe.db.commit()
+            result["renamed"].extend(entry["new_name"] for entry in batch)
+
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(
+                message=str(e),
+                title=f"Tax Template Rename Error - batch {batch[0]['old_name']}"
+            )
+            for entry in batch:
+                result["failed"][entry["old_name"]] = str(e)
+
+    return result
+
+
+def fix_tax_template_names(
+    dry_run: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Dict[str, Any]:
+    """
+    Plan and (unless dry_run) apply tax template renames on the connected site.
+
+    Args:
+        dry_run: Only compute the plan
+        batch_size: Renames per transaction
+
+    Returns:
+        Dict containing:
+            - site: Site name
+            - plan: The rename plan
+            - diff: Plan rendered as diff lines
+            - renamed: New names of renamed templates (empty on dry run)
+            - failed: Dict of old name -> error
+    """
+    plan = get_rename_plan()
+    diff = format_plan_diff(plan)
+
+    result = {"renamed": [], "failed": {}}
+    if not dry_run:
+        result = apply_rename_plan(plan, batch_size)
+
+    return {
+        "site": frappe.local.site,
+        "plan": plan,
+        "diff": diff,
+        "renamed": result["renamed"],
+        "failed": result["failed"]
+    }
@@ -0,0 +1,71 @@
+"""
+Unit Tests for the Calculator Benchmark Suite
+
+Tests that every case runs on valid inputs and that the baseline comparison
+flags throughput regressions past the threshold.
+"""
+
+import os
+import tempfile
+import unittest
+from erpnext_custom.benchmarks.bench_calculators import (
+    CASES,
+    case_key,
+    compare_to_baseline,
+    load_baseline,
+    save_baseline
+)
+
+
+class TestCases(unittest.TestCase):
+    """Test benchmark inputs"""
+
+    def test_cases_run(self):
+        """Test every case runs (inputs balanced and valid) at odd and even sizes"""
+        for name, setup in CASES.items():
+            for lines in (1, 2, 3):
+                with self.subTest(case=name, lines=lines):
+                    setup(lines)()
+
+
+class TestCompareToBaseline(unittest.TestCase):
+    """Test regression detection"""
+
+    def test_regression_past_threshold(self):
+        """Test a drop beyond the threshold is reported"""
+        regressions = compare_to_baseline(
+            {case_key("calculate_taxes", 100): 70.0},
+            {case_key("calculate_taxes", 100): 100.0},
+            threshold=0.2
+        )
+
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0]["change"], -0.3)
+
+    def test_drop_within_threshold(self):
+        """Test noise within the threshold and speedups pass"""
+        regressions = compare_to_baseline(
+            {"a[1]": 85.0, "b[1]": 150.0},
+            {"a[1]": 100.0, "b[1]": 100.0},
+            threshold=0.2
+        )
+
+        self.assertEqual(regressions, [])
+
+    def test_new_case_ignored(self):
+        """Test cases without a baseline are not regressions"""
+        self.assertEqual(compare_to_baseline({"new[1]": 1.0}, {}), [])
+
+    def test_baseline_roundtrip(self):
+        """Test saved results load back and a missing file is an empty baseline"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baselines", "calculators.json")
+            self.assertEqual(load_baseline(path), {})
+
+            save_baseline(path, {"a[1]": 100.0})
+
+            self.assertEqual(load_baseline(path), {"a[1]": 100.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Unit Tests for the Hook Pipeline Benchmark
+
+Runs a few documents through every submit and cancel pipeline on the
+in-memory frappe stand-in and checks they post without hook errors.
+"""
+
+import unittest
+from erpnext_custom.benchmarks.bench_hook_pipelines import run_pipelines, format_report
+
+
+class TestRunPipelines(unittest.TestCase):
+    """Test the pipelines"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.report = run_pipelines(docs=12, latency="local", seed=3)
+
+    def test_no_hook_errors(self):
+        """Test no hook wrote to the Error Log"""
+        self.assertEqual(self.report["errors"], [])
+
+    def test_document_counts(self):
+        """Test every pipeline submitted and cancelled its share of documents"""
+        counts = {
+            (pipeline, action): summary["count"]
+            for pipeline, actions in self.report["pipelines"].items()
+            for action, summary in actions.items()
+        }
+
+        self.assertEqual(counts, {
+            ("Sales Invoice", "submit"): 12,
+            ("Sales Invoice", "cancel"): 6,
+            ("Purchase Invoice", "submit"): 6,
+            ("Purchase Invoice", "cancel"): 6,
+            ("Credit Note", "submit"): 3,
+            ("Credit Note", "cancel"): 3,
+            ("Sales Return", "submit"): 3,
+            ("Sales Return", "cancel"): 3
+        })
+
+    def test_queries_and_latency_reported(self):
+        """Test statements per document and simulated waits are reported"""
+        for actions in self.report["pipelines"].values():
+            for summary in actions.values():
+                self.assertGreater(summary["queries_per_doc"], 0)
+
+        self.assertGreater(self.report["latency_seconds"], 0)
+        self.assertEqual(len(format_report(self.report)), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
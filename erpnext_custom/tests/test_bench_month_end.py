@@ -0,0 +1,74 @@
+"""
+Unit Tests for the Month-End Close Benchmark
+
+Runs a small simulated month on the in-memory frappe stand-in and checks
+that it closes cleanly and repeatably.
+"""
+
+import unittest
+from erpnext_custom.benchmarks.bench_month_end import find_problems, percentile, run_month
+
+
+class TestRunMonth(unittest.TestCase):
+    """Test the simulated month"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.report = run_month(
+            invoices=60,
+            credit_note_rate=0.1,
+            return_rate=0.1,
+            cancel_rate=0.1,
+            seed=7,
+            batch_size=4,
+            trace_memory=False
+        )
+
+    def test_closes_cleanly(self):
+        """Test hooks log no errors, the audit is clean and commission does not drift"""
+        self.assertEqual(find_problems(self.report), [])
+        self.assertTrue(self.report["close"]["audit"]["complete"])
+
+    def test_document_counts(self):
+        """Test every stage posted its share of documents"""
+        counts = {stage: summary["count"] for stage, summary in self.report["stages"].items()}
+
+        self.assertEqual(counts, {
+            "Sales Invoice": 60,
+            "Purchase Invoice": 30,
+            "Credit Note": 6,
+            "Sales Return": 6,
+            "Mass Cancellation": 6,
+            "Period Close": 1
+        })
+
+    def test_same_seed_same_month(self):
+        """Test a seed posts the same documents (same closing result)"""
+        again = run_month(
+            invoices=60,
+            credit_note_rate=0.1,
+            return_rate=0.1,
+            cancel_rate=0.1,
+            seed=7,
+            batch_size=4,
+            trace_memory=False
+        )
+
+        self.assertEqual(again["close"]["net_profit"], self.report["close"]["net_profit"])
+        self.assertEqual(again["queries"], self.report["queries"])
+
+
+class TestPercentile(unittest.TestCase):
+    """Test latency percentiles"""
+
+    def test_nearest_rank(self):
+        """Test nearest-rank percentiles of unsorted samples"""
+        samples = [float(i) for i in range(100, 0, -1)]
+
+        self.assertEqual(percentile(samples, 50), 50.0)
+        self.assertEqual(percentile(samples, 99), 99.0)
+        self.assertEqual(percentile([], 99), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
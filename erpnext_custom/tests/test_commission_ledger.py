@@ -0,0 +1,232 @@
+"""
+Unit Tests for Commission Adjustment Ledger
+
+Tests ledger row building, reversal of movements, the incremental update
+of the materialized totals and the period report read from them.
+"""
+
+import unittest
+from decimal import Decimal
+from unittest.mock import Mock, patch
+from erpnext_custom.benchmarks.frappe_standin import FrappeStandIn
+from erpnext_custom.commission_ledger import (
+    build_ledger_entries,
+    build_reversal_entries,
+    summarize_ledger_entries,
+    record_commission_movement,
+    seed_commission_ledger,
+    ENTRY_CREDIT_NOTE,
+    ENTRY_INVOICE,
+    ENTRY_OPENING,
+    ENTRY_REVERSAL
+)
+
+
+TEAM = [
+    {"sales_person": "Andi", "allocated_percentage": 60},
+    {"sales_person": "Budi", "allocated_percentage": 40}
+]
+SOLO = [{"sales_person": "Andi", "allocated_percentage": 100}]
+
+
+class TestBuildLedgerEntries(unittest.TestCase):
+    """Test ledger row building"""
+
+    def test_one_row_per_sales_person(self):
+        """Test movement is split across the Sales Team"""
+        entries = build_ledger_entries(
+            "SI-001", "CN-001", -50000, TEAM, ENTRY_CREDIT_NOTE, "2024-01-20 09:00:00"
+        )
+
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]["sales_person"], "Andi")
+        self.assertEqual(entries[0]["delta"], -30000.0)
+        self.assertEqual(entries[1]["delta"], -20000.0)
+        self.assertEqual(entries[1]["voucher"], "CN-001")
+        self.assertIsNone(entries[1]["reverses"])
+
+    def test_zero_commission_writes_nothing(self):
+        """Test zero movements do not produce ledger rows"""
+        entries = build_ledger_entries(
+            "SI-001", "SI-001", 0, TEAM, ENTRY_INVOICE, "2024-01-20 09:00:00"
+        )
+
+        self.assertEqual(entries, [])
+
+    def test_shares_add_up_to_movement(self):
+        """Test the rounding remainder goes to the last sales person"""
+        team = [{"sales_person": name, "allocated_percentage": 0} for name in ("Andi", "Budi", "Citra")]
+
+        entries = build_ledger_entries(
+            "SI-001", "SI-001", 100000, team, ENTRY_INVOICE, "2024-01-20 09:00:00"
+        )
+
+        self.assertEqual([entry["delta"] for entry in entries], [33333.33, 33333.33, 33333.34])
+        self.assertEqual(round(sum(entry["delta"] for entry in entries), 2), 100000)
+
+
+class TestBuildReversalEntries(unittest.TestCase):
+    """Test reversing rows for cancelled vouchers"""
+
+    def test_reverses_live_rows(self):
+        """Test every live row gets a reversing row"""
+        ledger_rows = [
+            {"name": "L1", "invoice": "SI-001", "voucher": "CN-001", "sales_person": "Andi",
+             "entry_type": ENTRY_CREDIT_NOTE, "delta": Decimal("-30000"), "reverses": None}
+        ]
+
+        entries = build_reversal_entries(ledger_rows, "2024-01-21 09:00:00")
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["delta"], 30000.0)
+        self.assertEqual(entries[0]["reverses"], "L1")
+        self.assertEqual(entries[0]["entry_type"], ENTRY_REVERSAL)
+
+    def test_already_reversed_rows_are_skipped(self):
+        """Test cancelling twice does not reverse twice"""
+        ledger_rows = [
+            {"name": "L1", "invoice": "SI-001", "voucher": "CN-001", "sales_person": "Andi",
+             "entry_type": ENTRY_CREDIT_NOTE, "delta": -30000, "reverses": None},
+            {"name": "L2", "invoice": "SI-001", "voucher": "CN-001", "sales_person": "Andi",
+             "entry_type": ENTRY_REVERSAL, "delta": 30000, "reverses": "L1"}
+        ]
+
+        self.assertEqual(build_reversal_entries(ledger_rows, "2024-01-22 09:00:00"), [])
+
+
+class TestSummarizeLedgerEntries(unittest.TestCase):
+    """Test totals folding"""
+
+    def test_sum_per_invoice_and_sales_person(self):
+        """Test rows are summed per (invoice, sales_person)"""
+        entries = [
+            {"invoice": "SI-001", "sales_person": "Andi", "delta": 100000},
+            {"invoice": "SI-001", "sales_person": "Andi", "delta": Decimal("-30000")},
+            {"invoice": "SI-002", "sales_person": "Andi", "delta": 5000}
+        ]
+
+        self.assertEqual(summarize_ledger_entries(entries), {
+            ("SI-001", "Andi"): 70000.0,
+            ("SI-002", "Andi"): 5000.0
+        })
+
+
+class TestRecordCommissionMovement(unittest.TestCase):
+    """Test ledger persistence"""
+
+    @patch('erpnext_custom.commission_ledger.frappe')
+    def test_two_multi_row_statements(self, mock_frappe):
+        """Test a movement is one ledger INSERT plus one totals upsert"""
+        mock_frappe.utils.now = Mock(return_value="2024-01-20 09:00:00")
+        mock_frappe.generate_hash = Mock(side_effect=["L1", "L2"])
+        mock_frappe.session.user = "Administrator"
+        mock_frappe.get_all.return_value = [
+            {"name": "SI-001", "posting_date": "2024-01-05", "company": "BAC"}
+        ]
+
+        entries = record_commission_movement(
+            "SI-001", "CN-001", -50000, ENTRY_CREDIT_NOTE, sales_team=TEAM
+        )
+
+        self.assertEqual([entry["name"] for entry in entries], ["L1", "L2"])
+        self.assertEqual(mock_frappe.db.sql.call_count, 2)
+
+        upsert_query, upsert_values = mock_frappe.db.sql.call_args_list[1][0]
+        self.assertIn("ON DUPLICATE KEY UPDATE", upsert_query)
+        self.assertEqual(upsert_values, (
+            "SI-001", "Andi", "2024-01-05", "BAC", -30000.0, "2024-01-20 09:00:00",
+            "SI-001", "Budi", "2024-01-05", "BAC", -20000.0, "2024-01-20 09:00:00"
+        ))
+        mock_frappe.get_all.assert_called_once()
+
+
+class TestCommissionReport(unittest.TestCase):
+    """Test the period report against the in-memory frappe stand-in"""
+
+    def setUp(self):
+        self.standin = FrappeStandIn()
+        self.standin.db.insert_rows("Sales Invoice", [
+            {"name": "SI-001", "posting_date": "2024-01-05", "company": "BAC", "docstatus": 1},
+            {"name": "SI-002", "posting_date": "2024-01-20", "company": "XYZ", "docstatus": 1},
+            {"name": "SI-003", "posting_date": "2024-02-02", "company": "BAC", "docstatus": 1}
+        ])
+        self.standin.db.commit()
+
+    def post(self):
+        from erpnext_custom.commission_ledger import install_commission_ledger
+        install_commission_ledger()
+        record_commission_movement("SI-001", "SI-001", 100000, ENTRY_INVOICE, sales_team=TEAM)
+        record_commission_movement("SI-002", "SI-002", 50000, ENTRY_INVOICE, sales_team=SOLO)
+        record_commission_movement("SI-003", "SI-003", 80000, ENTRY_INVOICE, sales_team=SOLO)
+        # Credit Note in February against a January invoice
+        record_commission_movement("SI-001", "CN-001", -30000, ENTRY_CREDIT_NOTE, sales_team=TEAM)
+
+    def test_report_from_totals(self):
+        """Test the report sums the period's totals per sales person, Credit Notes in their invoice's period"""
+        with self.standin.installed():
+            from erpnext_custom.commission_recompute import get_commission_report
+            self.post()
+            self.standin.db.query_count = 0
+
+            report = get_commission_report("2024-01-01", "2024-01-31")
+            by_company = get_commission_report("2024-01-01", "2024-01-31", company="BAC")
+
+        self.assertEqual(report["Andi"], {"total": 92000.0, "invoices": {"SI-001": 42000.0, "SI-002": 50000.0}})
+        self.assertEqual(report["Budi"], {"total": 28000.0, "invoices": {"SI-001": 28000.0}})
+        self.assertEqual(by_company["Andi"]["invoices"], {"SI-001": 42000.0})
+        self.assertEqual(self.standin.db.query_count, 2)
+
+    def test_old_totals_table_rebuilt(self):
+        """Test a totals table without the period columns is rebuilt from the ledger"""
+        with self.standin.installed():
+            import frappe
+            from erpnext_custom.commission_ledger import install_commission_ledger, get_commission_report
+            self.post()
+            frappe.db.sql_ddl("DROP TABLE `tabCommission Total`")
+            frappe.db.sql_ddl("""
+                CREATE TABLE `tabCommission Total` (
+                    invoice VARCHAR(140) NOT NULL,
+                    sales_person VARCHAR(140) NOT NULL,
+                    total DECIMAL(21, 9) NOT NULL DEFAULT 0,
+                    modified DATETIME(6) NOT NULL,
+                    PRIMARY KEY (invoice, sales_person)
+                )
+            """)
+
+            install_commission_ledger()
+            report = get_commission_report("2024-02-01", "2024-02-29")
+
+        self.assertEqual(report, {"Andi": {"total": 80000.0, "invoices": {"SI-003": 80000.0}}})
+
+
+
+class TestSeedCommissionLedger(unittest.TestCase):
+    """Test Opening rows for invoices posted before the ledger"""
+
+    @patch('erpnext_custom.commission_ledger.get_sales_team_rows')
+    @patch('erpnext_custom.commission_ledger.get_commission_rows')
+    @patch('erpnext_custom.commission_ledger.frappe')
+    def test_credit_notes_get_their_own_rows(self, mock_frappe, mock_rows, mock_teams):
+        """Test each voucher is seeded, so a later Credit Note cancel finds its rows"""
+        mock_rows.return_value = [
+            {"invoice": "SI-001", "voucher": "CN-001", "is_return": 1, "commission": -30000, "stored_total": 70000},
+            {"invoice": "SI-001", "voucher": "SI-001", "is_return": 0, "commission": 100000, "stored_total": 70000}
+        ]
+        mock_teams.return_value = [{"parent": "SI-001", "sales_person": "Andi", "allocated_percentage": 100}]
+        mock_frappe.db.sql = Mock(side_effect=lambda query, *args, **kwargs: [] if "DISTINCT" in query else None)
+        mock_frappe.utils.now = Mock(return_value="2024-01-20 09:00:00")
+        mock_frappe.generate_hash = Mock(side_effect=["L1", "L2"])
+
+        seeded = seed_commission_ledger("2024-01-01", "2024-01-31")
+
+        self.assertEqual(seeded, 1)
+        insert_query, values = mock_frappe.db.sql.call_args_list[1][0]
+        self.assertIn("INSERT INTO `tabCommission Adjustment Ledger`", insert_query)
+        self.assertEqual(
+            [(values[i + 2], values[i + 5], values[i + 4]) for i in range(0, len(values), 9)],
+            [("SI-001", 100000.0, ENTRY_OPENING), ("CN-001", -30000.0, ENTRY_OPENING)]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
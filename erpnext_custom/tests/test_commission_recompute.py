@@ -0,0 +1,190 @@
+"""
+Unit Tests for Batch Commission Recomputation
+
+Tests aggregation of invoice and Credit Note commission, drift detection,
+sales person allocation and the bulk write-back.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+from erpnext_custom.commission_recompute import (
+    aggregate_commission_rows,
+    find_changed_totals,
+    allocate_commission_to_sales_persons,
+    write_commission_totals,
+    get_commission_rows,
+    recompute_commission_totals,
+    UNASSIGNED_SALES_PERSON
+)
+
+
+def commission_row(invoice, voucher, commission, stored_total, is_return=0):
+    return {
+        "invoice": invoice,
+        "voucher": voucher,
+        "is_return": is_return,
+        "commission": commission,
+        "stored_total": stored_total
+    }
+
+
+class TestAggregateCommissionRows(unittest.TestCase):
+    """Test folding of grouped commission rows"""
+
+    def test_invoice_without_credit_note(self):
+        """Test invoice total equals its item commission"""
+        result = aggregate_commission_rows([
+            commission_row("SI-001", "SI-001", 100000, 100000)
+        ])
+
+        self.assertEqual(result["SI-001"]["total"], 100000.0)
+        self.assertEqual(result["SI-001"]["credit_note_commission"], 0.0)
+
+    def test_credit_notes_are_deducted(self):
+        """Test Credit Note commission is deducted as absolute value"""
+        result = aggregate_commission_rows([
+            commission_row("SI-001", "SI-001", 100000, 100000),
+            commission_row("SI-001", "CN-001", -30000, 100000, is_return=1),
+            commission_row("SI-001", "CN-002", 20000, 100000, is_return=1)
+        ])
+
+        self.assertEqual(result["SI-001"]["commission"], 100000.0)
+        self.assertEqual(result["SI-001"]["credit_note_commission"], 50000.0)
+        self.assertEqual(result["SI-001"]["total"], 50000.0)
+
+    def test_null_values(self):
+        """Test NULL commission and stored totals are treated as zero"""
+        result = aggregate_commission_rows([
+            commission_row("SI-001", "SI-001", None, None)
+        ])
+
+        self.assertEqual(result["SI-001"]["total"], 0.0)
+        self.assertEqual(result["SI-001"]["stored_total"], 0.0)
+
+    def test_rounding(self):
+        """Test totals are rounded to 2 decimals"""
+        result = aggregate_commission_rows([
+            commission_row("SI-001", "SI-001", 33333.333, 0),
+            commission_row("SI-001", "CN-001", -11111.111, 0, is_return=1)
+        ])
+
+        self.assertEqual(result["SI-001"]["total"], 22222.22)
+
+
+class TestFindChangedTotals(unittest.TestCase):
+    """Test drift detection"""
+
+    def test_only_drifted_invoices_are_returned(self):
+        """Test unchanged invoices and rounding noise are skipped"""
+        invoice_totals = {
+            "SI-002": {"total": 70000.0, "stored_total": 100000.0},
+            "SI-001": {"total": 50000.0, "stored_total": 50000.0},
+            "SI-003": {"total": 10000.0, "stored_total": 10000.005}
+        }
+
+        self.assertEqual(find_changed_totals(invoice_totals), [("SI-002", 70000.0)])
+
+
+class TestAllocateCommissionToSalesPersons(unittest.TestCase):
+    """Test allocation of invoice totals to the Sales Team"""
+
+    def test_allocated_percentage_split(self):
+        """Test totals are split by allocated_percentage"""
+        invoice_totals = {"SI-001": {"total": 100000.0}}
+        sales_team = [
+            {"parent": "SI-001", "sales_person": "Andi", "allocated_percentage": 60},
+            {"parent": "SI-001", "sales_person": "Budi", "allocated_percentage": 40}
+        ]
+
+        result = allocate_commission_to_sales_persons(invoice_totals, sales_team)
+
+        self.assertEqual(result["Andi"]["total"], 60000.0)
+        self.assertEqual(result["Budi"]["invoices"], {"SI-001": 40000.0})
+
+    def test_equal_split_without_percentages(self):
+        """Test equal split when no allocated percentage is set"""
+        invoice_totals = {"SI-001": {"total": 90000.0}}
+        sales_team = [
+            {"parent": "SI-001", "sales_person": "Andi", "allocated_percentage": 0},
+            {"parent": "SI-001", "sales_person": "Budi", "allocated_percentage": None},
+            {"parent": "SI-001", "sales_person": "Citra", "allocated_percentage": 0}
+        ]
+
+        result = allocate_commission_to_sales_persons(invoice_totals, sales_team)
+
+        self.assertEqual(result["Citra"]["total"], 30000.0)
+
+    def test_invoice_without_sales_team(self):
+        """Test invoices without Sales Team are reported as unassigned"""
+        invoice_totals = {
+            "SI-001": {"total": 10000.0},
+            "SI-002": {"total": 5000.0}
+        }
+
+        result = allocate_commission_to_sales_persons(invoice_totals, [])
+
+        self.assertEqual(result[UNASSIGNED_SALES_PERSON]["total"], 15000.0)
+
+
+class TestGetCommissionRows(unittest.TestCase):
+    """Test the grouped commission query"""
+
+    @patch('erpnext_custom.commission_recompute.frappe')
+    def test_vouchers_before_period_skipped(self, mock_frappe):
+        """Test vouchers are bounded by the period start, not only originals"""
+        mock_frappe.db.sql = Mock(return_value=[])
+
+        get_commission_rows("2024-01-01", "2024-01-31", company="Test Company")
+
+        query, values = mock_frappe.db.sql.call_args[0]
+        self.assertIn("si.posting_date >= %(from_date)s", query)
+        self.assertIn("orig.company = %(company)s", query)
+        self.assertEqual(values["from_date"], "2024-01-01")
+
+
+class TestWriteCommissionTotals(unittest.TestCase):
+    """Test bulk write-back"""
+
+    @patch('erpnext_custom.commission_recompute.frappe')
+    def test_one_update_per_chunk(self, mock_frappe):
+        """Test changes are written with one UPDATE per chunk"""
+        mock_frappe.utils.now = Mock(return_value="2024-02-01 10:00:00")
+        changes = [("SI-001", 100.0), ("SI-002", 200.0), ("SI-003", 300.0)]
+
+        updated = write_commission_totals(changes, chunk_size=2)
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(mock_frappe.db.sql.call_count, 2)
+
+        first_values = mock_frappe.db.sql.call_args_list[0][0][1]
+        self.assertEqual(
+            first_values,
+            ("SI-001", 100.0, "SI-002", 200.0, "2024-02-01 10:00:00", "SI-001", "SI-002")
+        )
+
+
+class TestRecomputeCommissionTotals(unittest.TestCase):
+    """Test the recomputation workflow"""
+
+    @patch('erpnext_custom.commission_recompute.frappe')
+    def test_dry_run_does_not_write(self, mock_frappe):
+        """Test dry run reports drift without writing"""
+        mock_frappe.db.sql = Mock(return_value=[
+            commission_row("SI-001", "SI-001", 100000, 100000),
+            commission_row("SI-001", "CN-001", -30000, 100000, is_return=1)
+        ])
+        mock_frappe.get_all = Mock(return_value=[
+            {"parent": "SI-001", "sales_person": "Andi", "allocated_percentage": 100}
+        ])
+
+        result = recompute_commission_totals("2024-01-01", "2024-01-31", dry_run=True)
+
+        self.assertEqual(result["changes"], [("SI-001", 70000.0)])
+        self.assertEqual(result["updated"], 0)
+        self.assertEqual(result["sales_persons"]["Andi"]["total"], 70000.0)
+        # Only the grouped read query was executed
+        self.assertEqual(mock_frappe.db.sql.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+Unit Tests for the Frappe-Free Core
+
+Tests that core modules and the hooks module import without frappe, in a
+fresh interpreter where importing frappe fails.
+"""
+
+import subprocess
+import sys
+import unittest
+from erpnext_custom import CORE_MODULES
+
+
+def import_without_frappe(module: str) -> subprocess.CompletedProcess:
+    """Import a module in a fresh interpreter with frappe blocked"""
+    return subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.modules['frappe'] = None; import {module}"],
+        capture_output=True,
+        text=True
+    )
+
+
+class TestCoreImports(unittest.TestCase):
+    """Test imports without frappe"""
+
+    def test_core_modules(self):
+        """Test every core module imports without frappe"""
+        for module in CORE_MODULES:
+            with self.subTest(module=module):
+                completed = import_without_frappe(module)
+                self.assertEqual(completed.returncode, 0, completed.stderr)
+
+    def test_hooks_module(self):
+        """Test hooks can be imported (e.g. to read DOC_EVENTS) without frappe"""
+        completed = import_without_frappe("erpnext_custom.hooks")
+
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+
+    def test_reexports(self):
+        """Test commission math is still importable from its previous modules"""
+        from erpnext_custom import commission_calculator
+        from erpnext_custom.credit_note_commission import calculate_commission_adjustment
+        from erpnext_custom.commission_recompute import split_amount_by_sales_team
+
+        self.assertIs(calculate_commission_adjustment, commission_calculator.calculate_commission_adjustment)
+        self.assertIs(split_amount_by_sales_team, commission_calculator.split_amount_by_sales_team)
+
+
+if __name__ == '__main__':
+    unittest.main()
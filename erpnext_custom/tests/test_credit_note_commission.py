@@ -11,11 +11,31 @@ from unittest.mock import Mock, MagicMock, patch
 from erpnext_custom.credit_note_commission import (
     calculate_commission_adjustment,
     validate_commission_adjustment,
+    apply_commission_delta,
     on_credit_note_submit,
     on_credit_note_cancel
 )
 
 
+class FakeDoesNotExistError(Exception):
+    pass
+
+
+def setup_invoice_row(mock_frappe, commission):
+    """Mock the original invoice row updated and read back by apply_commission_delta"""
+    row = {"custom_total_komisi_sales": commission}
+    
+    def run_update(query, values):
+        row["custom_total_komisi_sales"] += values[0]
+    
+    mock_frappe.DoesNotExistError = FakeDoesNotExistError
+    mock_frappe.db.sql = Mock(side_effect=run_update)
+    mock_frappe.db.get_value = Mock(side_effect=lambda *args, **kwargs: row["custom_total_komisi_sales"])
+    mock_frappe.utils.now = Mock(return_value="2024-01-20 09:00:00.000000")
+    mock_frappe.logger = Mock(return_value=Mock(info=Mock()))
+    return row
+
+
 class TestCalculateCommissionAdjustment(unittest.TestCase):
     """Test commission adjustment calculation"""
     
@@ -151,6 +171,47 @@ class TestValidateCommissionAdjustment(unittest.TestCase):
         self.assertEqual(result["new_commission"], 0)
 
 
+class TestApplyCommissionDelta(unittest.TestCase):
+    """Test atomic commission update"""
+    
+    @patch('erpnext_custom.credit_note_commission.frappe')
+    def test_atomic_increment(self, mock_frappe):
+        """Test delta is applied as one in-database increment and read back"""
+        setup_invoice_row(mock_frappe, 100000)
+        
+        result = apply_commission_delta("SI-2024-00001", -30000)
+        
+        self.assertEqual(result["original_commission"], 100000)
+        self.assertEqual(result["new_commission"], 70000)
+        
+        query, values = mock_frappe.db.sql.call_args[0]
+        self.assertIn("custom_total_komisi_sales = IFNULL(custom_total_komisi_sales, 0) + %s", query)
+        self.assertNotIn("AND modified", query)
+        self.assertEqual(values, (-30000, "2024-01-20 09:00:00.000000", "SI-2024-00001"))
+        mock_frappe.db.sql.assert_called_once()
+        mock_frappe.get_doc.assert_not_called()
+    
+    @patch('erpnext_custom.credit_note_commission.frappe')
+    def test_clears_document_cache(self, mock_frappe):
+        """Test the cached original invoice is dropped after the update"""
+        setup_invoice_row(mock_frappe, 100000)
+        
+        apply_commission_delta("SI-2024-00001", -30000)
+        
+        mock_frappe.clear_document_cache.assert_called_once_with("Sales Invoice", "SI-2024-00001")
+    
+    @patch('erpnext_custom.credit_note_commission.frappe')
+    def test_missing_invoice(self, mock_frappe):
+        """Test missing invoice raises DoesNotExistError"""
+        setup_invoice_row(mock_frappe, 0)
+        mock_frappe.db.get_value = Mock(return_value=None)
+        
+        with self.assertRaises(FakeDoesNotExistError):
+            apply_commission_delta("SI-2024-00001", -30000)
+        
+        mock_frappe.clear_document_cache.assert_not_called()
+
+
 class TestOnCreditNoteSubmit(unittest.TestCase):
     """Test Credit Note submit hook"""
     
@@ -163,11 +224,13 @@ class TestOnCreditNoteSubmit(unittest.TestCase):
         
         on_credit_note_submit(doc)
         
-        # Should not call frappe.get_doc
-        mock_frappe.get_doc.assert_not_called()
+        # Should not touch the original invoice
+        mock_frappe.db.get_value.assert_not_called()
+        mock_frappe.db.sql.assert_not_called()
     
+    @patch('erpnext_custom.credit_note_commission.record_commission_movement')
     @patch('erpnext_custom.credit_note_commission.frappe')
-    def test_submit_credit_note_adjusts_commission(self, mock_frappe):
+    def test_submit_credit_note_adjusts_commission(self, mock_frappe, mock_ledger):
         """Test Credit Note submit adjusts original invoice commission"""
         # Setup Credit Note
         credit_note = Mock()
@@ -177,28 +240,27 @@ class TestOnCreditNoteSubmit(unittest.TestCase):
         credit_note.get = Mock(return_value=-50000)
         credit_note.add_comment = Mock()
         
-        # Setup original invoice
-        original_invoice = Mock()
-        original_invoice.name = "SI-2024-00001"
-        original_invoice.get = Mock(return_value=100000)
-        original_invoice.custom_total_komisi_sales = 100000
-        original_invoice.flags = Mock()
-        original_invoice.save = Mock()
-        original_invoice.add_comment = Mock()
-        
-        mock_frappe.get_doc = Mock(return_value=original_invoice)
-        mock_frappe.logger = Mock(return_value=Mock(info=Mock()))
+        # Setup original invoice row
+        setup_invoice_row(mock_frappe, 100000)
         
         # Execute
         on_credit_note_submit(credit_note)
         
-        # Verify original invoice was updated
-        self.assertEqual(original_invoice.custom_total_komisi_sales, 50000)
-        original_invoice.save.assert_called_once_with(ignore_permissions=True)
+        # Verify original invoice was decremented in the database
+        values = mock_frappe.db.sql.call_args[0][1]
+        self.assertEqual(values[0], -50000)
+        self.assertEqual(values[2], "SI-2024-00001")
         
-        # Verify comments were added
-        original_invoice.add_comment.assert_called_once()
+        # Verify comments were added without loading the original invoice
+        comment = mock_frappe.get_doc.call_args[0][0]
+        self.assertEqual(comment["reference_name"], "SI-2024-00001")
+        self.assertIn("100000 - 50000 = 50000", comment["content"])
         credit_note.add_comment.assert_called_once()
+        
+        # Verify the adjustment was appended to the ledger
+        mock_ledger.assert_called_once_with(
+            "SI-2024-00001", "CN-2024-00001", -50000, "Credit Note"
+        )
     
     @patch('erpnext_custom.credit_note_commission.frappe')
     def test_submit_credit_note_no_return_against(self, mock_frappe):
@@ -222,8 +284,10 @@ class TestOnCreditNoteSubmit(unittest.TestCase):
         credit_note.is_return = 1
         credit_note.return_against = "SI-2024-00001"
         credit_note.name = "CN-2024-00001"
+        credit_note.get = Mock(return_value=-50000)
         
-        mock_frappe.get_doc = Mock(side_effect=mock_frappe.DoesNotExistError)
+        setup_invoice_row(mock_frappe, 0)
+        mock_frappe.db.get_value = Mock(return_value=None)
         mock_frappe.throw = Mock()
         
         on_credit_note_submit(credit_note)
@@ -232,6 +296,40 @@ class TestOnCreditNoteSubmit(unittest.TestCase):
         mock_frappe.throw.assert_called_once()
 
 
+    @patch('erpnext_custom.credit_note_commission.record_commission_movement')
+    @patch('erpnext_custom.credit_note_commission.frappe')
+    def test_ledger_failure_rolls_back_increment(self, mock_frappe, mock_ledger):
+        """Test a failing ledger write undoes the increment before the error is swallowed"""
+        credit_note = Mock()
+        credit_note.is_return = 1
+        credit_note.return_against = "SI-2024-00001"
+        credit_note.name = "CN-2024-00001"
+        credit_note.get = Mock(return_value=-50000)
+        setup_invoice_row(mock_frappe, 100000)
+        mock_ledger.side_effect = Exception("Lock wait timeout")
+        
+        on_credit_note_submit(credit_note)
+        
+        mock_frappe.db.savepoint.assert_called_once_with("credit_note_commission")
+        mock_frappe.db.rollback.assert_called_once_with(save_point="credit_note_commission")
+        mock_frappe.log_error.assert_called_once()
+        mock_frappe.msgprint.assert_called_once()
+    
+    @patch('erpnext_custom.credit_note_commission.frappe')
+    def test_no_rollback_before_adjustment(self, mock_frappe):
+        """Test nothing is rolled back when the hook fails before adjusting"""
+        credit_note = Mock()
+        credit_note.is_return = 1
+        credit_note.return_against = "SI-2024-00001"
+        credit_note.name = "CN-2024-00001"
+        credit_note.get = Mock(side_effect=Exception("Bad document"))
+        
+        on_credit_note_submit(credit_note)
+        
+        mock_frappe.db.rollback.assert_not_called()
+        mock_frappe.log_error.assert_called_once()
+
+
 class TestOnCreditNoteCancel(unittest.TestCase):
     """Test Credit Note cancel hook"""
     
@@ -244,11 +342,13 @@ class TestOnCreditNoteCancel(unittest.TestCase):
         
         on_credit_note_cancel(doc)
         
-        # Should not call frappe.get_doc
-        mock_frappe.get_doc.assert_not_called()
+        # Should not touch the original invoice
+        mock_frappe.db.get_value.assert_not_called()
+        mock_frappe.db.sql.assert_not_called()
     
+    @patch('erpnext_custom.credit_note_commission.reverse_commission_movements')
     @patch('erpnext_custom.credit_note_commission.frappe')
-    def test_cancel_credit_note_reverses_commission(self, mock_frappe):
+    def test_cancel_credit_note_reverses_commission(self, mock_frappe, mock_ledger):
         """Test Credit Note cancel reverses commission adjustment"""
         # Setup Credit Note
         credit_note = Mock()
@@ -258,28 +358,23 @@ class TestOnCreditNoteCancel(unittest.TestCase):
         credit_note.get = Mock(return_value=-50000)
         credit_note.add_comment = Mock()
         
-        # Setup original invoice (already adjusted)
-        original_invoice = Mock()
-        original_invoice.name = "SI-2024-00001"
-        original_invoice.get = Mock(return_value=50000)  # Already reduced
-        original_invoice.custom_total_komisi_sales = 50000
-        original_invoice.flags = Mock()
-        original_invoice.save = Mock()
-        original_invoice.add_comment = Mock()
-        
-        mock_frappe.get_doc = Mock(return_value=original_invoice)
-        mock_frappe.logger = Mock(return_value=Mock(info=Mock()))
+        # Setup original invoice row (already adjusted)
+        setup_invoice_row(mock_frappe, 50000)
         
         # Execute
         on_credit_note_cancel(credit_note)
         
-        # Verify original invoice was restored
-        self.assertEqual(original_invoice.custom_total_komisi_sales, 100000)
-        original_invoice.save.assert_called_once_with(ignore_permissions=True)
+        # Verify original invoice was incremented in the database
+        values = mock_frappe.db.sql.call_args[0][1]
+        self.assertEqual(values[0], 50000)
         
         # Verify comments were added
-        original_invoice.add_comment.assert_called_once()
+        comment = mock_frappe.get_doc.call_args[0][0]
+        self.assertIn("50000 + 50000 = 100000", comment["content"])
         credit_note.add_comment.assert_called_once()
+        
+        # Verify reversing rows were appended to the ledger
+        mock_ledger.assert_called_once_with("CN-2024-00001")
     
     @patch('erpnext_custom.credit_note_commission.frappe')
     def test_cancel_credit_note_no_return_against(self, mock_frappe):
@@ -303,15 +398,17 @@ class TestOnCreditNoteCancel(unittest.TestCase):
         credit_note.is_return = 1
         credit_note.return_against = "SI-2024-00001"
         credit_note.name = "CN-2024-00001"
+        credit_note.get = Mock(return_value=-50000)
         
-        mock_frappe.get_doc = Mock(side_effect=Exception("Database error"))
+        mock_frappe.db.get_value = Mock(side_effect=Exception("Database error"))
         mock_frappe.log_error = Mock()
         mock_frappe.msgprint = Mock()
         
         # Should not raise exception
         on_credit_note_cancel(credit_note)
         
-        # Should log error and show message
+        # Should roll the increment back, log error and show message
+        mock_frappe.db.rollback.assert_called_once_with(save_point="credit_note_commission")
         mock_frappe.log_error.assert_called_once()
         mock_frappe.msgprint.assert_called_once()
 
@@ -319,8 +416,10 @@ class TestOnCreditNoteCancel(unittest.TestCase):
 class TestCommissionAdjustmentIntegration(unittest.TestCase):
     """Integration tests for commission adjustment workflow"""
     
+    @patch('erpnext_custom.credit_note_commission.reverse_commission_movements')
+    @patch('erpnext_custom.credit_note_commission.record_commission_movement')
     @patch('erpnext_custom.credit_note_commission.frappe')
-    def test_full_workflow_submit_and_cancel(self, mock_frappe):
+    def test_full_workflow_submit_and_cancel(self, mock_frappe, mock_record, mock_reverse):
         """Test complete workflow: submit Credit Note then cancel it"""
         # Setup Credit Note
         credit_note = Mock()
@@ -330,35 +429,21 @@ class TestCommissionAdjustmentIntegration(unittest.TestCase):
         credit_note.get = Mock(return_value=-50000)
         credit_note.add_comment = Mock()
         
-        # Setup original invoice
-        original_invoice = Mock()
-        original_invoice.name = "SI-2024-00001"
-        original_invoice.custom_total_komisi_sales = 100000
-        original_invoice.flags = Mock()
-        original_invoice.save = Mock()
-        original_invoice.add_comment = Mock()
-        
-        # Mock get method to return current commission value
-        def get_commission(field, default=0):
-            if field == "custom_total_komisi_sales":
-                return original_invoice.custom_total_komisi_sales
-            return default
-        
-        original_invoice.get = get_commission
-        
-        mock_frappe.get_doc = Mock(return_value=original_invoice)
-        mock_frappe.logger = Mock(return_value=Mock(info=Mock()))
+        # Setup original invoice row kept in a dict
+        row = setup_invoice_row(mock_frappe, 100000)
         
         # Submit Credit Note
         on_credit_note_submit(credit_note)
-        self.assertEqual(original_invoice.custom_total_komisi_sales, 50000)
+        self.assertEqual(row["custom_total_komisi_sales"], 50000)
         
         # Cancel Credit Note
         on_credit_note_cancel(credit_note)
-        self.assertEqual(original_invoice.custom_total_komisi_sales, 100000)
+        self.assertEqual(row["custom_total_komisi_sales"], 100000)
         
-        # Verify save was called twice
-        self.assertEqual(original_invoice.save.call_count, 2)
+        # Verify one update per hook
+        self.assertEqual(mock_frappe.db.sql.call_count, 2)
+        mock_record.assert_called_once()
+        mock_reverse.assert_called_once_with("CN-2024-00001")
 
 
 if __name__ == '__main__':
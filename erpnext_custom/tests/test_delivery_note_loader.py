@@ -0,0 +1,82 @@
+"""
+Unit Tests for Delivery Note Loader
+
+Tests the narrow, request-cached Delivery Note reads and the remaining
+returnable quantity per line.
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from erpnext_custom.sales_return.delivery_note_loader import (
+    get_delivery_note_header,
+    get_delivery_note_items,
+    get_remaining_returnable_qty,
+    clear_delivery_note_cache,
+    ITEM_FIELDS
+)
+
+
+ITEMS = [
+    {"name": "DNI-1", "idx": 1, "item_code": "ITEM-1", "item_name": "Item 1",
+     "qty": 10, "uom": "Nos", "rate": 1000, "warehouse": "Stores"},
+    {"name": "DNI-2", "idx": 2, "item_code": "ITEM-2", "item_name": "Item 2",
+     "qty": 3, "uom": "Nos", "rate": 500, "warehouse": "Stores"}
+]
+
+
+class TestDeliveryNoteCache(unittest.TestCase):
+    """Test request-scoped caching"""
+
+    @patch('erpnext_custom.sales_return.delivery_note_loader.frappe')
+    def test_header_and_items_fetched_once(self, mock_frappe):
+        """Test repeated reads in one request hit the database once"""
+        mock_frappe.local = SimpleNamespace()
+        mock_frappe.db.get_value = Mock(return_value={"name": "DN-001", "docstatus": 1})
+        mock_frappe.get_all = Mock(return_value=ITEMS)
+
+        for _ in range(3):
+            get_delivery_note_header("DN-001")
+            get_delivery_note_items("DN-001")
+
+        mock_frappe.db.get_value.assert_called_once()
+        mock_frappe.get_all.assert_called_once()
+        mock_frappe.get_doc.assert_not_called()
+        self.assertEqual(mock_frappe.get_all.call_args[1]["fields"], ITEM_FIELDS)
+
+    @patch('erpnext_custom.sales_return.delivery_note_loader.frappe')
+    def test_clear_cache_refetches(self, mock_frappe):
+        """Test clearing the cache forces a new read"""
+        mock_frappe.local = SimpleNamespace()
+        mock_frappe.get_all = Mock(return_value=ITEMS)
+
+        get_delivery_note_items("DN-001")
+        clear_delivery_note_cache("DN-001")
+        get_delivery_note_items("DN-001")
+
+        self.assertEqual(mock_frappe.get_all.call_count, 2)
+
+
+class TestGetRemainingReturnableQty(unittest.TestCase):
+    """Test remaining returnable quantity per line"""
+
+    @patch('erpnext_custom.sales_return.delivery_note_loader.get_returned_qty')
+    @patch('erpnext_custom.sales_return.delivery_note_loader.frappe')
+    def test_remaining_per_line(self, mock_frappe, mock_get_returned_qty):
+        """Test delivered minus returned, with one lookup for all lines"""
+        mock_frappe.local = SimpleNamespace()
+        mock_frappe.get_all = Mock(return_value=ITEMS)
+        mock_get_returned_qty.return_value = {"DNI-1": 4.0, "DNI-2": 0.0}
+
+        lines = get_remaining_returnable_qty("DN-001")
+
+        mock_get_returned_qty.assert_called_once_with(["DNI-1", "DNI-2"])
+        self.assertEqual(
+            [(line["name"], line["delivered_qty"], line["returned_qty"], line["remaining_qty"]) for line in lines],
+            [("DNI-1", 10.0, 4.0, 6.0), ("DNI-2", 3.0, 0.0, 3.0)]
+        )
+        self.assertEqual(lines[0]["item_code"], "ITEM-1")
+
+
+if __name__ == '__main__':
+    unittest.main()
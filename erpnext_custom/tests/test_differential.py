@@ -0,0 +1,202 @@
+"""
+Unit Tests for the Differential Harness
+
+Tests comparison of results, shrinking of mismatching cases and running
+engines against the scalar calculators, serially and in worker processes.
+"""
+
+import unittest
+from decimal import Decimal, ROUND_HALF_UP
+from erpnext_custom.discount_calculator import DiscountValidationError
+from erpnext_custom.tax_calculator import TaxValidationError
+from erpnext_custom.benchmarks.differential import (
+    TARGETS,
+    complexity,
+    engine_results,
+    first_difference,
+    generate_cases,
+    reference_engine,
+    run_differential,
+    shrink
+)
+
+
+def half_up_engine(target, cases):
+    """Rounds percentage discounts half up on the printed value instead of like round()"""
+    if target != "calculate_discount":
+        return reference_engine(target, cases)
+
+    def half_up(value):
+        return float(Decimal(repr(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+    results = []
+    for case, result in zip(cases, reference_engine(target, cases)):
+        if isinstance(result, dict) and not case["discount_amount"] and case["discount_percentage"]:
+            amount = (case["discount_percentage"] / 100) * case["subtotal"]
+            result = dict(result, discount_amount=half_up(amount), net_total=half_up(case["subtotal"] - amount))
+        results.append(result)
+    return results
+
+
+def last_row_engine(target, cases):
+    """Forgets the last tax row of templates with more than one"""
+    if target != "calculate_taxes":
+        return reference_engine(target, cases)
+
+    trimmed = []
+    for case in cases:
+        template = case["tax_template"]
+        if template and len(template["taxes"]) > 1:
+            case = dict(case, tax_template={"taxes": template["taxes"][:-1]})
+        trimmed.append(case)
+    return reference_engine(target, trimmed)
+
+
+def all_or_nothing_engine(target, cases):
+    """Validates the whole batch up front, like a vectorized engine would"""
+    if target == "calculate_discount" and any(case["subtotal"] <= 0 for case in cases):
+        raise DiscountValidationError("Subtotal must be greater than 0")
+    return reference_engine(target, cases)
+
+
+class TestFirstDifference(unittest.TestCase):
+    """Test comparing results"""
+
+    def test_exact_equality(self):
+        """Test numbers must be equal, without tolerance"""
+        self.assertIsNone(first_difference({"a": [1.5, {"b": 2}]}, {"a": [1.5, {"b": 2.0}]}))
+        self.assertEqual(first_difference({"a": [1.5, {"b": 2}]}, {"a": [1.5, {"b": 2.0000001}]}), "$.a[1].b")
+        self.assertEqual(first_difference({"a": [1]}, {"a": [1, 2]}), "$.a")
+        self.assertEqual(first_difference({"a": 1}, {"b": 1}), "$")
+
+    def test_exceptions_by_type(self):
+        """Test exceptions match by type, not message"""
+        self.assertIsNone(first_difference(TaxValidationError("one"), TaxValidationError("two")))
+        self.assertEqual(first_difference(TaxValidationError("one"), ValueError("one")), "$")
+        self.assertEqual(first_difference(TaxValidationError("one"), {"taxes": []}), "$")
+
+
+class TestGenerateCases(unittest.TestCase):
+    """Test the generated inputs"""
+
+    def test_deterministic(self):
+        """Test a seed and chunk always give the same cases"""
+        for target in TARGETS:
+            self.assertEqual(generate_cases(target, 7, 3, 50), generate_cases(target, 7, 3, 50))
+            self.assertNotEqual(generate_cases(target, 7, 3, 50), generate_cases(target, 7, 4, 50))
+
+    def test_covers_errors_and_results(self):
+        """Test inputs include both valid and rejected cases"""
+        for target in ["calculate_discount", "calculate_taxes"]:
+            results = reference_engine(target, generate_cases(target, 1, 0, 2000))
+            errors = sum(1 for result in results if isinstance(result, Exception))
+            self.assertGreater(errors, 0)
+            self.assertLess(errors, len(results) / 4)
+
+    def test_invoices_mostly_balance(self):
+        """Test generated invoices mostly post, as the calculators built them"""
+        for target in ["post_sales_invoice_gl_entry", "post_purchase_invoice_gl_entry"]:
+            results = reference_engine(target, generate_cases(target, 1, 0, 500))
+            posted = sum(1 for result in results if isinstance(result, dict) and result["is_balanced"])
+            self.assertGreater(posted, 450)
+
+
+class TestEngineResults(unittest.TestCase):
+    """Test calling an engine"""
+
+    def test_batch_failure_retried_per_case(self):
+        """Test a batch that raises is split into per-case results"""
+        cases = [
+            {"subtotal": 1000.0, "discount_percentage": 10, "discount_amount": 0},
+            {"subtotal": 0, "discount_percentage": 10, "discount_amount": 0}
+        ]
+
+        results = engine_results(all_or_nothing_engine, "calculate_discount", cases)
+
+        self.assertEqual(results[0]["net_total"], 900.0)
+        self.assertIsInstance(results[1], DiscountValidationError)
+
+
+class TestShrink(unittest.TestCase):
+    """Test shrinking mismatching cases"""
+
+    def test_drops_rows_and_simplifies_numbers(self):
+        """Test a missing-row bug shrinks to two plain rows"""
+        case = {
+            "net_total": 8123456.789,
+            "tax_template": {"taxes": [
+                {"charge_type": "On Net Total", "account_head": "2210 - Hutang PPN", "rate": 11.5},
+                {"charge_type": "On Previous Row Total", "account_head": "2210 - Hutang PPN", "rate": 3.25},
+                {"charge_type": "On Net Total", "account_head": "2230 - Hutang PPh 23", "rate": 2,
+                 "add_deduct_tax": "Deduct"}
+            ]},
+            "tax_type": "Sales"
+        }
+
+        shrunk = shrink(last_row_engine, "calculate_taxes", case)
+
+        self.assertEqual(len(shrunk["tax_template"]["taxes"]), 2)
+        self.assertEqual(shrunk["net_total"], 1.0)
+        self.assertEqual([row["rate"] for row in shrunk["tax_template"]["taxes"]], [0.0, 0])
+        self.assertLess(complexity(shrunk), complexity(case))
+
+    def test_rounding_mismatch(self):
+        """Test a half-up rounding bug shrinks to the smallest subtotal that shows it"""
+        case = {"subtotal": 83.0, "discount_percentage": 1.5, "discount_amount": 0}
+
+        shrunk = shrink(half_up_engine, "calculate_discount", case)
+
+        self.assertEqual(shrunk, {"subtotal": 1.0, "discount_percentage": 1.5, "discount_amount": 0})
+        self.assertEqual(reference_engine("calculate_discount", [shrunk])[0]["discount_amount"], 0.01)
+        self.assertEqual(half_up_engine("calculate_discount", [shrunk])[0]["discount_amount"], 0.02)
+
+
+class TestRunDifferential(unittest.TestCase):
+    """Test whole runs"""
+
+    def test_reference_matches_itself(self):
+        """Test the scalar loop has no mismatches on any target"""
+        report = run_differential(cases=3000, chunk_size=1000)
+
+        self.assertEqual(set(report["targets"]), set(TARGETS))
+        for summary in report["targets"].values():
+            self.assertEqual(summary, {"cases": 3000, "mismatches": 0})
+        self.assertEqual(report["mismatches"], [])
+
+    def test_batch_validation_matches(self):
+        """Test an engine rejecting whole batches still matches per case"""
+        report = run_differential(all_or_nothing_engine, ["calculate_discount"], cases=2000, chunk_size=500)
+
+        self.assertEqual(report["targets"]["calculate_discount"]["mismatches"], 0)
+
+    def test_reports_shrunk_mismatches(self):
+        """Test a wrong engine is caught and its cases reported shrunk, once each"""
+        report = run_differential(last_row_engine, ["calculate_taxes"], cases=2000, chunk_size=500, max_mismatches=3)
+
+        self.assertGreater(report["targets"]["calculate_taxes"]["mismatches"], 100)
+        self.assertLessEqual(len(report["mismatches"]), 3)
+        shrunk = [mismatch["shrunk"] for mismatch in report["mismatches"]]
+        self.assertEqual(len(shrunk), len({repr(case) for case in shrunk}))
+        for mismatch in report["mismatches"]:
+            self.assertEqual(len(mismatch["shrunk"]["tax_template"]["taxes"]), 2)
+            self.assertLessEqual(complexity(mismatch["shrunk"]), complexity(mismatch["case"]))
+
+    def test_workers_give_same_report(self):
+        """Test worker processes report what a serial run does"""
+        arguments = dict(engine=half_up_engine, targets=["calculate_discount"], cases=4000, chunk_size=1000, seed=5)
+
+        serial = run_differential(workers=1, **arguments)
+        parallel = run_differential(workers=2, **arguments)
+
+        self.assertGreater(serial["targets"]["calculate_discount"]["mismatches"], 0)
+        self.assertEqual(serial["targets"], parallel["targets"])
+        self.assertEqual(serial["mismatches"], parallel["mismatches"])
+
+    def test_unknown_target(self):
+        """Test an unknown target is rejected"""
+        with self.assertRaises(ValueError):
+            run_differential(targets=["calculate_commission"])
+
+
+if __name__ == '__main__':
+    unittest.main()
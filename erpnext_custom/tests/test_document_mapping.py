@@ -0,0 +1,145 @@
+"""
+Unit Tests for Document Mapping
+
+Tests the read-only mapping view of documents and that the posting functions
+give the same GL Entries for a view as for a dict copy of the document.
+"""
+
+import unittest
+from erpnext_custom.benchmarks.frappe_standin import FrappeStandIn
+from erpnext_custom.document_mapping import DocumentMapping, DocumentRows
+from erpnext_custom.gl_entry_sales import post_sales_invoice_gl_entry, validate_sales_invoice_for_gl_posting
+from erpnext_custom.gl_entry_purchase import post_purchase_invoice_gl_entry
+
+
+def make_sales_invoice():
+    return FrappeStandIn().get_doc({
+        "doctype": "Sales Invoice",
+        "name": "SI-2024-00001",
+        "customer": "CUST-001",
+        "posting_date": "2024-01-15",
+        "total": 1000000,
+        "discount_amount": 100000,
+        "discount_percentage": 10,
+        "net_total": 900000,
+        "grand_total": 981000,
+        "items": [{"item_code": "ITEM-001", "qty": 10, "rate": 100000}],
+        "taxes": [
+            {"account_head": "2210 - Hutang PPN", "description": "PPN 11%", "rate": 11, "tax_amount": 99000},
+            {"account_head": "2230 - Hutang PPh 23", "description": None, "rate": 2, "tax_amount": -18000}
+        ]
+    })
+
+
+def make_purchase_invoice():
+    return FrappeStandIn().get_doc({
+        "doctype": "Purchase Invoice",
+        "name": "PI-2024-00001",
+        "supplier": "SUPP-001",
+        "posting_date": "2024-01-15",
+        "total": 600000,
+        "discount_amount": 50000,
+        "net_total": 550000,
+        "grand_total": 610500,
+        "items": [{"item_code": "ITEM-001", "qty": 6, "rate": 100000}],
+        "taxes": [
+            {"account_head": "1410 - Pajak Dibayar Dimuka", "description": "PPN Masukan 11%",
+             "rate": 11, "tax_amount": 60500}
+        ]
+    })
+
+
+class TestDocumentMapping(unittest.TestCase):
+    """Test the mapping view"""
+
+    def setUp(self):
+        self.doc = make_sales_invoice()
+        self.view = DocumentMapping(self.doc)
+
+    def test_reads_fields(self):
+        """Test fields read like dict keys"""
+        self.assertEqual(self.view["customer"], "CUST-001")
+        self.assertEqual(self.view.get("grand_total"), 981000)
+        self.assertIn("net_total", self.view)
+
+    def test_none_fields_are_missing(self):
+        """Test unset fields fall back to the default, like missing dict keys"""
+        self.assertEqual(self.view.get("rounding_adjustment", 0), 0)
+        self.assertNotIn("rounding_adjustment", self.view)
+        with self.assertRaises(KeyError):
+            self.view["rounding_adjustment"]
+
+    def test_child_rows_are_views(self):
+        """Test child tables read as sequences of row views"""
+        taxes = self.view["taxes"]
+
+        self.assertIsInstance(taxes, DocumentRows)
+        self.assertEqual(len(taxes), 2)
+        self.assertEqual([row.get("tax_amount", 0) for row in taxes], [99000, -18000])
+        self.assertEqual(taxes[1].get("description", "Tax"), "Tax")
+        self.assertEqual(taxes[-1:][0]["rate"], 2)
+
+    def test_no_copy(self):
+        """Test the view reads the document as it is now"""
+        self.doc.grand_total = 999000
+        self.doc.taxes[0].tax_amount = 100000
+
+        self.assertEqual(self.view["grand_total"], 999000)
+        self.assertEqual(self.view["taxes"][0]["tax_amount"], 100000)
+
+    def test_read_only(self):
+        """Test the view cannot be written"""
+        with self.assertRaises(TypeError):
+            self.view["grand_total"] = 0
+
+    def test_keys_are_fields(self):
+        """Test iteration lists set fields, without internal attributes"""
+        keys = set(self.view)
+
+        self.assertIn("customer", keys)
+        self.assertIn("taxes", keys)
+        self.assertNotIn("flags", keys)
+        self.assertNotIn("_standin", keys)
+        self.assertEqual(len(self.view), len(keys))
+
+    def test_plain_dict(self):
+        """Test a dict works as the document"""
+        view = DocumentMapping({"name": "SI-1", "taxes": [{"tax_amount": 5}], "remarks": None})
+
+        self.assertEqual(set(view), {"name", "taxes"})
+        self.assertEqual(view["taxes"][0]["tax_amount"], 5)
+
+
+class TestPostingFromView(unittest.TestCase):
+    """Test the posting functions read views like dicts"""
+
+    def test_sales_invoice(self):
+        """Test a Sales Invoice view posts the same GL Entries as its dict copy"""
+        doc = make_sales_invoice()
+        doc.taxes[1].description = "PPh 23 2%"
+        copy = doc.as_dict()
+
+        self.assertIsNone(validate_sales_invoice_for_gl_posting(DocumentMapping(doc)))
+        self.assertEqual(
+            post_sales_invoice_gl_entry(DocumentMapping(doc), "2024-01-15"),
+            post_sales_invoice_gl_entry(copy, "2024-01-15")
+        )
+
+    def test_purchase_invoice(self):
+        """Test a Purchase Invoice view posts the same GL Entries as its dict copy"""
+        doc = make_purchase_invoice()
+
+        self.assertEqual(
+            post_purchase_invoice_gl_entry(DocumentMapping(doc), "2024-01-15"),
+            post_purchase_invoice_gl_entry(doc.as_dict(), "2024-01-15")
+        )
+
+    def test_unset_description(self):
+        """Test a tax row without description gets the default remark"""
+        result = post_sales_invoice_gl_entry(DocumentMapping(make_sales_invoice()), "2024-01-15")
+
+        self.assertEqual(result["gl_entries"][-1]["remarks"], "Tax on SI-2024-00001")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Unit Tests for Employee Naming Series
+
+Tests the HR-EMP- counter is moved to the highest Employee number in use
+through the naming series audit.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+from erpnext_custom.employee_naming_series import fix_employee_naming_series
+
+
+class TestFixEmployeeNamingSeries(unittest.TestCase):
+    """Test the counter fix"""
+
+    @patch('erpnext_custom.naming_series_audit.frappe')
+    @patch('erpnext_custom.employee_naming_series.frappe')
+    def test_counter_follows_highest_number(self, mock_frappe, mock_audit_frappe):
+        """Test the counter is set to the highest number, reading only the HR-EMP- range"""
+        mock_frappe.local.site = mock_audit_frappe.local.site = "site1.local"
+        mock_frappe.db.count.return_value = 4
+        mock_audit_frappe.db.sql = Mock(side_effect=[
+            [{"doctype": "Employee", "is_submittable": 0}],
+            [{"name": "HR-EMP-", "current": 3}],
+            [{"name": "HR-EMP-00012"}],
+            None
+        ])
+
+        result = fix_employee_naming_series()
+
+        self.assertEqual(result["highest_number"], 12)
+        self.assertEqual(result["previous_counter"], 3)
+        self.assertEqual(result["counter"], 12)
+        self.assertEqual(result["next_id"], "HR-EMP-00013")
+        self.assertEqual(mock_audit_frappe.db.sql.call_args_list[1][0][1], (("HR-EMP-",),))
+        self.assertEqual(mock_audit_frappe.db.sql.call_args[0][1], ("HR-EMP-", 12))
+        mock_frappe.db.commit.assert_called_once()
+
+    @patch('erpnext_custom.naming_series_audit.frappe')
+    @patch('erpnext_custom.employee_naming_series.frappe')
+    def test_counter_ahead_is_kept(self, mock_frappe, mock_audit_frappe):
+        """Test a counter ahead of the highest number is not moved back"""
+        mock_frappe.local.site = mock_audit_frappe.local.site = "site1.local"
+        mock_audit_frappe.db.sql = Mock(side_effect=[
+            [{"doctype": "Employee", "is_submittable": 0}],
+            [{"name": "HR-EMP-", "current": 20}],
+            [{"name": "HR-EMP-00012"}]
+        ])
+
+        result = fix_employee_naming_series()
+
+        self.assertEqual(result["counter"], 20)
+        self.assertEqual(result["next_id"], "HR-EMP-00021")
+        self.assertEqual(mock_audit_frappe.db.sql.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+"""
+Unit Tests for the In-Memory Frappe Stand-In
+
+Tests MySQL to SQLite translation, document storage and events, latency
+injection, and that installing the stand-in leaves sys.modules as it was.
+"""
+
+import sys
+import time
+import unittest
+from erpnext_custom.benchmarks.frappe_standin import (
+    DoesNotExistError,
+    FrappeStandIn,
+    LatencyModel,
+    StandInError,
+    latency_profile,
+    translate_ddl,
+    translate_query
+)
+
+
+class TestTranslateQuery(unittest.TestCase):
+    """Test query translation"""
+
+    def test_tuple_expands_to_in_list(self):
+        """Test a tuple bound to %s becomes one placeholder per value"""
+        query, params = translate_query(
+            "SELECT name FROM `tabGL Entry` WHERE voucher_no IN %s AND is_cancelled = %s",
+            (("SI-001", "SI-002"), 0)
+        )
+
+        self.assertIn("IN (?, ?) AND is_cancelled = ?", query)
+        self.assertEqual(params, ["SI-001", "SI-002", 0])
+
+    def test_named_placeholders(self):
+        """Test %(name)s placeholders bind in order of appearance"""
+        query, params = translate_query(
+            "WHERE a = %(b)s AND c IN %(d)s AND e = %(b)s",
+            {"b": 1, "d": ["x"]}
+        )
+
+        self.assertEqual(query, "WHERE a = ? AND c IN (?) AND e = ?")
+        self.assertEqual(params, [1, "x", 1])
+
+    def test_percent_escape_only_with_values(self):
+        """Test %% is unescaped when values are given, as the MySQL driver does"""
+        self.assertIn("LIKE 'Reversal:%'", translate_query("LIKE 'Reversal:%%' AND a = %s", (1,))[0])
+        self.assertIn("LIKE 'A%%'", translate_query("LIKE 'A%%'")[0])
+
+    def test_on_duplicate_key_update(self):
+        """Test upserts become ON CONFLICT with excluded values"""
+        query, _params = translate_query(
+            "INSERT INTO t (k, total) VALUES (%s, %s) ON DUPLICATE KEY UPDATE total = total + VALUES(total)",
+            ("a", 1)
+        )
+
+        self.assertIn("ON CONFLICT DO UPDATE SET total = total + excluded.total", query)
+
+    def test_ddl_keys_and_engine_dropped(self):
+        """Test secondary keys and table options are removed"""
+        ddl = translate_ddl("""
+            CREATE TABLE IF NOT EXISTS `tabX` (
+                name VARCHAR(140) NOT NULL PRIMARY KEY,
+                parent VARCHAR(140),
+                KEY parent (parent)
+            ) ENGINE=InnoDB
+        """)
+
+        self.assertNotIn("KEY parent", ddl)
+        self.assertNotIn("ENGINE", ddl)
+        self.assertIn("parent VARCHAR(140)\n", ddl)
+
+
+class TestStandIn(unittest.TestCase):
+    """Test documents, database API and installation"""
+
+    def setUp(self):
+        self.standin = FrappeStandIn()
+        self.frappe = self.standin.module
+
+    def test_document_roundtrip(self):
+        """Test a submitted document loads back with its child rows"""
+        doc = self.frappe.get_doc({
+            "doctype": "Sales Invoice",
+            "naming_series": "SINV-.YYYY.-",
+            "customer": "CUST-001",
+            "posting_date": "2024-01-15",
+            "items": [{"item_code": "A", "qty": 2}, {"item_code": "B", "qty": 1}]
+        }).submit()
+
+        loaded = self.frappe.get_doc("Sales Invoice", doc.name)
+
+        self.assertEqual(doc.name, "SINV-2024-00001")
+        self.assertEqual(loaded.docstatus, 1)
+        self.assertEqual([row.item_code for row in loaded.items], ["A", "B"])
+        self.assertEqual(loaded.items[1].idx, 2)
+        self.assertIsNone(loaded.return_against)
+
+    def test_doc_events_order(self):
+        """Test events run as frappe runs them on submit and cancel"""
+        events = []
+        self.standin.register_doc_events({"ToDo": {
+            event: lambda doc, method: events.append(method)
+            for event in ("validate", "before_submit", "on_submit", "before_cancel", "on_cancel")
+        }})
+
+        doc = self.frappe.get_doc({"doctype": "ToDo", "description": "x"}).submit()
+        doc.cancel()
+
+        self.assertEqual(events, ["validate", "before_submit", "on_submit", "before_cancel", "on_cancel"])
+        self.assertEqual(self.frappe.db.get_value("ToDo", doc.name, "docstatus"), 2)
+
+    def test_get_value_and_filters(self):
+        """Test get_value shapes and get_all filters, with unset fields as NULL"""
+        for qty in (1, 5, 10):
+            self.frappe.get_doc({"doctype": "Item", "name": f"I-{qty}", "qty": qty}).insert()
+
+        self.assertEqual(self.frappe.db.get_value("Item", "I-5", "qty"), 5)
+        self.assertEqual(self.frappe.db.get_value("Item", "I-5", ["qty", "name"]), (5, "I-5"))
+        self.assertEqual(self.frappe.db.get_value("Item", "I-5", ["qty", "uom"], as_dict=True).uom, None)
+        self.assertIsNone(self.frappe.db.get_value("Item", "missing", "qty"))
+        self.assertEqual(
+            self.frappe.get_all("Item", filters={"qty": [">=", 5], "name": ["in", ["I-1", "I-10"]]}, pluck="name"),
+            ["I-10"]
+        )
+        self.assertEqual(self.frappe.get_all("Unknown Doctype"), [])
+
+    def test_missing_document(self):
+        """Test get_doc of a missing document raises DoesNotExistError"""
+        with self.assertRaises(DoesNotExistError):
+            self.frappe.get_doc("Sales Invoice", "missing")
+
+    def test_rowcount_and_rollback(self):
+        """Test UPDATE rowcount and rollback of uncommitted writes"""
+        self.frappe.get_doc({"doctype": "Item", "name": "I-1", "qty": 1}).insert()
+        self.frappe.db.commit()
+
+        self.frappe.db.sql("UPDATE `tabItem` SET qty = qty + %s WHERE name = %s", (1, "I-1"))
+        self.assertEqual(self.frappe.db._cursor.rowcount, 1)
+
+        self.frappe.db.rollback()
+        self.assertEqual(self.frappe.db.get_value("Item", "I-1", "qty"), 1)
+
+    def test_installed_restores_modules(self):
+        """Test installed() puts the stand-in in sys.modules and restores it"""
+        previous = sys.modules.get("frappe")
+
+        with self.standin.installed() as frappe:
+            import frappe as imported
+            self.assertIs(imported, frappe)
+
+        self.assertIs(sys.modules.get("frappe"), previous)
+
+
+
+class TestLatency(unittest.TestCase):
+    """Test simulated database latency"""
+
+    def test_statements_and_commits_wait(self):
+        """Test each statement waits a round trip plus its rows, commits their flush"""
+        standin = FrappeStandIn(latency=LatencyModel(round_trip=0.001, per_row=0.0001, commit=0.002))
+        db = standin.db
+        db.insert_rows("Item", [{"name": f"I-{i}", "qty": i} for i in range(10)])
+        self.assertAlmostEqual(db.latency_seconds, 0.002)
+
+        started = time.perf_counter()
+        db.sql("SELECT name FROM `tabItem`")
+        db.commit()
+        elapsed = time.perf_counter() - started
+
+        self.assertAlmostEqual(db.latency_seconds, 0.002 + 0.001 + 0.001 + 0.002)
+        self.assertGreaterEqual(elapsed, 0.004)
+
+    def test_jitter_is_seeded(self):
+        """Test the same seed gives the same waits, spread around the mean"""
+        first = LatencyModel(round_trip=0.001, jitter=0.3, seed=5)
+        second = LatencyModel(round_trip=0.001, jitter=0.3, seed=5)
+
+        delays = [first.statement_delay() for _ in range(2000)]
+
+        self.assertEqual(delays[:10], [second.statement_delay() for _ in range(10)])
+        self.assertGreater(len(set(delays)), 1)
+        self.assertAlmostEqual(sum(delays) / len(delays), 0.001, delta=0.0001)
+
+    def test_profiles(self):
+        """Test named profiles, "none" and unknown names"""
+        self.assertIsNone(latency_profile("none"))
+        self.assertIsNone(latency_profile(None))
+        self.assertGreater(latency_profile("cloud").round_trip, latency_profile("local").round_trip)
+        with self.assertRaises(StandInError):
+            latency_profile("moon")
+
+    def test_no_latency_by_default(self):
+        """Test a stand-in without a model never waits"""
+        standin = FrappeStandIn()
+        standin.db.sql("SELECT 1")
+        standin.db.commit()
+
+        self.assertEqual(standin.db.latency_seconds, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
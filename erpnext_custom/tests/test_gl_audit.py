@@ -0,0 +1,145 @@
+"""
+Unit Tests for GL Audit Module
+
+Tests posting-date windowing, the integrity audit time budget and the
+keyset-paginated net-effect audit.
+"""
+
+import unittest
+from datetime import date
+from unittest.mock import Mock, patch
+from erpnext_custom import gl_audit
+from erpnext_custom.gl_audit import (
+    iter_date_windows,
+    audit_ledger_integrity,
+    audit_cancellation_net_effect,
+    CHECK_UNBALANCED,
+    CHECK_GRAND_TOTAL
+)
+
+
+def getdate(value):
+    return date.fromisoformat(value)
+
+
+class TestIterDateWindows(unittest.TestCase):
+    """Test posting-date windows"""
+
+    @patch('erpnext_custom.gl_audit.frappe')
+    def test_windows_cover_period(self, mock_frappe):
+        """Test windows are consecutive, inclusive and clipped to the period"""
+        mock_frappe.utils.getdate = getdate
+
+        windows = list(iter_date_windows("2024-01-01", "2024-01-17", chunk_days=7))
+
+        self.assertEqual(windows, [
+            ("2024-01-01", "2024-01-07"),
+            ("2024-01-08", "2024-01-14"),
+            ("2024-01-15", "2024-01-17")
+        ])
+
+
+class TestAuditLedgerIntegrity(unittest.TestCase):
+    """Test the per-site integrity audit"""
+
+    @patch('erpnext_custom.gl_audit.frappe')
+    def test_findings_are_counted_per_check(self, mock_frappe):
+        """Test findings of each window are collected"""
+        mock_frappe.utils.getdate = getdate
+        mock_frappe.local.site = "site1.local"
+        finding = {"check": CHECK_UNBALANCED, "voucher_type": "Sales Invoice",
+                   "voucher_no": "SI-001", "detail": "GL Entry not balanced"}
+        check = Mock(side_effect=lambda start, end: iter([finding] if start == "2024-01-08" else []))
+
+        with patch.dict(gl_audit.INTEGRITY_CHECK_FUNCTIONS, {CHECK_UNBALANCED: check}):
+            report = audit_ledger_integrity(
+                "2024-01-01", "2024-01-14", checks=[CHECK_UNBALANCED], chunk_days=7
+            )
+
+        self.assertTrue(report["complete"])
+        self.assertEqual(report["site"], "site1.local")
+        self.assertEqual(report["counts"], {CHECK_UNBALANCED: 1})
+        self.assertEqual(report["findings"], [finding])
+        self.assertEqual(check.call_count, 2)
+
+    @patch('erpnext_custom.gl_audit.time')
+    @patch('erpnext_custom.gl_audit.frappe')
+    def test_deadline_stops_audit(self, mock_frappe, mock_time):
+        """Test the audit stops at a window boundary once the deadline passes"""
+        mock_frappe.utils.getdate = getdate
+        mock_time.monotonic = Mock(side_effect=[0, 100, 200])
+        check = Mock(return_value=iter([]))
+
+        with patch.dict(gl_audit.INTEGRITY_CHECK_FUNCTIONS, {CHECK_GRAND_TOTAL: check}):
+            report = audit_ledger_integrity(
+                "2024-01-01", "2024-01-31", checks=[CHECK_GRAND_TOTAL],
+                chunk_days=7, deadline=150
+            )
+
+        self.assertFalse(report["complete"])
+        self.assertEqual(check.call_count, 2)
+        self.assertEqual(report["checked_until"], {CHECK_GRAND_TOTAL: "2024-01-14"})
+
+    @patch('erpnext_custom.gl_audit.time')
+    @patch('erpnext_custom.gl_audit.frappe')
+    def test_statement_timeout_enforces_deadline(self, mock_frappe, mock_time):
+        """Test each window's statements are bounded by the time left, and a timeout ends the audit"""
+        class QueryTimeoutError(Exception):
+            pass
+
+        mock_frappe.utils.getdate = getdate
+        mock_frappe.QueryTimeoutError = QueryTimeoutError
+        mock_time.monotonic = Mock(side_effect=[0, 100])
+        check = Mock(side_effect=[iter([]), QueryTimeoutError("max_statement_time exceeded")])
+
+        with patch.dict(gl_audit.INTEGRITY_CHECK_FUNCTIONS, {CHECK_GRAND_TOTAL: check}):
+            report = audit_ledger_integrity(
+                "2024-01-01", "2024-01-31", checks=[CHECK_GRAND_TOTAL],
+                chunk_days=7, deadline=150
+            )
+
+        timeouts = [call.args[1][0] for call in mock_frappe.db.sql.call_args_list]
+        self.assertFalse(report["complete"])
+        self.assertEqual(report["checked_until"], {CHECK_GRAND_TOTAL: "2024-01-07"})
+        self.assertEqual(timeouts, [150, 50, 0])
+
+
+class TestAuditCancellationNetEffect(unittest.TestCase):
+    """Test the keyset-paginated net-effect audit"""
+
+    @patch('erpnext_custom.gl_audit.frappe')
+    def test_pages_until_short_page(self, mock_frappe):
+        """Test vouchers are paged and unbalanced ones reported"""
+        pages = [
+            [("Sales Invoice", "SI-001"), ("Sales Invoice", "SI-002")],
+            [("Sales Invoice", "SI-003")]
+        ]
+        nets = {
+            "SI-001": 0, "SI-002": 0, "SI-003": 1500
+        }
+
+        def sql(query, values, as_dict=False):
+            if "SELECT DISTINCT" in query:
+                return pages.pop(0)
+            return [
+                {"voucher_type": "Sales Invoice", "voucher_no": name,
+                 "account": "1210 - Piutang Usaha", "net": nets[name]}
+                for name in values[1]
+            ]
+
+        mock_frappe.db.sql = Mock(side_effect=sql)
+
+        result = audit_cancellation_net_effect("2024-01-01", "2024-12-31", chunk_size=2)
+
+        self.assertFalse(result["is_valid"])
+        self.assertEqual(result["unbalanced_count"], 1)
+        self.assertEqual(result["unbalanced"][0]["voucher_no"], "SI-003")
+        # Two pages, one net query per page
+        self.assertEqual(mock_frappe.db.sql.call_count, 4)
+        # Second page continues after the last key of the first
+        second_page_values = mock_frappe.db.sql.call_args_list[2][0][1]
+        self.assertEqual(second_page_values["after_no"], "SI-002")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+"""
+Unit Tests for Hook Latency Metrics
+
+Tests the per-site toggle, stage recording, the Prometheus file export and
+the query guard.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from erpnext_custom.hook_metrics import (
+    hook_timer,
+    record_hook_timings,
+    get_hook_histograms,
+    reset_hook_metrics,
+    render_hook_metrics,
+    export_hook_metrics,
+    CONFIG_ENABLED,
+    CONFIG_DIRECTORY,
+    CONFIG_QUERY_GUARD,
+    CONFIG_MAX_REPEATS,
+    METRIC_NAME,
+    STAGE_VALIDATE,
+    STAGE_BUILD_GL,
+    STAGE_DB,
+    STAGE_PERSIST,
+    STAGE_TOTAL
+)
+from erpnext_custom.query_counter import QueryBudgetExceeded
+
+
+class TestHookTimer(unittest.TestCase):
+    """Test timing hook calls"""
+
+    def setUp(self):
+        reset_hook_metrics()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        reset_hook_metrics()
+        shutil.rmtree(self.directory)
+
+    def configure(self, mock_frappe, enabled=True):
+        mock_frappe.conf = {CONFIG_ENABLED: int(enabled), CONFIG_DIRECTORY: self.directory}
+        mock_frappe.local.site = "site1.local"
+        mock_frappe.flags.in_test = False
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_disabled_site_records_nothing(self, mock_frappe):
+        """Test a site without the toggle gets the no-op timer"""
+        self.configure(mock_frappe, enabled=False)
+
+        with hook_timer("on_sales_invoice_submit") as timer:
+            with timer.stage(STAGE_VALIDATE):
+                pass
+
+        self.assertEqual(get_hook_histograms(), {})
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_stages_and_total_recorded(self, mock_frappe):
+        """Test every stage and the total get one value per call"""
+        self.configure(mock_frappe)
+
+        for _ in range(3):
+            with hook_timer("on_sales_invoice_submit") as timer:
+                with timer.stage(STAGE_VALIDATE):
+                    pass
+                with timer.stage(STAGE_BUILD_GL):
+                    pass
+
+        histograms = get_hook_histograms("site1.local")
+        self.assertEqual(
+            sorted(stage for _, _, stage in histograms),
+            [STAGE_BUILD_GL, STAGE_TOTAL, STAGE_VALIDATE]
+        )
+        for histogram in histograms.values():
+            self.assertEqual(histogram.count, 3)
+        self.assertEqual(get_hook_histograms("site2.local"), {})
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_repeated_stage_summed(self, mock_frappe):
+        """Test a stage entered twice in one call is one value"""
+        self.configure(mock_frappe)
+
+        with hook_timer("on_credit_note_submit") as timer:
+            with timer.stage(STAGE_VALIDATE):
+                pass
+            with timer.stage(STAGE_VALIDATE):
+                pass
+
+        histogram = get_hook_histograms()[("site1.local", "on_credit_note_submit", STAGE_VALIDATE)]
+        self.assertEqual(histogram.count, 1)
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_failed_hook_still_recorded(self, mock_frappe):
+        """Test timings are kept when the hook raises"""
+        self.configure(mock_frappe)
+
+        with self.assertRaises(ValueError):
+            with hook_timer("on_purchase_invoice_submit") as timer:
+                with timer.stage(STAGE_VALIDATE):
+                    raise ValueError("Supplier missing")
+
+        histograms = get_hook_histograms()
+        self.assertIn(("site1.local", "on_purchase_invoice_submit", STAGE_VALIDATE), histograms)
+        self.assertIn(("site1.local", "on_purchase_invoice_submit", STAGE_TOTAL), histograms)
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_first_call_exports_file(self, mock_frappe):
+        """Test the metrics file is written to the configured directory"""
+        self.configure(mock_frappe)
+
+        with hook_timer("on_sales_invoice_cancel"):
+            pass
+
+        path = os.path.join(self.directory, f"erpnext_custom_hooks_{os.getpid()}.prom")
+        with open(path) as f:
+            text = f.read()
+        self.assertIn(f'{METRIC_NAME}_count{{site="site1.local",hook="on_sales_invoice_cancel"', text)
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_export_only_current_site(self, mock_frappe):
+        """Test the export holds the current site's series only"""
+        self.configure(mock_frappe)
+        mock_frappe.conf[CONFIG_ENABLED] = 0
+        mock_frappe.local.site = "site2.local"
+
+        record_hook_timings("site1.local", "on_sales_invoice_submit", {STAGE_TOTAL: 0.01})
+        record_hook_timings("site2.local", "on_sales_invoice_submit", {STAGE_TOTAL: 0.02})
+
+        path = export_hook_metrics(os.path.join(self.directory, "out.prom"))
+
+        with open(path) as f:
+            text = f.read()
+        self.assertIn('site="site2.local"', text)
+        self.assertNotIn('site="site1.local"', text)
+        self.assertIn('pid="%d"' % os.getpid(), render_hook_metrics())
+
+
+
+class TestQueryGuard(unittest.TestCase):
+    """Test the query budget of hook calls"""
+
+    def setUp(self):
+        reset_hook_metrics()
+
+    def tearDown(self):
+        reset_hook_metrics()
+
+    def configure(self, mock_frappe, guard=None, in_test=False):
+        mock_frappe.conf = {CONFIG_QUERY_GUARD: guard, CONFIG_MAX_REPEATS: 3}
+        mock_frappe.local.site = "site1.local"
+        mock_frappe.flags.in_test = in_test
+        mock_frappe.db.sql = Mock(return_value=[])
+
+    def run_lookups(self, mock_frappe, rows):
+        with hook_timer("sales_return_validate"):
+            for row in range(rows):
+                mock_frappe.db.sql("SELECT qty FROM `tabDelivery Note Item` WHERE name = %s", (f"row-{row}",))
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_off_by_default(self, mock_frappe):
+        """Test a site without the guard does not count queries"""
+        self.configure(mock_frappe)
+        original_sql = mock_frappe.db.sql
+
+        with hook_timer("sales_return_validate") as timer:
+            self.assertIs(mock_frappe.db.sql, original_sql)
+        self.assertIsNone(getattr(timer, "queries", None))
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_warn_mode_logs_repeated_shape(self, mock_frappe):
+        """Test a per-row lookup over the repeat limit is logged"""
+        self.configure(mock_frappe, guard="warn")
+
+        self.run_lookups(mock_frappe, rows=5)
+
+        message = mock_frappe.logger.return_value.warning.call_args[0][0]
+        self.assertIn("sales_return_validate", message)
+        self.assertIn("5x SELECT qty FROM `tabDelivery Note Item` WHERE name = ?", message)
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_raise_mode_fails_hook(self, mock_frappe):
+        """Test the raise mode turns the violation into an exception"""
+        self.configure(mock_frappe, guard="raise")
+
+        with self.assertRaises(QueryBudgetExceeded):
+            self.run_lookups(mock_frappe, rows=5)
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_tests_not_forced_to_raise(self, mock_frappe):
+        """Test frappe test runs only enforce the budget when the site opts in"""
+        self.configure(mock_frappe, in_test=True)
+
+        self.run_lookups(mock_frappe, rows=4)
+        mock_frappe.logger.return_value.warning.assert_not_called()
+
+        mock_frappe.conf[CONFIG_QUERY_GUARD] = "raise"
+        with self.assertRaises(QueryBudgetExceeded):
+            self.run_lookups(mock_frappe, rows=4)
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_uncounted_stage_outside_budget(self, mock_frappe):
+        """Test queries of a nested document submit do not count against the hook"""
+        self.configure(mock_frappe, guard="raise")
+
+        with hook_timer("sales_return_on_submit") as timer:
+            with timer.uncounted(STAGE_PERSIST):
+                for row in range(10):
+                    mock_frappe.db.sql("INSERT INTO `tabStock Ledger Entry` VALUES (%s)", (row,))
+            with timer.stage(STAGE_PERSIST):
+                mock_frappe.db.sql("UPDATE `tabSales Return` SET stock_entry = %s", ("STE-1",))
+
+        self.assertEqual(timer.queries.count, 1)
+        self.assertIn(STAGE_PERSIST, timer.stages)
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_hook_error_not_replaced(self, mock_frappe):
+        """Test a failing hook raises its own error and the budget is logged"""
+        self.configure(mock_frappe, guard="raise")
+
+        with self.assertRaises(ValueError):
+            with hook_timer("sales_return_validate"):
+                for row in range(5):
+                    mock_frappe.db.sql("SELECT 1 FROM `tabItem` WHERE name = %s", (row,))
+                raise ValueError("Return quantity exceeds delivered quantity")
+
+        mock_frappe.logger.return_value.warning.assert_called_once()
+
+    @patch('erpnext_custom.hook_metrics.frappe')
+    def test_db_time_recorded_with_metrics(self, mock_frappe):
+        """Test the db stage is recorded when metrics are enabled as well"""
+        self.configure(mock_frappe, guard="warn")
+        mock_frappe.conf[CONFIG_ENABLED] = 1
+        mock_frappe.conf[CONFIG_DIRECTORY] = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, mock_frappe.conf[CONFIG_DIRECTORY])
+
+        self.run_lookups(mock_frappe, rows=2)
+
+        self.assertIn(("site1.local", "sales_return_validate", STAGE_DB), get_hook_histograms())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+"""
+Unit Tests for Invoice Cancellation Module
+
+Tests bulk reversal of GL Entries for many vouchers and the streaming
+net-effect verifier.
+"""
+
+import unittest
+from decimal import Decimal
+from erpnext_custom.invoice_cancellation import (
+    create_reversal_gl_entry,
+    create_reversal_gl_entries_bulk,
+    verify_cancellation_net_effect,
+    iter_unbalanced_vouchers
+)
+
+
+def gl_row(voucher_no, account, debit, credit, **extra):
+    row = {
+        "voucher_type": "Sales Invoice",
+        "voucher_no": voucher_no,
+        "account": account,
+        "debit": debit,
+        "credit": credit,
+        "against": "CUST-001",
+        "remarks": f"Sales Invoice {voucher_no}"
+    }
+    row.update(extra)
+    return row
+
+
+class TestCreateReversalGLEntriesBulk(unittest.TestCase):
+    """Test bulk reversal of many vouchers"""
+    
+    def test_reversals_grouped_per_voucher(self):
+        """Test each voucher gets its own reversal lines"""
+        rows = [
+            gl_row("SI-001", "1210 - Piutang Usaha", 999000, 0),
+            gl_row("SI-002", "1210 - Piutang Usaha", 500000, 0),
+            gl_row("SI-001", "4100 - Pendapatan Penjualan", 0, 999000),
+            gl_row("SI-002", "4100 - Pendapatan Penjualan", 0, 500000)
+        ]
+        
+        result = create_reversal_gl_entries_bulk(rows, "2024-02-01")
+        
+        self.assertEqual(result["failed"], {})
+        self.assertEqual(set(result["reversals"]), {
+            ("Sales Invoice", "SI-001"),
+            ("Sales Invoice", "SI-002")
+        })
+        self.assertEqual(result["total_debit"], 1499000.0)
+        self.assertEqual(result["total_credit"], 1499000.0)
+    
+    def test_matches_single_voucher_reversal(self):
+        """Test bulk reversal lines equal create_reversal_gl_entry output"""
+        rows = [
+            gl_row("SI-001", "1210 - Piutang Usaha", 999000, 0),
+            gl_row("SI-001", "4300 - Potongan Penjualan", 100000, 0),
+            gl_row("SI-001", "4100 - Pendapatan Penjualan", 0, 1000000),
+            gl_row("SI-001", "2210 - Hutang PPN", 0, 99000)
+        ]
+        
+        bulk = create_reversal_gl_entries_bulk(rows, "2024-02-01")
+        single = create_reversal_gl_entry(rows, "2024-02-01")
+        
+        self.assertEqual(bulk["reversals"][("Sales Invoice", "SI-001")], single["gl_entries"])
+    
+    def test_unbalanced_voucher_is_reported(self):
+        """Test unbalanced vouchers are left out and reported"""
+        rows = [
+            gl_row("SI-001", "1210 - Piutang Usaha", 999000, 0),
+            gl_row("SI-001", "4100 - Pendapatan Penjualan", 0, 999000),
+            gl_row("SI-002", "1210 - Piutang Usaha", 500000, 0),
+            gl_row("SI-002", "4100 - Pendapatan Penjualan", 0, 400000)
+        ]
+        
+        result = create_reversal_gl_entries_bulk(rows, "2024-02-01")
+        
+        self.assertIn(("Sales Invoice", "SI-002"), result["failed"])
+        self.assertNotIn(("Sales Invoice", "SI-002"), result["reversals"])
+        self.assertIn("not balanced", result["failed"][("Sales Invoice", "SI-002")][0])
+        self.assertEqual(result["total_debit"], 999000.0)
+    
+    def test_accounting_dimensions_are_copied(self):
+        """Test company, cost center and party are kept on the reversal"""
+        rows = [
+            gl_row("SI-001", "1210 - Piutang Usaha", 1000, 0,
+                   company="BAC", cost_center="Main - BAC",
+                   party_type="Customer", party="CUST-001"),
+            gl_row("SI-001", "4100 - Pendapatan Penjualan", 0, 1000,
+                   company="BAC", cost_center="Main - BAC",
+                   party_type=None, party=None)
+        ]
+        
+        result = create_reversal_gl_entries_bulk(rows, "2024-02-01")
+        first, second = result["reversals"][("Sales Invoice", "SI-001")]
+        
+        self.assertEqual(first["party"], "CUST-001")
+        self.assertEqual(first["cost_center"], "Main - BAC")
+        self.assertNotIn("party", second)
+
+    def test_account_currency_amounts_are_swapped(self):
+        """Test amounts in account currency are reversed with debit and credit"""
+        rows = [
+            gl_row("SI-001", "1210 - Piutang Usaha", 1000, 0, account_currency="IDR",
+                   debit_in_account_currency=1000, credit_in_account_currency=0),
+            gl_row("SI-001", "4100 - Pendapatan Penjualan", 0, 1000, account_currency="IDR",
+                   debit_in_account_currency=0, credit_in_account_currency=1000)
+        ]
+
+        result = create_reversal_gl_entries_bulk(rows, "2024-02-01")
+        first, second = result["reversals"][("Sales Invoice", "SI-001")]
+
+        self.assertEqual((first["debit_in_account_currency"], first["credit_in_account_currency"]), (0, 1000))
+        self.assertEqual((second["debit_in_account_currency"], second["credit_in_account_currency"]), (1000, 0))
+        self.assertEqual(first["account_currency"], "IDR")
+
+    def test_empty_input(self):
+        """Test no rows produce no reversals"""
+        result = create_reversal_gl_entries_bulk([], "2024-02-01")
+        
+        self.assertEqual(result["reversals"], {})
+        self.assertEqual(result["total_debit"], 0)
+
+
+class TestIterUnbalancedVouchers(unittest.TestCase):
+    """Test the streaming multi-voucher net-effect verifier"""
+    
+    def test_balanced_vouchers_yield_nothing(self):
+        """Test original + reversal rows of every voucher net to zero"""
+        originals = [
+            gl_row("SI-001", "1210 - Piutang Usaha", 999000, 0),
+            gl_row("SI-001", "4100 - Pendapatan Penjualan", 0, 999000)
+        ]
+        reversals = create_reversal_gl_entry(originals, "2024-02-01")["gl_entries"]
+        
+        self.assertEqual(list(iter_unbalanced_vouchers(originals + reversals)), [])
+    
+    def test_reports_only_unbalanced_vouchers(self):
+        """Test every voucher that does not net to zero is reported"""
+        rows = [
+            gl_row("SI-001", "1210 - Piutang Usaha", 1000, 0),
+            gl_row("SI-001", "1210 - Piutang Usaha", 0, 1000),
+            gl_row("SI-002", "1210 - Piutang Usaha", 1000, 0),
+            gl_row("SI-002", "1210 - Piutang Usaha", 0, 900),
+            gl_row("SI-003", "4100 - Pendapatan Penjualan", 0, 500)
+        ]
+        
+        reports = list(iter_unbalanced_vouchers(rows))
+        
+        self.assertEqual([r["voucher_no"] for r in reports], ["SI-002", "SI-003"])
+        self.assertEqual(reports[0]["account_balances"], {"1210 - Piutang Usaha": 100})
+        self.assertIn("non-zero net balance", reports[1]["errors"][0])
+    
+    def test_precomputed_nets(self):
+        """Test rows already summed per account by the database"""
+        rows = [
+            {"voucher_type": "Sales Invoice", "voucher_no": "SI-001",
+             "account": "1210 - Piutang Usaha", "net": Decimal("0.000000000")},
+            {"voucher_type": "Purchase Invoice", "voucher_no": "PI-001",
+             "account": "2110 - Hutang Usaha", "net": Decimal("-250.500000000")}
+        ]
+        
+        reports = list(iter_unbalanced_vouchers(rows))
+        
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(reports[0]["voucher_type"], "Purchase Invoice")
+    
+    def test_is_lazy(self):
+        """Test vouchers are reported while the input is still streaming"""
+        def rows():
+            yield gl_row("SI-001", "1210 - Piutang Usaha", 1000, 0)
+            yield gl_row("SI-002", "1210 - Piutang Usaha", 0, 0)
+            raise AssertionError("input consumed beyond the next voucher")
+        
+        first = next(iter_unbalanced_vouchers(rows()))
+        
+        self.assertEqual(first["voucher_no"], "SI-001")
+    
+    def test_matches_single_voucher_verification(self):
+        """Test results agree with verify_cancellation_net_effect"""
+        originals = [gl_row("SI-001", "1210 - Piutang Usaha", 1000, 0)]
+        reversals = [gl_row("SI-001", "1210 - Piutang Usaha", 0, 400)]
+        
+        single = verify_cancellation_net_effect(originals, reversals)
+        streamed = list(iter_unbalanced_vouchers(originals + reversals))
+        
+        self.assertFalse(single["is_valid"])
+        self.assertEqual(streamed[0]["account_balances"], single["account_balances"])
+        self.assertEqual(streamed[0]["errors"], single["errors"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+Unit Tests for Latency Histogram
+
+Tests bucket precision, exact export bounds, merging and the Prometheus
+text rendering.
+"""
+
+import random
+import unittest
+from erpnext_custom.latency_histogram import (
+    LatencyHistogram,
+    SUB_BUCKETS,
+    bucket_index,
+    bucket_upper_bound,
+    render_prometheus
+)
+
+
+class TestBuckets(unittest.TestCase):
+    """Test the log-linear bucket layout"""
+
+    def test_small_values_have_own_bucket(self):
+        """Test values below SUB_BUCKETS map to themselves"""
+        for microseconds in range(SUB_BUCKETS):
+            self.assertEqual(bucket_index(microseconds), microseconds)
+            self.assertEqual(bucket_upper_bound(microseconds), microseconds)
+
+    def test_value_within_bucket_bounds(self):
+        """Test every value is at most its bucket's upper bound, within 1/SUB_BUCKETS"""
+        rng = random.Random(3)
+        values = [rng.randint(0, 10 ** 9) for _ in range(2000)] + [2 ** n for n in range(31)]
+
+        for microseconds in values:
+            upper = bucket_upper_bound(bucket_index(microseconds))
+            self.assertGreaterEqual(upper, microseconds)
+            self.assertLessEqual(upper - microseconds, microseconds / SUB_BUCKETS)
+
+    def test_indexes_are_monotonic(self):
+        """Test larger values never land in a lower bucket"""
+        indexes = [bucket_index(microseconds) for microseconds in range(0, 5000)]
+
+        self.assertEqual(indexes, sorted(indexes))
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test recording and reading a histogram"""
+
+    def test_exact_aggregates(self):
+        """Test count, sum, min and max are exact"""
+        histogram = LatencyHistogram()
+        for seconds in (0.004, 0.001, 0.25):
+            histogram.record(seconds)
+
+        self.assertEqual(histogram.count, 3)
+        self.assertAlmostEqual(histogram.total, 0.255)
+        self.assertEqual(histogram.min, 0.001)
+        self.assertEqual(histogram.max, 0.25)
+
+    def test_percentiles(self):
+        """Test percentiles are within bucket precision and capped at max"""
+        histogram = LatencyHistogram()
+        for milliseconds in range(1, 101):
+            histogram.record(milliseconds / 1000)
+
+        self.assertAlmostEqual(histogram.value_at_percentile(50), 0.050, delta=0.050 / SUB_BUCKETS)
+        self.assertAlmostEqual(histogram.value_at_percentile(99), 0.099, delta=0.099 / SUB_BUCKETS)
+        self.assertEqual(histogram.value_at_percentile(100), 0.1)
+        self.assertEqual(LatencyHistogram().value_at_percentile(50), 0.0)
+
+    def test_cumulative_counts_are_exact(self):
+        """Test le buckets count values on the bound itself"""
+        histogram = LatencyHistogram(bounds=[0.001, 0.01, 1.0])
+        for seconds in (0.0005, 0.001, 0.002, 0.01, 0.5, 3.0):
+            histogram.record(seconds)
+
+        self.assertEqual(histogram.cumulative_counts(), [2, 4, 5])
+
+    def test_merge(self):
+        """Test merging equals recording everything in one histogram"""
+        first, second, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for seconds in (0.002, 0.03):
+            first.record(seconds)
+            both.record(seconds)
+        for seconds in (0.0001, 4.0):
+            second.record(seconds)
+            both.record(seconds)
+
+        first.merge(second)
+
+        self.assertEqual(first.counts, both.counts)
+        self.assertEqual(first.cumulative_counts(), both.cumulative_counts())
+        self.assertEqual((first.count, first.min, first.max), (4, 0.0001, 4.0))
+
+    def test_merge_rejects_other_bounds(self):
+        """Test histograms with different export bounds cannot be merged"""
+        with self.assertRaises(ValueError):
+            LatencyHistogram(bounds=[1.0]).merge(LatencyHistogram(bounds=[2.0]))
+
+    def test_copy_is_independent(self):
+        """Test recording into a copy leaves the original unchanged"""
+        histogram = LatencyHistogram()
+        histogram.record(0.01)
+
+        copy = histogram.copy()
+        copy.record(0.02)
+
+        self.assertEqual(histogram.count, 1)
+        self.assertEqual(copy.count, 2)
+
+
+class TestRenderPrometheus(unittest.TestCase):
+    """Test the Prometheus text exposition"""
+
+    def test_histogram_series(self):
+        """Test bucket, sum and count lines"""
+        histogram = LatencyHistogram(bounds=[0.01, 0.5])
+        for seconds in (0.005, 0.2, 0.7):
+            histogram.record(seconds)
+
+        text = render_prometheus("hook_seconds", "Hook time", ("hook",), [(("submit",), histogram)])
+
+        self.assertEqual(text.splitlines(), [
+            "# HELP hook_seconds Hook time",
+            "# TYPE hook_seconds histogram",
+            'hook_seconds_bucket{hook="submit",le="0.01"} 1',
+            'hook_seconds_bucket{hook="submit",le="0.5"} 2',
+            'hook_seconds_bucket{hook="submit",le="+Inf"} 3',
+            'hook_seconds_sum{hook="submit"} 0.905',
+            'hook_seconds_count{hook="submit"} 3'
+        ])
+
+    def test_label_values_escaped(self):
+        """Test quotes, backslashes and newlines in label values are escaped"""
+        histogram = LatencyHistogram(bounds=[1.0])
+        histogram.record(0.1)
+
+        text = render_prometheus("m", "h", ("site",), [(('a"b\\c\nd',), histogram)])
+
+        self.assertIn('m_count{site="a\\"b\\\\c\\nd"} 1', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Unit Tests for Mass Invoice Cancellation
+
+Tests which invoices take the bulk path and what cancelling them writes,
+against the in-memory frappe stand-in.
+"""
+
+import unittest
+from erpnext_custom.benchmarks.frappe_standin import FrappeStandIn
+
+
+STANDARD = {"modified": "2024-06-01 10:00:00", "modified_by": "Administrator"}
+
+
+def gl_rows(invoice, amount):
+    return [
+        {"name": f"{invoice}-1", "voucher_type": "Purchase Invoice", "voucher_no": invoice,
+         "account": "5100 - HPP", "debit": amount, "credit": 0, "is_cancelled": 0,
+         "fiscal_year": "2024", "account_currency": "IDR",
+         "debit_in_account_currency": amount, "credit_in_account_currency": 0, **STANDARD},
+        {"name": f"{invoice}-2", "voucher_type": "Purchase Invoice", "voucher_no": invoice,
+         "account": "2110 - Hutang Usaha", "debit": 0, "credit": amount, "is_cancelled": 0,
+         "party_type": "Supplier", "party": "SUPP-001", "against_voucher_type": "Purchase Invoice",
+         "against_voucher": invoice, "fiscal_year": "2024", "account_currency": "IDR",
+         "debit_in_account_currency": 0, "credit_in_account_currency": amount, **STANDARD}
+    ]
+
+
+class TestMassCancelInvoices(unittest.TestCase):
+    """Test mass cancellation of Purchase Invoices"""
+
+    def setUp(self):
+        self.standin = FrappeStandIn()
+        db = self.standin.db
+        names = ["PI-001", "PI-002", "PI-003", "PI-004", "PI-005"]
+        db.insert_rows("Purchase Invoice", [
+            {"name": name, "docstatus": 1, "is_return": 0, "update_stock": 0, "status": "Unpaid", **STANDARD}
+            for name in names
+        ])
+        db.set_value("Purchase Invoice", "PI-002", {"update_stock": 1})
+        db.insert_rows("Purchase Invoice", [
+            {"name": "PI-RET-001", "docstatus": 1, "is_return": 1, "return_against": "PI-003"}
+        ])
+        db.insert_rows("Payment Entry Reference", [
+            {"name": "PER-1", "parent": "PE-001", "reference_doctype": "Purchase Invoice",
+             "reference_name": "PI-004", "docstatus": 1},
+            {"name": "PER-2", "parent": "PE-002", "reference_doctype": "Purchase Invoice",
+             "reference_name": "PI-005", "docstatus": 2}
+        ])
+        db.insert_rows("GL Entry", [row for name in names for row in gl_rows(name, 1000)])
+        db.insert_rows("Payment Ledger Entry", [
+            {"name": f"PLE-{name}", "voucher_type": "Purchase Invoice", "voucher_no": name, "delinked": 0,
+             **STANDARD}
+            for name in names
+        ])
+        db.insert_rows("Purchase Invoice Item", [
+            {"name": f"{name}-item", "parent": name, "parenttype": "Purchase Invoice", "docstatus": 1, **STANDARD}
+            for name in names
+        ])
+        db.insert_rows("Payment Schedule", [
+            {"name": f"{name}-schedule", "parent": name, "parenttype": "Purchase Invoice", "docstatus": 1,
+             **STANDARD}
+            for name in names
+        ] + [
+            {"name": "SINV-001-schedule", "parent": "PI-001", "parenttype": "Sales Invoice", "docstatus": 1,
+             **STANDARD}
+        ])
+        db.insert_rows("Fiscal Year", [
+            {"name": "2024", "year_start_date": "2024-01-01", "year_end_date": "2024-12-31", "disabled": 0},
+            {"name": "2025", "year_start_date": "2025-01-01", "year_end_date": "2025-12-31", "disabled": 0}
+        ])
+        db.commit()
+
+    def cancel(self, **kwargs):
+        with self.standin.installed():
+            from erpnext_custom.mass_cancellation import mass_cancel_invoices
+            return mass_cancel_invoices(
+                "Purchase Invoice",
+                ["PI-001", "PI-002", "PI-003", "PI-004", "PI-005", "PI-RET-001"],
+                cancellation_date="2025-01-10",
+                **kwargs
+            )
+
+    def test_linked_and_stock_invoices_excluded(self):
+        """Test invoices ERPNext's cancel does more for are left for the document"""
+        result = self.cancel()
+
+        self.assertEqual(result["cancelled"], ["PI-001", "PI-005"])
+        self.assertEqual(set(result["excluded"]), {"PI-002", "PI-003", "PI-004"})
+        self.assertIn("PE-001", result["excluded"]["PI-004"])
+        self.assertIn("PI-RET-001", result["excluded"]["PI-003"])
+        self.assertEqual(result["skipped"], ["PI-RET-001"])
+        self.assertEqual(self.standin.db.get_value("Purchase Invoice", "PI-002", "docstatus"), 1)
+        self.assertEqual(self.standin.db.get_value("Purchase Invoice", "PI-005", "docstatus"), 2)
+
+    def test_reversal_columns(self):
+        """Test reversals carry currency amounts, the cancellation's fiscal year and the party links"""
+        self.cancel()
+
+        reversals = self.standin.db.select(
+            "GL Entry", {"voucher_no": "PI-001", "remarks": ["like", "Reversal:%"]}, ["*"]
+        )
+        payable = next(row for row in reversals if row.account == "2110 - Hutang Usaha")
+
+        self.assertEqual(len(reversals), 2)
+        self.assertEqual((payable.debit, payable.credit), (1000, 0))
+        self.assertEqual((payable.debit_in_account_currency, payable.credit_in_account_currency), (1000, 0))
+        self.assertEqual(payable.account_currency, "IDR")
+        self.assertEqual(payable.fiscal_year, "2025")
+        self.assertEqual(payable.against_voucher, "PI-001")
+
+    def test_payment_ledger_delinked(self):
+        """Test Payment Ledger Entries of cancelled invoices are delinked"""
+        self.cancel()
+
+        self.assertEqual(self.standin.db.get_value("Payment Ledger Entry", "PLE-PI-001", "delinked"), 1)
+        self.assertEqual(self.standin.db.get_value("Payment Ledger Entry", "PLE-PI-004", "delinked"), 0)
+
+    def test_child_rows_cancelled(self):
+        """Test child rows of cancelled invoices follow the parent's docstatus"""
+        self.cancel()
+
+        db = self.standin.db
+        self.assertEqual(db.get_value("Purchase Invoice Item", "PI-001-item", "docstatus"), 2)
+        self.assertEqual(db.get_value("Payment Schedule", "PI-001-schedule", "docstatus"), 2)
+        self.assertEqual(db.get_value("Purchase Invoice Item", "PI-004-item", "docstatus"), 1)
+        self.assertEqual(db.get_value("Payment Schedule", "SINV-001-schedule", "docstatus"), 1)
+
+    def test_dry_run_writes_nothing(self):
+        """Test a dry run reports the same split without writing"""
+        result = self.cancel(dry_run=True)
+
+        self.assertEqual(result["cancelled"], ["PI-001", "PI-005"])
+        self.assertEqual(result["reversal_entries"], 4)
+        self.assertEqual(self.standin.db.get_value("Purchase Invoice", "PI-001", "docstatus"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Unit Tests for Multi-Site Executor
+
+Tests per-site isolation, timeouts, retries, worker termination and result
+aggregation.
+"""
+
+import multiprocessing
+import time
+import unittest
+from unittest.mock import Mock, patch
+from erpnext_custom.multi_site import (
+    run_on_all_sites,
+    run_on_site,
+    resolve_function,
+    summarize_site_results,
+    STATUS_SUCCESS,
+    STATUS_FAILED,
+    STATUS_TIMEOUT
+)
+
+
+class TestRunOnSite(unittest.TestCase):
+    """Test running a function on one site"""
+
+    @patch('erpnext_custom.multi_site.frappe')
+    def test_success_connects_commits_and_destroys(self, mock_frappe):
+        """Test a successful site is connected, committed and torn down"""
+        result = run_on_site("site1.local", lambda x: x * 2, args=(21,))
+
+        self.assertEqual(result["status"], STATUS_SUCCESS)
+        self.assertEqual(result["result"], 42)
+        self.assertEqual(result["attempts"], 1)
+        mock_frappe.init.assert_called_once_with(site="site1.local")
+        mock_frappe.db.commit.assert_called_once()
+        mock_frappe.destroy.assert_called_once()
+
+    @patch('erpnext_custom.multi_site.frappe')
+    def test_retry_after_error(self, mock_frappe):
+        """Test a failed attempt is rolled back and retried"""
+        func = Mock(side_effect=[Exception("Deadlock found"), "ok"])
+
+        result = run_on_site("site1.local", func, retries=2)
+
+        self.assertEqual(result["status"], STATUS_SUCCESS)
+        self.assertEqual(result["attempts"], 2)
+        mock_frappe.db.rollback.assert_called_once()
+        self.assertEqual(mock_frappe.destroy.call_count, 2)
+
+    @patch('erpnext_custom.multi_site.frappe')
+    def test_failure_after_retries(self, mock_frappe):
+        """Test the last error is reported once retries are exhausted"""
+        func = Mock(side_effect=Exception("Table missing"))
+
+        result = run_on_site("site1.local", func, retries=1)
+
+        self.assertEqual(result["status"], STATUS_FAILED)
+        self.assertEqual(result["error"], "Table missing")
+        self.assertEqual(result["attempts"], 2)
+        mock_frappe.db.commit.assert_not_called()
+
+    @patch('erpnext_custom.multi_site.frappe')
+    def test_timeout_interrupts_site(self, mock_frappe):
+        """Test a site exceeding its timeout is interrupted"""
+        result = run_on_site("site1.local", time.sleep, args=(2,), timeout=0.05)
+
+        self.assertEqual(result["status"], STATUS_TIMEOUT)
+        self.assertLess(result["duration"], 1)
+        mock_frappe.db.commit.assert_not_called()
+
+
+class TestResolveFunction(unittest.TestCase):
+    """Test dotted path resolution"""
+
+    def test_dotted_path(self):
+        """Test a dotted path resolves to the function"""
+        self.assertIs(resolve_function("erpnext_custom.multi_site.summarize_site_results"),
+                      summarize_site_results)
+
+    def test_module_function_path(self):
+        """Test a "module:function" path resolves to the function"""
+        self.assertIs(resolve_function("erpnext_custom.multi_site:summarize_site_results"),
+                      summarize_site_results)
+
+
+class TestRunOnAllSites(unittest.TestCase):
+    """Test running a function on many sites in worker processes"""
+
+    @patch('erpnext_custom.multi_site.frappe')
+    def test_total_timeout_terminates_workers(self, mock_frappe):
+        """Test workers still busy at the total timeout are terminated, not left running"""
+        started = time.monotonic()
+
+        results = run_on_all_sites("time:sleep", sites=["a", "b"], args=(30,), workers=2, total_timeout=0.5)
+
+        self.assertEqual([result["status"] for result in results], [STATUS_TIMEOUT, STATUS_TIMEOUT])
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_main_functions_rejected(self):
+        """Test functions defined in __main__ are refused before any worker starts"""
+        def fix_site():
+            pass
+        fix_site.__module__ = "__main__"
+
+        with self.assertRaises(ValueError):
+            run_on_all_sites(fix_site, sites=["a"])
+
+
+class TestSummarizeSiteResults(unittest.TestCase):
+    """Test result aggregation"""
+
+    def test_sites_per_status(self):
+        """Test sites are grouped by status"""
+        results = [
+            {"site": "a", "status": STATUS_SUCCESS, "attempts": 1, "duration": 1.5},
+            {"site": "b", "status": STATUS_SUCCESS, "attempts": 2, "duration": 2.0},
+            {"site": "c", "status": STATUS_FAILED, "attempts": 2, "duration": 0.5},
+            {"site": "d", "status": STATUS_TIMEOUT, "attempts": 1, "duration": 600.0}
+        ]
+
+        summary = summarize_site_results(results)
+
+        self.assertEqual(summary["total"], 4)
+        self.assertEqual(summary["succeeded"], ["a", "b"])
+        self.assertEqual(summary["failed"], ["c"])
+        self.assertEqual(summary["timed_out"], ["d"])
+        self.assertEqual(summary["retried"], ["b", "c"])
+        self.assertEqual(summary["duration"], 604.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
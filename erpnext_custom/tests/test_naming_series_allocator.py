@@ -0,0 +1,233 @@
+"""
+Unit Tests for Block-Reserving Naming Series Allocator
+
+Tests block reservation, gap recording and uniqueness across processes
+against the SQLite backend, allocators per site and the short-lived
+reservation connections.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import Mock, patch
+from erpnext_custom import naming_series_allocator
+from erpnext_custom.naming_series_allocator import (
+    BlockAllocator,
+    FrappeSeriesBackend,
+    SQLiteSeriesBackend,
+    allocate_document_name,
+    get_allocator,
+    GAP_FAILED_INSERT,
+    GAP_UNUSED_BLOCK
+)
+
+
+def allocate_in_process(path, count, block_size):
+    allocator = BlockAllocator(SQLiteSeriesBackend(path), block_size)
+    numbers = [allocator.next_number("HR-EMP-") for _ in range(count)]
+    allocator.release()
+    return numbers
+
+
+class TestBlockAllocator(unittest.TestCase):
+    """Test allocation against the SQLite backend"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "series.db")
+        self.backend = SQLiteSeriesBackend(self.path)
+        self.backend.install()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_one_reservation_per_block(self):
+        """Test numbers are consecutive and the counter is hit once per block"""
+        allocator = BlockAllocator(self.backend, block_size=10)
+
+        numbers = [allocator.next_number("HR-EMP-") for _ in range(25)]
+
+        self.assertEqual(numbers, list(range(1, 26)))
+        self.assertEqual(allocator.reservations, 3)
+
+    def test_allocators_never_share_numbers(self):
+        """Test two allocators on one counter get disjoint blocks"""
+        first = BlockAllocator(self.backend, block_size=5)
+        second = BlockAllocator(SQLiteSeriesBackend(self.path), block_size=5)
+
+        self.assertEqual(first.next_number("HR-EMP-"), 1)
+        self.assertEqual(second.next_number("HR-EMP-"), 6)
+        self.assertEqual(first.next_number("HR-EMP-"), 2)
+
+    def test_release_records_unused_rest(self):
+        """Test the unused rest of a block is recorded as a gap"""
+        allocator = BlockAllocator(self.backend, block_size=10)
+        for _ in range(3):
+            allocator.next_number("HR-EMP-")
+
+        gaps = allocator.release()
+
+        self.assertEqual(gaps, [("HR-EMP-", 4, 10, GAP_UNUSED_BLOCK)])
+        self.assertIsNone(self.backend._connection)
+        self.assertEqual(self.backend.get_gaps("HR-EMP-"), gaps)
+
+    def test_failed_insert_recorded(self):
+        """Test a number of a failed insert is recorded as a gap"""
+        allocator = BlockAllocator(self.backend, block_size=10)
+        number = allocator.next_number("HR-EMP-")
+
+        allocator.record_failed("HR-EMP-", number)
+
+        self.assertEqual(self.backend.get_gaps(), [("HR-EMP-", 1, 1, GAP_FAILED_INSERT)])
+
+    def test_block_recorded_when_reserved(self):
+        """Test a block is recorded at reservation, before any release"""
+        allocator = BlockAllocator(self.backend, block_size=10)
+
+        allocator.next_number("HR-EMP-")
+
+        self.assertEqual(self.backend.get_blocks(), [("HR-EMP-", 1, 10)])
+        self.assertEqual(self.backend.get_gaps(), [])
+
+    def test_next_name_is_zero_padded(self):
+        """Test names are formatted like Frappe's naming series"""
+        allocator = BlockAllocator(self.backend)
+
+        self.assertEqual(allocator.next_name("ACC-SINV-2024-"), "ACC-SINV-2024-00001")
+
+    def test_unique_across_processes(self):
+        """Test concurrent processes never receive the same number"""
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                allocate_in_process, [self.path] * 4, [30] * 4, [7] * 4
+            ))
+
+        numbers = [number for result in results for number in result]
+        self.assertEqual(len(numbers), len(set(numbers)))
+
+        # Every reserved number was either used or recorded as a gap
+        current = self.backend.connection.execute(
+            "SELECT current FROM series WHERE name = 'HR-EMP-'"
+        ).fetchone()[0]
+        gap_numbers = sum(
+            to_number - from_number + 1
+            for _prefix, from_number, to_number, _reason in self.backend.get_gaps()
+        )
+        self.assertEqual(len(numbers) + gap_numbers, current)
+
+        # Every reserved number belongs to exactly one recorded block
+        block_numbers = [
+            number
+            for _prefix, from_number, to_number in self.backend.get_blocks()
+            for number in range(from_number, to_number + 1)
+        ]
+        self.assertEqual(sorted(block_numbers), list(range(1, current + 1)))
+
+    def test_invalid_block_size(self):
+        """Test block_size below 1 is rejected"""
+        with self.assertRaises(ValueError):
+            BlockAllocator(self.backend, block_size=0)
+
+
+class TestFrappeSeriesBackend(unittest.TestCase):
+    """Test the tabSeries reservation statement"""
+
+    def test_reserve_uses_last_insert_id_and_commits(self):
+        """Test a block is reserved with one upsert and committed at once"""
+        db = Mock()
+        db.sql = Mock(side_effect=[None, [(150,)], None])
+        backend = FrappeSeriesBackend(db)
+
+        self.assertEqual(backend.reserve("ACC-SINV-2024-", 50), 101)
+
+        query, values = db.sql.call_args_list[0][0]
+        self.assertIn("LAST_INSERT_ID(current + %s)", query)
+        self.assertEqual(values, ("ACC-SINV-2024-", 50, 50))
+        db.commit.assert_called_once()
+
+    def test_block_recorded_before_commit(self):
+        """Test the reserved block is written in the counter's transaction"""
+        db = Mock()
+        db.sql = Mock(side_effect=[None, [(150,)], None])
+
+        FrappeSeriesBackend(db).reserve("ACC-SINV-2024-", 50)
+
+        query, values = db.sql.call_args_list[2][0]
+        self.assertIn("tabNaming Series Block", query)
+        self.assertEqual(values[:3], ("ACC-SINV-2024-", 101, 150))
+        self.assertEqual(db.method_calls[-1][0], "commit")
+
+    def test_connection_closed_after_each_reservation(self):
+        """Test every reservation opens its own connection and closes it"""
+        mock_frappe = Mock()
+        first, second = Mock(), Mock()
+        first.sql = Mock(side_effect=[None, [(10,)], None])
+        second.sql = Mock(side_effect=[None, [(20,)], None])
+        mock_frappe.database.get_db = Mock(side_effect=[first, second])
+        backend = FrappeSeriesBackend(site="site1.local")
+
+        with patch.dict(sys.modules, {"frappe": mock_frappe}):
+            self.assertEqual(backend.reserve("HR-EMP-", 10), 1)
+            first.close.assert_called_once()
+            self.assertEqual(backend.reserve("HR-EMP-", 10), 11)
+
+        second.close.assert_called_once()
+
+    def test_injected_connection_not_closed(self):
+        """Test a connection passed in is left to its owner"""
+        db = Mock()
+        db.sql = Mock(side_effect=[None, [(10,)], None])
+
+        FrappeSeriesBackend(db).reserve("HR-EMP-", 10)
+        FrappeSeriesBackend(db).close()
+
+        db.close.assert_not_called()
+
+
+class TestGetAllocator(unittest.TestCase):
+    """Test allocators per site"""
+
+    @patch('erpnext_custom.naming_series_allocator.atexit')
+    def test_one_allocator_per_site(self, mock_atexit):
+        """Test each site gets its own allocator and backend, released at exit"""
+        with patch.dict(naming_series_allocator._allocators, clear=True):
+            first = get_allocator("site1.local")
+            second = get_allocator("site2.local")
+
+            self.assertIs(get_allocator("site1.local"), first)
+            self.assertIsNot(first, second)
+            self.assertEqual(second.backend.site, "site2.local")
+            self.assertEqual(mock_atexit.register.call_count, 2)
+
+
+class TestAllocateDocumentName(unittest.TestCase):
+    """Test the autoname hook"""
+
+    def test_rollback_records_failed_insert(self):
+        """Test the number of an insert whose transaction rolls back becomes a gap"""
+        mock_frappe = Mock()
+        mock_frappe.flags.use_block_allocator = True
+        mock_frappe.model.naming.parse_naming_series = Mock(return_value="ACC-SINV-2024-")
+        allocator = Mock()
+        allocator.next_number = Mock(return_value=42)
+        doc = Mock()
+        doc.naming_series = "ACC-SINV-.YYYY.-.#####"
+        doc.get = lambda key: {"naming_series": doc.naming_series}.get(key)
+        modules = {"frappe": mock_frappe, "frappe.model": mock_frappe.model,
+                   "frappe.model.naming": mock_frappe.model.naming}
+
+        with patch.dict(sys.modules, modules), \
+                patch('erpnext_custom.naming_series_allocator.get_allocator', return_value=allocator):
+            allocate_document_name(doc)
+
+        self.assertEqual(doc.name, "ACC-SINV-2024-00042")
+        on_rollback = mock_frappe.db.after_rollback.add.call_args[0][0]
+        on_rollback()
+        allocator.record_failed.assert_called_once_with("ACC-SINV-2024-", 42)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+Unit Tests for Naming Series Audit
+
+Tests the per-prefix queries, counter classification and the batched
+correction.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+from erpnext_custom.naming_series_audit import (
+    build_prefix_query,
+    parse_series_number,
+    classify_series,
+    apply_series_corrections,
+    audit_naming_series,
+    SERIES_OK,
+    SERIES_BEHIND,
+    SERIES_MISSING,
+    SERIES_AHEAD
+)
+
+
+DOCTYPES = [
+    {"doctype": "Employee", "is_submittable": 0},
+    {"doctype": "Sales Invoice", "is_submittable": 1}
+]
+
+
+class TestBuildPrefixQuery(unittest.TestCase):
+    """Test the per-prefix query"""
+
+    def test_one_index_range_per_doctype(self):
+        """Test every DocType reads MAX(name) over the prefix's name range"""
+        query = build_prefix_query(DOCTYPES)
+
+        self.assertIn("FROM `tabEmployee`", query)
+        self.assertIn("FROM `tabSales Invoice`", query)
+        self.assertEqual(query.count("UNION ALL"), 1)
+        self.assertEqual(query.count("name >= %(start)s"), 2)
+        self.assertNotIn("REGEXP", query)
+
+    def test_amended_documents_skipped_for_submittable(self):
+        """Test only submittable DocTypes filter on amended_from"""
+        query = build_prefix_query(DOCTYPES)
+        employee_part, invoice_part = query.split("UNION ALL")
+
+        self.assertNotIn("amended_from", employee_part)
+        self.assertIn("amended_from IS NULL", invoice_part)
+
+
+class TestParseSeriesNumber(unittest.TestCase):
+    """Test reading the number from a name"""
+
+    def test_number_after_prefix(self):
+        """Test the digits right after the prefix are the number"""
+        self.assertEqual(parse_series_number("ACC-SINV-2024-00042", "ACC-SINV-2024-"), 42)
+        self.assertEqual(parse_series_number("SINV-00012-1", "SINV-"), 12)
+        self.assertIsNone(parse_series_number(None, "SINV-"))
+
+    def test_prefix_ending_in_digit(self):
+        """Test a prefix ending in a digit keeps its digits out of the number"""
+        self.assertEqual(parse_series_number("INV-202400017", "INV-2024"), 17)
+
+
+class TestClassifySeries(unittest.TestCase):
+    """Test counter classification"""
+
+    def test_statuses(self):
+        """Test behind, missing, ahead and ok counters"""
+        series = classify_series([
+            {"prefix": "HR-EMP-", "max_used": 120, "current": 100},
+            {"prefix": "ACC-SINV-2024-", "max_used": 50, "current": None},
+            {"prefix": "ACC-SINV-2023-", "max_used": 10, "current": 12},
+            {"prefix": "ACC-PINV-2024-", "max_used": 7, "current": 7}
+        ])
+
+        self.assertEqual([row["status"] for row in series], [
+            SERIES_BEHIND, SERIES_MISSING, SERIES_AHEAD, SERIES_OK
+        ])
+
+
+class TestApplySeriesCorrections(unittest.TestCase):
+    """Test batched correction"""
+
+    @patch('erpnext_custom.naming_series_audit.frappe')
+    def test_one_upsert_never_lowers(self, mock_frappe):
+        """Test behind and missing counters are written in one GREATEST upsert"""
+        series = [
+            {"prefix": "HR-EMP-", "max_used": 120, "current": 100, "status": SERIES_BEHIND},
+            {"prefix": "ACC-SINV-2024-", "max_used": 50, "current": None, "status": SERIES_MISSING},
+            {"prefix": "ACC-SINV-2023-", "max_used": 10, "current": 12, "status": SERIES_AHEAD}
+        ]
+
+        self.assertEqual(apply_series_corrections(series), 2)
+
+        mock_frappe.db.sql.assert_called_once()
+        query, values = mock_frappe.db.sql.call_args[0]
+        self.assertIn("GREATEST", query)
+        self.assertEqual(values, ("HR-EMP-", 120, "ACC-SINV-2024-", 50))
+
+    @patch('erpnext_custom.naming_series_audit.frappe')
+    def test_nothing_to_correct(self, mock_frappe):
+        """Test no statement when every counter is fine"""
+        series = [{"prefix": "HR-EMP-", "max_used": 1, "current": 1, "status": SERIES_OK}]
+
+        self.assertEqual(apply_series_corrections(series), 0)
+        mock_frappe.db.sql.assert_not_called()
+
+
+class TestAuditNamingSeries(unittest.TestCase):
+    """Test the per-site audit"""
+
+    @patch('erpnext_custom.naming_series_audit.frappe')
+    def test_report_only_does_not_write(self, mock_frappe):
+        """Test the default run reports without writing"""
+        mock_frappe.local.site = "site1.local"
+        mock_frappe.db.sql = Mock(side_effect=[
+            DOCTYPES,
+            [{"name": "HR-EMP-", "current": 100}],
+            [{"name": "HR-EMP-00120"}, {"name": None}]
+        ])
+
+        report = audit_naming_series()
+
+        self.assertEqual(report["behind"], ["HR-EMP-"])
+        self.assertEqual(report["series"][0]["max_used"], 120)
+        self.assertEqual(report["corrected"], 0)
+        self.assertEqual(mock_frappe.db.sql.call_count, 3)
+        self.assertEqual(mock_frappe.db.sql.call_args[0][1], {"start": "HR-EMP-0", "end": "HR-EMP-A"})
+
+    @patch('erpnext_custom.naming_series_audit.frappe')
+    def test_one_query_per_prefix(self, mock_frappe):
+        """Test each tabSeries prefix and each passed prefix is queried once; unused ones are left out"""
+        mock_frappe.local.site = "site1.local"
+        max_names = {
+            "ACC-SINV-2024-": [{"name": "ACC-SINV-2024-00050"}, {"name": None}],
+            "INV-2024": [{"name": None}, {"name": "INV-202400009"}],
+            "OLD-": [{"name": None}, {"name": None}]
+        }
+
+        def sql(query, values=None, as_dict=False):
+            if "tabDocType" in query:
+                return DOCTYPES
+            if "tabSeries" in query:
+                return [{"name": "INV-2024", "current": 9}, {"name": "OLD-", "current": 4}]
+            return max_names[values["start"][:-1]]
+
+        mock_frappe.db.sql = Mock(side_effect=sql)
+
+        report = audit_naming_series(prefixes=["ACC-SINV-2024-"])
+
+        self.assertEqual(mock_frappe.db.sql.call_count, 5)
+        self.assertEqual(
+            [(row["prefix"], row["max_used"], row["status"]) for row in report["series"]],
+            [("ACC-SINV-2024-", 50, SERIES_MISSING), ("INV-2024", 9, SERIES_OK)]
+        )
+
+    @patch('erpnext_custom.naming_series_audit.frappe')
+    def test_only_passed_prefixes(self, mock_frappe):
+        """Test all_series=False reads and audits only the passed prefixes"""
+        mock_frappe.local.site = "site1.local"
+        mock_frappe.db.sql = Mock(side_effect=[
+            DOCTYPES,
+            [{"name": "HR-EMP-", "current": 100}],
+            [{"name": "HR-EMP-00120"}, {"name": None}]
+        ])
+
+        report = audit_naming_series(prefixes=["HR-EMP-"], all_series=False)
+
+        self.assertEqual(report["behind"], ["HR-EMP-"])
+        self.assertIn("WHERE name IN", mock_frappe.db.sql.call_args_list[1][0][0])
+        self.assertEqual(mock_frappe.db.sql.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+Unit Tests for Query Counter
+
+Tests statement shapes, counting, nesting and budgets, and keeps the Sales
+Return validation free of per-row queries on the in-memory frappe stand-in.
+"""
+
+import unittest
+from erpnext_custom.query_counter import (
+    QueryCounter,
+    QueryBudgetExceeded,
+    statement_shape
+)
+
+
+class FakeDatabase:
+    """Records the statements it is given"""
+
+    def __init__(self):
+        self.statements = []
+
+    def sql(self, query, values=None):
+        self.statements.append(query)
+        return []
+
+
+class TestStatementShape(unittest.TestCase):
+    """Test normalizing statements to shapes"""
+
+    def test_literals_and_placeholders(self):
+        """Test strings, numbers and placeholders become ?"""
+        self.assertEqual(
+            statement_shape("SELECT name FROM `tabItem` WHERE item_code = 'A-1' AND qty > 10.5"),
+            "SELECT name FROM `tabItem` WHERE item_code = ? AND qty > ?"
+        )
+        self.assertEqual(
+            statement_shape("SELECT name FROM `tabItem` WHERE item_code = %(code)s AND idx = %s"),
+            "SELECT name FROM `tabItem` WHERE item_code = ? AND idx = ?"
+        )
+
+    def test_value_lists_collapsed(self):
+        """Test IN lists of any length share one shape"""
+        self.assertEqual(
+            statement_shape("SELECT 1 FROM `tabItem` WHERE name IN ('A', 'B', 'C')"),
+            statement_shape("SELECT 1 FROM `tabItem` WHERE name IN (%s)")
+        )
+
+    def test_whitespace_and_identifiers(self):
+        """Test whitespace is collapsed and digits inside identifiers are kept"""
+        self.assertEqual(
+            statement_shape("SELECT  account\n\tFROM `tabGL Entry2`  WHERE  x = 1"),
+            "SELECT account FROM `tabGL Entry2` WHERE x = ?"
+        )
+
+
+class TestQueryCounter(unittest.TestCase):
+    """Test counting statements on a database object"""
+
+    def test_counts_and_restores(self):
+        """Test statements are counted and passed through, and sql is restored"""
+        db = FakeDatabase()
+
+        with QueryCounter(db) as counter:
+            db.sql("SELECT 1 FROM `tabItem` WHERE name = %s", ("A",))
+            db.sql("SELECT 1 FROM `tabItem` WHERE name = %s", ("B",))
+
+        self.assertEqual(counter.count, 2)
+        self.assertEqual(counter.shapes, {"SELECT ? FROM `tabItem` WHERE name = ?": 2})
+        self.assertEqual(len(db.statements), 2)
+        self.assertNotIn("sql", db.__dict__)
+
+    def test_nested_counters(self):
+        """Test an inner counter's statements count for the outer one"""
+        db = FakeDatabase()
+
+        with QueryCounter(db) as outer:
+            db.sql("SELECT 1")
+            with QueryCounter(db) as inner:
+                db.sql("SELECT 2")
+            db.sql("SELECT 3")
+
+        self.assertEqual((outer.count, inner.count), (3, 1))
+        self.assertNotIn("sql", db.__dict__)
+
+    def test_paused_block_not_counted(self):
+        """Test statements inside paused() pass through without being counted"""
+        db = FakeDatabase()
+
+        with QueryCounter(db) as counter:
+            db.sql("SELECT 1")
+            with counter.paused():
+                db.sql("SELECT 2")
+                db.sql("SELECT 3")
+            db.sql("SELECT 4")
+
+        self.assertEqual(counter.count, 2)
+        self.assertEqual(len(db.statements), 4)
+
+    def test_failed_statement_counted(self):
+        """Test a statement that raises is still counted"""
+        db = FakeDatabase()
+        db.sql = lambda query, values=None: 1 / 0
+
+        with self.assertRaises(ZeroDivisionError):
+            with QueryCounter(db) as counter:
+                db.sql("SELECT 1")
+
+        self.assertEqual(counter.count, 1)
+
+    def test_budgets(self):
+        """Test total and repeated-shape limits"""
+        db = FakeDatabase()
+
+        with QueryCounter(db, max_queries=5, max_repeats=3) as counter:
+            for row in range(3):
+                db.sql(f"SELECT qty FROM `tabSales Return Item` WHERE name = 'row-{row}'")
+            db.sql("SELECT 1")
+            db.sql("SELECT 2")
+        counter.check()
+
+        with QueryCounter(db, max_queries=5, max_repeats=3) as counter:
+            for row in range(6):
+                db.sql(f"SELECT qty FROM `tabSales Return Item` WHERE name = 'row-{row}'")
+
+        self.assertEqual(counter.violations(), [
+            "6 queries (limit 5)",
+            "6x SELECT qty FROM `tabSales Return Item` WHERE name = ? (limit 3)"
+        ])
+        with self.assertRaises(QueryBudgetExceeded):
+            counter.check()
+        self.assertEqual(counter.summary()["distinct_shapes"], 1)
+
+
+class TestSalesReturnValidationQueries(unittest.TestCase):
+    """Test Sales Return validation runs a constant number of queries"""
+
+    def test_no_per_row_queries(self):
+        """Test validating a 40-line return repeats no statement per row"""
+        from erpnext_custom.benchmarks.frappe_standin import FrappeStandIn
+        from erpnext_custom.benchmarks.bench_month_end import COMPANY, setup_site
+
+        standin = FrappeStandIn()
+        with standin.installed() as frappe:
+            from erpnext_custom.sales_return.sales_return_validation import validate
+
+            setup_site(standin)
+            delivery_note = frappe.get_doc({
+                "doctype": "Delivery Note",
+                "company": COMPANY,
+                "customer": "CUST-001",
+                "posting_date": "2024-01-15",
+                "items": [
+                    {"item_code": f"ITEM-{row}", "qty": 10, "uom": "Nos", "rate": 1000, "warehouse": "Stores"}
+                    for row in range(40)
+                ]
+            }).submit()
+            standin.end_request()
+
+            sales_return = frappe.get_doc({
+                "doctype": "Sales Return",
+                "company": COMPANY,
+                "delivery_note": delivery_note.name,
+                "posting_date": "2024-01-20",
+                "items": [
+                    {
+                        "item_code": line.item_code,
+                        "delivery_note_item": line.name,
+                        "qty": 2,
+                        "rate": line.rate,
+                        "return_reason": "Damaged"
+                    }
+                    for line in delivery_note.items
+                ]
+            })
+
+            # The stand-in runs every statement through _execute
+            with QueryCounter(standin.db, max_queries=10, max_repeats=2, method="_execute") as counter:
+                validate(sales_return)
+
+        counter.check()
+        self.assertEqual(sales_return.grand_total, 80000)
+
+
+if __name__ == '__main__':
+    unittest.main()
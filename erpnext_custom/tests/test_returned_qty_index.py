@@ -0,0 +1,179 @@
+"""
+Unit Tests for Sales Return Returned Quantity Index
+
+Tests quantity folding, the keyed lookup, incremental index updates and
+that validation reads previous returns with one lookup for all rows.
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from erpnext_custom.sales_return.returned_qty_index import (
+    summarize_return_items,
+    get_returned_qty,
+    update_returned_qty_index,
+    sync_returned_qty_index
+)
+from erpnext_custom.sales_return import sales_return_validation
+
+
+class Row(dict):
+    """Dict with attribute access, like frappe._dict"""
+
+    __getattr__ = dict.get
+
+
+class TestSummarizeReturnItems(unittest.TestCase):
+    """Test quantity folding per Delivery Note Item"""
+
+    def test_sum_per_delivery_note_item(self):
+        """Test rows of the same Delivery Note Item are summed"""
+        items = [
+            Row(delivery_note_item="DNI-1", qty=2),
+            Row(delivery_note_item="DNI-1", qty=3),
+            Row(delivery_note_item="DNI-2", qty=1),
+            Row(delivery_note_item=None, qty=5)
+        ]
+
+        self.assertEqual(summarize_return_items(items), {"DNI-1": 5.0, "DNI-2": 1.0})
+
+
+class TestGetReturnedQty(unittest.TestCase):
+    """Test the keyed lookup"""
+
+    @patch('erpnext_custom.sales_return.returned_qty_index.frappe')
+    def test_one_query_with_defaults(self, mock_frappe):
+        """Test all rows are read with one query and missing rows default to 0"""
+        mock_frappe.db.sql = Mock(return_value=[Row(delivery_note_item="DNI-1", returned_qty=4)])
+
+        returned = get_returned_qty(["DNI-1", "DNI-2"])
+
+        self.assertEqual(returned, {"DNI-1": 4.0, "DNI-2": 0.0})
+        mock_frappe.db.sql.assert_called_once()
+
+    @patch('erpnext_custom.sales_return.returned_qty_index.frappe')
+    def test_no_rows_no_query(self, mock_frappe):
+        """Test an empty lookup does not hit the database"""
+        self.assertEqual(get_returned_qty([]), {})
+        mock_frappe.db.sql.assert_not_called()
+
+
+class TestUpdateReturnedQtyIndex(unittest.TestCase):
+    """Test incremental index updates"""
+
+    @patch('erpnext_custom.sales_return.returned_qty_index.frappe')
+    def test_cancel_subtracts_with_one_upsert(self, mock_frappe):
+        """Test cancelling writes negative quantities in one statement"""
+        mock_frappe.utils.now = Mock(return_value="2024-01-20 09:00:00")
+        doc = Mock(delivery_note="DN-001", items=[
+            Row(delivery_note_item="DNI-1", qty=2),
+            Row(delivery_note_item="DNI-2", qty=1)
+        ])
+
+        applied = update_returned_qty_index(doc, -1)
+
+        self.assertEqual(applied, {"DNI-1": -2.0, "DNI-2": -1.0})
+        mock_frappe.db.sql.assert_called_once()
+        query, values = mock_frappe.db.sql.call_args[0]
+        self.assertIn("ON DUPLICATE KEY UPDATE", query)
+        self.assertEqual(values, (
+            "DNI-1", "DN-001", -2.0, "2024-01-20 09:00:00",
+            "DNI-2", "DN-001", -1.0, "2024-01-20 09:00:00"
+        ))
+
+
+class TestSyncReturnedQtyIndex(unittest.TestCase):
+    """Test the after_migrate install"""
+
+    @patch('erpnext_custom.sales_return.returned_qty_index.rebuild_returned_qty_index')
+    @patch('erpnext_custom.sales_return.returned_qty_index.frappe')
+    def test_new_table_is_filled_once(self, mock_frappe, mock_rebuild):
+        """Test a newly created index is rebuilt from existing returns"""
+        mock_frappe.db.table_exists.side_effect = lambda doctype, cached=True: doctype == "Sales Return Item"
+        mock_rebuild.return_value = 12
+
+        result = sync_returned_qty_index()
+
+        self.assertEqual(result, {"created": True, "indexed": 12})
+        mock_frappe.db.sql_ddl.assert_called_once()
+        mock_frappe.db.commit.assert_called_once()
+
+    @patch('erpnext_custom.sales_return.returned_qty_index.rebuild_returned_qty_index')
+    @patch('erpnext_custom.sales_return.returned_qty_index.frappe')
+    def test_existing_table_is_not_rebuilt(self, mock_frappe, mock_rebuild):
+        """Test re-running neither recreates nor rebuilds an existing index"""
+        mock_frappe.db.table_exists.return_value = True
+
+        result = sync_returned_qty_index()
+
+        self.assertEqual(result, {"created": False, "indexed": None})
+        mock_frappe.db.sql_ddl.assert_not_called()
+        mock_rebuild.assert_not_called()
+
+    @patch('erpnext_custom.sales_return.returned_qty_index.rebuild_returned_qty_index')
+    @patch('erpnext_custom.sales_return.returned_qty_index.frappe')
+    def test_no_sales_return_no_rebuild(self, mock_frappe, mock_rebuild):
+        """Test the index is created but not filled before Sales Return is installed"""
+        mock_frappe.db.table_exists.return_value = False
+
+        result = sync_returned_qty_index()
+
+        self.assertTrue(result["created"])
+        mock_rebuild.assert_not_called()
+
+
+class TestValidateUsesIndex(unittest.TestCase):
+    """Test validation of returned quantities against the index"""
+
+    def make_return(self, qty):
+        return Mock(
+            delivery_note="DN-001",
+            docstatus=0,
+            items=[
+                Mock(idx=1, delivery_note_item="DNI-1", qty=qty, rate=1000,
+                     return_reason="Damaged", return_notes=None),
+                Mock(idx=2, delivery_note_item="DNI-2", qty=1, rate=500,
+                     return_reason="Damaged", return_notes=None)
+            ]
+        )
+
+    def setup_delivery_note(self, mock_frappe):
+        mock_frappe.local = SimpleNamespace()
+        mock_frappe.db.get_value = Mock(return_value={"name": "DN-001", "docstatus": 1})
+        mock_frappe.get_all = Mock(return_value=[
+            {"name": "DNI-1", "qty": 5, "item_code": "ITEM-1", "rate": 1000, "warehouse": "Stores"},
+            {"name": "DNI-2", "qty": 2, "item_code": "ITEM-2", "rate": 500, "warehouse": "Stores"}
+        ])
+
+    @patch('erpnext_custom.sales_return.delivery_note_loader.frappe')
+    @patch('erpnext_custom.sales_return.sales_return_validation.get_returned_qty')
+    @patch('erpnext_custom.sales_return.sales_return_validation.frappe')
+    def test_single_lookup_for_all_rows(self, mock_frappe, mock_get_returned_qty, mock_loader_frappe):
+        """Test previous returns of all rows are read with one lookup"""
+        self.setup_delivery_note(mock_loader_frappe)
+        mock_frappe.throw = Mock(side_effect=Exception)
+        mock_get_returned_qty.return_value = {"DNI-1": 2.0, "DNI-2": 0.0}
+        doc = self.make_return(3)
+
+        sales_return_validation.validate(doc)
+
+        mock_get_returned_qty.assert_called_once_with(["DNI-1", "DNI-2"])
+        mock_frappe.db.sql.assert_not_called()
+        mock_frappe.get_doc.assert_not_called()
+        self.assertEqual(doc.grand_total, 3500)
+
+    @patch('erpnext_custom.sales_return.delivery_note_loader.frappe')
+    @patch('erpnext_custom.sales_return.sales_return_validation.get_returned_qty')
+    @patch('erpnext_custom.sales_return.sales_return_validation.frappe')
+    def test_exceeding_remaining_qty_throws(self, mock_frappe, mock_get_returned_qty, mock_loader_frappe):
+        """Test returning more than delivered minus returned is rejected"""
+        self.setup_delivery_note(mock_loader_frappe)
+        mock_frappe.throw = Mock(side_effect=Exception)
+        mock_get_returned_qty.return_value = {"DNI-1": 4.0, "DNI-2": 0.0}
+
+        with self.assertRaises(Exception):
+            sales_return_validation.validate(self.make_return(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
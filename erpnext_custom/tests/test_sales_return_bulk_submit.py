@@ -0,0 +1,154 @@
+"""
+Unit Tests for Bulk Sales Return Submission
+
+Tests grouping into consolidated Material Receipts, the single transaction
+and the cancellation path for shared Stock Entries.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+from erpnext_custom.sales_return.bulk_submit import (
+    group_returns_for_stock_entry,
+    bulk_submit_sales_returns,
+    SKIP_STOCK_ENTRY_FLAG
+)
+from erpnext_custom.sales_return import sales_return_validation
+
+
+def make_item(warehouse, item_code="ITEM-1", qty=1, rate=1000):
+    return Mock(item_code=item_code, qty=qty, uom="Nos", warehouse=warehouse,
+                rate=rate, amount=qty * rate)
+
+
+def make_return(name, warehouses, company="Test Company", posting_date="2024-01-20"):
+    doc = Mock(company=company, posting_date=posting_date, items=[make_item(w) for w in warehouses])
+    doc.name = name
+    return doc
+
+
+class TestGroupReturnsForStockEntry(unittest.TestCase):
+    """Test grouping into consolidated Material Receipts"""
+
+    def test_group_by_company_warehouse_and_date(self):
+        """Test returns sharing company, warehouse and date are merged"""
+        returns = [
+            make_return("SR-001", ["Stores"]),
+            make_return("SR-002", ["Stores", "Stores"]),
+            make_return("SR-003", ["Finished Goods"]),
+            make_return("SR-004", ["Stores"], posting_date="2024-01-21")
+        ]
+
+        groups = group_returns_for_stock_entry(returns)
+
+        self.assertEqual([group["returns"] for group in groups], [
+            ["SR-001", "SR-002"], ["SR-003"], ["SR-004"]
+        ])
+        self.assertEqual(len(groups[0]["items"]), 3)
+        self.assertEqual(groups[0]["items"][0]["t_warehouse"], "Stores")
+
+    def test_mixed_warehouse_return_stays_alone(self):
+        """Test a return spanning warehouses gets its own entry"""
+        returns = [
+            make_return("SR-001", ["Stores"]),
+            make_return("SR-002", ["Stores", "Finished Goods"]),
+            make_return("SR-003", ["Stores"])
+        ]
+
+        groups = group_returns_for_stock_entry(returns)
+
+        self.assertEqual([group["returns"] for group in groups], [
+            ["SR-001", "SR-003"], ["SR-002"]
+        ])
+        self.assertIsNone(groups[1]["warehouse"])
+
+
+class TestBulkSubmitSalesReturns(unittest.TestCase):
+    """Test bulk submission"""
+
+    @patch('erpnext_custom.sales_return.bulk_submit.frappe')
+    def test_one_commit_and_one_entry_per_group(self, mock_frappe):
+        """Test returns are submitted, consolidated and committed once"""
+        docs = {
+            "SR-001": make_return("SR-001", ["Stores"]),
+            "SR-002": make_return("SR-002", ["Stores"])
+        }
+        for doc in docs.values():
+            doc.flags = {}
+        mock_frappe.get_doc = Mock(side_effect=lambda doctype, name: docs[name])
+        stock_entry = Mock()
+        stock_entry.name = "STE-001"
+        mock_frappe.new_doc = Mock(return_value=stock_entry)
+
+        result = bulk_submit_sales_returns(["SR-001", "SR-002"])
+
+        self.assertEqual(result["submitted"], ["SR-001", "SR-002"])
+        self.assertEqual(result["stock_entries"], {"STE-001": ["SR-001", "SR-002"]})
+        self.assertTrue(all(doc.flags[SKIP_STOCK_ENTRY_FLAG] for doc in docs.values()))
+        stock_entry.submit.assert_called_once()
+        self.assertEqual(stock_entry.append.call_count, 2)
+        mock_frappe.db.commit.assert_called_once()
+        mock_frappe.db.rollback.assert_not_called()
+
+    @patch('erpnext_custom.sales_return.bulk_submit.frappe')
+    def test_failure_rolls_back_everything(self, mock_frappe):
+        """Test any failure rolls the whole batch back"""
+        doc = make_return("SR-001", ["Stores"])
+        doc.flags = {}
+        mock_frappe.get_doc = Mock(return_value=doc)
+        mock_frappe.new_doc.return_value.submit = Mock(side_effect=Exception("Negative stock"))
+        mock_frappe.throw = Mock(side_effect=Exception)
+
+        with self.assertRaises(Exception):
+            bulk_submit_sales_returns(["SR-001"])
+
+        mock_frappe.db.rollback.assert_called_once()
+        mock_frappe.db.commit.assert_not_called()
+
+
+class TestSalesReturnHooks(unittest.TestCase):
+    """Test on_submit and on_cancel with consolidated entries"""
+
+    @patch('erpnext_custom.sales_return.sales_return_validation.update_returned_qty_index')
+    @patch('erpnext_custom.sales_return.sales_return_validation.frappe')
+    def test_on_submit_never_commits(self, mock_frappe, mock_update_index):
+        """Test on_submit leaves the transaction to the caller"""
+        doc = make_return("SR-001", ["Stores"])
+        doc.flags = {}
+
+        sales_return_validation.on_submit(doc)
+
+        mock_frappe.new_doc.return_value.submit.assert_called_once()
+        mock_frappe.db.commit.assert_not_called()
+
+    @patch('erpnext_custom.sales_return.sales_return_validation.update_returned_qty_index')
+    @patch('erpnext_custom.sales_return.sales_return_validation.frappe')
+    def test_on_submit_skips_entry_in_bulk_mode(self, mock_frappe, mock_update_index):
+        """Test bulk submission skips the per-return Stock Entry"""
+        doc = make_return("SR-001", ["Stores"])
+        doc.flags = {SKIP_STOCK_ENTRY_FLAG: True}
+
+        sales_return_validation.on_submit(doc)
+
+        mock_update_index.assert_called_once_with(doc, 1)
+        mock_frappe.new_doc.assert_not_called()
+
+    @patch('erpnext_custom.sales_return.sales_return_validation.reverse_shared_stock_entry')
+    @patch('erpnext_custom.sales_return.sales_return_validation.is_shared_stock_entry')
+    @patch('erpnext_custom.sales_return.sales_return_validation.update_returned_qty_index')
+    @patch('erpnext_custom.sales_return.sales_return_validation.frappe')
+    def test_on_cancel_shared_entry_posts_issue(self, mock_frappe, mock_update_index,
+                                                mock_is_shared, mock_reverse):
+        """Test a shared Stock Entry is not cancelled"""
+        doc = make_return("SR-001", ["Stores"])
+        mock_frappe.db.get_value = Mock(return_value="STE-001")
+        mock_is_shared.return_value = True
+        mock_reverse.return_value = "STE-002"
+
+        sales_return_validation.on_cancel(doc)
+
+        mock_reverse.assert_called_once_with(doc)
+        mock_frappe.get_doc.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
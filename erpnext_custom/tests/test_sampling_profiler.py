@@ -0,0 +1,176 @@
+"""
+Unit Tests for Sampling Profiler
+
+Tests stack sampling, the collapsed output format and the per-request
+profiler hooks.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+from erpnext_custom.sampling_profiler import SamplingProfiler
+from erpnext_custom.request_profiler import (
+    before_request,
+    after_request,
+    CONFIG_ENABLED,
+    CONFIG_DIRECTORY,
+    PROFILE_HEADER,
+    PROFILE_FILE_HEADER
+)
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test sampling one thread"""
+
+    def test_samples_running_function(self):
+        """Test the sampled thread's busy function dominates the stacks"""
+        with SamplingProfiler(interval=0.001) as profiler:
+            busy_loop(0.1)
+
+        self.assertGreater(profiler.samples, 10)
+        busy = sum(count for stack, count in profiler.stacks.items() if stack.endswith(f"{__name__}.busy_loop"))
+        self.assertGreater(busy, profiler.samples / 2)
+
+    def test_collapsed_format(self):
+        """Test lines are root-first stacks with counts, most sampled first"""
+        profiler = SamplingProfiler()
+        frame = sys._getframe()
+        profiler.record(frame)
+        profiler.record(frame)
+        profiler.record(frame.f_back)
+
+        lines = profiler.collapsed()
+
+        self.assertEqual(len(lines), 2)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertEqual(count, "2")
+        self.assertTrue(stack.endswith(f";{__name__}.TestSamplingProfiler.test_collapsed_format"))
+        self.assertTrue(lines[1].endswith(" 1"))
+
+    def test_other_thread(self):
+        """Test sampling a thread other than the caller's"""
+        worker = threading.Thread(target=busy_loop, args=(0.1,))
+        worker.start()
+
+        with SamplingProfiler(interval=0.001, thread_id=worker.ident) as profiler:
+            time.sleep(0.05)
+        worker.join()
+
+        self.assertTrue(any(stack.endswith(".busy_loop") for stack in profiler.stacks))
+
+    def test_idle_until_started(self):
+        """Test no sampling thread exists before start or after stop"""
+        threads = threading.active_count()
+        profiler = SamplingProfiler()
+        self.assertEqual(threading.active_count(), threads)
+
+        profiler.start()
+        self.assertEqual(threading.active_count(), threads + 1)
+        profiler.stop()
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_write(self):
+        """Test the file holds one line per stack"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        profiler = SamplingProfiler()
+        profiler.stacks = {"a;b": 3, "a;c": 1}
+
+        path = profiler.write(os.path.join(directory, "out.folded"))
+
+        with open(path) as f:
+            self.assertEqual(f.read(), "a;b 3\na;c 1\n")
+
+
+class TestRequestProfiler(unittest.TestCase):
+    """Test profiling web requests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def configure(self, mock_frappe, enabled=False, header=None, roles=()):
+        mock_frappe.conf = {CONFIG_ENABLED: int(enabled), CONFIG_DIRECTORY: self.directory}
+        mock_frappe.get_request_header.side_effect = lambda key, default=None: header if key == PROFILE_HEADER else default
+        mock_frappe.get_roles.return_value = list(roles)
+        mock_frappe.utils.now.return_value = "2024-01-31 10:15:00.123456"
+        mock_frappe.local = Mock(spec=[])
+
+    @patch('erpnext_custom.request_profiler.frappe')
+    def test_not_profiled_by_default(self, mock_frappe):
+        """Test requests without config or header start nothing"""
+        self.configure(mock_frappe)
+
+        before_request()
+
+        self.assertIsNone(getattr(mock_frappe.local, "erpnext_custom_profiler", None))
+        mock_frappe.get_roles.assert_not_called()
+
+    @patch('erpnext_custom.request_profiler.frappe')
+    def test_header_needs_role(self, mock_frappe):
+        """Test the header is ignored for users without System Manager"""
+        self.configure(mock_frappe, header="1", roles=["Sales User"])
+
+        before_request()
+
+        self.assertIsNone(getattr(mock_frappe.local, "erpnext_custom_profiler", None))
+
+    @patch('erpnext_custom.request_profiler.frappe')
+    def test_header_profiles_request(self, mock_frappe):
+        """Test a System Manager's header profiles the request into a file"""
+        self.configure(mock_frappe, header="1", roles=["System Manager"])
+        request = Mock(path="/api/method/erpnext_custom.gl_audit.audit")
+        response = Mock(headers={})
+
+        before_request()
+        busy_loop(0.02)
+        after_request(response=response, request=request)
+
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertEqual(response.headers[PROFILE_FILE_HEADER], files[0])
+        self.assertTrue(files[0].startswith("2024-01-31T101500-api_method_erpnext_custom.gl_audit.audit-"))
+        self.assertIsNone(mock_frappe.local.erpnext_custom_profiler)
+
+    @patch('erpnext_custom.request_profiler.frappe')
+    def test_site_config_profiles_every_request(self, mock_frappe):
+        """Test the site config profiles without header"""
+        self.configure(mock_frappe, enabled=True)
+
+        before_request()
+        profiler = mock_frappe.local.erpnext_custom_profiler
+        after_request()
+
+        self.assertIsInstance(profiler, SamplingProfiler)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    @patch('erpnext_custom.request_profiler.frappe')
+    def test_write_failure_does_not_break_request(self, mock_frappe):
+        """Test a failed write is logged, not raised"""
+        self.configure(mock_frappe, enabled=True)
+        mock_frappe.conf[CONFIG_DIRECTORY] = os.path.join(self.directory, "file")
+        open(mock_frappe.conf[CONFIG_DIRECTORY], "w").close()
+
+        before_request()
+        after_request()
+
+        mock_frappe.logger.return_value.warning.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
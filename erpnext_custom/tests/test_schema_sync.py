@@ -0,0 +1,203 @@
+"""
+Unit Tests for Schema Sync
+
+Tests checksums, change planning, that stored checksums are only trusted
+while the DocTypes and custom fields exist, and that a sync applies only
+changed definitions with one commit.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from erpnext_custom.schema_sync import (
+    compute_checksum,
+    doctype_definition,
+    custom_fields_definition,
+    plan_sync,
+    get_stored_checksums,
+    sync_definitions,
+    CHECKSUM_KEY_PREFIX
+)
+
+
+MANIFEST = {
+    "Purchase Receipt": [
+        {"fieldname": "custom_return_notes", "fieldtype": "Text Editor", "insert_after": "remarks"}
+    ]
+}
+
+
+class TestComputeChecksum(unittest.TestCase):
+    """Test definition checksums"""
+
+    def test_key_order_ignored(self):
+        """Test the checksum does not depend on key order"""
+        self.assertEqual(
+            compute_checksum({"a": 1, "b": [1, 2]}),
+            compute_checksum({"b": [1, 2], "a": 1})
+        )
+
+    def test_value_change_detected(self):
+        """Test a changed value changes the checksum"""
+        changed = {"Purchase Receipt": [dict(MANIFEST["Purchase Receipt"][0], insert_after="title")]}
+
+        self.assertNotEqual(compute_checksum(MANIFEST), compute_checksum(changed))
+
+
+class TestDefinitions(unittest.TestCase):
+    """Test definition builders"""
+
+    def test_doctype_definition(self):
+        """Test a DocType JSON file becomes a keyed definition"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sales_return.json")
+            with open(path, "w") as f:
+                json.dump({"doctype": "DocType", "name": "Sales Return", "fields": []}, f)
+
+            definition = doctype_definition(path)
+
+        self.assertEqual(definition["key"], "DocType:Sales Return")
+        self.assertEqual(definition["name"], "Sales Return")
+        self.assertEqual(definition["checksum"], compute_checksum(definition["payload"]))
+
+    def test_plan_sync(self):
+        """Test only new or changed definitions are planned"""
+        unchanged = custom_fields_definition("Purchase Return", MANIFEST)
+        changed = custom_fields_definition("Debit Note", MANIFEST)
+        new = custom_fields_definition("Sales Return", MANIFEST)
+        stored = {unchanged["key"]: unchanged["checksum"], changed["key"]: "old"}
+
+        plan = plan_sync([unchanged, changed, new], stored)
+
+        self.assertEqual([d["key"] for d in plan], [changed["key"], new["key"]])
+
+
+class TestSyncDefinitions(unittest.TestCase):
+    """Test applying definitions to a site"""
+
+    def setUp(self):
+        self.doctype = {
+            "key": "DocType:Sales Return",
+            "kind": "DocType",
+            "name": "Sales Return",
+            "payload": {"doctype": "DocType", "name": "Sales Return"},
+            "checksum": "dt-new"
+        }
+        self.fields_a = custom_fields_definition("Purchase Return", MANIFEST)
+        self.fields_b = custom_fields_definition("Debit Note", {
+            "Purchase Invoice": [{"fieldname": "custom_return_notes", "fieldtype": "Text Editor"}]
+        })
+
+    @patch('erpnext_custom.schema_sync._create_custom_fields')
+    @patch('erpnext_custom.schema_sync.frappe')
+    def test_nothing_changed(self, mock_frappe, mock_create):
+        """Test an unchanged site is not written to and its cache is kept"""
+        stored = {
+            CHECKSUM_KEY_PREFIX + self.doctype["key"]: "dt-new",
+            CHECKSUM_KEY_PREFIX + self.fields_a["key"]: self.fields_a["checksum"]
+        }
+        mock_frappe.db.get_global.side_effect = stored.get
+        mock_frappe.db.exists.return_value = True
+        mock_frappe.get_all.return_value = [
+            {"name": "Purchase Receipt-custom_return_notes", "fieldtype": "Text Editor"}
+        ]
+
+        result = sync_definitions([self.doctype, self.fields_a])
+
+        self.assertEqual(result["changed"], [])
+        self.assertEqual(len(result["unchanged"]), 2)
+        mock_frappe.get_doc.assert_not_called()
+        mock_create.assert_not_called()
+        mock_frappe.db.set_global.assert_not_called()
+        mock_frappe.db.commit.assert_not_called()
+        mock_frappe.clear_cache.assert_not_called()
+
+    @patch('erpnext_custom.schema_sync._create_custom_fields')
+    @patch('erpnext_custom.schema_sync.frappe')
+    def test_changed_manifests_applied_in_one_batch(self, mock_frappe, mock_create):
+        """Test changed manifests go to one create_custom_fields call and one commit"""
+        mock_frappe.db.get_global.return_value = None
+
+        result = sync_definitions([self.fields_a, self.fields_b])
+
+        self.assertEqual(result["changed"], [self.fields_a["key"], self.fields_b["key"]])
+        mock_create.assert_called_once()
+        self.assertEqual(set(mock_create.call_args[0][0]), {"Purchase Receipt", "Purchase Invoice"})
+        mock_frappe.db.set_global.assert_any_call(
+            CHECKSUM_KEY_PREFIX + self.fields_a["key"], self.fields_a["checksum"]
+        )
+        mock_frappe.db.commit.assert_called_once()
+        mock_frappe.clear_cache.assert_called_once()
+
+    @patch('erpnext_custom.schema_sync._create_custom_fields')
+    @patch('erpnext_custom.schema_sync.frappe')
+    def test_missing_doctype_is_recreated(self, mock_frappe, mock_create):
+        """Test a deleted DocType is synced even though its checksum is stored"""
+        mock_frappe.db.get_global.return_value = "dt-new"
+        mock_frappe.db.exists.return_value = False
+
+        self.assertEqual(get_stored_checksums([self.doctype]), {})
+
+        result = sync_definitions([self.doctype])
+
+        self.assertEqual(result["changed"], [self.doctype["key"]])
+        mock_frappe.get_doc.assert_called_once_with(self.doctype["payload"])
+        mock_frappe.get_doc.return_value.save.assert_called_once_with(ignore_permissions=True)
+        mock_create.assert_not_called()
+
+    @patch('erpnext_custom.schema_sync.frappe')
+    def test_missing_or_altered_custom_field_is_recreated(self, mock_frappe):
+        """Test a manifest is synced again when one of its fields was deleted or altered"""
+        mock_frappe.db.get_global.side_effect = lambda key: {
+            CHECKSUM_KEY_PREFIX + self.fields_a["key"]: self.fields_a["checksum"],
+            CHECKSUM_KEY_PREFIX + self.fields_b["key"]: self.fields_b["checksum"]
+        }.get(key)
+        mock_frappe.get_all.return_value = [
+            {"name": "Purchase Receipt-custom_return_notes", "fieldtype": "Text Editor"}
+        ]
+
+        self.assertEqual(
+            get_stored_checksums([self.fields_a, self.fields_b]),
+            {self.fields_a["key"]: self.fields_a["checksum"]}
+        )
+        mock_frappe.get_all.assert_called_once()
+        self.assertEqual(set(mock_frappe.get_all.call_args[1]["filters"]["name"][1]), {
+            "Purchase Receipt-custom_return_notes", "Purchase Invoice-custom_return_notes"
+        })
+
+        mock_frappe.get_all.return_value = [
+            {"name": "Purchase Receipt-custom_return_notes", "fieldtype": "Data"}
+        ]
+
+        self.assertEqual(get_stored_checksums([self.fields_a]), {})
+
+    @patch('erpnext_custom.schema_sync._create_custom_fields')
+    @patch('erpnext_custom.schema_sync.frappe')
+    def test_failure_rolls_back(self, mock_frappe, mock_create):
+        """Test no checksum is kept when applying fails"""
+        mock_frappe.db.get_global.return_value = None
+        mock_create.side_effect = Exception("Duplicate field")
+
+        with self.assertRaises(Exception):
+            sync_definitions([self.fields_a])
+
+        mock_frappe.db.set_global.assert_not_called()
+        mock_frappe.db.rollback.assert_called_once()
+        mock_frappe.db.commit.assert_not_called()
+
+    @patch('erpnext_custom.schema_sync._create_custom_fields')
+    @patch('erpnext_custom.schema_sync.frappe')
+    def test_force(self, mock_frappe, mock_create):
+        """Test force applies unchanged definitions"""
+        mock_frappe.db.get_global.return_value = self.fields_a["checksum"]
+
+        result = sync_definitions([self.fields_a], force=True)
+
+        self.assertEqual(result["changed"], [self.fields_a["key"]])
+        mock_create.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
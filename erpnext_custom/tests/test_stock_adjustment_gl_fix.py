@@ -0,0 +1,204 @@
+"""
+Unit Tests for Stock Adjustment GL Fix
+
+Tests aggregation of valuation differences into GL lines, idempotency against
+already posted GL, and the submit hook's batched lookups.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+from erpnext_custom.stock_adjustment_gl_fix import (
+    compute_stock_adjustment_gl_entries,
+    fix_stock_adjustment_gl_entries,
+    get_warehouse_accounts,
+    StockAdjustmentGLError
+)
+
+
+STOCK_ACCOUNT = "1141.000 - Persediaan Barang - BAC"
+ADJUSTMENT_ACCOUNT = "5130 - Penyesuaian Persediaan - BAC"
+COMPANY_DEFAULTS = {
+    "stock_adjustment_account": ADJUSTMENT_ACCOUNT,
+    "default_inventory_account": STOCK_ACCOUNT,
+    "cost_center": "Main - BAC",
+    "enable_perpetual_inventory": 1
+}
+
+
+def make_rows(count, difference, warehouse="Gudang - BAC"):
+    """Grouped Stock Ledger Entries of count item rows"""
+    return [
+        {"voucher_detail_no": f"row{i}", "warehouse": warehouse, "stock_value_difference": difference}
+        for i in range(count)
+    ]
+
+
+class TestComputeStockAdjustmentGLEntries(unittest.TestCase):
+    """Test GL line computation"""
+
+    def test_thousands_of_items_aggregated(self):
+        """Test many item rows become one stock line and one adjustment line"""
+        result = compute_stock_adjustment_gl_entries(
+            make_rows(5000, 10.0), {}, {"Gudang - BAC": STOCK_ACCOUNT}, {}, COMPANY_DEFAULTS
+        )
+
+        self.assertEqual(len(result["gl_entries"]), 2)
+        stock_line, adjustment_line = result["gl_entries"]
+        self.assertEqual(stock_line["account"], STOCK_ACCOUNT)
+        self.assertEqual(stock_line["debit"], 50000.0)
+        self.assertEqual(adjustment_line["account"], ADJUSTMENT_ACCOUNT)
+        self.assertEqual(adjustment_line["credit"], 50000.0)
+        self.assertTrue(result["is_balanced"])
+
+    def test_valuation_decrease(self):
+        """Test a decrease credits stock and debits the adjustment account"""
+        result = compute_stock_adjustment_gl_entries(
+            make_rows(1, -25000), {}, {"Gudang - BAC": STOCK_ACCOUNT}, {}, COMPANY_DEFAULTS
+        )
+
+        stock_line, adjustment_line = result["gl_entries"]
+        self.assertEqual(stock_line["credit"], 25000)
+        self.assertEqual(adjustment_line["debit"], 25000)
+
+    def test_already_posted_is_skipped(self):
+        """Test nothing is posted when the GL already matches the valuation"""
+        result = compute_stock_adjustment_gl_entries(
+            make_rows(3, 100), {}, {"Gudang - BAC": STOCK_ACCOUNT}, {STOCK_ACCOUNT: 300}, COMPANY_DEFAULTS
+        )
+
+        self.assertEqual(result["gl_entries"], [])
+
+    def test_only_missing_difference_posted(self):
+        """Test a partially posted difference is topped up"""
+        result = compute_stock_adjustment_gl_entries(
+            make_rows(3, 100), {}, {"Gudang - BAC": STOCK_ACCOUNT}, {STOCK_ACCOUNT: 250}, COMPANY_DEFAULTS
+        )
+
+        self.assertEqual(result["gl_entries"][0]["debit"], 50)
+
+    def test_row_expense_account_used(self):
+        """Test the item rows' difference account replaces the company default"""
+        row_accounts = {"row0": {"expense_account": "5140 - Selisih Stok - BAC", "cost_center": "Toko - BAC"}}
+
+        result = compute_stock_adjustment_gl_entries(
+            make_rows(1, 100), row_accounts, {"Gudang - BAC": STOCK_ACCOUNT}, {}, COMPANY_DEFAULTS
+        )
+
+        self.assertEqual(result["gl_entries"][1]["account"], "5140 - Selisih Stok - BAC")
+        self.assertEqual(result["gl_entries"][1]["cost_center"], "Toko - BAC")
+
+    def test_missing_adjustment_account(self):
+        """Test an error is raised without an adjustment account"""
+        with self.assertRaises(StockAdjustmentGLError):
+            compute_stock_adjustment_gl_entries(
+                make_rows(1, 100), {}, {"Gudang - BAC": STOCK_ACCOUNT}, {},
+                dict(COMPANY_DEFAULTS, stock_adjustment_account=None)
+            )
+
+
+class TestFixStockAdjustmentGLEntries(unittest.TestCase):
+    """Test the submit hook"""
+
+    def setUp(self):
+        self.doc = Mock()
+        self.doc.doctype = "Stock Reconciliation"
+        self.doc.name = "MAT-RECO-2024-00001"
+        self.doc.company = "BAC"
+        self.doc.get.side_effect = lambda key, default=None: {"items": []}.get(key, default)
+        self.doc.get_gl_dict.side_effect = lambda args: args
+
+    @patch('erpnext_custom.stock_adjustment_gl_fix._make_gl_entries')
+    @patch('erpnext_custom.stock_adjustment_gl_fix.frappe')
+    def test_posts_in_one_pass(self, mock_frappe, mock_make_gl):
+        """Test valuation, GL and warehouse lookups are one query each and GL is posted once"""
+        mock_frappe.db.get_value.return_value = COMPANY_DEFAULTS
+        mock_frappe.db.sql.side_effect = [make_rows(2000, 5), []]
+        mock_frappe.get_all.return_value = [{"name": "Gudang - BAC", "account": STOCK_ACCOUNT}]
+
+        fix_stock_adjustment_gl_entries(self.doc)
+
+        self.assertEqual(mock_frappe.db.sql.call_count, 2)
+        mock_frappe.get_all.assert_called_once()
+        mock_make_gl.assert_called_once()
+        gl_map = mock_make_gl.call_args[0][0]
+        self.assertEqual(len(gl_map), 2)
+        self.assertEqual(gl_map[0]["debit"], 10000)
+        self.doc.add_comment.assert_called_once()
+
+    @patch('erpnext_custom.stock_adjustment_gl_fix._make_gl_entries')
+    @patch('erpnext_custom.stock_adjustment_gl_fix.frappe')
+    def test_no_perpetual_inventory(self, mock_frappe, mock_make_gl):
+        """Test nothing is posted when the company has no perpetual inventory"""
+        mock_frappe.db.get_value.return_value = dict(COMPANY_DEFAULTS, enable_perpetual_inventory=0)
+
+        fix_stock_adjustment_gl_entries(self.doc)
+
+        mock_frappe.db.sql.assert_not_called()
+        mock_make_gl.assert_not_called()
+
+    @patch('erpnext_custom.stock_adjustment_gl_fix._make_gl_entries')
+    @patch('erpnext_custom.stock_adjustment_gl_fix.frappe')
+    def test_error_is_logged_and_thrown(self, mock_frappe, mock_make_gl):
+        """Test failures are logged and block the submit"""
+        mock_frappe.db.get_value.return_value = COMPANY_DEFAULTS
+        mock_frappe.db.sql.side_effect = [make_rows(1, 5), [], []]
+        mock_frappe.get_all.return_value = []
+        mock_make_gl.side_effect = Exception("Fiscal year not found")
+        mock_frappe.throw.side_effect = Exception("thrown")
+
+        with self.assertRaises(Exception):
+            fix_stock_adjustment_gl_entries(self.doc)
+
+        mock_frappe.log_error.assert_called_once()
+
+    @patch('erpnext_custom.stock_adjustment_gl_fix._make_gl_entries')
+    @patch('erpnext_custom.stock_adjustment_gl_fix.frappe')
+    def test_parent_warehouse_account_already_posted(self, mock_frappe, mock_make_gl):
+        """Test stock posted by ERPNext to the parent warehouse's account is not posted again"""
+        parent_account = "1142.000 - Persediaan Cabang - BAC"
+        mock_frappe.db.get_value.return_value = COMPANY_DEFAULTS
+        mock_frappe.get_all.return_value = [{"name": "Rak A - BAC", "account": None}]
+        mock_frappe.db.sql.side_effect = [
+            make_rows(3, 5, warehouse="Rak A - BAC"),
+            [{"warehouse": "Rak A - BAC", "account": parent_account}],
+            [{"account": parent_account, "balance": 15}]
+        ]
+
+        fix_stock_adjustment_gl_entries(self.doc)
+
+        self.assertIn(parent_account, mock_frappe.db.sql.call_args_list[2][0][1][2])
+        mock_make_gl.assert_not_called()
+
+
+class TestGetWarehouseAccounts(unittest.TestCase):
+    """Test warehouse account resolution"""
+
+    @patch('erpnext_custom.stock_adjustment_gl_fix.frappe')
+    def test_own_account_needs_no_tree_query(self, mock_frappe):
+        """Test warehouses with their own account are resolved from one query"""
+        mock_frappe.get_all.return_value = [{"name": "Gudang - BAC", "account": STOCK_ACCOUNT}]
+
+        self.assertEqual(get_warehouse_accounts({"Gudang - BAC"}), {"Gudang - BAC": STOCK_ACCOUNT})
+        mock_frappe.db.sql.assert_not_called()
+
+    @patch('erpnext_custom.stock_adjustment_gl_fix.frappe')
+    def test_nearest_parent_account(self, mock_frappe):
+        """Test a child warehouse takes the account of its nearest parent that has one"""
+        mock_frappe.get_all.return_value = [
+            {"name": "Gudang - BAC", "account": STOCK_ACCOUNT},
+            {"name": "Rak A - BAC", "account": ""}
+        ]
+        mock_frappe.db.sql.return_value = [
+            {"warehouse": "Rak A - BAC", "account": "1142.000 - Persediaan Cabang - BAC"},
+            {"warehouse": "Rak A - BAC", "account": "1140.000 - Persediaan - BAC"}
+        ]
+
+        accounts = get_warehouse_accounts(["Gudang - BAC", "Rak A - BAC"])
+
+        self.assertEqual(accounts["Rak A - BAC"], "1142.000 - Persediaan Cabang - BAC")
+        self.assertEqual(accounts["Gudang - BAC"], STOCK_ACCOUNT)
+        self.assertEqual(mock_frappe.db.sql.call_args[0][1], (("Rak A - BAC",),))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Unit Tests for Tax Template Rename Planner
+
+Tests the compiled suffix pattern, rename planning with conflicts, the dry-run
+diff and batched application.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+from erpnext_custom.tax_template_rename import (
+    compile_suffix_pattern,
+    plan_template_renames,
+    format_plan_diff,
+    apply_rename_plan,
+    fix_tax_template_names
+)
+
+
+COMPANIES = ["BAC", "Cirebon", "PT Maju Jaya", "Jaya"]
+
+
+class TestCompileSuffixPattern(unittest.TestCase):
+    """Test the company suffix pattern"""
+
+    def test_longest_company_wins(self):
+        """Test the full company name is matched, not a shorter one"""
+        pattern = compile_suffix_pattern(COMPANIES)
+
+        self.assertEqual(pattern.search("PPN 11% - PT Maju Jaya").group(1), "PT Maju Jaya")
+
+    def test_no_companies(self):
+        """Test no pattern without companies"""
+        self.assertIsNone(compile_suffix_pattern([]))
+
+
+class TestPlanTemplateRenames(unittest.TestCase):
+    """Test rename planning"""
+
+    def setUp(self):
+        self.pattern = compile_suffix_pattern(COMPANIES)
+
+    def test_wrong_suffix_planned(self):
+        """Test only templates with a wrong suffix are renamed"""
+        templates = {
+            "Sales Taxes and Charges Template": [
+                {"name": "PPN 11% - BAC", "company": "Cirebon", "title": "PPN 11% - BAC"},
+                {"name": "PPN 11% - Cirebon", "company": "Cirebon", "title": "PPN 11%"},
+                {"name": "Tanpa Pajak", "company": "Cirebon", "title": None}
+            ],
+            "Purchase Taxes and Charges Template": [
+                {"name": "PPN Masukan - Cirebon", "company": "BAC", "title": "PPN Masukan"}
+            ]
+        }
+
+        plan = plan_template_renames(templates, self.pattern)
+
+        self.assertEqual([(e["old_name"], e["new_name"]) for e in plan], [
+            ("PPN 11% - BAC", "PPN 11% - Cirebon"),
+            ("PPN Masukan - Cirebon", "PPN Masukan - BAC")
+        ])
+        # First conflicts with the existing correct template
+        self.assertEqual(plan[0]["conflict"], "PPN 11% - Cirebon already exists")
+        self.assertIsNone(plan[1]["conflict"])
+        # Title without suffix is kept
+        self.assertIsNone(plan[1]["new_title"])
+
+    def test_title_with_suffix_updated(self):
+        """Test the title gets the new suffix when it had one"""
+        templates = {
+            "Sales Taxes and Charges Template": [
+                {"name": "PPN 11% - BAC", "company": "Cirebon", "title": "PPN 11% - BAC"}
+            ]
+        }
+
+        plan = plan_template_renames(templates, self.pattern)
+
+        self.assertEqual(plan[0]["new_title"], "PPN 11% - Cirebon")
+        self.assertIn("  + PPN 11% - Cirebon", format_plan_diff(plan))
+
+    def test_missing_title_falls_back_to_name(self):
+        """Test a template without a title gets one from its new name"""
+        templates = {
+            "Sales Taxes and Charges Template": [
+                {"name": "PPN 11% - BAC", "company": "Cirebon", "title": None}
+            ]
+        }
+
+        plan = plan_template_renames(templates, self.pattern)
+
+        self.assertEqual(plan[0]["old_title"], "PPN 11% - BAC")
+        self.assertEqual(plan[0]["new_title"], "PPN 11% - Cirebon")
+
+
+class TestFixTaxTemplateNames(unittest.TestCase):
+    """Test the per-site entry point"""
+
+    @patch('builtins.print')
+    @patch('erpnext_custom.tax_template_rename.frappe')
+    def test_diff_returned_not_printed(self, mock_frappe, mock_print):
+        """Test the diff comes back in the result and nothing is printed from workers"""
+        mock_frappe.local.site = "site1.local"
+        mock_frappe.get_all.side_effect = lambda doctype, **kwargs: (
+            COMPANIES if doctype == "Company"
+            else [{"name": "PPN 11% - BAC", "company": "Cirebon", "title": "PPN 11%"}]
+        )
+
+        result = fix_tax_template_names(dry_run=True)
+
+        self.assertIn("  + PPN 11% - Cirebon", result["diff"])
+        mock_print.assert_not_called()
+        mock_frappe.rename_doc.assert_not_called()
+
+
+class TestApplyRenamePlan(unittest.TestCase):
+    """Test batched application"""
+
+    def make_plan(self, count):
+        return [
+            {"doctype": "Sales Taxes and Charges Template", "old_name": f"T{i} - BAC",
+             "new_name": f"T{i} - Cirebon", "old_title": None, "new_title": None, "conflict": None}
+            for i in range(count)
+        ]
+
+    @patch('erpnext_custom.tax_template_rename.frappe')
+    def test_one_commit_per_batch(self, mock_frappe):
+        """Test renames are committed per batch"""
+        result = apply_rename_plan(self.make_plan(5), batch_size=2)
+
+        self.assertEqual(len(result["renamed"]), 5)
+        self.assertEqual(mock_frappe.rename_doc.call_count, 5)
+        self.assertEqual(mock_frappe.db.commit.call_count, 3)
+        mock_frappe.get_doc.assert_not_called()
+
+    @patch('erpnext_custom.tax_template_rename.frappe')
+    def test_failed_batch_rolled_back(self, mock_frappe):
+        """Test a failing batch is rolled back and later batches still run"""
+        mock_frappe.rename_doc = Mock(side_effect=[None, Exception("Locked"), None, None])
+
+        result = apply_rename_plan(self.make_plan(4), batch_size=2)
+
+        self.assertEqual(result["renamed"], ["T2 - Cirebon", "T3 - Cirebon"])
+        self.assertEqual(set(result["failed"]), {"T0 - BAC", "T1 - BAC"})
+        mock_frappe.db.rollback.assert_called_once()
+
+    @patch('erpnext_custom.tax_template_rename.frappe')
+    def test_conflicts_skipped(self, mock_frappe):
+        """Test conflicting renames are never applied"""
+        plan = self.make_plan(1)
+        plan[0]["conflict"] = "T0 - Cirebon already exists"
+
+        self.assertEqual(apply_rename_plan(plan)["renamed"], [])
+        mock_frappe.rename_doc.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
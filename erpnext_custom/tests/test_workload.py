@@ -0,0 +1,200 @@
+"""
+Unit Tests for the Synthetic Invoice Workload
+
+Tests determinism, document contents, references between records and
+replaying a workload on the in-memory frappe stand-in.
+"""
+
+import io
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from erpnext_custom.benchmarks.workload import (
+    POOL_SIZE,
+    PPN_12_FROM,
+    WorkloadGenerator,
+    ZipfChoice,
+    read_workload,
+    write_workload
+)
+
+
+class TestWorkloadGenerator(unittest.TestCase):
+    """Test the generated stream"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.records = list(WorkloadGenerator(seed=11).records(2000))
+
+    def test_same_seed_same_stream(self):
+        """Test a seed reproduces the stream byte for byte"""
+        first, second = io.StringIO(), io.StringIO()
+        write_workload(WorkloadGenerator(seed=5).records(300), first)
+        write_workload(WorkloadGenerator(seed=5).records(300), second)
+        other = io.StringIO()
+        write_workload(WorkloadGenerator(seed=6).records(300), other)
+
+        self.assertEqual(first.getvalue(), second.getvalue())
+        self.assertNotEqual(first.getvalue(), other.getvalue())
+
+    def test_streams_lazily(self):
+        """Test records are produced on demand"""
+        records = WorkloadGenerator(seed=1).records(10 ** 9)
+
+        self.assertEqual(len(list(itertools.islice(records, 50))), 50)
+
+    def test_kinds_and_rates(self):
+        """Test every kind appears at about its rate"""
+        kinds = Counter((record["kind"], record["action"]) for record in self.records)
+
+        self.assertEqual(kinds[("Company", "insert")], 3)
+        self.assertEqual(kinds[("Sales Invoice", "submit")] + kinds[("Purchase Invoice", "submit")], 2000)
+        self.assertAlmostEqual(kinds[("Purchase Invoice", "submit")] / 2000, 0.3, delta=0.05)
+        self.assertAlmostEqual(kinds[("Credit Note", "submit")] / 2000, 0.05, delta=0.02)
+        self.assertEqual(kinds[("Delivery Note", "submit")], kinds[("Sales Return", "submit")])
+        self.assertGreater(kinds[("Sales Invoice", "cancel")], 0)
+
+    def test_ppn_rate_by_date(self):
+        """Test PPN is 11% before PPN_12_FROM and 12% from then on"""
+        rates = set()
+        for record in self.records:
+            if record["kind"] == "Sales Invoice" and record["action"] == "submit":
+                doc = record["doc"]
+                expected = 12 if doc["posting_date"] >= PPN_12_FROM else 11
+                self.assertEqual(doc["taxes"][0]["rate"], expected)
+                rates.add(expected)
+
+        self.assertEqual(rates, {11, 12})
+
+    def test_pph23_on_service_purchases(self):
+        """Test some Purchase Invoices withhold PPh 23 and their totals net it"""
+        withheld = [
+            record["doc"] for record in self.records
+            if record["kind"] == "Purchase Invoice" and len(record["doc"]["taxes"]) == 2
+        ]
+
+        self.assertTrue(withheld)
+        for doc in withheld:
+            ppn, pph23 = doc["taxes"]
+            self.assertEqual(pph23["add_deduct_tax"], "Deduct")
+            self.assertLess(pph23["tax_amount"], 0)
+            self.assertAlmostEqual(
+                doc["grand_total"],
+                doc["net_total"] + ppn["tax_amount"] + pph23["tax_amount"],
+                places=2
+            )
+
+    def test_tiered_discounts(self):
+        """Test invoices get the discount of their subtotal's tier"""
+        for record in self.records:
+            if record["kind"] == "Sales Invoice" and record["action"] == "submit":
+                doc = record["doc"]
+                expected = 10 if doc["total"] >= 50000000 else 5 if doc["total"] >= 10000000 else 0
+                self.assertEqual(doc["discount_percentage"], expected)
+
+    def test_references_point_backwards(self):
+        """Test Credit Notes, returns and cancels reference earlier, distinct documents"""
+        seen = set()
+        used = []
+        for record in self.records:
+            doc = record.get("doc", {})
+            if record["kind"] == "Credit Note":
+                self.assertIn(doc["return_against"], seen)
+                used.append(doc["return_against"])
+            elif record["kind"] == "Sales Return":
+                self.assertIn(doc["delivery_note"], seen)
+            elif record["action"] == "cancel":
+                self.assertIn(record["name"], seen)
+                used.append(record["name"])
+            if doc.get("name"):
+                seen.add(doc["name"])
+
+        self.assertEqual(len(used), len(set(used)))
+
+    def test_skewed_customers_across_companies(self):
+        """Test a few customers dominate and every company has documents"""
+        customers = Counter()
+        companies = Counter()
+        for record in self.records:
+            if record["kind"] == "Sales Invoice" and record["action"] == "submit":
+                customers[record["doc"]["customer"]] += 1
+                companies[record["doc"]["company"]] += 1
+
+        top_ten = sum(count for _, count in customers.most_common(10))
+        self.assertGreater(top_ten / sum(customers.values()), 0.3)
+        self.assertEqual(len(companies), 3)
+
+    def test_invalid_company_count(self):
+        """Test more companies than defined is rejected"""
+        with self.assertRaises(ValueError):
+            WorkloadGenerator(companies=9)
+
+    def test_fewer_items_than_lines(self):
+        """Test invoices with more lines than there are items use every item once"""
+        records = list(WorkloadGenerator(seed=3, items=3).records(50))
+        invoices = [r["doc"] for r in records if r["kind"] == "Sales Invoice" and r["action"] == "submit"]
+
+        self.assertTrue(invoices)
+        for invoice in invoices:
+            codes = [line["item_code"] for line in invoice["items"]]
+            self.assertLessEqual(len(codes), 3)
+            self.assertEqual(len(codes), len(set(codes)))
+
+    def test_no_items_rejected(self):
+        """Test a workload without items is rejected"""
+        with self.assertRaises(ValueError):
+            WorkloadGenerator(items=0)
+
+    def test_pool_is_bounded(self):
+        """Test only the most recent Sales Invoices are kept as follow-up targets"""
+        generator = WorkloadGenerator(seed=2, purchase_rate=0, credit_note_rate=0, return_rate=0, cancel_rate=0)
+        records = list(generator.records(POOL_SIZE + 50))
+
+        self.assertEqual(len(generator.pool), POOL_SIZE)
+        self.assertEqual(generator.pool[-1]["name"], records[-1]["doc"]["name"])
+
+
+class TestZipfChoice(unittest.TestCase):
+    """Test the skewed draw"""
+
+    def test_rank_order(self):
+        """Test lower ranks are drawn more often, uniform at skew 0"""
+        rng = random.Random(0)
+
+        skewed = Counter(ZipfChoice(list("abcd"), 1.5).draw(rng) for _ in range(4000))
+        uniform = Counter(ZipfChoice(list("abcd"), 0).draw(rng) for _ in range(4000))
+
+        self.assertGreater(skewed["a"], skewed["b"])
+        self.assertGreater(skewed["b"], skewed["d"])
+        self.assertLess(max(uniform.values()) - min(uniform.values()), 300)
+
+
+class TestReplay(unittest.TestCase):
+    """Test replaying a workload file on the stand-in"""
+
+    def test_file_roundtrip_and_replay(self):
+        """Test a written workload replays without hook errors"""
+        from erpnext_custom.benchmarks.bench_hook_pipelines import replay_workload
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "workload.jsonl")
+        generator = WorkloadGenerator(seed=4, credit_note_rate=0.2, return_rate=0.2, cancel_rate=0.2)
+        with open(path, "w") as output:
+            written = write_workload(generator.records(60), output)
+
+        records = list(read_workload(path))
+        report = replay_workload(records)
+
+        self.assertEqual(len(records), written)
+        self.assertEqual(report["errors"], [])
+        replayed = sum(summary["count"] for actions in report["pipelines"].values() for summary in actions.values())
+        self.assertEqual(replayed, written - 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
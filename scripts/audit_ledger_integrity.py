@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Audit GL Ledger Integrity on All Sites
+
+Runs erpnext_custom.gl_audit.audit_ledger_integrity on every site of the bench
+in a pool of worker processes and writes one consolidated report.
+
+Checks per site:
+    - unbalanced_voucher: live vouchers whose debit != credit
+    - duplicate_posting: the same GL line posted more than once
+    - reversal_without_original: reversal rows with no original entries
+    - cancelled_document_with_live_gl: cancelled invoices with live GL rows
+    - grand_total_mismatch: invoices rejected by validate_*_for_gl_posting
+
+The whole run is bounded by --time-budget. Each worker's queries run with a
+statement timeout set to the time left, so sites still running when the budget
+is spent are interrupted mid-query and reported as incomplete; sites that never
+started are reported as not audited.
+
+Usage (from the frappe-bench/sites directory):
+    ../env/bin/python ../apps/erpnext_custom/scripts/audit_ledger_integrity.py \\
+        --from 2024-01-01 --to 2024-12-31 --workers 4 --time-budget 21600 \\
+        --output ledger-audit.json
+"""
+
+import argparse
+import json
+import time
+
+import frappe
+
+from erpnext_custom.multi_site import run_on_all_sites, STATUS_SUCCESS
+
+
+def audit_all_sites(from_date, to_date, checks=None, chunk_days=7,
+                    workers=4, time_budget=6 * 3600, sites=None):
+    """Audit every site in parallel and return the consolidated report"""
+
+    sites = sites or frappe.utils.get_sites()
+    started = time.time()
+    deadline_epoch = started + time_budget
+
+    print("=" * 80)
+    print("GL LEDGER INTEGRITY AUDIT")
+    print("=" * 80)
+    print(f"\nFound {len(sites)} sites, period {from_date} - {to_date}, "
+          f"{workers} workers, budget {time_budget}s\n")
+
+    # The audit itself stops at the deadline (statement timeout); the total
+    # timeout gives workers one extra minute to report back
+    results = run_on_all_sites(
+        "erpnext_custom.gl_audit:audit_ledger_integrity_until",
+        sites=sites,
+        args=(from_date, to_date, deadline_epoch, checks, chunk_days),
+        workers=workers,
+        commit=False,
+        total_timeout=time_budget + 60
+    )
+
+    report = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "duration_seconds": round(time.time() - started, 1),
+        "sites": [
+            result["result"] if result["status"] == STATUS_SUCCESS
+            else {"site": result["site"], "complete": False, "error": result["error"]}
+            for result in results
+        ]
+    }
+
+    print_summary(report)
+
+    return report
+
+
+def print_summary(report):
+    """Print one line per site"""
+    print("\n" + "=" * 80)
+    print("SUMMARY")
+    print("=" * 80 + "\n")
+
+    for result in report["sites"]:
+        if result.get("error"):
+            print(f"❌ {result['site']}: {result['error']}")
+            continue
+
+        findings = sum(result["counts"].values())
+        status = "✅" if findings == 0 else "⚠️ "
+        suffix = "" if result["complete"] else " (incomplete, time budget reached)"
+        counts = ", ".join(f"{check}={count}" for check, count in result["counts"].items() if count)
+        print(f"{status} {result['site']}: {findings} findings{suffix}"
+              + (f" [{counts}]" if counts else ""))
+
+    print(f"\nDuration: {report['duration_seconds']}s")
+    print("=" * 80)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Audit GL ledger integrity on all sites")
+    parser.add_argument("--from", dest="from_date", required=True)
+    parser.add_argument("--to", dest="to_date", required=True)
+    parser.add_argument("--check", dest="checks", action="append",
+                        help="Run only this check (repeatable)")
+    parser.add_argument("--site", dest="sites", action="append",
+                        help="Audit only this site (repeatable)")
+    parser.add_argument("--chunk-days", type=int, default=7)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--time-budget", type=int, default=6 * 3600,
+                        help="Seconds for the whole run")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = audit_all_sites(
+        args.from_date,
+        args.to_date,
+        checks=args.checks,
+        chunk_days=args.chunk_days,
+        workers=args.workers,
+        time_budget=args.time_budget,
+        sites=args.sites
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nReport written to {args.output}")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Audit Naming Series Counters on All Sites
+
+Runs erpnext_custom.naming_series_audit.audit_naming_series on every site of
+the bench, several sites in parallel. Without --apply only reports counters
+that are behind the highest document number in use; with --apply moves them
+forward in one batch per site. Prefixes come from tabSeries; pass --prefix for
+series whose counter row is missing altogether.
+
+Usage (from the frappe-bench/sites directory):
+    ../env/bin/python ../apps/erpnext_custom/scripts/audit_naming_series.py
+    ../env/bin/python ../apps/erpnext_custom/scripts/audit_naming_series.py --apply --workers 4
+    ../env/bin/python ../apps/erpnext_custom/scripts/audit_naming_series.py --site cirebon.batasku.cloud
+    ../env/bin/python ../apps/erpnext_custom/scripts/audit_naming_series.py --prefix ACC-SINV-2025-
+"""
+
+import argparse
+
+from erpnext_custom.multi_site import run_on_all_sites, print_site_results
+
+
+def describe(report):
+    """One summary line per site"""
+    line = f"{len(report['series'])} series in {report['doctypes']} doctypes"
+    if report["behind"]:
+        line += f", behind: {', '.join(report['behind'])}"
+    if report["corrected"]:
+        line += f" ({report['corrected']} corrected)"
+    return line
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Audit naming series counters on all sites")
+    parser.add_argument("--apply", action="store_true", help="Correct counters that are behind")
+    parser.add_argument("--site", dest="sites", action="append",
+                        help="Audit only this site (repeatable)")
+    parser.add_argument("--prefix", dest="prefixes", action="append",
+                        help="Also audit this prefix if it has no tabSeries row (repeatable)")
+    parser.add_argument("--workers", type=int, default=4, help="Sites processed at the same time")
+    parser.add_argument("--timeout", type=int, default=1800, help="Seconds per site")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("NAMING SERIES AUDIT" + (" (APPLY)" if args.apply else " (REPORT ONLY)"))
+    print("=" * 80)
+
+    results = run_on_all_sites(
+        "erpnext_custom.naming_series_audit:audit_naming_series",
+        sites=args.sites,
+        kwargs={"apply": args.apply, "prefixes": args.prefixes},
+        workers=args.workers,
+        timeout=args.timeout,
+        commit=args.apply
+    )
+
+    print_site_results(results, describe=describe)
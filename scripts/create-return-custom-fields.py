@@ -4,108 +4,44 @@ Script to create custom fields for Purchase Return and Debit Note features
 Creates custom fields in Purchase Receipt and Purchase Invoice doctypes
 
 Module: Batasku Custom
+
+Usage (from the frappe-bench/sites directory):
+    ../env/bin/python ../apps/erpnext_custom/scripts/create-return-custom-fields.py --site [site-name]
+    ../env/bin/python ../apps/erpnext_custom/scripts/create-return-custom-fields.py --all --workers 4
+
+The field definitions live in erpnext_custom.return_custom_fields, so worker
+processes can import them. Each manifest is checksummed (see
+erpnext_custom.schema_sync); a site whose stored checksums match is skipped
+without touching its custom fields. Pass --force to re-apply anyway.
 """
 
+import argparse
 import frappe
-from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
 
-def create_purchase_receipt_custom_fields():
-    """Create custom fields for Purchase Receipt (Purchase Return)"""
-    
-    custom_fields = {
-        'Purchase Receipt': [
-            {
-                'fieldname': 'custom_return_notes',
-                'label': 'Return Notes',
-                'fieldtype': 'Text Editor',
-                'insert_after': 'remarks',
-                'depends_on': 'eval:doc.is_return==1',
-                'description': 'Additional notes for purchase return',
-                'module': 'Batasku Custom',
-            }
-        ],
-        'Purchase Receipt Item': [
-            {
-                'fieldname': 'custom_return_reason',
-                'label': 'Return Reason',
-                'fieldtype': 'Select',
-                'options': '\nDamaged\nQuality Issue\nWrong Item\nSupplier Request\nExpired\nOther',
-                'insert_after': 'item_name',
-                'depends_on': 'eval:parent.is_return==1',
-                'description': 'Reason for returning this item',
-                'module': 'Batasku Custom',
-            },
-            {
-                'fieldname': 'custom_return_item_notes',
-                'label': 'Return Item Notes',
-                'fieldtype': 'Small Text',
-                'insert_after': 'custom_return_reason',
-                'depends_on': 'eval:parent.is_return==1',
-                'description': 'Additional notes for this return item (required for "Other" reason)',
-                'module': 'Batasku Custom',
-            }
-        ]
-    }
-    
-    create_custom_fields(custom_fields, update=True)
-    print("✅ Custom fields for Purchase Receipt created successfully")
+from erpnext_custom.multi_site import run_on_all_sites, print_site_results
+from erpnext_custom.return_custom_fields import sync_return_custom_fields
 
-def create_purchase_invoice_custom_fields():
-    """Create custom fields for Purchase Invoice (Debit Note)"""
+def create_all_custom_fields(force=False):
+    """Create changed custom fields on the connected site in one batch"""
+    print("Creating custom fields for Purchase Return and Debit Note...")
+    result = sync_return_custom_fields(force=force)
     
-    custom_fields = {
-        'Purchase Invoice': [
-            {
-                'fieldname': 'custom_return_notes',
-                'label': 'Return Notes',
-                'fieldtype': 'Text Editor',
-                'insert_after': 'remarks',
-                'depends_on': 'eval:doc.is_return==1',
-                'description': 'Additional notes for debit note',
-                'module': 'Batasku Custom',
-            }
-        ],
-        'Purchase Invoice Item': [
-            {
-                'fieldname': 'custom_return_reason',
-                'label': 'Return Reason',
-                'fieldtype': 'Select',
-                'options': '\nDamaged\nQuality Issue\nWrong Item\nSupplier Request\nExpired\nOther',
-                'insert_after': 'item_name',
-                'depends_on': 'eval:parent.is_return==1',
-                'description': 'Reason for returning this item',
-                'module': 'Batasku Custom',
-            },
-            {
-                'fieldname': 'custom_return_item_notes',
-                'label': 'Return Item Notes',
-                'fieldtype': 'Small Text',
-                'insert_after': 'custom_return_reason',
-                'depends_on': 'eval:parent.is_return==1',
-                'description': 'Additional notes for this return item (required for "Other" reason)',
-                'module': 'Batasku Custom',
-            }
-        ]
-    }
+    for key in result['changed']:
+        print(f"✅ {key} created/updated")
+    for key in result['unchanged']:
+        print(f"   {key} unchanged, skipped")
     
-    create_custom_fields(custom_fields, update=True)
-    print("✅ Custom fields for Purchase Invoice created successfully")
+    return result
 
-def main():
+def main(site, force=False):
     """Main function to create all custom fields"""
-    frappe.init(site='your-site-name')  # Replace with your actual site name
+    frappe.init(site=site)
     frappe.connect()
     
     try:
-        print("Creating custom fields for Purchase Return and Debit Note...")
-        print("\n1. Creating Purchase Receipt custom fields...")
-        create_purchase_receipt_custom_fields()
-        
-        print("\n2. Creating Purchase Invoice custom fields...")
-        create_purchase_invoice_custom_fields()
+        create_all_custom_fields(force=force)
         
-        frappe.db.commit()
-        print("\n✅ All custom fields created successfully!")
+        print("\n✅ All custom fields up to date!")
         print("\nCustom fields created:")
         print("  - Purchase Receipt: custom_return_notes")
         print("  - Purchase Receipt Item: custom_return_reason, custom_return_item_notes")
@@ -119,5 +55,39 @@ def main():
     finally:
         frappe.destroy()
 
+def describe(result):
+    """One summary line per site"""
+    if not result['changed']:
+        return "up to date"
+    return f"{len(result['changed'])} manifests applied"
+
+def main_all_sites(workers=4, timeout=600, retries=1, force=False):
+    """Create all custom fields on every site, several sites in parallel"""
+    results = run_on_all_sites(
+        "erpnext_custom.return_custom_fields:sync_return_custom_fields",
+        kwargs={"force": force},
+        workers=workers,
+        timeout=timeout,
+        retries=retries
+    )
+    
+    print_site_results(results, describe=describe)
+    
+    return results
+
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Create Purchase Return and Debit Note custom fields")
+    parser.add_argument("--site", help="Site to update")
+    parser.add_argument("--all", action="store_true", help="Update every site of the bench")
+    parser.add_argument("--workers", type=int, default=4, help="Sites processed at the same time")
+    parser.add_argument("--timeout", type=int, default=600, help="Seconds per site")
+    parser.add_argument("--retries", type=int, default=1, help="Extra attempts per failed site")
+    parser.add_argument("--force", action="store_true", help="Apply manifests even if their checksum is unchanged")
+    args = parser.parse_args()
+    
+    if args.all:
+        main_all_sites(workers=args.workers, timeout=args.timeout, retries=args.retries, force=args.force)
+    elif args.site:
+        main(args.site, force=args.force)
+    else:
+        parser.error("Pass --site [site-name] or --all")
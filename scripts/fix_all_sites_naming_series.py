@@ -5,16 +5,20 @@ Fix Employee Naming Series Counter for All Sites
 This script fixes the Employee naming series counter for all sites in a multi-tenant ERPNext setup.
 Run this on the ERPNext server.
 
-Usage Option 1 - Fix all sites:
-    python3 fix_all_sites_naming_series.py
+Usage Option 1 - Fix all sites (4 sites at a time, 10 minutes per site):
+    python3 fix_all_sites_naming_series.py --all --workers 4 --timeout 600
 
 Usage Option 2 - Fix specific site:
     bench --site cirebon.batasku.cloud console
-    # Then paste the fix_employee_naming_series() function and call it
+    >>> from erpnext_custom.employee_naming_series import fix_employee_naming_series
+    >>> fix_employee_naming_series()
 """
 
+import argparse
 import frappe
-import sys
+
+from erpnext_custom.multi_site import run_on_all_sites, print_site_results
+from erpnext_custom import employee_naming_series
 
 def fix_employee_naming_series():
     """Fix the Employee naming series counter for current site"""
@@ -23,62 +27,20 @@ def fix_employee_naming_series():
     print(f"FIXING EMPLOYEE NAMING SERIES FOR: {frappe.local.site}")
     print("=" * 60)
     
-    # Get all employees
-    employees = frappe.get_all('Employee', fields=['name'], order_by='name desc', limit_page_length=999999)
-    
-    # Find highest number
-    max_number = 0
-    for emp in employees:
-        if emp.name.startswith('HR-EMP-'):
-            try:
-                num = int(emp.name.replace('HR-EMP-', ''))
-                if num > max_number:
-                    max_number = num
-            except ValueError:
-                continue
-    
-    next_number = max_number + 1
+    result = employee_naming_series.fix_employee_naming_series()
     
     print(f"\n📊 Current State:")
-    print(f"  - Total employees: {len(employees)}")
-    print(f"  - Highest ID number: {max_number}")
-    print(f"  - Next ID should be: {next_number}")
-    
-    # Check current naming series value
-    current_series = frappe.db.sql("""
-        SELECT current FROM tabSeries WHERE name = 'HR-EMP-'
-    """, as_dict=True)
-    
-    if current_series:
-        print(f"  - Current series counter: {current_series[0].current}")
-    else:
-        print(f"  - Current series counter: NOT SET")
-    
-    # Update naming series counter
-    print(f"\n🔧 Updating naming series counter...")
-    frappe.db.sql("""
-        INSERT INTO tabSeries (name, current) 
-        VALUES ('HR-EMP-', %s)
-        ON DUPLICATE KEY UPDATE current = %s
-    """, (next_number, next_number))
-    
-    frappe.db.commit()
-    
-    print(f"✅ Successfully updated naming series counter to {next_number}")
-    print(f"📝 Next employee will be: HR-EMP-{str(next_number).zfill(5)}")
+    print(f"  - Total employees: {result['total_employees']}")
+    print(f"  - Highest ID number: {result['highest_number']}")
+    print(f"  - Previous series counter: {result['previous_counter'] or 'NOT SET'}")
+    print(f"✅ Naming series counter is now {result['counter']}")
+    print(f"📝 Next employee will be: {result['next_id']}")
     print("=" * 60)
     
-    return {
-        'site': frappe.local.site,
-        'success': True,
-        'total_employees': len(employees),
-        'highest_number': max_number,
-        'next_number': next_number,
-        'next_id': f"HR-EMP-{str(next_number).zfill(5)}"
-    }
+    return result
 
-def fix_all_sites():
-    """Fix naming series for all sites"""
+def fix_all_sites(workers=4, timeout=600, retries=1):
+    """Fix naming series for all sites, several sites in parallel"""
     
     # Get all sites
     sites = frappe.utils.get_sites()
@@ -86,52 +48,35 @@ def fix_all_sites():
     print("=" * 80)
     print("FIXING EMPLOYEE NAMING SERIES FOR ALL SITES")
     print("=" * 80)
-    print(f"\nFound {len(sites)} sites\n")
-    
-    results = []
+    print(f"\nFound {len(sites)} sites, {workers} at a time\n")
     
-    for site in sites:
-        try:
-            frappe.init(site=site)
-            frappe.connect()
-            
-            result = fix_employee_naming_series()
-            results.append(result)
-            
-            frappe.destroy()
-            
-        except Exception as e:
-            print(f"\n❌ Error fixing {site}: {str(e)}\n")
-            results.append({
-                'site': site,
-                'success': False,
-                'error': str(e)
-            })
-            frappe.destroy()
+    results = run_on_all_sites(
+        "erpnext_custom.employee_naming_series:fix_employee_naming_series",
+        sites=sites,
+        workers=workers,
+        timeout=timeout,
+        retries=retries
+    )
     
     # Summary
-    print("\n" + "=" * 80)
-    print("SUMMARY")
-    print("=" * 80)
-    
-    success_count = sum(1 for r in results if r.get('success'))
-    failed_count = len(results) - success_count
-    
-    print(f"\n✅ Successfully fixed: {success_count} sites")
-    print(f"❌ Failed: {failed_count} sites\n")
-    
-    for result in results:
-        if result.get('success'):
-            print(f"✅ {result['site']}: {result['total_employees']} employees, next ID: {result['next_id']}")
-        else:
-            print(f"❌ {result['site']}: {result.get('error', 'Unknown error')}")
+    print_site_results(
+        results,
+        describe=lambda r: f"{r['total_employees']} employees, next ID: {r['next_id']}"
+    )
     
-    print("\n" + "=" * 80)
+    return results
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1 and sys.argv[1] == '--all':
+    parser = argparse.ArgumentParser(description="Fix Employee naming series counter")
+    parser.add_argument("--all", action="store_true", help="Fix every site of the bench")
+    parser.add_argument("--workers", type=int, default=4, help="Sites processed at the same time")
+    parser.add_argument("--timeout", type=int, default=600, help="Seconds per site")
+    parser.add_argument("--retries", type=int, default=1, help="Extra attempts per failed site")
+    args = parser.parse_args()
+    
+    if args.all:
         # Fix all sites
-        fix_all_sites()
+        fix_all_sites(workers=args.workers, timeout=args.timeout, retries=args.retries)
     else:
         # Fix current site (when run from bench console)
         if hasattr(frappe, 'local') and hasattr(frappe.local, 'site'):
@@ -140,7 +85,7 @@ if __name__ == '__main__':
         else:
             print("Usage:")
             print("  Option 1 - Fix all sites:")
-            print("    python3 fix_all_sites_naming_series.py --all")
+            print("    python3 fix_all_sites_naming_series.py --all [--workers 4] [--timeout 600]")
             print()
             print("  Option 2 - Fix specific site:")
             print("    bench --site your-site.com console")
@@ -2,99 +2,92 @@
 """
 Script to fix tax template names by replacing incorrect company suffix with correct one.
 
+The rename plan is computed first (see erpnext_custom.tax_template_rename) and
+printed as a diff; with --dry-run nothing is changed.
+
 Usage:
     bench --site [site-name] execute scripts/fix_tax_template_names.py
 
 Example:
     bench --site cirebon.batasku.cloud execute erp-next-system/scripts/fix_tax_template_names.py
+
+All sites (from the frappe-bench/sites directory, 4 sites at a time):
+    ../env/bin/python ../apps/erpnext_custom/scripts/fix_tax_template_names.py --all --dry-run
+    ../env/bin/python ../apps/erpnext_custom/scripts/fix_tax_template_names.py --all --workers 4
 """
 
+import argparse
 import frappe
-import re
 
-def fix_tax_template_names():
+from erpnext_custom.multi_site import run_on_all_sites, print_site_results, STATUS_SUCCESS
+from erpnext_custom import tax_template_rename
+
+def fix_tax_template_names(dry_run=False, batch_size=tax_template_rename.DEFAULT_BATCH_SIZE):
     """
     Fix tax template names by replacing company suffix with correct company from field.
-    
+
     Example:
         "PPN 11% - BAC" with company="Cirebon" → "PPN 11% - Cirebon"
     """
-    
-    # Get all companies
-    companies = frappe.get_all('Company', fields=['name'])
-    company_names = [c.name for c in companies]
-    
+
     print(f"\n{'='*60}")
-    print(f"Found {len(company_names)} companies: {', '.join(company_names)}")
+    print(f"Tax template rename plan for {frappe.local.site}" + (" (DRY RUN)" if dry_run else ""))
     print(f"{'='*60}\n")
-    
-    # Process both Sales and Purchase tax templates
-    doctypes = [
-        'Sales Taxes and Charges Template',
-        'Purchase Taxes and Charges Template'
-    ]
-    
-    total_updated = 0
-    
-    for doctype in doctypes:
-        print(f"\n--- Processing {doctype} ---\n")
-        
-        # Get all templates
-        templates = frappe.get_all(doctype, fields=['name', 'company', 'title'])
-        
-        for template in templates:
-            name = template.name
-            company = template.company
-            title = template.title or name
-            
-            # Check if name has company suffix pattern (e.g., " - BAC", " - Cirebon")
-            # Pattern: ends with " - [CompanyName]"
-            suffix_pattern = r'\s*-\s*(' + '|'.join(re.escape(c) for c in company_names) + r')$'
-            match = re.search(suffix_pattern, name)
-            
-            if match:
-                current_suffix = match.group(1)
-                
-                # Check if suffix matches the actual company field
-                if current_suffix != company:
-                    # Build new name by replacing suffix
-                    base_name = re.sub(suffix_pattern, '', name)
-                    new_name = f"{base_name} - {company}"
-                    
-                    print(f"Template: {name}")
-                    print(f"  Company field: {company}")
-                    print(f"  Current suffix: {current_suffix}")
-                    print(f"  New name: {new_name}")
-                    
-                    try:
-                        # Rename the document
-                        frappe.rename_doc(doctype, name, new_name, force=True)
-                        
-                        # Update title if it also has the wrong suffix
-                        if title and re.search(suffix_pattern, title):
-                            base_title = re.sub(suffix_pattern, '', title)
-                            new_title = f"{base_title} - {company}"
-                            
-                            doc = frappe.get_doc(doctype, new_name)
-                            doc.title = new_title
-                            doc.save()
-                            
-                            print(f"  ✓ Renamed and updated title")
-                        else:
-                            print(f"  ✓ Renamed")
-                        
-                        total_updated += 1
-                        
-                    except Exception as e:
-                        print(f"  ✗ Error: {str(e)}")
-                    
-                    print()
-    
-    frappe.db.commit()
-    
+
+    result = tax_template_rename.fix_tax_template_names(dry_run=dry_run, batch_size=batch_size)
+
+    for line in result['diff']:
+        print(line)
+
     print(f"\n{'='*60}")
-    print(f"Total templates updated: {total_updated}")
+    print(f"Templates planned: {len(result['plan'])}")
+    print(f"Total templates updated: {len(result['renamed'])}")
+    if result['failed']:
+        print(f"Failed: {len(result['failed'])}")
     print(f"{'='*60}\n")
 
+    return result
+
+def describe(result):
+    """One summary line per site"""
+    line = f"{len(result['plan'])} planned, {len(result['renamed'])} renamed"
+    if result['failed']:
+        line += f", {len(result['failed'])} failed"
+    return line
+
+def fix_all_sites(dry_run=False, workers=4, timeout=600, retries=0):
+    """Fix tax template names on every site, several sites in parallel"""
+
+    # Batches commit themselves, so a retry only re-plans what is left
+    results = run_on_all_sites(
+        "erpnext_custom.tax_template_rename:fix_tax_template_names",
+        kwargs={"dry_run": dry_run},
+        workers=workers,
+        timeout=timeout,
+        retries=retries,
+        commit=False
+    )
+
+    # Diffs per site, printed together instead of interleaved from workers
+    for result in results:
+        if result['status'] == STATUS_SUCCESS and result['result']['diff']:
+            print(f"\n--- {result['site']} ---")
+            print("\n".join(result['result']['diff']))
+
+    print_site_results(results, describe=describe)
+
+    return results
+
 if __name__ == '__main__':
-    fix_tax_template_names()
+    parser = argparse.ArgumentParser(description="Fix tax template company suffixes")
+    parser.add_argument("--all", action="store_true", help="Fix every site of the bench")
+    parser.add_argument("--dry-run", action="store_true", help="Print the rename plan only")
+    parser.add_argument("--workers", type=int, default=4, help="Sites processed at the same time")
+    parser.add_argument("--timeout", type=int, default=600, help="Seconds per site")
+    parser.add_argument("--retries", type=int, default=0, help="Extra attempts per failed site")
+    args = parser.parse_args()
+
+    if args.all:
+        fix_all_sites(dry_run=args.dry_run, workers=args.workers, timeout=args.timeout, retries=args.retries)
+    else:
+        fix_tax_template_names(dry_run=args.dry_run)